@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Synthetic Class Generator
+
+Builds a benchmark assignment directory of configurable size from
+assignments/sample-assignment: a base notebook with M activities, N filled-in
+student submissions in Moodle folder layout, and an overview.md.
+
+The marking pattern designer runs interactively even with --auto-approve, so
+the rubric and marking criteria it would write are pre-seeded in processed/
+and the orchestrator's resume logic skips that stage.
+
+Usage:
+    python3 bench/generate_class.py --output /tmp/bench-class --students 60 --activities 7
+    python3 bench/generate_class.py --output /tmp/bench-ff --type freeform --students 30
+"""
+
+import argparse
+import base64
+import copy
+import json
+import random
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).parent.parent
+SAMPLE_DIR = PROJECT_ROOT / "assignments" / "sample-assignment"
+
+ACTIVITY_PATTERN = re.compile(r'\*\*\[A(\d+)\]\*\*')
+START_INPUT = '*Start student input* ↓'
+END_INPUT = '*End student input ↑*'
+
+# Length of a long answer (--long-rate), relative to a normal one
+LONG_ANSWER_FACTOR = 10
+
+FIRST_NAMES = [
+    'Amara', 'Ben', 'Chloe', 'Dev', 'Elena', 'Farid', 'Grace', 'Hiro', 'Isla', 'Jonah',
+    'Kavya', 'Liam', 'Maya', 'Noah', 'Olga', 'Priya', 'Quinn', 'Ravi', 'Sara', 'Tomas',
+    'Uma', 'Victor', 'Wen', 'Ximena', 'Yusuf', 'Zoe',
+]
+LAST_NAMES = [
+    'Adeyemi', 'Brooks', 'Chen', 'Dubois', 'Eriksen', 'Fischer', 'Gupta', 'Haddad', 'Ivanova',
+    'Jensen', 'Kim', 'Lopez', 'Murphy', 'Nakamura', 'Okafor', 'Patel', 'Rossi', 'Singh',
+    'Tanaka', 'Usman', 'Varga', 'Walsh', 'Yilmaz', 'Zhang',
+]
+
+# Answer templates for the sample's seven activities; activity N > 7 reuses template ((N-1) % 7) + 1
+ANSWER_TEMPLATES = [
+    "X_train, X_val, y_train, y_val = train_test_split(X, y, test_size={test_size}, random_state={seed})",
+    "dt = DecisionTreeClassifier(random_state={seed})",
+    "dt.fit(X_train, y_train)",
+    "y_pred = dt.predict(X_val)\nprint(y_pred[:{count}])",
+    "print('Accuracy:', accuracy_score(y_val, y_pred))\nprint(classification_report(y_val, y_pred))",
+    "scaler = StandardScaler()\nX_train_s = scaler.fit_transform(X_train)\nX_val_s = scaler.transform(X_val)\n"
+    "dt_s = DecisionTreeClassifier(random_state={seed}).fit(X_train_s, y_train)\n"
+    "print('Scaled accuracy:', accuracy_score(y_val, dt_s.predict(X_val_s)))",
+    "No. Decision trees split on one feature at a time using thresholds, so rescaling a feature "
+    "does not change which split is best. The accuracy was {accuracy} both with and without scaling.",
+]
+
+FREEFORM_PARTS = [
+    ("Data loading and exploration", "df = pd.read_csv('data.csv')\nprint(df.shape)\ndf.describe()"),
+    ("Preprocessing", "X = df.drop(columns=['target'])\ny = df['target']\n"
+                      "X = StandardScaler().fit_transform(X)"),
+    ("Model training", "model = RandomForestClassifier(n_estimators={count}, random_state={seed})\n"
+                       "model.fit(X_train, y_train)"),
+    ("Evaluation", "print(classification_report(y_val, model.predict(X_val)))"),
+    ("Discussion", "The model reached {accuracy} accuracy on the validation set. "
+                   "The most important features were related to cell size."),
+]
+
+
+def cell_source(cell: Dict) -> str:
+    """Cell source as a single string."""
+    source = cell.get('source', '')
+    return ''.join(source) if isinstance(source, list) else source
+
+
+def markdown_cell(text: str) -> Dict:
+    return {'cell_type': 'markdown', 'metadata': {}, 'source': text}
+
+
+def code_cell(text: str, outputs: Optional[List] = None) -> Dict:
+    return {'cell_type': 'code', 'execution_count': None, 'metadata': {},
+            'outputs': outputs or [], 'source': text}
+
+
+def split_activity_blocks(cells: List[Dict]) -> tuple:
+    """Split a structured notebook into (preamble cells, [cells of each activity])."""
+    preamble, blocks = [], []
+    for cell in cells:
+        if ACTIVITY_PATTERN.search(cell_source(cell)):
+            blocks.append([cell])
+        elif blocks:
+            blocks[-1].append(cell)
+        else:
+            preamble.append(cell)
+    return preamble, blocks
+
+
+def build_base_notebook(sample: Dict, num_activities: int) -> Dict:
+    """Base notebook with the sample's activities repeated and renumbered to reach num_activities."""
+    preamble, blocks = split_activity_blocks(sample['cells'])
+    if not blocks:
+        print("Error: sample notebook has no activity markers", file=sys.stderr)
+        sys.exit(1)
+
+    cells = copy.deepcopy(preamble)
+    for number in range(1, num_activities + 1):
+        block = copy.deepcopy(blocks[(number - 1) % len(blocks)])
+        block[0]['source'] = ACTIVITY_PATTERN.sub(f'**[A{number}]**', cell_source(block[0]), count=1)
+        cells.extend(block)
+
+    notebook = copy.deepcopy(sample)
+    notebook['cells'] = cells
+    return notebook
+
+
+def build_freeform_base(sample: Dict, num_parts: int) -> Dict:
+    """Free-form base notebook: the sample's title cells followed by the project parts."""
+    preamble, _ = split_activity_blocks(sample['cells'])
+    cells = copy.deepcopy(preamble[:5])
+    for number in range(1, num_parts + 1):
+        title, _ = FREEFORM_PARTS[(number - 1) % len(FREEFORM_PARTS)]
+        cells.append(markdown_cell(f"## Part {number}: {title}"))
+    notebook = copy.deepcopy(sample)
+    notebook['cells'] = cells
+    return notebook
+
+
+def make_answers(rng: random.Random, num_activities: int, freeform: bool) -> List[str]:
+    """One answer per activity (or free-form part), with varied parameters."""
+    templates = [part[1] for part in FREEFORM_PARTS] if freeform else ANSWER_TEMPLATES
+    answers = []
+    for number in range(1, num_activities + 1):
+        template = templates[(number - 1) % len(templates)]
+        answers.append(template.format(
+            test_size=rng.choice([0.2, 0.25, 0.3]),
+            seed=rng.choice([0, 1, 7, 42, 123]),
+            count=rng.choice([5, 10, 20]),
+            accuracy=f"{rng.uniform(0.88, 0.96):.3f}",
+        ))
+    return answers
+
+
+def lengthen_answer(answer: str) -> str:
+    """An answer followed by the student's commented-out attempts, LONG_ANSWER_FACTOR times its length."""
+    attempts = '\n'.join(f"# attempt {n}: " + line for n in range(1, LONG_ANSWER_FACTOR)
+                         for line in answer.splitlines())
+    return f"{answer}\n{attempts}"
+
+
+def padding_output(size_bytes: int, rng: random.Random) -> List[Dict]:
+    """A display_data output holding an image-sized base64 payload."""
+    if size_bytes <= 0:
+        return []
+    payload = base64.b64encode(rng.randbytes(size_bytes * 3 // 4)).decode('ascii')
+    return [{'output_type': 'display_data', 'metadata': {},
+             'data': {'image/png': payload, 'text/plain': ['<Figure size 640x480 with 1 Axes>']}}]
+
+
+def fill_structured(base: Dict, student_name: str, answers: List[str], padding: List[Dict]) -> Dict:
+    """Student copy of the base notebook with every input section answered."""
+    notebook = copy.deepcopy(base)
+    activity = 0
+    in_input = False
+    padded = False
+    for cell in notebook['cells']:
+        source = cell_source(cell)
+        if source.startswith('**Student name**'):
+            cell['source'] = f"**Student name**: {student_name}"
+        match = ACTIVITY_PATTERN.search(source)
+        if match:
+            # The preamble quotes the input markers, so only track them inside activities
+            activity = int(match.group(1))
+            in_input = False
+        elif START_INPUT in source:
+            in_input = True
+        elif END_INPUT in source:
+            in_input = False
+        elif in_input and activity:
+            cell['source'] = answers[activity - 1]
+            if cell['cell_type'] == 'code' and not padded:
+                cell['outputs'] = padding
+                padded = True
+    return notebook
+
+
+def fill_freeform(base: Dict, student_name: str, answers: List[str], padding: List[Dict]) -> Dict:
+    """Student copy of the free-form notebook with a solution cell after each part heading."""
+    notebook = copy.deepcopy(base)
+    cells = []
+    part = 0
+    for cell in notebook['cells']:
+        source = cell_source(cell)
+        if source.startswith('**Student name**'):
+            cell['source'] = f"**Student name**: {student_name}"
+        cells.append(cell)
+        if source.startswith('## Part '):
+            answer = answers[part]
+            part += 1
+            if FREEFORM_PARTS[(part - 1) % len(FREEFORM_PARTS)][0] == 'Discussion':
+                cells.append(markdown_cell(answer))
+            else:
+                cells.append(code_cell(answer, padding if part == 1 else None))
+    notebook['cells'] = cells
+    return notebook
+
+
+def allocate_marks(total: int, count: int) -> List[int]:
+    """Split total marks into count near-equal integer allocations."""
+    base, remainder = divmod(total, count)
+    return [base + (1 if i < remainder else 0) for i in range(count)]
+
+
+def write_overview(output_dir: Path, assignment_type: str, total_marks: int, parallel: int):
+    """overview.md with benchmark front matter and the sample's description."""
+    sample_text = (SAMPLE_DIR / 'overview.md').read_text(encoding='utf-8')
+    body = re.sub(r'^---\n.*?\n---\n', '', sample_text, count=1, flags=re.DOTALL)
+    base_line = "base_file: base_notebook.ipynb\n" if assignment_type == 'structured' else ''
+    front_matter = (f"---\ndefault_provider: claude\nmax_parallel: {parallel}\n{base_line}"
+                    f"assignment_type: {assignment_type}\ntotal_marks: {total_marks}\n---\n")
+    (output_dir / 'overview.md').write_text(front_matter + body, encoding='utf-8')
+
+
+def seed_pattern_design(processed_dir: Path, assignment_type: str, allocations: List[int]):
+    """Write the rubric and criteria the interactive pattern designer would produce."""
+    processed_dir.mkdir(parents=True, exist_ok=True)
+    if assignment_type == 'structured':
+        lines = ["# Marking Rubric", "", "## Activity Allocations", ""]
+        lines += [f"- **A{n} – Activity {n}:** {marks} marks" for n, marks in enumerate(allocations, 1)]
+        (processed_dir / 'rubric.md').write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+        activities_dir = processed_dir / 'activities'
+        activities_dir.mkdir(exist_ok=True)
+        for n, marks in enumerate(allocations, 1):
+            (activities_dir / f'A{n}_criteria.md').write_text(
+                f"# A{n} Marking Criteria\n\n**Total**: {marks} marks\n\n"
+                "- Full marks for a correct, runnable answer that displays its result\n"
+                "- Deduct for missing random_state, wrong variables or missing output\n",
+                encoding='utf-8')
+    else:
+        lines = ["# Marking Rubric", ""]
+        lines += [f"- **Part {n}:** {marks} marks" for n, marks in enumerate(allocations, 1)]
+        (processed_dir / 'rubric.md').write_text("\n".join(lines) + "\n", encoding='utf-8')
+        (processed_dir / 'marking_criteria.md').write_text(
+            "# Marking Criteria\n\n- Each part is complete, runs, and shows its output\n"
+            "- The discussion refers to the observed results\n", encoding='utf-8')
+
+
+def generate_class(output_dir: Path, assignment_type: str = 'structured', students: int = 30,
+                   activities: int = 7, sections: int = 2, dup_rate: float = 0.0,
+                   notebook_kb: int = 0, total_marks: int = 100, parallel: int = 4,
+                   seed: int = 0, long_rate: float = 0.0) -> Dict:
+    """
+    Generate a synthetic assignment directory.
+
+    Args:
+        output_dir: Assignment directory to create (must not exist or be empty)
+        assignment_type: 'structured' or 'freeform'
+        students: Number of submissions
+        activities: Activities (structured) or project parts (free-form)
+        sections: Number of section folders under submissions/
+        dup_rate: Probability that a student copies all answers of an earlier student
+        notebook_kb: Approximate extra size of each submission, as an image output
+        total_marks: Total marks for the assignment
+        parallel: max_parallel written to overview.md
+        seed: Random seed
+        long_rate: Fraction of students whose answers are LONG_ANSWER_FACTOR times longer
+
+    Returns:
+        Description of the generated class (also written to bench_class.json)
+    """
+    rng = random.Random(seed)
+    freeform = assignment_type == 'freeform'
+
+    with open(SAMPLE_DIR / 'base_notebook.ipynb', 'r', encoding='utf-8') as f:
+        sample = json.load(f)
+    base = build_freeform_base(sample, activities) if freeform else build_base_notebook(sample, activities)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if not freeform:
+        with open(output_dir / 'base_notebook.ipynb', 'w', encoding='utf-8') as f:
+            json.dump(base, f, indent=1)
+    write_overview(output_dir, assignment_type, total_marks, parallel)
+    seed_pattern_design(output_dir / 'processed', assignment_type, allocate_marks(total_marks, activities))
+
+    names = [f"{first} {last}" for last in LAST_NAMES for first in FIRST_NAMES]
+    rng.shuffle(names)
+
+    roster = []
+    answer_sets = []
+    for index in range(students):
+        name = names[index % len(names)]
+        if index >= len(names):
+            name = f"{name} {index // len(names) + 1}"
+        duplicate_of = None
+        if answer_sets and rng.random() < dup_rate:
+            duplicate_of = rng.randrange(len(answer_sets))
+            answers = answer_sets[duplicate_of]
+        else:
+            answers = make_answers(rng, activities, freeform)
+            # Drawn only when asked for, so classes without long answers keep their seeds
+            if long_rate and rng.random() < long_rate:
+                answers = [lengthen_answer(answer) for answer in answers]
+        answer_sets.append(answers)
+
+        padding = padding_output(notebook_kb * 1024, rng)
+        fill = fill_freeform if freeform else fill_structured
+        notebook = fill(base, name, answers, padding)
+
+        student_id = 2000000 + index
+        folder = (output_dir / 'submissions' / f'section_{index % sections + 1}'
+                  / f"{name.replace(' ', '_')}_{student_id}_assignsubmission_file")
+        folder.mkdir(parents=True, exist_ok=True)
+        with open(folder / f"Lab ({name}).ipynb", 'w', encoding='utf-8') as f:
+            json.dump(notebook, f, indent=1)
+
+        roster.append({'name': name, 'id': student_id,
+                       'duplicate_of': roster[duplicate_of]['name'] if duplicate_of is not None else None})
+
+    description = {
+        'assignment_type': assignment_type,
+        'students': students,
+        'activities': activities,
+        'sections': sections,
+        'dup_rate': dup_rate,
+        'duplicates': sum(1 for s in roster if s['duplicate_of']),
+        'notebook_kb': notebook_kb,
+        'long_rate': long_rate,
+        'total_marks': total_marks,
+        'seed': seed,
+        'roster': roster,
+    }
+    with open(output_dir / 'bench_class.json', 'w', encoding='utf-8') as f:
+        json.dump(description, f, indent=2)
+    return description
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate a synthetic class for pipeline benchmarks'
+    )
+    parser.add_argument('--output', required=True, help='Assignment directory to create')
+    parser.add_argument('--type', choices=['structured', 'freeform'], default='structured',
+                        help='Assignment type (default: structured)')
+    parser.add_argument('--students', type=int, default=30, help='Number of students (default: 30)')
+    parser.add_argument('--activities', type=int, default=7,
+                        help='Activities, or project parts for free-form (default: 7)')
+    parser.add_argument('--sections', type=int, default=2, help='Section folders (default: 2)')
+    parser.add_argument('--dup-rate', type=float, default=0.0,
+                        help='Fraction of students whose answers copy an earlier student (default: 0)')
+    parser.add_argument('--notebook-kb', type=int, default=0,
+                        help='Extra size per submission in KB, added as an image output (default: 0)')
+    parser.add_argument('--long-rate', type=float, default=0.0,
+                        help=f'Fraction of students with {LONG_ANSWER_FACTOR}x longer answers (default: 0)')
+    parser.add_argument('--total-marks', type=int, default=100, help='Total marks (default: 100)')
+    parser.add_argument('--parallel', type=int, default=4, help='max_parallel in overview.md (default: 4)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+
+    args = parser.parse_args()
+
+    output_dir = Path(args.output)
+    if output_dir.exists() and any(output_dir.iterdir()):
+        print(f"Error: Output directory is not empty: {output_dir}", file=sys.stderr)
+        sys.exit(1)
+    if args.students < 1 or args.activities < 1 or args.sections < 1:
+        print("Error: --students, --activities and --sections must be at least 1", file=sys.stderr)
+        sys.exit(1)
+    if not 0.0 <= args.dup_rate <= 1.0:
+        print("Error: --dup-rate must be between 0 and 1", file=sys.stderr)
+        sys.exit(1)
+
+    description = generate_class(
+        output_dir, args.type, args.students, args.activities, args.sections,
+        args.dup_rate, args.notebook_kb, args.total_marks, args.parallel, args.seed, args.long_rate
+    )
+
+    print(f"✓ Generated {args.type} class: {output_dir}")
+    print(f"  Students: {description['students']} ({description['duplicates']} duplicate submissions)")
+    print(f"  Activities: {description['activities']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Mock LLM CLI
+
+Stands in for the claude, gemini and codex CLIs as invoked by llm_caller.sh,
+emitting the same output formats (plain text, Claude/Gemini JSON, Codex JSONL)
+so extract_llm_stats.py and the agents work unchanged.
+
+Usage (via the shims in bench/mock/bin):
+    mock_cli.py --cli claude [CLI ARGS...] PROMPT
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from mock_core import complete, startup_delay, MockLLMError
+
+# Options that take a value, per CLI (everything else starting with '-' is a flag)
+VALUE_OPTIONS = {
+    'claude': {'--model', '--allowedTools', '--permission-mode', '--output-format',
+               '--input-format'},
+    'gemini': {'--model', '--include-directories', '--output-format', '-p', '-i'},
+    'codex': {'--model', '--add-dir', '--sandbox', '--ask-for-approval', '-o'},
+}
+
+
+def parse_cli_args(cli: str, argv: list) -> tuple:
+    """Split CLI arguments into ({option: value}, [positionals])."""
+    options = {}
+    positionals = []
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg in VALUE_OPTIONS[cli] and i + 1 < len(argv):
+            options[arg] = argv[i + 1]
+            i += 2
+        elif arg.startswith('-') and len(arg) > 1:
+            options[arg] = True
+            i += 1
+        else:
+            positionals.append(arg)
+            i += 1
+    return options, positionals
+
+
+def claude_result(text: str, usage: dict, is_error: bool = False) -> dict:
+    """A claude result event (the --output-format json object)."""
+    return {
+        'type': 'result',
+        'subtype': 'error_during_execution' if is_error else 'success',
+        'is_error': is_error,
+        'result': text,
+        'usage': {
+            'input_tokens': usage['input_tokens'],
+            'output_tokens': usage['output_tokens'],
+            'cache_creation_input_tokens': 0,
+            'cache_read_input_tokens': 0,
+        },
+        'total_cost_usd': 0,
+        'duration_api_ms': usage['api_ms'],
+    }
+
+
+def serve_stream_json(model: str | None):
+    """
+    claude --input-format stream-json: one process serves a stream of user
+    messages, paying the startup time once.
+    """
+    time.sleep(startup_delay('cli'))
+    print(json.dumps({'type': 'system', 'subtype': 'init', 'model': model or 'mock'}), flush=True)
+    for line in sys.stdin:
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        content = message.get('message', {}).get('content', '')
+        if isinstance(content, list):
+            content = ''.join(part.get('text', '') for part in content)
+        try:
+            text, usage = complete(content, 'cli', 'claude', model, include_startup=False)
+            event = claude_result(text, usage)
+        except MockLLMError as e:
+            event = claude_result(str(e), {'input_tokens': 0, 'output_tokens': 0, 'api_ms': 0},
+                                  is_error=True)
+        print(json.dumps(event), flush=True)
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] != '--cli':
+        print("Usage: mock_cli.py --cli <claude|gemini|codex> [ARGS...]", file=sys.stderr)
+        sys.exit(2)
+
+    cli = sys.argv[2]
+    argv = sys.argv[3:]
+    if argv and argv[0] == '--version':
+        print(f"{cli} 0.0.0 (benchmark mock)")
+        return
+    if cli == 'codex' and argv and argv[0] == 'exec':
+        argv = argv[1:]
+
+    options, positionals = parse_cli_args(cli, argv)
+    if cli == 'claude' and options.get('--input-format') == 'stream-json':
+        model = options.get('--model') if isinstance(options.get('--model'), str) else None
+        serve_stream_json(model)
+        return
+    prompt = options.get('-p') or options.get('-i') or (positionals[-1] if positionals else '')
+    if not isinstance(prompt, str) or not prompt or prompt == '-':
+        prompt = '' if sys.stdin.isatty() else sys.stdin.read()
+    model = options.get('--model') if isinstance(options.get('--model'), str) else None
+
+    try:
+        text, usage = complete(prompt, 'cli', cli, model)
+    except MockLLMError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if cli == 'claude' and options.get('--output-format') == 'json':
+        print(json.dumps(claude_result(text, usage)))
+    elif cli == 'gemini' and options.get('--output-format') == 'json':
+        print(json.dumps({
+            'response': text,
+            'stats': {'models': {model or 'mock': {
+                'api': {'totalRequests': 1, 'totalErrors': 0, 'totalLatencyMs': usage['api_ms']},
+                'tokens': {
+                    'prompt': usage['input_tokens'],
+                    'candidates': usage['output_tokens'],
+                },
+            }}},
+        }))
+    elif cli == 'codex' and options.get('--json'):
+        print(json.dumps({'type': 'thread.started'}))
+        print(json.dumps({'type': 'item.completed', 'item': {'type': 'agent_message', 'text': text}}))
+        print(json.dumps({'type': 'turn.completed', 'usage': {
+            'input_tokens': usage['input_tokens'],
+            'output_tokens': usage['output_tokens'],
+        }}))
+    elif cli == 'codex' and isinstance(options.get('-o'), str):
+        with open(options['-o'], 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,680 @@
+#!/usr/bin/env python3
+"""
+Mock LLM Core
+
+Shared by the mock CLIs (bench/mock/bin/claude, gemini, codex) and the mock
+SDK packages (bench/mock/sdk/anthropic, openai, google.generativeai), so the
+pipeline can run end-to-end without network access or quota.
+
+Each call:
+- detects which agent sent the prompt (marker, normalizer, unifier, ...)
+- sleeps for a latency drawn from the configured distribution
+- fails with the configured error rate
+- returns a canned, well-formed output that the pipeline's parsers accept
+- appends one JSON line describing the call to $BENCH_MOCK_LOG
+
+Configuration is read from the JSON file named by $BENCH_MOCK_CONFIG:
+
+    {
+      "seed": 0,
+      "time_scale": 1.0,
+      "startup": {"cli": 0.3, "api": 0.0},
+      "latency": {
+        "default": {"dist": "lognormal", "median": 0.05, "sigma": 0.5},
+        "marker": {"dist": "lognormal", "median": 8, "sigma": 0.6, "per_output_token": 0.01,
+                   "stall": {"rate": 0.02, "seconds": 240}}
+      },
+      "error_rate": {"default": 0.0, "marker": 0.02},
+      "degenerate_rate": {"marker": 0.05},
+      "malformed_rate": {"normalizer": 0.2},
+      "quota_after": {"gemini": 40},
+      "key_rate_limit": {"requests": 10, "window": 60}
+    }
+
+A latency spec's optional stall adds `seconds` to a `rate` fraction of calls,
+for provider stalls far beyond the distribution's tail. per_output_token and
+per_input_token add seconds per token of the response and of the prompt.
+
+quota_after simulates an exhausted quota: after that many calls to a
+provider, every further call to it fails at once with a quota error.
+
+degenerate_rate (per stage, like error_rate) makes a fraction of the calls
+return a degenerate response: the start of the normal one, then one
+sentence looped for about 4000 tokens (and the latency of that output).
+Streamed calls (the mock SDKs' streaming APIs) deliver the response in
+chunks, the first after first_token_share (default 0.2) of the latency.
+
+malformed_rate (per stage) makes a fraction of the marker, normalizer and
+unifier responses miss what the next stage parses (a section heading, the
+per-student mapping format, the Total Mark line; with structured outputs, a
+student's mapping or the total_mark field). Repair prompts from
+src/utils/output_validator.py are always answered well-formed.
+
+Normalizer and unifier prompts with the JSON instructions of
+src/utils/structured_output.py are answered with a JSON object matching
+their schema.
+
+key_rate_limit simulates per-key rate limits on the mock SDKs: an API key
+that has started `requests` calls in the last `window` (scaled) seconds gets
+an immediate 429 until older calls age out.
+
+Latencies and failures are reproducible for a given seed and prompt, but a
+retried call draws again (attempts are counted per prompt in $BENCH_MOCK_STATE).
+"""
+
+import fcntl
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_CONFIG = {
+    'seed': 0,
+    'time_scale': 1.0,
+    'startup': {'cli': 0.0, 'api': 0.0},
+    'latency': {'default': {'dist': 'lognormal', 'median': 0.05, 'sigma': 0.5}},
+    'error_rate': {'default': 0.0},
+}
+
+# Heading of the repair prompts of src/utils/output_validator.py
+REPAIR_HEADING = '## Repair Required'
+
+# Heading of the JSON instructions of src/utils/structured_output.py
+JSON_HEADING = '## JSON Output'
+
+# Prompt headings that identify the calling agent (earliest match wins)
+STAGE_MARKERS = [
+    ('# Name Resolver Agent', 'name_resolver'),
+    ('# Marking Pattern Designer', 'pattern_designer'),
+    ('# Marker Agent', 'marker'),
+    ('# Normalizer Agent', 'normalizer'),
+    ('# Unifier Agent', 'unifier'),
+    ('# Translator Agent', 'translator'),
+    ('# Aggregator Agent', 'aggregator'),
+    ('You are a feedback summarizer', 'summarizer'),
+    ('You are a precise feedback editor', 'modifier'),
+]
+
+MISTAKES = [
+    'Missing random_state, results are not reproducible',
+    'Used the test split for model selection',
+    'Output not displayed or printed',
+    'Incorrect variable names for the required outputs',
+    'Explanation does not reference the observed results',
+]
+
+POSITIVES = [
+    'Clear, well-commented code',
+    'Correctly interpreted the evaluation metrics',
+    'Went beyond the requirements with an extra comparison',
+]
+
+
+# Characters per chunk of a streamed response
+STREAM_CHUNK_CHARS = 200
+
+# Repetitions of the looping sentence of a degenerate response (~4000 tokens)
+DEGENERATE_REPEATS = 120
+
+
+class MockLLMError(Exception):
+    """Simulated provider failure."""
+
+
+class MockRateLimitError(MockLLMError):
+    """Simulated 429 (rate limit or exhausted quota)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def load_config() -> Dict:
+    """Load the mock configuration, falling back to fast defaults."""
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    config_path = os.environ.get('BENCH_MOCK_CONFIG')
+    if config_path and Path(config_path).exists():
+        with open(config_path, 'r', encoding='utf-8') as f:
+            user_config = json.load(f)
+        for key, value in user_config.items():
+            if isinstance(value, dict) and isinstance(config.get(key), dict):
+                config[key].update(value)
+            else:
+                config[key] = value
+    return config
+
+
+def detect_stage(prompt: str) -> str:
+    """Identify the agent that built the prompt from its heading."""
+    head = prompt[:4000]
+    found = [(head.find(marker), stage) for marker, stage in STAGE_MARKERS if marker in head]
+    return min(found)[1] if found else 'other'
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def _stage_setting(config: Dict, key: str, stage: str, default):
+    """Get a per-stage setting, falling back to the 'default' entry."""
+    settings = config.get(key, {})
+    return settings.get(stage, settings.get('default', default))
+
+
+def sample_latency(spec: Dict, rng: random.Random, output_tokens: int, input_tokens: int = 0) -> float:
+    """Draw a latency in seconds from a distribution spec."""
+    dist = spec.get('dist', 'fixed')
+    if dist == 'lognormal':
+        # median = exp(mu), so mu = ln(median)
+        latency = rng.lognormvariate(math.log(max(spec.get('median', 0.05), 1e-6)),
+                                     spec.get('sigma', 0.5))
+    elif dist == 'uniform':
+        latency = rng.uniform(spec.get('low', 0.0), spec.get('high', 0.1))
+    else:
+        latency = float(spec.get('value', 0.0))
+    stall = spec.get('stall')
+    if stall and rng.random() < stall.get('rate', 0.0):
+        # Provider stall: the call hangs before answering
+        latency += stall.get('seconds', 0.0)
+    return (latency + spec.get('per_output_token', 0.0) * output_tokens
+            + spec.get('per_input_token', 0.0) * input_tokens)
+
+
+def _next_attempt(prompt_sha: str) -> int:
+    """Count calls for this prompt so retries draw fresh latency/errors."""
+    return _bump_counter(prompt_sha)
+
+
+def _bump_counter(name: str) -> int:
+    """Increment a counter in $BENCH_MOCK_STATE, returning its previous value."""
+    state_dir = os.environ.get('BENCH_MOCK_STATE')
+    if not state_dir:
+        return 0
+    Path(state_dir).mkdir(parents=True, exist_ok=True)
+    fd = os.open(os.path.join(state_dir, name), os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+    try:
+        os.write(fd, b'.')
+        return os.fstat(fd).st_size - 1
+    finally:
+        os.close(fd)
+
+
+def _key_rate_limited(api_key: str, limit: Dict, time_scale: float) -> Optional[float]:
+    """
+    Count a call against an API key's rate limit.
+
+    Returns:
+        Seconds until the key has capacity again if it is over the limit,
+        else None
+    """
+    state_dir = os.environ.get('BENCH_MOCK_STATE')
+    if not state_dir or not limit:
+        return None
+    Path(state_dir).mkdir(parents=True, exist_ok=True)
+    key_sha = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+    now = time.time()
+    window = limit.get('window', 60) * time_scale
+    with open(os.path.join(state_dir, f"key_{key_sha}"), 'a+') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        recent = [float(t) for t in f.read().split() if float(t) > now - window]
+        limited = len(recent) >= limit.get('requests', 0)
+        if not limited:
+            recent.append(now)
+        f.seek(0)
+        f.truncate()
+        f.write(''.join(f"{t}\n" for t in recent))
+    return round(min(recent) + window - now, 3) if limited else None
+
+
+def _log_call(entry: Dict):
+    """Append one call record to the mock log (single write, so lines don't interleave)."""
+    log_path = os.environ.get('BENCH_MOCK_LOG')
+    if not log_path:
+        return
+    fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, (json.dumps(entry) + '\n').encode('utf-8'))
+    finally:
+        os.close(fd)
+
+
+def startup_delay(interface: str) -> float:
+    """Simulated process startup for an interface, in (scaled) seconds."""
+    config = load_config()
+    return config.get('startup', {}).get(interface, 0.0) * config.get('time_scale', 1.0)
+
+
+def _prepare(prompt: str, interface: str, provider: str, model: Optional[str],
+             include_startup: bool, api_key: Optional[str]) -> Dict:
+    """
+    Draw the outcome of one mock call: response, usage, delay and failure.
+
+    Raises:
+        MockRateLimitError: When the key is rate limited (before any work)
+    """
+    start = time.time()
+    config = load_config()
+    time_scale = config.get('time_scale', 1.0)
+    retry_after = _key_rate_limited(api_key, config.get('key_rate_limit'), time_scale) if api_key else None
+    if retry_after is not None:
+        key_sha = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+        _log_call({'start': start, 'end': time.time(), 'pid': os.getpid(), 'interface': interface,
+                   'provider': provider, 'model': model or '', 'stage': detect_stage(prompt),
+                   'error': True, 'rate_limited': True})
+        raise MockRateLimitError(f"mock {provider} error: 429 rate_limit_error: "
+                                 f"too many requests for key {key_sha}", retry_after)
+    stage = detect_stage(prompt)
+    prompt_sha = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+    attempt = _next_attempt(prompt_sha)
+
+    # Content depends only on the prompt; timing and failures also on the attempt
+    content_rng = random.Random(f"{config['seed']}:{prompt_sha}")
+    timing_rng = random.Random(f"{config['seed']}:{prompt_sha}:{attempt}")
+    degenerate_rng = random.Random(f"{config['seed']}:{prompt_sha}:{attempt}:degenerate")
+    malformed_rng = random.Random(f"{config['seed']}:{prompt_sha}:malformed")
+
+    # A failed call produces no output (and no side effects such as written files)
+    quota = config.get('quota_after', {}).get(provider)
+    exhausted = quota is not None and _bump_counter(f"calls_{provider}") >= quota
+    failed = exhausted or timing_rng.random() < _stage_setting(config, 'error_rate', stage, 0.0)
+    degenerate = not failed and degenerate_rng.random() < _stage_setting(config, 'degenerate_rate', stage, 0.0)
+    text = '' if failed else respond(stage, prompt, content_rng)
+    if (text and REPAIR_HEADING not in prompt
+            and malformed_rng.random() < _stage_setting(config, 'malformed_rate', stage, 0.0)):
+        text = malformed_response(stage, text)
+    if degenerate:
+        text = degenerate_response(text)
+    usage = {'input_tokens': estimate_tokens(prompt), 'output_tokens': estimate_tokens(text)}
+
+    startup = config.get('startup', {}).get(interface, 0.0) if include_startup else 0.0
+    api_latency = sample_latency(_stage_setting(config, 'latency', stage, {}), timing_rng,
+                                 usage['output_tokens'], usage['input_tokens'])
+    if exhausted:
+        # Quota errors are returned before any work is done
+        api_latency = 0.0
+    elif failed:
+        # Failures surface partway through the call
+        api_latency *= timing_rng.random()
+    usage['api_ms'] = round(api_latency * time_scale * 1000)
+    return {
+        'start': start, 'config': config, 'time_scale': time_scale, 'interface': interface,
+        'provider': provider, 'model': model or '', 'stage': stage, 'prompt_sha': prompt_sha,
+        'attempt': attempt, 'quota': quota, 'exhausted': exhausted, 'failed': failed,
+        'degenerate': degenerate, 'text': text, 'usage': usage, 'startup': startup,
+        'api_latency': api_latency,
+    }
+
+
+def _finish(call: Dict, output_tokens: int, aborted: bool = False):
+    """Log a prepared call, and raise its failure if it failed."""
+    _log_call({
+        'start': call['start'],
+        'end': time.time(),
+        'pid': os.getpid(),
+        'interface': call['interface'],
+        'provider': call['provider'],
+        'model': call['model'],
+        'stage': call['stage'],
+        'prompt_sha': call['prompt_sha'],
+        'attempt': call['attempt'],
+        'input_tokens': call['usage']['input_tokens'],
+        'output_tokens': 0 if call['failed'] else output_tokens,
+        'error': call['failed'],
+        **({'degenerate': True} if call['degenerate'] else {}),
+        **({'aborted': True} if aborted else {}),
+    })
+
+    if call['exhausted']:
+        raise MockRateLimitError(f"mock {call['provider']} error: 429 RESOURCE_EXHAUSTED: quota exceeded "
+                                 f"(limit {call['quota']} calls)")
+    if call['failed']:
+        raise MockLLMError(f"mock {call['provider']} error: 529 overloaded "
+                           f"(stage {call['stage']}, attempt {call['attempt']})")
+
+
+def complete(prompt: str, interface: str, provider: str, model: Optional[str] = None,
+             include_startup: bool = True, api_key: Optional[str] = None) -> Tuple[str, Dict]:
+    """
+    Run one mock LLM call.
+
+    Args:
+        prompt: Full prompt text (system prompt included)
+        interface: 'cli' or 'api'
+        provider: claude, gemini or codex
+        model: Requested model name
+        include_startup: Whether to sleep the interface's startup time
+            (False for calls on an already running streaming CLI process)
+        api_key: Key the mock SDK was given (for key_rate_limit)
+
+    Returns:
+        Tuple of (response text, {'input_tokens': n, 'output_tokens': n,
+        'api_ms': simulated provider time, excluding startup})
+
+    Raises:
+        MockLLMError: When the configured error rate triggers a failure
+        MockRateLimitError: When a quota or key rate limit is hit
+    """
+    call = _prepare(prompt, interface, provider, model, include_startup, api_key)
+    time.sleep(max(0.0, (call['startup'] + call['api_latency']) * call['time_scale']))
+    _finish(call, call['usage']['output_tokens'])
+    return call['text'], call['usage']
+
+
+class MockStream:
+    """
+    A mock response delivered in chunks at the call's simulated pace.
+
+    The first chunk arrives after the startup and `first_token_share` of the
+    call's latency (config, default 0.2); the rest is spread evenly over the
+    remaining chunks. Closing the stream early (or dropping it) cancels the
+    call, which is logged with the tokens delivered so far. `usage` is set
+    once the stream has been read to the end.
+    """
+
+    def __init__(self, call: Dict):
+        self.call = call
+        self.usage = None
+        self._chunks = self._generate()
+
+    def _generate(self):
+        call, text = self.call, self.call['text']
+        scale = call['time_scale']
+        if call['failed']:
+            time.sleep(max(0.0, (call['startup'] + call['api_latency']) * scale))
+            _finish(call, 0)
+        share = call['config'].get('first_token_share', 0.2)
+        pieces = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or ['']
+        gap = call['api_latency'] * (1 - share) / max(len(pieces) - 1, 1)
+        sent = 0
+        try:
+            time.sleep(max(0.0, (call['startup'] + call['api_latency'] * share) * scale))
+            for n, piece in enumerate(pieces):
+                if n:
+                    time.sleep(gap * scale)
+                sent += len(piece)
+                yield piece
+        finally:
+            done = sent >= len(text)
+            _finish(call, estimate_tokens(text[:sent]) if sent else 0, aborted=not done)
+        self.usage = call['usage']
+
+    def __iter__(self):
+        return self._chunks
+
+    def close(self):
+        self._chunks.close()
+
+
+def complete_stream(prompt: str, interface: str, provider: str, model: Optional[str] = None,
+                    api_key: Optional[str] = None) -> MockStream:
+    """
+    Run one mock LLM call, streamed (same outcomes as complete()).
+
+    Raises:
+        MockRateLimitError: When a key rate limit is hit (before streaming)
+    """
+    return MockStream(_prepare(prompt, interface, provider, model, True, api_key))
+
+
+def degenerate_response(text: str) -> str:
+    """A response that starts well and then loops on one sentence."""
+    head = text.split('\n\n', 2)[:2]
+    loop = ("The student completed the required steps and the results are consistent with "
+            "the expected output for this part of the assignment. ")
+    return '\n\n'.join(head) + '\n\n' + loop * DEGENERATE_REPEATS
+
+
+def malformed_response(stage: str, text: str) -> str:
+    """A response the next stage cannot parse fully (output_validator.py rejects it)."""
+    if stage in ('normalizer', 'unifier') and text.startswith('{'):
+        # Structured outputs: a student left out of the mapping, or no total mark
+        data = json.loads(text)
+        if stage == 'normalizer':
+            data['student_mappings'] = data['student_mappings'][:-1]
+        else:
+            data.pop('total_mark', None)
+        return json.dumps(data, indent=2)
+    if stage == 'marker':
+        return text.replace('## Positive Points', 'Positive points:')
+    if stage == 'normalizer':
+        # The per-student mapping in a format combine_normalized.py does not read
+        text = re.sub(r'^\*   \*\*Student (\d+) \((.+?)\)\*\*: Mistakes: (.+?); Positives: (.+)$',
+                      r'**Student \1 \2**:\n- Mistakes: \3\n- Positives: \4', text, flags=re.MULTILINE)
+        return re.sub(r'^### Student (\d+): (.+)$', r'**Student \1: \2**', text, flags=re.MULTILINE)
+    if stage == 'unifier':
+        return text.replace('Total Mark: ', 'Final Mark: ')
+    return text
+
+
+# ============================================================================
+# Canned outputs
+# ============================================================================
+
+def respond(stage: str, prompt: str, rng: random.Random) -> str:
+    """Build a well-formed response for the detected agent."""
+    builders = {
+        'name_resolver': respond_name_resolver,
+        'marker': respond_marker,
+        'normalizer': respond_normalizer,
+        'unifier': respond_unifier,
+        'summarizer': respond_summarizer,
+        'modifier': respond_modifier,
+    }
+    builder = builders.get(stage)
+    if builder is None:
+        return f"Mock response for {stage} prompt ({len(prompt)} characters)."
+    return builder(prompt, rng)
+
+
+def _choose(rng: random.Random, items: List[str], rates: List[float]) -> List[int]:
+    """Pick item indices, each with its own probability."""
+    return [i for i, rate in enumerate(rates[:len(items)]) if rng.random() < rate]
+
+
+def respond_name_resolver(prompt: str, rng: random.Random) -> str:
+    """Write name_mapping.json like the interactive agent would."""
+    output_match = re.search(r'create the file at: `([^`]+)`', prompt)
+    paths_match = re.search(r'## Submission Paths to Analyze\s+```\n(.*?)\n```', prompt, re.DOTALL)
+    if not output_match or not paths_match:
+        return "Could not find the output path or submission paths in the prompt."
+
+    mapping = {}
+    for path in paths_match.group(1).splitlines():
+        path = path.strip()
+        if not path:
+            continue
+        name = None
+        for part in Path(path).parts:
+            moodle = re.match(r'^(.+?)_\d+_assignsubmission_file$', part)
+            if moodle:
+                name = moodle.group(1)
+        if not name:
+            paren = re.search(r'\(([^)]+)\)', Path(path).stem)
+            name = paren.group(1) if paren else Path(path).stem
+        mapping[path] = name.replace('_', ' ').strip()
+
+    output_path = Path(output_match.group(1))
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({'assignment_name': 'benchmark', 'name_mapping': mapping,
+                   'unresolved': [], 'notes': ['Resolved by the mock provider']}, f, indent=2)
+    return f"Created {output_path} with {len(mapping)} names."
+
+
+def respond_marker(prompt: str, rng: random.Random) -> str:
+    """Per-activity (or whole-submission) marker assessment."""
+    activity = re.search(r'# Marker Agent - Activity (A\d+)', prompt)
+    title = f"Activity {activity.group(1)}" if activity else "Submission"
+    mistakes = _choose(rng, MISTAKES, [0.4, 0.3, 0.2, 0.15, 0.1])
+    positives = _choose(rng, POSITIVES, [0.5, 0.3, 0.1])
+
+    lines = [f"# {title} Assessment", "", "## Summary", "",
+             "The student completed the required steps. The assessment below lists "
+             "each issue found and each notable strength.", "", "## Mistakes Identified", ""]
+    lines += [f"{n}. **{MISTAKES[i]}** - observed in the submitted cells; "
+              f"this affects correctness of the result." for n, i in enumerate(mistakes, 1)] or ["None."]
+    lines += ["", "## Positive Points", ""]
+    lines += [f"{n}. **{POSITIVES[i]}**" for n, i in enumerate(positives, 1)] or ["None."]
+    score = max(0, 10 - 2 * len(mistakes) + len(positives))
+    lines += ["", "## Suggested Mark", "", f"**{min(score, 10)} / 10**", ""]
+    if '## Confidence Report' in prompt:
+        # Cascade pass: self-reported confidence and structured fields
+        severity = 'none' if not mistakes else rng.choice(['minor', 'major'])
+        fields = {'confidence': round(rng.uniform(0.4, 1.0), 2), 'requirements_met': 5 - len(mistakes),
+                  'requirements_total': 5, 'mistakes': len(mistakes), 'max_severity': severity}
+        lines += ["### Confidence", "```json", json.dumps(fields), "```", ""]
+    return "\n".join(lines)
+
+
+def _activity_total(prompt: str, activity_id: str) -> float:
+    """Activity allocation from the rubric embedded in the prompt."""
+    match = re.search(rf'\*\*{activity_id}\s+[–-].*?:\*\*\s+(\d+)\s+marks', prompt)
+    return float(match.group(1)) if match else 10.0
+
+
+def _fmt(value: float) -> str:
+    return f"{value:g}"
+
+
+def respond_normalizer(prompt: str, rng: random.Random) -> str:
+    """Scoring tables and per-student mapping in the format combine_normalized.py parses."""
+    activity = re.search(r'# Normalizer Agent - Activity (A\d+)', prompt)
+    students = re.findall(r'^## Student (\d+): (.+)$', prompt, re.MULTILINE)
+    freeform = activity is None
+    total = 100.0 if freeform else _activity_total(prompt, activity.group(1))
+
+    mistake_ids = [f"M{i:03d}" if freeform else f"M{i}" for i in range(1, len(MISTAKES) + 1)]
+    positive_ids = [f"P{i:03d}" if freeform else f"P{i}" for i in range(1, len(POSITIVES) + 1)]
+    assignments = []
+    for _, name in students:
+        student_rng = random.Random(f"{rng.random()}:{name}")
+        assignments.append((
+            [mistake_ids[i] for i in _choose(student_rng, MISTAKES, [0.4, 0.3, 0.2, 0.15, 0.1])],
+            [positive_ids[i] for i in _choose(student_rng, POSITIVES, [0.5, 0.3, 0.1])],
+        ))
+
+    def frequency(code, side):
+        return sum(1 for a in assignments if code in a[side])
+
+    def deduction(i):
+        return max(0.5, round(total * 0.05 * (i + 1) * 2) / 2)
+
+    if JSON_HEADING in prompt:
+        return json.dumps({
+            'mistakes': [{'id': code, 'category': 'Correctness' if freeform else '', 'description': MISTAKES[i],
+                          'frequency': frequency(code, 0), 'severity': min(10, 3 + 2 * i),
+                          'suggested_deduction': deduction(i), 'rubric_component': '', 'notes': 'mock'}
+                         for i, code in enumerate(mistake_ids)],
+            'positives': [{'id': code, 'category': 'Code Quality' if freeform else '', 'description': POSITIVES[i],
+                           'frequency': frequency(code, 1), 'quality': 8 - i, 'suggested_bonus': 0.5 * i,
+                           'rubric_component': '', 'notes': 'mock'}
+                          for i, code in enumerate(positive_ids)],
+            'student_mappings': [{'student': name.strip(), 'mistakes': mistakes, 'positives': positives,
+                                  'requirements_coverage': '', 'overall_assessment': ''}
+                                 for (_, name), (mistakes, positives) in zip(students, assignments)],
+            'distribution_analysis': 'Mock distribution analysis.',
+            'marking_recommendations': 'Mock marking recommendations.',
+        }, indent=2)
+
+    heading = "Free-form Assignment" if freeform else f"Activity {activity.group(1)}"
+    lines = [f"# Normalized Scoring - {heading}", "", "### Mistakes Table",
+             "| Mistake ID | Description | Frequency | Severity (1-10) | Suggested Deduction | Notes |",
+             "|------------|-------------|-----------|-----------------|---------------------|-------|"]
+    for i, code in enumerate(mistake_ids):
+        lines.append(f"| {code} | {MISTAKES[i]} | {frequency(code, 0)}/{len(students)} students | "
+                     f"{min(10, 3 + 2 * i)} | {_fmt(deduction(i))} marks | mock |")
+    lines += ["", "### Positive Points Table",
+              "| Positive ID | Description | Frequency | Quality (1-10) | Suggested Bonus | Notes |",
+              "|-------------|-------------|-----------|----------------|-----------------|-------|"]
+    for i, code in enumerate(positive_ids):
+        lines.append(f"| {code} | {POSITIVES[i]} | {frequency(code, 1)}/{len(students)} students | "
+                     f"{8 - i} | {_fmt(0.5 * i)} marks | mock |")
+    lines.append("")
+
+    if freeform:
+        lines += ["## Per-Student Mapping", ""]
+        for (number, name), (mistakes, positives) in zip(students, assignments):
+            lines += [f"### Student {number}: {name.strip()}",
+                      f"- **Mistakes**: {', '.join(mistakes) or 'None'}",
+                      f"- **Positives**: {', '.join(positives) or 'None'}", ""]
+    else:
+        lines += ["### Per-Student Mistake/Positive Mapping", ""]
+        for (number, name), (mistakes, positives) in zip(students, assignments):
+            lines.append(f"*   **Student {number} ({name.strip()})**: Mistakes: "
+                         f"{', '.join(mistakes) or 'None'}; Positives: {', '.join(positives) or 'None'}")
+    return "\n".join(lines) + "\n"
+
+
+def respond_unifier(prompt: str, rng: random.Random) -> str:
+    """Final feedback card in the format aggregate_grades.py parses."""
+    name_match = re.search(r'\*\*Student Name\*\*: (.+)', prompt)
+    student_name = name_match.group(1).strip() if name_match else 'Unknown Student'
+    scheme = {}
+    scheme_match = re.search(r'## Approved Marking Scheme\s+(\{.*?\})\s+## Student Information',
+                             prompt, re.DOTALL)
+    if scheme_match:
+        try:
+            scheme = json.loads(scheme_match.group(1))
+        except json.JSONDecodeError:
+            pass
+    total_available = float(scheme.get('total_marks', 100))
+    activity_marks = scheme.get('activity_marks') or {}
+
+    marks = []
+    breakdown = []
+    total = 0.0
+    for activity_id in sorted(activity_marks, key=lambda a: int(re.sub(r'\D', '', a) or 0)):
+        available = float(activity_marks[activity_id])
+        mark = round(available * rng.uniform(0.5, 1.0) * 2) / 2
+        total += mark
+        marks.append({'activity': activity_id, 'mark': mark, 'available': available})
+        breakdown.append(f"Activity {activity_id.lstrip('A')}: {_fmt(mark)} / {_fmt(available)}")
+    if not breakdown:
+        total = round(total_available * rng.uniform(0.5, 1.0) * 2) / 2
+
+    comments = ("You completed most of the required work and your code runs end to end. "
+                "Some results were not reproducible and a few outputs were not displayed.")
+    if JSON_HEADING in prompt:
+        return json.dumps({
+            'student_name': student_name, 'total_mark': total, 'total_available': total_available,
+            'activity_marks': marks, 'calculation_details': 'Mock calculation from the approved scheme.',
+            'holistic_assessment': {'overall_performance': 'Good', 'key_strengths': [POSITIVES[0]],
+                                    'areas_for_improvement': [MISTAKES[0]], 'patterns_observed': 'None.'},
+            'academic_integrity': {'risk_level': 'Low', 'confidence': 'High', 'evidence': 'Mock.',
+                                   'recommendation': 'No action.'},
+            'suggested_adjustments': {'recommendation': 'Accept marks as calculated', 'proposed_change': '',
+                                      'justification': '', 'new_total': ''},
+            'feedback_card': {'overall_comments': comments, 'strengths': [POSITIVES[0], POSITIVES[1]],
+                              'areas_for_improvement': [MISTAKES[0], MISTAKES[2]]},
+        }, indent=2)
+
+    lines = ["### Student Feedback Card", "", "```", f"ASSIGNMENT FEEDBACK - {student_name}", "",
+             f"Total Mark: {_fmt(total)} / {_fmt(total_available)}", ""]
+    lines += breakdown
+    lines += ["", "OVERALL COMMENTS:", comments,
+              "", "STRENGTHS:", f"• {POSITIVES[0]}", f"• {POSITIVES[1]}",
+              "", "AREAS FOR IMPROVEMENT:", f"• {MISTAKES[0]}", f"• {MISTAKES[2]}", "```", ""]
+    return "\n".join(lines)
+
+
+def respond_summarizer(prompt: str, rng: random.Random) -> str:
+    """One-paragraph plain-text summary."""
+    student = re.search(r'^Student: (.+)$', prompt, re.MULTILINE)
+    mark = re.search(r'^Total Mark: (.+)$', prompt, re.MULTILINE)
+    name = student.group(1).strip() if student else 'The student'
+    return (f"{name} received {mark.group(1).strip() if mark else 'N/A'}. "
+            f"The main issue was that results were not reproducible. "
+            f"Several outputs were not displayed. The code was clear and well commented.")
+
+
+def respond_modifier(prompt: str, rng: random.Random) -> str:
+    """Return the original feedback unchanged."""
+    match = re.search(r'ORIGINAL FEEDBACK:\n(.*?)\n\nOUTPUT the modified feedback', prompt, re.DOTALL)
+    return match.group(1) if match else ''
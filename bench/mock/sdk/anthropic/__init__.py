@@ -0,0 +1,140 @@
+"""
+Mock of the anthropic SDK surface used by src/api/caller.py (benchmarks only).
+"""
+
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from mock_core import complete, complete_stream, MockLLMError, MockRateLimitError
+
+
+class APIError(Exception):
+    """Base error, as in the real SDK."""
+
+
+class InternalServerError(APIError):
+    """Raised for simulated provider failures."""
+    status_code = 529
+
+
+class RateLimitError(APIError):
+    """Raised for simulated 429s."""
+    status_code = 429
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.response = SimpleNamespace(headers={'retry-after': str(retry_after)} if retry_after else {})
+
+
+def _text(content) -> str:
+    """Flatten message or system content (string or list of text blocks)."""
+    if isinstance(content, str):
+        return content
+    return "".join(block.get('text', '') for block in content or [])
+
+
+def _tool_input(text):
+    """Tool input of a forced tool call (the mock's response is the JSON object)."""
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = None
+    return data if isinstance(data, dict) else {'text': text}
+
+
+def _message(model, text, usage, tool=None):
+    if tool:
+        content = [SimpleNamespace(type='tool_use', id='toolu_mock', name=tool, input=_tool_input(text))]
+    else:
+        content = [SimpleNamespace(type='text', text=text)]
+    return SimpleNamespace(
+        model=model,
+        stop_reason='tool_use' if tool else 'end_turn',
+        content=content,
+        usage=SimpleNamespace(
+            input_tokens=usage['input_tokens'],
+            output_tokens=usage['output_tokens'],
+            cache_creation_input_tokens=0,
+            cache_read_input_tokens=0,
+        ),
+    )
+
+
+def _errors(fn):
+    """Run fn, raising mock failures as the SDK's exceptions."""
+    try:
+        return fn()
+    except MockRateLimitError as e:
+        raise RateLimitError(str(e), e.retry_after) from None
+    except MockLLMError as e:
+        raise InternalServerError(str(e)) from None
+
+
+def _forced_tool(kwargs):
+    """Name of the tool a request forces (tool_choice), or None."""
+    choice = kwargs.get('tool_choice') or {}
+    return choice.get('name') if choice.get('type') == 'tool' else None
+
+
+class _MessageStream:
+    """
+    Context manager returned by messages.stream(): text_stream, events when
+    iterated (text, or input_json for a forced tool call), get_final_message.
+    """
+
+    def __init__(self, model, stream, tool=None):
+        self.model = model
+        self.stream = stream
+        self.tool = tool
+        self.text = ''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stream.close()
+        return False
+
+    @property
+    def text_stream(self):
+        chunks = iter(self.stream)
+        while True:
+            chunk = _errors(lambda: next(chunks, None))
+            if chunk is None:
+                return
+            self.text += chunk
+            yield chunk
+
+    def __iter__(self):
+        for chunk in self.text_stream:
+            if self.tool:
+                yield SimpleNamespace(type='input_json', partial_json=chunk, snapshot=None)
+            else:
+                yield SimpleNamespace(type='text', text=chunk, snapshot=self.text)
+
+    def get_final_message(self):
+        return _message(self.model, self.text, self.stream.usage, self.tool)
+
+
+class _Messages:
+    def __init__(self, api_key):
+        self.api_key = api_key
+
+    def create(self, model, messages, max_tokens=None, system=None, **kwargs):
+        prompt = "\n\n".join(filter(None, [_text(system)] + [_text(m['content']) for m in messages]))
+        text, usage = _errors(lambda: complete(prompt, 'api', 'claude', model, api_key=self.api_key))
+        return _message(model, text, usage, _forced_tool(kwargs))
+
+    def stream(self, model, messages, max_tokens=None, system=None, **kwargs):
+        prompt = "\n\n".join(filter(None, [_text(system)] + [_text(m['content']) for m in messages]))
+        return _MessageStream(model, _errors(lambda: complete_stream(prompt, 'api', 'claude', model,
+                                                                     api_key=self.api_key)),
+                              _forced_tool(kwargs))
+
+
+class Anthropic:
+    def __init__(self, api_key=None, **kwargs):
+        self.messages = _Messages(api_key)
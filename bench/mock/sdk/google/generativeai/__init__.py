@@ -0,0 +1,77 @@
+"""
+Mock of the google.generativeai SDK surface used by src/api/caller.py (benchmarks only).
+
+google/ has no __init__.py, so other google.* namespace packages still import.
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mock_core import complete, complete_stream, MockLLMError, MockRateLimitError
+
+_api_key = None
+
+
+class ResourceExhausted(Exception):
+    """Raised for simulated 429s (google.api_core.exceptions.ResourceExhausted)."""
+    code = 429
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.response = SimpleNamespace(headers={'retry-after': str(retry_after)} if retry_after else {})
+
+
+def _usage_metadata(usage):
+    return SimpleNamespace(
+        prompt_token_count=usage['input_tokens'],
+        candidates_token_count=usage['output_tokens'],
+        cached_content_token_count=0,
+    )
+
+
+def _errors(fn):
+    """Run fn, raising mock failures as the SDK's exceptions."""
+    try:
+        return fn()
+    except MockRateLimitError as e:
+        raise ResourceExhausted(str(e), e.retry_after) from None
+    except MockLLMError as e:
+        raise RuntimeError(str(e)) from None
+
+
+class _StreamedResponse:
+    """Iterable of chunks (.text); usage_metadata is set once it has been read to the end."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.usage_metadata = None
+
+    def __iter__(self):
+        chunks = iter(self.stream)
+        while True:
+            chunk = _errors(lambda: next(chunks, None))
+            if chunk is None:
+                break
+            yield SimpleNamespace(text=chunk)
+        self.usage_metadata = _usage_metadata(self.stream.usage)
+
+
+def configure(api_key=None, **kwargs):
+    global _api_key
+    _api_key = api_key
+
+
+class GenerativeModel:
+    def __init__(self, model_name, system_instruction=None, **kwargs):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        full_prompt = "\n\n".join(filter(None, [self.system_instruction, prompt]))
+        if stream:
+            return _StreamedResponse(_errors(lambda: complete_stream(full_prompt, 'api', 'gemini',
+                                                                     self.model_name, api_key=_api_key)))
+        text, usage = _errors(lambda: complete(full_prompt, 'api', 'gemini', self.model_name, api_key=_api_key))
+        return SimpleNamespace(text=text, usage_metadata=_usage_metadata(usage))
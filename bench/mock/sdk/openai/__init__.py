@@ -0,0 +1,87 @@
+"""
+Mock of the openai SDK surface used by src/api/caller.py (benchmarks only).
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from mock_core import complete, complete_stream, MockLLMError, MockRateLimitError
+
+
+class APIError(Exception):
+    """Base error, as in the real SDK."""
+
+
+class InternalServerError(APIError):
+    """Raised for simulated provider failures."""
+    status_code = 500
+
+
+class RateLimitError(APIError):
+    """Raised for simulated 429s."""
+    status_code = 429
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.response = SimpleNamespace(headers={'retry-after': str(retry_after)} if retry_after else {})
+
+
+def _usage(usage):
+    return SimpleNamespace(
+        prompt_tokens=usage['input_tokens'],
+        completion_tokens=usage['output_tokens'],
+        prompt_tokens_details=SimpleNamespace(cached_tokens=0),
+    )
+
+
+def _errors(fn):
+    """Run fn, raising mock failures as the SDK's exceptions."""
+    try:
+        return fn()
+    except MockRateLimitError as e:
+        raise RateLimitError(str(e), e.retry_after) from None
+    except MockLLMError as e:
+        raise InternalServerError(str(e)) from None
+
+
+class _Stream:
+    """Chunks of a streamed completion; the last one carries the usage."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def __iter__(self):
+        chunks = iter(self.stream)
+        while True:
+            chunk = _errors(lambda: next(chunks, None))
+            if chunk is None:
+                break
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))], usage=None)
+        yield SimpleNamespace(choices=[], usage=_usage(self.stream.usage))
+
+    def close(self):
+        self.stream.close()
+
+
+class _Completions:
+    def __init__(self, api_key):
+        self.api_key = api_key
+
+    def create(self, model, messages, stream=False, **kwargs):
+        prompt = "\n\n".join(m['content'] for m in messages if m.get('content'))
+        if stream:
+            return _Stream(_errors(lambda: complete_stream(prompt, 'api', 'codex', model,
+                                                           api_key=self.api_key)))
+        text, usage = _errors(lambda: complete(prompt, 'api', 'codex', model, api_key=self.api_key))
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text), finish_reason='stop')],
+            usage=_usage(usage),
+        )
+
+
+class OpenAI:
+    def __init__(self, api_key=None, **kwargs):
+        self.chat = SimpleNamespace(completions=_Completions(api_key))
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Offline Pipeline Benchmark
+
+Generates a synthetic class, runs mark_structured.sh or mark_freeform.sh on it
+with --auto-approve against the mock LLM provider, and writes a JSON report of:
+- total and per-stage wall time
+- process spawns per stage (Python interpreters and LLM CLIs)
+- LLM calls, failures, retries and tokens per stage and per agent
+
+No network access or API quota is used: bench/mock/bin shadows the claude,
+gemini and codex CLIs on PATH, and bench/mock/sdk shadows the provider SDKs on
+PYTHONPATH for --api-model runs.
+
+Usage:
+    python3 bench/run_bench.py --students 30 --activities 7
+    python3 bench/run_bench.py --type freeform --students 40 --api-model claude-haiku-4-5
+    python3 bench/run_bench.py --students 100 --mock-config bench/configs/realistic.json \\
+        --compare bench/results/baseline.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from generate_class import generate_class
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+MOCK_BIN = BENCH_DIR / "mock" / "bin"
+MOCK_SDK = BENCH_DIR / "mock" / "sdk"
+RESULTS_DIR = BENCH_DIR / "results"
+
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+STAGE_LINE = re.compile(r'^\[INFO\] Stage ([\d.]+): (.*)$')
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def peak_concurrency(intervals: List[tuple]) -> int:
+    """Largest number of overlapping (start, end) intervals."""
+    events = sorted([(start, 1) for start, _ in intervals] + [(end, -1) for _, end in intervals])
+    peak = current = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def load_jsonl(path: Path) -> List[Dict]:
+    """Read a JSONL file, skipping malformed lines."""
+    records = []
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return records
+
+
+def load_spawns(path: Path) -> List[tuple]:
+    """Read the spawn log written by the bench/mock/bin shims as (timestamp, program)."""
+    spawns = []
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    try:
+                        spawns.append((float(parts[0]), parts[1]))
+                    except ValueError:
+                        continue
+    return spawns
+
+
+def summarize_calls(calls: List[Dict]) -> Dict:
+    """Call, failure, token and latency totals for a set of mock LLM calls."""
+    latencies = [c['end'] - c['start'] for c in calls]
+    return {
+        'calls': len(calls),
+        'errors': sum(1 for c in calls if c.get('error')),
+        'retries': sum(1 for c in calls if c.get('attempt', 0) > 0),
+        'rate_limited': sum(1 for c in calls if c.get('rate_limited')),
+        'input_tokens': sum(c.get('input_tokens', 0) for c in calls),
+        'output_tokens': sum(c.get('output_tokens', 0) for c in calls),
+        'llm_time_s': round(sum(latencies), 3),
+        'latency_p50_s': round(percentile(latencies, 50), 3),
+        'latency_p95_s': round(percentile(latencies, 95), 3),
+        'peak_concurrency': peak_concurrency([(c['start'], c['end']) for c in calls]),
+    }
+
+
+def run_pipeline(command: List[str], env: Dict, log_path: Path, timeout: Optional[float]) -> tuple:
+    """
+    Run the orchestrator, timestamping each output line.
+
+    Returns:
+        Tuple of (exit code, start time, end time, [(timestamp, stage, title)])
+    """
+    stages = []
+    start = time.time()
+    process = subprocess.Popen(
+        command, cwd=str(PROJECT_ROOT), env=env, stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+        start_new_session=True
+    )
+    with open(log_path, 'w', encoding='utf-8') as log:
+        for line in process.stdout:
+            now = time.time()
+            log.write(f"{now - start:9.3f} {line}")
+            match = STAGE_LINE.match(ANSI_ESCAPE.sub('', line).strip())
+            if match and (not stages or stages[-1][1] != match.group(1)):
+                stages.append((now, match.group(1), match.group(2)))
+            if timeout and now - start > timeout:
+                os.killpg(process.pid, signal.SIGTERM)
+                log.write(f"Benchmark timeout after {timeout}s\n")
+                break
+    exit_code = process.wait()
+    return exit_code, start, time.time(), stages
+
+
+def build_report(stage_marks: List[tuple], start: float, end: float,
+                 calls: List[Dict], spawns: List[tuple]) -> tuple:
+    """Attribute calls and spawns to orchestrator stages by time window."""
+    windows = [(start, 'setup', 'Configuration and directory setup')] + stage_marks
+    stages = []
+    for i, (window_start, stage, title) in enumerate(windows):
+        window_end = windows[i + 1][0] if i + 1 < len(windows) else end
+        stage_calls = [c for c in calls if window_start <= c['start'] < window_end]
+        stage_spawns = [p for t, p in spawns if window_start <= t < window_end]
+        spawn_counts = {}
+        for program in stage_spawns:
+            spawn_counts[program] = spawn_counts.get(program, 0) + 1
+        entry = {
+            'stage': stage,
+            'title': title,
+            'wall_time_s': round(window_end - window_start, 3),
+            'skipped': title.startswith('Skipping'),
+            'process_spawns': len(stage_spawns),
+            'spawns_by_program': spawn_counts,
+        }
+        entry.update(summarize_calls(stage_calls))
+        stages.append(entry)
+
+    by_agent = {}
+    for agent in sorted({c['stage'] for c in calls}):
+        by_agent[agent] = summarize_calls([c for c in calls if c['stage'] == agent])
+    return stages, by_agent
+
+
+def count_outputs(class_dir: Path) -> Dict:
+    """Count what the pipeline produced, to confirm the run completed."""
+    processed = class_dir / 'processed'
+    grades_csv = processed / 'final' / 'grades.csv'
+    graded = 0
+    if grades_csv.exists():
+        with open(grades_csv, 'r', encoding='utf-8') as f:
+            graded = sum(1 for _ in csv.DictReader(f))
+    return {
+        'markings': len(list((processed / 'markings').glob('*.md'))),
+        'feedback_cards': len(list((processed / 'final').glob('*_feedback.md'))),
+        'grades_csv': grades_csv.exists(),
+        'graded_rows': graded,
+    }
+
+
+def print_comparison(current: Dict, previous: Dict):
+    """Print per-stage wall time against a previous result file."""
+    previous_stages = {s['stage']: s for s in previous.get('stages', [])}
+    print(f"\nComparison with {previous.get('label', 'previous run')}:")
+    print(f"  {'Stage':<8} {'Previous':>10} {'Current':>10} {'Change':>9}")
+    rows = [(s['stage'], previous_stages.get(s['stage'], {}).get('wall_time_s'), s['wall_time_s'])
+            for s in current['stages']]
+    rows.append(('total', previous.get('wall_time_s'), current['wall_time_s']))
+    for stage, before, after in rows:
+        if before:
+            change = f"{(after - before) / before * 100:+.1f}%"
+            print(f"  {stage:<8} {before:>9.2f}s {after:>9.2f}s {change:>9}")
+        else:
+            print(f"  {stage:<8} {'-':>10} {after:>9.2f}s {'':>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run the marking pipeline end-to-end against the mock LLM provider'
+    )
+    parser.add_argument('--type', choices=['structured', 'freeform'], default='structured',
+                        help='Assignment type (default: structured)')
+    parser.add_argument('--students', type=int, default=30, help='Number of students (default: 30)')
+    parser.add_argument('--activities', type=int, default=7,
+                        help='Activities, or project parts for free-form (default: 7)')
+    parser.add_argument('--dup-rate', type=float, default=0.0,
+                        help='Fraction of duplicated submissions (default: 0)')
+    parser.add_argument('--notebook-kb', type=int, default=0,
+                        help='Extra size per submission in KB (default: 0)')
+    parser.add_argument('--long-rate', type=float, default=0.0,
+                        help='Fraction of students with much longer answers (default: 0)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the class (default: 0)')
+    parser.add_argument('--provider', choices=['claude', 'gemini', 'codex'], default='claude',
+                        help='CLI provider to exercise (default: claude)')
+    parser.add_argument('--api-model', help='Exercise the direct API path with this model')
+    parser.add_argument('--parallel', type=int, help='Override max_parallel')
+    parser.add_argument('--mock-config', help='Mock latency/error configuration (JSON)')
+    parser.add_argument('--label', help='Name for this run (default: derived from the parameters)')
+    parser.add_argument('--output', help='Result JSON path (default: bench/results/<label>.json)')
+    parser.add_argument('--compare', help='Previous result JSON to compare against')
+    parser.add_argument('--work-dir', help='Directory for the class and logs (default: a temp dir)')
+    parser.add_argument('--keep', action='store_true', help='Keep the temporary work directory')
+    parser.add_argument('--timeout', type=float, help='Abort the pipeline after this many seconds')
+    parser.add_argument('--trace', help='Also write a Chrome/Perfetto trace of the run to this file')
+    parser.add_argument('--cli-pool', action='store_true', help='Run with persistent CLI workers (--cli-pool)')
+    parser.add_argument('--provider-pool', action='store_true',
+                        help='Spread calls over provider_pool in config.yaml (--provider-pool)')
+    parser.add_argument('--cascade', action='store_true',
+                        help='Mark with the cascade\'s cheap model first (--cascade)')
+    parser.add_argument('--deadline-minutes', type=float,
+                        help='Run in deadline mode, with the deadline this many minutes after the start')
+    parser.add_argument('--api-keys', type=int, default=1,
+                        help='Mock API keys per provider for --api-model runs (default: 1)')
+
+    args = parser.parse_args()
+
+    if args.mock_config and not Path(args.mock_config).exists():
+        print(f"Error: Mock config not found: {args.mock_config}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.work_dir:
+        work_dir = Path(args.work_dir).resolve()
+        if work_dir.exists() and any(work_dir.iterdir()):
+            print(f"Error: Work directory is not empty: {work_dir}", file=sys.stderr)
+            sys.exit(1)
+        work_dir.mkdir(parents=True, exist_ok=True)
+    else:
+        work_dir = Path(tempfile.mkdtemp(prefix='agentic-bench-'))
+
+    timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    suffix = ('-pool' if args.cli_pool else '') + ('-multi' if args.provider_pool else '')
+    suffix += '-cascade' if args.cascade else ''
+    suffix += f"-deadline{args.deadline_minutes:g}m" if args.deadline_minutes else ''
+    suffix += f"-keys{args.api_keys}" if args.api_keys > 1 else ''
+    label = args.label or (f"{args.type}-s{args.students}-a{args.activities}-"
+                           f"{'api' if args.api_model else args.provider}{suffix}-{timestamp}")
+    output_path = Path(args.output) if args.output else RESULTS_DIR / f"{label}.json"
+
+    class_dir = work_dir / 'bench-class'
+    description = generate_class(class_dir, args.type, args.students, args.activities,
+                                 dup_rate=args.dup_rate, notebook_kb=args.notebook_kb, seed=args.seed,
+                                 long_rate=args.long_rate)
+    print(f"✓ Generated {args.type} class: {args.students} students, {args.activities} activities "
+          f"({description['duplicates']} duplicates)")
+
+    env = dict(os.environ)
+    env.update({
+        'PATH': f"{MOCK_BIN}{os.pathsep}{env.get('PATH', '')}",
+        'PYTHONPATH': os.pathsep.join(filter(None, [str(MOCK_SDK), env.get('PYTHONPATH')])),
+        'BENCH_REAL_PYTHON': sys.executable,
+        'BENCH_MOCK_LOG': str(work_dir / 'mock_calls.jsonl'),
+        'BENCH_SPAWN_LOG': str(work_dir / 'spawns.log'),
+        'BENCH_MOCK_STATE': str(work_dir / 'mock_state'),
+        'AGENTIC_KEY_POOL_STATE': str(work_dir / 'key_pool.json'),
+        'AGENTIC_PREFLIGHT_CACHE': str(work_dir / 'preflight.json'),
+    })
+    # The mock SDKs only use the keys for key_rate_limit
+    mock_keys = ','.join(f"bench-mock-{i + 1}" for i in range(args.api_keys))
+    for name in ('CLAUDE_API_KEYS', 'GEMINI_API_KEYS', 'OPENAI_API_KEYS'):
+        env[name] = mock_keys
+    for name in ('CLAUDE_API_KEY', 'ANTHROPIC_API_KEY', 'GOOGLE_API_KEY', 'GEMINI_API_KEY',
+                 'OPENAI_API_KEY', 'ANTHROPIC_API_KEYS', 'GOOGLE_API_KEYS'):
+        env.pop(name, None)
+    if args.mock_config:
+        env['BENCH_MOCK_CONFIG'] = str(Path(args.mock_config).resolve())
+    else:
+        env.pop('BENCH_MOCK_CONFIG', None)
+
+    resolved = shutil.which(args.provider, path=env['PATH'])
+    if not resolved or Path(resolved).parent != MOCK_BIN:
+        print(f"Error: {args.provider} does not resolve to the mock CLI ({resolved})", file=sys.stderr)
+        sys.exit(1)
+    if (PROJECT_ROOT / '.venv' / 'bin' / 'activate').exists():
+        print("⚠ .venv is activated by the orchestrator, so Python spawns are not counted", file=sys.stderr)
+
+    orchestrator = PROJECT_ROOT / ('mark_structured.sh' if args.type == 'structured' else 'mark_freeform.sh')
+    command = ['bash', str(orchestrator), str(class_dir), '--auto-approve', '--provider', args.provider]
+    if args.api_model:
+        command += ['--api-model', args.api_model]
+    if args.parallel:
+        command += ['--parallel', str(args.parallel)]
+    if args.trace:
+        command += ['--trace', str(Path(args.trace).resolve())]
+    if args.cli_pool:
+        command += ['--cli-pool']
+    if args.provider_pool:
+        command += ['--provider-pool']
+    if args.cascade:
+        command += ['--cascade']
+    deadline = None
+    if args.deadline_minutes:
+        deadline = datetime.fromtimestamp(time.time() + args.deadline_minutes * 60)
+        command += ['--deadline', deadline.strftime('%Y-%m-%d %H:%M:%S')]
+
+    print(f"Running {orchestrator.name} (log: {work_dir / 'pipeline.log'})...")
+    exit_code, start, end, stage_marks = run_pipeline(command, env, work_dir / 'pipeline.log', args.timeout)
+
+    calls = load_jsonl(work_dir / 'mock_calls.jsonl')
+    spawns = load_spawns(work_dir / 'spawns.log')
+    stages, by_agent = build_report(stage_marks, start, end, calls, spawns)
+    outputs = count_outputs(class_dir)
+    cascade_report = class_dir / 'processed' / 'stats' / 'cascade_report.json'
+
+    mock_config = {}
+    if args.mock_config:
+        with open(args.mock_config, 'r', encoding='utf-8') as f:
+            mock_config = json.load(f)
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=str(PROJECT_ROOT),
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+
+    wall_time = end - start
+    result = {
+        'label': label,
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': commit,
+        'orchestrator': orchestrator.name,
+        'exit_code': exit_code,
+        'wall_time_s': round(wall_time, 3),
+        'students_per_minute': round(args.students / wall_time * 60, 2) if wall_time > 0 else 0,
+        'config': {
+            'type': args.type,
+            'students': args.students,
+            'activities': args.activities,
+            'dup_rate': args.dup_rate,
+            'long_rate': args.long_rate,
+            'duplicates': description['duplicates'],
+            'notebook_kb': args.notebook_kb,
+            'seed': args.seed,
+            'provider': args.provider,
+            'api_model': args.api_model,
+            'parallel': args.parallel,
+            'api_keys': args.api_keys,
+            'mock_config': mock_config,
+        },
+        'outputs': outputs,
+        'totals': dict(summarize_calls(calls), process_spawns=len(spawns)),
+        'stages': stages,
+        'agents': by_agent,
+    }
+    if cascade_report.exists():
+        result['cascade'] = json.loads(cascade_report.read_text(encoding='utf-8'))
+    # Failed output checks per stage, and outputs kept invalid (src/utils/output_validator.py)
+    validation = {}
+    for entry in load_jsonl(class_dir / 'processed' / 'stats' / 'token_usage.jsonl'):
+        if entry.get('event') == 'validation_failure':
+            counts = validation.setdefault(entry['stage'], {'failed_checks': 0, 'kept_invalid': 0})
+            counts['failed_checks'] += 1
+            counts['kept_invalid'] += entry.get('action') == 'kept'
+    if validation:
+        result['validation'] = validation
+    if deadline:
+        deadline_log = class_dir / 'processed' / 'logs' / 'deadline.log'
+        result['deadline'] = {
+            'deadline': deadline.isoformat(sep=' ', timespec='seconds'),
+            'met': end <= deadline.timestamp(),
+            'projections': deadline_log.read_text(encoding='utf-8').splitlines() if deadline_log.exists() else [],
+        }
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+
+    print(f"\n{'Stage':<8} {'Wall (s)':>9} {'Spawns':>7} {'LLM calls':>9} {'Errors':>6} {'Tokens in/out':>17}")
+    for stage in stages:
+        tokens = f"{stage['input_tokens']}/{stage['output_tokens']}"
+        print(f"{stage['stage']:<8} {stage['wall_time_s']:>9.2f} {stage['process_spawns']:>7} "
+              f"{stage['calls']:>9} {stage['errors']:>6} {tokens:>17}")
+    print(f"\n✓ Wall time: {wall_time:.2f}s ({result['students_per_minute']} students/min), "
+          f"exit code {exit_code}")
+    print(f"✓ Graded rows: {outputs['graded_rows']}/{args.students}")
+    print(f"✓ Results saved to: {output_path}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            print_comparison(result, json.load(f))
+
+    if args.keep or args.work_dir:
+        print(f"  Work directory: {work_dir}")
+    else:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    sys.exit(0 if exit_code == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
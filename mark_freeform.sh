@@ -47,6 +47,16 @@ STOP_AFTER_STAGE=""
 PARALLEL_OVERRIDE=""
 AUTO_APPROVE=false
 FORCE_COMPLETE=false
+WATCH=false  # Watch submissions/ and mark late submissions incrementally
+WATCH_INTERVAL=60
+TRACE_FILE=""  # Write a Chrome/Perfetto trace of the run
+CLI_POOL=false  # Keep persistent CLI workers for headless calls (CLI mode)
+PROVIDER_POOL=false  # Spread marker/unifier calls over provider_pool in config.yaml
+CASCADE=false  # Mark with cascade's cheap model first, escalate uncertain markings
+DEADLINE=""  # Adapt parallelism and models to finish by this time
+PLAN=false  # Print the run's calls, tokens, cost and time without marking
+PLAN_JSON=""  # Also write the plan as JSON (batch_mark.sh --plan)
+STUDENT_MAJOR=true  # With an approved scheme, mark and unify each student in one task
 PROVIDER_OVERRIDE=""
 MODEL_OVERRIDE=""
 API_MODEL=""  # When set, use direct API calls instead of CLI for headless stages
@@ -87,6 +97,14 @@ while [[ $# -gt 0 ]]; do
             FORCE_COMPLETE=true
             shift
             ;;
+        --watch)
+            WATCH=true
+            shift
+            ;;
+        --watch-interval)
+            WATCH_INTERVAL="$2"
+            shift 2
+            ;;
         --provider)
             PROVIDER_OVERRIDE="$2"
             shift 2
@@ -99,6 +117,39 @@ while [[ $# -gt 0 ]]; do
             API_MODEL="$2"
             shift 2
             ;;
+        --trace)
+            TRACE_FILE="$2"
+            shift 2
+            ;;
+        --cli-pool)
+            CLI_POOL=true
+            shift
+            ;;
+        --provider-pool)
+            PROVIDER_POOL=true
+            shift
+            ;;
+        --cascade)
+            CASCADE=true
+            shift
+            ;;
+        --deadline)
+            DEADLINE="$2"
+            shift 2
+            ;;
+        --plan)
+            PLAN=true
+            shift
+            ;;
+        --plan-json)
+            PLAN=true
+            PLAN_JSON="$2"
+            shift 2
+            ;;
+        --stage-major)
+            STUDENT_MAJOR=false
+            shift
+            ;;
         -*)
             echo "Unknown option: $1" >&2
             echo "Usage: $0 <assignment_directory> [OPTIONS]" >&2
@@ -129,6 +180,15 @@ if [[ -z "${ASSIGNMENT_DIR:-}" ]]; then
     echo "  --provider NAME       Override LLM provider (claude, gemini, or codex)"
     echo "  --model NAME          Override model name (for CLI calls)"
     echo "  --api-model NAME      Use direct API calls for headless stages (requires API key)"
+    echo "  --watch               Watch submissions/ and mark late submissions only (after a full run)"
+    echo "  --watch-interval N    Seconds between submission scans in watch mode (default: 60)"
+    echo "  --trace FILE          Write a Chrome/Perfetto trace of the run to FILE"
+    echo "  --cli-pool            Keep persistent CLI worker processes for headless calls"
+    echo "  --provider-pool       Spread marker/unifier calls over the providers in provider_pool (config.yaml)"
+    echo "  --cascade             Mark with the cascade's cheap model first, escalating uncertain markings"
+    echo "  --deadline TIME       Finish by TIME (e.g. \"2026-10-20 09:00\"), raising parallelism or using faster models"
+    echo "  --plan                Estimate calls, tokens, cost and time of the run without marking"
+    echo "  --stage-major         With an approved scheme, run all markers before any unifier"
     exit 1
 fi
 
@@ -141,6 +201,11 @@ fi
 ASSIGNMENT_DIR="$(cd "$ASSIGNMENT_DIR" && pwd)"
 ASSIGNMENT_NAME="$(basename "$ASSIGNMENT_DIR")"
 
+# Run-wide tracing (--trace); agents and LLM calls add their spans to this run
+source "$SRC_DIR/utils/tracing.sh"
+trace_init "$TRACE_FILE" "mark_freeform: $ASSIGNMENT_NAME"
+trace_stage "Setup"
+
 log_info "Starting free-form assignment marking: $ASSIGNMENT_NAME"
 log_info "Assignment directory: $ASSIGNMENT_DIR"
 
@@ -268,6 +333,21 @@ fi
 
 log_info "  Total marks: $TOTAL_MARKS"
 
+# Persistent CLI workers (--cli-pool or cli_pool.enabled in config.yaml); the
+# pool stops when this script exits, and is shared with runs started below it
+if [[ -z "$API_MODEL" && "$PLAN" != true ]]; then
+    pool_args=(--parent-pid $$ --parallel "$MAX_PARALLEL")
+    [[ "$CLI_POOL" == true ]] && pool_args+=(--force)
+    if pool_env=$(python3 "$SRC_DIR/cli_pool.py" start "${pool_args[@]}"); then
+        eval "$pool_env"
+        if [[ -n "${AGENTIC_CLI_POOL:-}" ]]; then
+            log_info "  CLI worker pool: enabled"
+        fi
+    else
+        log_warning "CLI worker pool failed to start; each call will spawn its own CLI process"
+    fi
+fi
+
 # Function to get model for a specific stage
 # Priority: stage-specific > assignment default > none (use provider default)
 get_stage_model() {
@@ -312,6 +392,23 @@ SESSIONS_DIR="$PROCESSED_DIR/sessions"
 STATS_DIR="$PROCESSED_DIR/stats"
 STATS_FILE="$STATS_DIR/token_usage.jsonl"
 
+# Dry run (--plan, see src/dry_run.py): build the prompts of the calls still to
+# make and print their tokens, cost and time, without marking or writing files
+if [[ "$PLAN" == true ]]; then
+    plan_args=(--assignment-dir "$ASSIGNMENT_DIR" --type freeform \
+        --provider "$DEFAULT_PROVIDER" --parallel "$MAX_PARALLEL" \
+        --marker-model "$MODEL_MARKER" --normalizer-model "$MODEL_NORMALIZER" \
+        --unifier-model "$MODEL_UNIFIER" --api-model "$API_MODEL")
+    [[ -n "$PLAN_JSON" ]] && plan_args+=(--json "$PLAN_JSON")
+    echo ""
+    python3 "$SRC_DIR/dry_run.py" plan "${plan_args[@]}"
+    exit $?
+fi
+
+# Start of this run (the stats file accumulates across runs)
+RUN_START_TS="${EPOCHREALTIME:-$(date +%s)}"
+RUN_START_TS="${RUN_START_TS/,/.}"
+
 mkdir -p "$MARKINGS_DIR" "$NORMALIZED_DIR" "$FINAL_DIR" "$LOGS_DIR" "$SESSIONS_DIR" "$STATS_DIR"
 
 # Clean mode: remove processed directory
@@ -329,10 +426,131 @@ if [[ $RESUME == true ]]; then
     log_info "Resume mode: Will skip completed stages and tasks"
 fi
 
+# Provider pool (--provider-pool or provider_pool.enabled in config.yaml):
+# marker and unifier calls are spread over the providers listed there and
+# fail over on quota errors (CLI mode). An explicit --provider or --model
+# keeps the run on that provider unless --provider-pool is also given.
+if [[ -z "$API_MODEL" ]] && [[ "$PROVIDER_POOL" == true || ( -z "$PROVIDER_OVERRIDE" && -z "$MODEL_OVERRIDE" ) ]]; then
+    pool_args=(--state "$STATS_DIR/provider_pool.json")
+    [[ "$PROVIDER_POOL" == true ]] && pool_args+=(--force)
+    if ! pool_env=$(python3 "$SRC_DIR/utils/provider_pool.py" init "${pool_args[@]}"); then
+        log_error "Invalid provider_pool section in configs/config.yaml"
+        exit 1
+    fi
+    eval "$pool_env"
+elif [[ "$PROVIDER_POOL" == true ]]; then
+    log_warning "--provider-pool is ignored in API mode (--api-model)"
+fi
+
+# Marker cascade (--cascade or cascade.enabled in config.yaml): the cascade's
+# cheap model marks first and markings that are malformed, not confident, or
+# disagree with identical submissions are re-marked by the marker model
+CASCADE_MODEL=""
+cascade_args=(--api-model "$API_MODEL")
+[[ "$CASCADE" == true ]] && cascade_args+=(--force)
+if ! cascade_env=$(python3 "$SRC_DIR/utils/cascade.py" init "${cascade_args[@]}"); then
+    log_error "Invalid cascade section in configs/config.yaml"
+    exit 1
+fi
+eval "$cascade_env"
+
+# Deadline mode (--deadline): before each headless stage, project the finish
+# from the calls left and the latency measured so far, and raise parallelism
+# or move the remaining stages to a faster model when the run would be late
+# (see src/task_planner.py). A run still behind skips work that grades.csv
+# does not need: the cascade's second round and gradebook translation.
+DEADLINE_BEHIND=false
+DEADLINE_BASE_PARALLEL="$MAX_PARALLEL"
+DEADLINE_MONITOR_PID=""
+if [[ -n "$DEADLINE" ]]; then
+    if ! python3 "$SRC_DIR/task_planner.py" share --deadline "$DEADLINE" --parts 1 > /dev/null; then
+        exit 1
+    fi
+    log_info "  Deadline: $DEADLINE (projections in $LOGS_DIR/deadline.log)"
+fi
+
+deadline_checkpoint() {
+    local checkpoint="$1"
+    local model="$2"
+    local monitor="${3:-true}"
+    [[ -z "$DEADLINE" ]] && return 0
+
+    local plan_args=(
+        --processed-dir "$PROCESSED_DIR"
+        --type freeform
+        --students "$NUM_STUDENTS"
+        --deadline "$DEADLINE"
+        --base-parallel "$DEADLINE_BASE_PARALLEL"
+        --provider "$DEFAULT_PROVIDER"
+    )
+    local plan_env
+    if ! plan_env=$(python3 "$SRC_DIR/task_planner.py" plan "${plan_args[@]}" --concurrency "$MAX_PARALLEL" \
+            --model "$model" --api-model "$API_MODEL" --checkpoint "$checkpoint"); then
+        log_warning "Could not project the run against the deadline"
+        return 0
+    fi
+    local previous_parallel="$MAX_PARALLEL"
+    eval "$plan_env"
+    [[ "$MAX_PARALLEL" != "$previous_parallel" ]] && log_warning "Deadline: max parallel raised to $MAX_PARALLEL"
+    if [[ -n "$DEADLINE_MODEL" ]]; then
+        log_warning "Deadline: remaining stages move to the faster model $DEADLINE_MODEL"
+        if [[ -n "$API_MODEL" ]]; then
+            API_MODEL="$DEADLINE_MODEL"
+        else
+            MODEL_MARKER="$DEADLINE_MODEL"
+            MODEL_NORMALIZER="$DEADLINE_MODEL"
+            MODEL_UNIFIER="$DEADLINE_MODEL"
+        fi
+    fi
+
+    # Keep logging projections during the stage, with the current settings
+    [[ -n "$DEADLINE_MONITOR_PID" ]] && kill "$DEADLINE_MONITOR_PID" 2>/dev/null
+    DEADLINE_MONITOR_PID=""
+    [[ "$monitor" == true ]] || return 0
+    python3 "$SRC_DIR/task_planner.py" monitor "${plan_args[@]}" --concurrency "$MAX_PARALLEL" \
+        --model "${DEADLINE_MODEL:-$model}" --api-model "$API_MODEL" \
+        --checkpoint "$checkpoint (running)" --parent-pid $$ > /dev/null 2>&1 &
+    DEADLINE_MONITOR_PID=$!
+}
+
+# ============================================================================
+# WATCH MODE: Mark late submissions against the approved scheme
+# ============================================================================
+
+if [[ "$WATCH" == true ]]; then
+    if [[ ! -f "$PROCESSED_DIR/approved_scheme.json" || ! -f "$PROCESSED_DIR/submissions_manifest.json" ]]; then
+        log_error "Watch mode requires a completed run (approved scheme and submissions manifest)"
+        log_info "Run without --watch first, then restart with --watch"
+        exit 1
+    fi
+
+    log_info "Watch mode: new submissions are marked with the approved scheme"
+    log_info "  Existing students are not re-marked and normalization is not re-run"
+
+    WATCH_CMD=(python3 "$SRC_DIR/watch_submissions.py"
+        --assignment-dir "$ASSIGNMENT_DIR"
+        --type freeform
+        --provider "$DEFAULT_PROVIDER"
+        --parallel "$MAX_PARALLEL"
+        --interval "$WATCH_INTERVAL")
+
+    [[ -n "$MODEL_MARKER" ]] && WATCH_CMD+=(--marker-model "$MODEL_MARKER")
+    [[ -n "$MODEL_UNIFIER" ]] && WATCH_CMD+=(--unifier-model "$MODEL_UNIFIER")
+    [[ -n "$API_MODEL" ]] && WATCH_CMD+=(--api-model "$API_MODEL")
+    [[ $CLEAN_ARTIFACTS == false ]] && WATCH_CMD+=(--no-clean-artifacts)
+    if [[ "$DIFFERENT_PROBLEMS" == "true" && -f "$PROCESSED_DIR/problem_contexts.json" ]]; then
+        WATCH_CMD+=(--problem-context "$PROCESSED_DIR/problem_contexts.json")
+    fi
+
+    exec "${WATCH_CMD[@]}"
+fi
+
 # ============================================================================
 # STAGE 1: Find Submissions
 # ============================================================================
 
+trace_stage "Stage 1: Find Submissions"
+
 SUBMISSIONS_MANIFEST="$PROCESSED_DIR/submissions_manifest.json"
 
 if [[ $RESUME == true && -f "$SUBMISSIONS_MANIFEST" ]]; then
@@ -365,6 +583,8 @@ fi
 # STAGE 1.5: Extract Problem Contexts (Different-Problem Assignments Only)
 # ============================================================================
 
+trace_stage "Stage 1.5: Extract Problem Contexts"
+
 PROBLEM_CONTEXTS="$PROCESSED_DIR/problem_contexts.json"
 
 if [[ "$DIFFERENT_PROBLEMS" == "true" ]]; then
@@ -393,6 +613,8 @@ fi
 # STAGE 2: Marking Pattern Designer (Interactive)
 # ============================================================================
 
+trace_stage "Stage 2: Marking Pattern Designer"
+
 if [[ $RESUME == true && -f "$PROCESSED_DIR/rubric.md" && -f "$PROCESSED_DIR/marking_criteria.md" ]]; then
     log_info "Stage 2: Skipping (rubric and marking criteria already exist)"
     log_success "Pattern design complete"
@@ -446,7 +668,26 @@ fi
 # STAGE 3: Marker Agents (Parallel, Headless)
 # ============================================================================
 
-log_info "Stage 3: Running Marker Agents (Parallel)..."
+trace_stage "Stage 3: Marker Agents"
+
+APPROVED_SCHEME="$PROCESSED_DIR/approved_scheme.json"
+GRADES_CSV="$FINAL_DIR/grades.csv"
+GRADES_PARTIAL="$FINAL_DIR/.grades.csv.partial"  # grades.csv has rows added one student at a time
+
+# Student-major order: with an approved scheme from an earlier (or calibrated)
+# run, each task marks one student, runs their unifier right away and adds
+# their row to grades.csv, so finished feedback cards can be spot-checked
+# while the rest of the class is marked. Stage 6 then only has the students
+# whose task failed, and stage 7 regenerates the partial grades.csv.
+if [[ $STUDENT_MAJOR == true && $RESUME == true && -f "$APPROVED_SCHEME" ]]; then
+    MARKER_STAGE=student
+    log_info "Stage 3: Running Marker and Unifier Agents per student (approved scheme exists)..."
+else
+    STUDENT_MAJOR=false
+    MARKER_STAGE=marker
+    log_info "Stage 3: Running Marker Agents (Parallel)..."
+fi
+deadline_checkpoint "Stage 3" "$MODEL_MARKER"
 log_info "This will process $NUM_STUDENTS students"
 
 # Clean up stale marker logs from previous runs to prevent false error detection
@@ -460,24 +701,37 @@ MARKER_TASKS="$PROCESSED_DIR/marker_tasks.txt"
 
 # Generate marker tasks (one per student for free-form)
 # In resume mode, skip tasks where output file already exists
+trace_begin "Plan marker tasks" planning
 jq -r '.submissions[] | .path + "|" + .student_name' "$SUBMISSIONS_MANIFEST" | while IFS='|' read -r submission_path student_name; do
     output_file="$MARKINGS_DIR/${student_name}.md"
+    feedback_file="$FINAL_DIR/${student_name}_feedback.md"
+
+    # Student-major: the student's unifier and grades.csv row follow the marker
+    # (the unifier's task start is reset so its stats exclude the marker's time)
+    unify_cmd="LLM_TASK_START_TS=\$EPOCHREALTIME python3 '$SRC_DIR/agents/unifier.py' --student '$student_name' --submission '$submission_path' --scheme '$APPROVED_SCHEME' --markings-dir '$MARKINGS_DIR' --output '$feedback_file' --type freeform --provider '$DEFAULT_PROVIDER' ${MODEL_UNIFIER:+--model '$MODEL_UNIFIER'} ${API_MODEL:+--api-model '$API_MODEL'} --stats-file '$STATS_FILE' && python3 '$SRC_DIR/aggregate_grades.py' --feedback-dir '$FINAL_DIR' --output '$GRADES_CSV' --total-marks '$TOTAL_MARKS' --type freeform --student-feedback '$feedback_file'"
 
     if [[ $RESUME == true && -f "$output_file" ]]; then
         # Skip this task - output already exists
-        :
+        if [[ $STUDENT_MAJOR == true && ! -f "$feedback_file" ]]; then
+            echo "$unify_cmd" >> "$MARKER_TASKS"
+        fi
     else
         # Add task to list
-        task_cmd="python3 '$SRC_DIR/agents/marker.py' --student '$student_name' --submission '$submission_path' --criteria '$PROCESSED_DIR/marking_criteria.md' --output '$output_file' --type freeform --provider '$DEFAULT_PROVIDER' ${MODEL_MARKER:+--model '$MODEL_MARKER'} ${API_MODEL:+--api-model '$API_MODEL'} --stats-file '$STATS_FILE'"
+        task_cmd="python3 '$SRC_DIR/agents/marker.py' --student '$student_name' --submission '$submission_path' --criteria '$PROCESSED_DIR/marking_criteria.md' --output '$output_file' --type freeform --provider '$DEFAULT_PROVIDER' ${MODEL_MARKER:+--model '$MODEL_MARKER'} ${API_MODEL:+--api-model '$API_MODEL'} ${CASCADE_MODEL:+--cascade-model '$CASCADE_MODEL'} --stats-file '$STATS_FILE'"
 
         # For different-problems assignments, pass problem context
         if [[ "$DIFFERENT_PROBLEMS" == "true" && -f "$PROBLEM_CONTEXTS" ]]; then
             task_cmd="$task_cmd --problem-context '$PROBLEM_CONTEXTS'"
         fi
 
+        if [[ $STUDENT_MAJOR == true ]]; then
+            task_cmd="$task_cmd && $unify_cmd"
+        fi
+
         echo "$task_cmd" >> "$MARKER_TASKS"
     fi
 done
+trace_end
 
 # Count tasks and report
 TASKS_TO_RUN=$(wc -l < "$MARKER_TASKS" | tr -d ' ')
@@ -492,11 +746,29 @@ else
         log_info "Generated $TASKS_TO_RUN marker tasks"
     fi
 
+    if [[ $STUDENT_MAJOR == true ]]; then
+        log_info "Feedback cards appear in $FINAL_DIR and rows in grades.csv as each student finishes"
+    fi
+
+    # Preflight (see src/preflight.py): check each provider and model of the
+    # run with one small probe call before the tasks fan out, so a missing
+    # API key, expired login or unknown model stops the run here. Failing
+    # provider pool members are dropped from the pool instead.
+    if ! python3 "$SRC_DIR/preflight.py" --provider "$DEFAULT_PROVIDER" \
+            --marker-model "$MODEL_MARKER" --normalizer-model "$MODEL_NORMALIZER" \
+            --unifier-model "$MODEL_UNIFIER" --api-model "$API_MODEL" \
+            --cascade-model "$CASCADE_MODEL" --calls "$TASKS_TO_RUN" --stats-file "$STATS_FILE"; then
+        log_error "Preflight check failed (see above); fix it and re-run with --resume"
+        exit 1
+    fi
+
     # Run markers in parallel
     PARALLEL_ARGS=(
         --tasks "$MARKER_TASKS"
         --concurrency "$MAX_PARALLEL"
         --output-dir "$LOGS_DIR/marker_logs"
+        --stage "$MARKER_STAGE"
+        --stats-file "$STATS_FILE"
         --verbose
     )
 
@@ -509,6 +781,38 @@ else
     log_success "Marker agents completed"
 fi
 
+# Cascade: escalate cheap markings that disagree with identical submissions,
+# then record the escalation rate and savings per activity
+if [[ -n "$CASCADE_MODEL" ]]; then
+    CASCADE_TASKS="$PROCESSED_DIR/cascade_tasks.txt"
+    ESCALATIONS=0
+    if [[ $STUDENT_MAJOR == true ]]; then
+        # The feedback cards are already written from the cheap markings
+        log_info "Cascade: student-major order, skipping the review of disagreeing markings"
+    else
+        ESCALATIONS=$(python3 "$SRC_DIR/utils/cascade.py" review --markings-dir "$MARKINGS_DIR" --tasks "$MARKER_TASKS" --output "$CASCADE_TASKS")
+    fi
+    if [[ "${ESCALATIONS:-0}" -gt 0 && "$DEADLINE_BEHIND" == true ]]; then
+        log_warning "Cascade: behind the deadline, keeping $ESCALATIONS disagreeing marking(s) unescalated"
+    elif [[ "${ESCALATIONS:-0}" -gt 0 ]]; then
+        log_info "Cascade: re-marking $ESCALATIONS marking(s) that disagree with identical submissions"
+        CASCADE_ARGS=(
+            --tasks "$CASCADE_TASKS"
+            --concurrency "$MAX_PARALLEL"
+            --output-dir "$LOGS_DIR/cascade_logs"
+            --stage marker
+            --stats-file "$STATS_FILE"
+            --verbose
+        )
+        if [[ $FORCE_XARGS == true ]]; then
+            CASCADE_ARGS+=(--force-xargs)
+        fi
+        "$SRC_DIR/parallel_runner.sh" "${CASCADE_ARGS[@]}" || true
+    fi
+    python3 "$SRC_DIR/utils/cascade.py" report --markings-dir "$MARKINGS_DIR" --stats-file "$STATS_FILE" \
+        --output "$STATS_DIR/cascade_report.json" || log_warning "Could not write the cascade report"
+fi
+
 # Check for missing marker outputs (more reliable than checking stderr files which may be stale)
 MISSING_MARKINGS=0
 TOTAL_STUDENTS=$(jq -r '.submissions | length' "$SUBMISSIONS_MANIFEST")
@@ -571,6 +875,8 @@ fi
 # STAGE 4: Normalizer Agent
 # ============================================================================
 
+trace_stage "Stage 4: Normalizer Agent"
+
 SCORING_OUTPUT="$NORMALIZED_DIR/scoring.md"
 
 if [[ $RESUME == true && -f "$SCORING_OUTPUT" ]]; then
@@ -578,6 +884,7 @@ if [[ $RESUME == true && -f "$SCORING_OUTPUT" ]]; then
     log_success "Normalization complete"
 else
     log_info "Stage 4: Running Normalizer Agent..."
+    deadline_checkpoint "Stage 4" "$MODEL_NORMALIZER"
 
     python3 "$SRC_DIR/agents/normalizer.py" \
         --markings-dir "$MARKINGS_DIR" \
@@ -621,8 +928,10 @@ fi
 # STAGE 5: Create Adjustment Dashboard
 # ============================================================================
 
+trace_stage "Stage 5: Create Adjustment Dashboard"
+
 DASHBOARD_NOTEBOOK="$PROCESSED_DIR/adjustment_dashboard.ipynb"
-APPROVED_SCHEME="$PROCESSED_DIR/approved_scheme.json"
+DASHBOARD_HTML="$PROCESSED_DIR/adjustment_dashboard.html"
 
 if [[ $RESUME == true && -f "$APPROVED_SCHEME" ]]; then
     log_info "Stage 5: Skipping (approved scheme already exists)"
@@ -638,6 +947,7 @@ else
         "$NORMALIZED_DIR/combined_scoring.json" \
         "$NORMALIZED_DIR/student_mappings.json" \
         --output "$DASHBOARD_NOTEBOOK" \
+        --html "$DASHBOARD_HTML" \
         --type freeform \
         $([[ "$AUTO_APPROVE" == "true" ]] && echo "--auto-approve")
 
@@ -648,6 +958,8 @@ else
     else
         log_warning "Please open the dashboard in Jupyter and approve the marking scheme:"
         log_info "  jupyter notebook \"$DASHBOARD_NOTEBOOK\""
+        log_info "Or, without Jupyter, open in a browser and export approved_scheme.json to $PROCESSED_DIR:"
+        log_info "  $DASHBOARD_HTML"
         log_info ""
         read -p "Press Enter when you have saved the approved scheme..."
     fi
@@ -671,7 +983,10 @@ fi
 # STAGE 6: Unifier Agents (Parallel)
 # ============================================================================
 
+trace_stage "Stage 6: Unifier Agents"
+
 log_info "Stage 6: Running Unifier Agents (Parallel)..."
+deadline_checkpoint "Stage 6" "$MODEL_UNIFIER"
 
 # Create task list
 UNIFIER_TASKS="$PROCESSED_DIR/unifier_tasks.txt"
@@ -679,6 +994,7 @@ UNIFIER_TASKS="$PROCESSED_DIR/unifier_tasks.txt"
 
 # Generate unifier tasks (one per student)
 # In resume mode, skip tasks where output file already exists
+trace_begin "Plan unifier tasks" planning
 jq -r '.submissions[] | .path + "|" + .student_name' "$SUBMISSIONS_MANIFEST" | while IFS='|' read -r submission_path student_name; do
     output_file="$FINAL_DIR/${student_name}_feedback.md"
 
@@ -690,6 +1006,7 @@ jq -r '.submissions[] | .path + "|" + .student_name' "$SUBMISSIONS_MANIFEST" | w
         echo "python3 '$SRC_DIR/agents/unifier.py' --student '$student_name' --submission '$submission_path' --scheme '$APPROVED_SCHEME' --markings-dir '$MARKINGS_DIR' --output '$output_file' --type freeform --provider '$DEFAULT_PROVIDER' ${MODEL_UNIFIER:+--model '$MODEL_UNIFIER'} ${API_MODEL:+--api-model '$API_MODEL'} --stats-file '$STATS_FILE'" >> "$UNIFIER_TASKS"
     fi
 done
+trace_end
 
 # Count tasks and report
 UNIFIER_TASKS_TO_RUN=$(wc -l < "$UNIFIER_TASKS" | tr -d ' ')
@@ -712,6 +1029,8 @@ else
         --tasks "$UNIFIER_TASKS"
         --concurrency "$MAX_PARALLEL"
         --output-dir "$LOGS_DIR/unifier_logs"
+        --stage unifier
+        --stats-file "$STATS_FILE"
         --verbose
     )
 
@@ -767,6 +1086,8 @@ fi
 # STAGE 6.5: Duplicate Group Feedback (Group Assignments Only)
 # ============================================================================
 
+trace_stage "Stage 6.5: Duplicate Group Feedback"
+
 GROUPS_CSV="$ASSIGNMENT_DIR/groups.csv"
 
 if [[ "$GROUP_ASSIGNMENT" == "true" ]]; then
@@ -800,9 +1121,9 @@ fi
 # STAGE 7: Aggregator Agent (Interactive)
 # ============================================================================
 
-GRADES_CSV="$FINAL_DIR/grades.csv"
+trace_stage "Stage 7: Aggregator Agent"
 
-if [[ $RESUME == true && -f "$GRADES_CSV" ]]; then
+if [[ $RESUME == true && -f "$GRADES_CSV" && ! -f "$GRADES_PARTIAL" ]]; then
     log_info "Stage 7: Skipping (grades already generated)"
     log_success "Grades CSV: $GRADES_CSV"
 else
@@ -830,6 +1151,8 @@ fi
 # STAGE 7.5: Clean Artifacts from grades.csv
 # ============================================================================
 
+trace_stage "Stage 7.5: Clean Artifacts from grades.csv"
+
 if [[ $CLEAN_ARTIFACTS == true ]]; then
     log_info "Stage 7.5: Cleaning artifacts from grades.csv..."
     python3 "$SRC_DIR/clean_artifacts.py" "$GRADES_CSV" --in-place --verbose
@@ -853,12 +1176,21 @@ fi
 # STAGE 8: Gradebook Translation (Optional, Automatic)
 # ============================================================================
 
+trace_stage "Stage 8: Gradebook Translation"
+
 GRADEBOOKS_DIR="$ASSIGNMENT_DIR/gradebooks"
 TRANSLATION_DIR="$PROCESSED_DIR/translation"
 TRANSLATION_MAPPING="$TRANSLATION_DIR/translation_mapping.json"
 
+# Translation is not needed for grades.csv: past the deadline it is deferred
+deadline_checkpoint "Stage 8" "" false
+
 # Check if gradebook CSVs are provided
-if [[ -d "$GRADEBOOKS_DIR" ]] && compgen -G "$GRADEBOOKS_DIR/*.csv" > /dev/null; then
+if [[ "$DEADLINE_BEHIND" == true ]] && compgen -G "$GRADEBOOKS_DIR/*.csv" > /dev/null; then
+    log_warning "Stage 8: Deferring gradebook translation (deadline reached, grades.csv is ready)"
+    log_info "Run it later with:"
+    log_info "  ./utils/translate_grades.sh --assignment-dir \"$ASSIGNMENT_DIR\" --gradebooks <files>"
+elif [[ -d "$GRADEBOOKS_DIR" ]] && compgen -G "$GRADEBOOKS_DIR/*.csv" > /dev/null; then
     log_info "Stage 8: Gradebook translation (automatic)..."
 
     # Count gradebook files
@@ -952,6 +1284,7 @@ if [[ -d "$GRADEBOOKS_DIR" ]] && compgen -G "$GRADEBOOKS_DIR/*.csv" > /dev/null;
                                 --provider "$DEFAULT_PROVIDER" \
                                 ${MODEL_AGGREGATOR:+--model "$MODEL_AGGREGATOR"} \
                                 ${API_MODEL:+--api-model "$API_MODEL"} \
+                                --parallel "$MAX_PARALLEL" \
                                 --total-marks "$TOTAL_MARKS"
 
                             if [[ $? -eq 0 ]]; then
@@ -992,6 +1325,8 @@ fi
 # FINAL SUMMARY
 # ============================================================================
 
+trace_stage "Final summary"
+
 echo ""
 echo "========================================================================"
 log_success "MARKING COMPLETE"
@@ -1011,6 +1346,17 @@ if [[ -f "$TRANSLATION_MAPPING" && -f "$TRANSLATION_DIR/translation_report.txt"
     log_info "  Translation report: $TRANSLATION_DIR/translation_report.txt"
 fi
 
+# Outputs that failed validation in this run (see src/utils/output_validator.py)
+VALIDATION_SUMMARY=$(python3 "$SRC_DIR/utils/output_validator.py" summary --stats-file "$STATS_FILE" \
+    --since "$RUN_START_TS" 2>/dev/null || true)
+if [[ -n "$VALIDATION_SUMMARY" ]]; then
+    echo ""
+    log_warning "Output validation:"
+    while IFS= read -r line; do
+        log_info "  $line"
+    done <<< "$VALIDATION_SUMMARY"
+fi
+
 echo ""
 log_success "All marking artifacts saved to: $PROCESSED_DIR"
 echo "========================================================================"
@@ -50,6 +50,15 @@ MODEL_OVERRIDE=""
 API_MODEL=""  # When set, use direct API calls instead of CLI for headless stages
 AUTO_APPROVE=false  # Auto-approve LLM proposals without instructor interaction
 FORCE_COMPLETE=false  # Force complete by generating zero-mark feedback for failed students
+WATCH=false  # Watch submissions/ and mark late submissions incrementally
+WATCH_INTERVAL=60
+TRACE_FILE=""  # Write a Chrome/Perfetto trace of the run
+CLI_POOL=false  # Keep persistent CLI workers for headless calls (CLI mode)
+PROVIDER_POOL=false  # Spread marker/unifier calls over provider_pool in config.yaml
+CASCADE=false  # Mark with cascade's cheap model first, escalate uncertain markings
+DEADLINE=""  # Adapt parallelism and models to finish by this time
+PLAN=false  # Print the run's calls, tokens, cost and time without marking
+PLAN_JSON=""  # Also write the plan as JSON (batch_mark.sh --plan)
 
 while [[ $# -gt 0 ]]; do
     case $1 in
@@ -103,6 +112,43 @@ while [[ $# -gt 0 ]]; do
             FORCE_COMPLETE=true
             shift
             ;;
+        --watch)
+            WATCH=true
+            shift
+            ;;
+        --watch-interval)
+            WATCH_INTERVAL="$2"
+            shift 2
+            ;;
+        --trace)
+            TRACE_FILE="$2"
+            shift 2
+            ;;
+        --cli-pool)
+            CLI_POOL=true
+            shift
+            ;;
+        --provider-pool)
+            PROVIDER_POOL=true
+            shift
+            ;;
+        --cascade)
+            CASCADE=true
+            shift
+            ;;
+        --deadline)
+            DEADLINE="$2"
+            shift 2
+            ;;
+        --plan)
+            PLAN=true
+            shift
+            ;;
+        --plan-json)
+            PLAN=true
+            PLAN_JSON="$2"
+            shift 2
+            ;;
         -*)
             echo "Unknown option: $1" >&2
             echo "Usage: $0 <assignment_directory> [OPTIONS]" >&2
@@ -134,6 +180,14 @@ if [[ -z "${ASSIGNMENT_DIR:-}" ]]; then
     echo "  --parallel N            Override max_parallel setting"
     echo "  --auto-approve          Auto-approve LLM proposals (no instructor interaction)"
     echo "  --force-complete        Generate zero-mark feedback for failed students and continue"
+    echo "  --watch                 Watch submissions/ and mark late submissions only (after a full run)"
+    echo "  --watch-interval N      Seconds between submission scans in watch mode (default: 60)"
+    echo "  --trace FILE            Write a Chrome/Perfetto trace of the run to FILE"
+    echo "  --cli-pool              Keep persistent CLI worker processes for headless calls"
+    echo "  --provider-pool         Spread marker/unifier calls over the providers in provider_pool (config.yaml)"
+    echo "  --cascade               Mark with the cascade's cheap model first, escalating uncertain markings"
+    echo "  --deadline TIME         Finish by TIME (e.g. \"2026-10-20 09:00\"), raising parallelism or using faster models"
+    echo "  --plan                  Estimate calls, tokens, cost and time of the run without marking"
     exit 1
 fi
 
@@ -146,6 +200,11 @@ fi
 ASSIGNMENT_DIR="$(cd "$ASSIGNMENT_DIR" && pwd)"
 ASSIGNMENT_NAME="$(basename "$ASSIGNMENT_DIR")"
 
+# Run-wide tracing (--trace); agents and LLM calls add their spans to this run
+source "$SRC_DIR/utils/tracing.sh"
+trace_init "$TRACE_FILE" "mark_structured: $ASSIGNMENT_NAME"
+trace_stage "Setup"
+
 log_info "Starting structured assignment marking: $ASSIGNMENT_NAME"
 log_info "Assignment directory: $ASSIGNMENT_DIR"
 
@@ -270,6 +329,21 @@ fi
 
 log_info "  Total marks: $TOTAL_MARKS"
 
+# Persistent CLI workers (--cli-pool or cli_pool.enabled in config.yaml); the
+# pool stops when this script exits, and is shared with runs started below it
+if [[ -z "$API_MODEL" && "$PLAN" != true ]]; then
+    pool_args=(--parent-pid $$ --parallel "$MAX_PARALLEL")
+    [[ "$CLI_POOL" == true ]] && pool_args+=(--force)
+    if pool_env=$(python3 "$SRC_DIR/cli_pool.py" start "${pool_args[@]}"); then
+        eval "$pool_env"
+        if [[ -n "${AGENTIC_CLI_POOL:-}" ]]; then
+            log_info "  CLI worker pool: enabled"
+        fi
+    else
+        log_warning "CLI worker pool failed to start; each call will spawn its own CLI process"
+    fi
+fi
+
 # Function to get model for a specific stage
 # Priority: stage-specific > assignment default > none (use provider default)
 get_stage_model() {
@@ -316,6 +390,24 @@ SESSIONS_DIR="$PROCESSED_DIR/sessions"
 STATS_DIR="$PROCESSED_DIR/stats"
 STATS_FILE="$STATS_DIR/token_usage.jsonl"
 
+# Dry run (--plan, see src/dry_run.py): build the prompts of the calls still to
+# make and print their tokens, cost and time, without marking or writing files
+if [[ "$PLAN" == true ]]; then
+    plan_args=(--assignment-dir "$ASSIGNMENT_DIR" --type structured \
+        --provider "$DEFAULT_PROVIDER" --parallel "$MAX_PARALLEL" \
+        --marker-model "$MODEL_MARKER" --normalizer-model "$MODEL_NORMALIZER" \
+        --unifier-model "$MODEL_UNIFIER" --api-model "$API_MODEL")
+    [[ -n "${BASE_FILE:-}" ]] && plan_args+=(--base-file "$BASE_FILE")
+    [[ -n "$PLAN_JSON" ]] && plan_args+=(--json "$PLAN_JSON")
+    echo ""
+    python3 "$SRC_DIR/dry_run.py" plan "${plan_args[@]}"
+    exit $?
+fi
+
+# Start of this run (the stats file accumulates across runs)
+RUN_START_TS="${EPOCHREALTIME:-$(date +%s)}"
+RUN_START_TS="${RUN_START_TS/,/.}"
+
 mkdir -p "$ACTIVITIES_DIR" "$MARKINGS_DIR" "$NORMALIZED_DIR" "$FINAL_DIR" "$LOGS_DIR" "$SESSIONS_DIR" "$STATS_DIR"
 
 # Clean mode: remove processed directory
@@ -333,10 +425,130 @@ if [[ $RESUME == true ]]; then
     log_info "Resume mode: Will skip completed stages and tasks"
 fi
 
+# Provider pool (--provider-pool or provider_pool.enabled in config.yaml):
+# marker and unifier calls are spread over the providers listed there and
+# fail over on quota errors (CLI mode). An explicit --provider or --model
+# keeps the run on that provider unless --provider-pool is also given.
+if [[ -z "$API_MODEL" ]] && [[ "$PROVIDER_POOL" == true || ( -z "$PROVIDER_OVERRIDE" && -z "$MODEL_OVERRIDE" ) ]]; then
+    pool_args=(--state "$STATS_DIR/provider_pool.json")
+    [[ "$PROVIDER_POOL" == true ]] && pool_args+=(--force)
+    if ! pool_env=$(python3 "$SRC_DIR/utils/provider_pool.py" init "${pool_args[@]}"); then
+        log_error "Invalid provider_pool section in configs/config.yaml"
+        exit 1
+    fi
+    eval "$pool_env"
+elif [[ "$PROVIDER_POOL" == true ]]; then
+    log_warning "--provider-pool is ignored in API mode (--api-model)"
+fi
+
+# Marker cascade (--cascade or cascade.enabled in config.yaml): the cascade's
+# cheap model marks first and markings that are malformed, not confident, or
+# disagree with identical submissions are re-marked by the marker model
+CASCADE_MODEL=""
+cascade_args=(--api-model "$API_MODEL")
+[[ "$CASCADE" == true ]] && cascade_args+=(--force)
+if ! cascade_env=$(python3 "$SRC_DIR/utils/cascade.py" init "${cascade_args[@]}"); then
+    log_error "Invalid cascade section in configs/config.yaml"
+    exit 1
+fi
+eval "$cascade_env"
+
+# Deadline mode (--deadline): before each headless stage, project the finish
+# from the calls left and the latency measured so far, and raise parallelism
+# or move the remaining stages to a faster model when the run would be late
+# (see src/task_planner.py). A run still behind skips work that grades.csv
+# does not need: the cascade's second round and gradebook translation.
+DEADLINE_BEHIND=false
+DEADLINE_BASE_PARALLEL="$MAX_PARALLEL"
+DEADLINE_MONITOR_PID=""
+if [[ -n "$DEADLINE" ]]; then
+    if ! python3 "$SRC_DIR/task_planner.py" share --deadline "$DEADLINE" --parts 1 > /dev/null; then
+        exit 1
+    fi
+    log_info "  Deadline: $DEADLINE (projections in $LOGS_DIR/deadline.log)"
+fi
+
+deadline_checkpoint() {
+    local checkpoint="$1"
+    local model="$2"
+    local monitor="${3:-true}"
+    [[ -z "$DEADLINE" ]] && return 0
+
+    local plan_args=(
+        --processed-dir "$PROCESSED_DIR"
+        --type structured
+        --students "$NUM_STUDENTS"
+        --activities "$NUM_ACTIVITIES"
+        --deadline "$DEADLINE"
+        --base-parallel "$DEADLINE_BASE_PARALLEL"
+        --provider "$DEFAULT_PROVIDER"
+    )
+    local plan_env
+    if ! plan_env=$(python3 "$SRC_DIR/task_planner.py" plan "${plan_args[@]}" --concurrency "$MAX_PARALLEL" \
+            --model "$model" --api-model "$API_MODEL" --checkpoint "$checkpoint"); then
+        log_warning "Could not project the run against the deadline"
+        return 0
+    fi
+    local previous_parallel="$MAX_PARALLEL"
+    eval "$plan_env"
+    [[ "$MAX_PARALLEL" != "$previous_parallel" ]] && log_warning "Deadline: max parallel raised to $MAX_PARALLEL"
+    if [[ -n "$DEADLINE_MODEL" ]]; then
+        log_warning "Deadline: remaining stages move to the faster model $DEADLINE_MODEL"
+        if [[ -n "$API_MODEL" ]]; then
+            API_MODEL="$DEADLINE_MODEL"
+        else
+            MODEL_MARKER="$DEADLINE_MODEL"
+            MODEL_NORMALIZER="$DEADLINE_MODEL"
+            MODEL_UNIFIER="$DEADLINE_MODEL"
+        fi
+    fi
+
+    # Keep logging projections during the stage, with the current settings
+    [[ -n "$DEADLINE_MONITOR_PID" ]] && kill "$DEADLINE_MONITOR_PID" 2>/dev/null
+    DEADLINE_MONITOR_PID=""
+    [[ "$monitor" == true ]] || return 0
+    python3 "$SRC_DIR/task_planner.py" monitor "${plan_args[@]}" --concurrency "$MAX_PARALLEL" \
+        --model "${DEADLINE_MODEL:-$model}" --api-model "$API_MODEL" \
+        --checkpoint "$checkpoint (running)" --parent-pid $$ > /dev/null 2>&1 &
+    DEADLINE_MONITOR_PID=$!
+}
+
+# ============================================================================
+# WATCH MODE: Mark late submissions against the approved scheme
+# ============================================================================
+
+if [[ "$WATCH" == true ]]; then
+    if [[ ! -f "$PROCESSED_DIR/approved_scheme.json" || ! -f "$PROCESSED_DIR/submissions_manifest.json" ]]; then
+        log_error "Watch mode requires a completed run (approved scheme and submissions manifest)"
+        log_info "Run without --watch first, then restart with --watch"
+        exit 1
+    fi
+
+    log_info "Watch mode: new submissions are marked with the approved scheme"
+    log_info "  Existing students are not re-marked and normalization is not re-run"
+
+    WATCH_CMD=(python3 "$SRC_DIR/watch_submissions.py"
+        --assignment-dir "$ASSIGNMENT_DIR"
+        --type structured
+        --provider "$DEFAULT_PROVIDER"
+        --parallel "$MAX_PARALLEL"
+        --interval "$WATCH_INTERVAL")
+
+    [[ -n "${BASE_FILE:-}" ]] && WATCH_CMD+=(--base-file "$BASE_FILE")
+    [[ -n "$MODEL_MARKER" ]] && WATCH_CMD+=(--marker-model "$MODEL_MARKER")
+    [[ -n "$MODEL_UNIFIER" ]] && WATCH_CMD+=(--unifier-model "$MODEL_UNIFIER")
+    [[ -n "$API_MODEL" ]] && WATCH_CMD+=(--api-model "$API_MODEL")
+    [[ $CLEAN_ARTIFACTS == false ]] && WATCH_CMD+=(--no-clean-artifacts)
+
+    exec "${WATCH_CMD[@]}"
+fi
+
 # ============================================================================
 # STAGE 1: Find Submissions
 # ============================================================================
 
+trace_stage "Stage 1: Find Submissions"
+
 SUBMISSIONS_MANIFEST="$PROCESSED_DIR/submissions_manifest.json"
 
 if [[ $RESUME == true && -f "$SUBMISSIONS_MANIFEST" ]]; then
@@ -370,6 +582,8 @@ fi
 # STAGE 2: Extract Activities from Base Notebook
 # ============================================================================
 
+trace_stage "Stage 2: Extract Activities from Base Notebook"
+
 # Find base notebook
 BASE_NOTEBOOK=$(find "$ASSIGNMENT_DIR" -maxdepth 1 -name "*.ipynb" -not -path "*/processed/*" | head -1)
 
@@ -424,6 +638,8 @@ fi
 # STAGE 3: Marking Pattern Designer (Interactive)
 # ============================================================================
 
+trace_stage "Stage 3: Marking Pattern Designer"
+
 # Check if pattern design already complete
 RUBRIC_FILE="$PROCESSED_DIR/rubric.md"
 ACTIVITIES_DIR="$PROCESSED_DIR/activities"
@@ -501,6 +717,8 @@ fi
 # STAGE 3.5: Name Resolver Agent (LLM-based name extraction)
 # ============================================================================
 
+trace_stage "Stage 3.5: Name Resolver Agent"
+
 NAME_MAPPING_FILE="$PROCESSED_DIR/name_mapping.json"
 
 if [[ $RESUME == true && -f "$NAME_MAPPING_FILE" ]]; then
@@ -552,7 +770,10 @@ fi
 # STAGE 4: Marker Agents (Parallel, Headless)
 # ============================================================================
 
+trace_stage "Stage 4: Marker Agents"
+
 log_info "Stage 4: Running Marker Agents (Parallel)..."
+deadline_checkpoint "Stage 4" "$MODEL_MARKER"
 log_info "This will process $NUM_ACTIVITIES activities × $NUM_STUDENTS students = $((NUM_ACTIVITIES * NUM_STUDENTS)) marking tasks"
 
 # Create task list for parallel execution
@@ -578,6 +799,7 @@ get_canonical_name() {
 
 # Generate marker tasks (one per activity per student)
 # In resume mode, skip tasks where output file already exists
+trace_begin "Plan marker tasks" planning
 jq -r '.submissions[] | .path + "|" + .student_name' "$SUBMISSIONS_MANIFEST" | while IFS='|' read -r submission_path student_name; do
     # Get canonical name from name mapping (if available)
     canonical_name=$(get_canonical_name "$submission_path" "$student_name")
@@ -589,10 +811,11 @@ jq -r '.submissions[] | .path + "|" + .student_name' "$SUBMISSIONS_MANIFEST" | w
             :
         else
             # Add task to list (use canonical_name for student identification)
-            echo "python3 '$SRC_DIR/agents/marker.py' --activity A$activity --student '$canonical_name' --submission '$submission_path' --output '$output_file' --provider '$DEFAULT_PROVIDER' ${MODEL_MARKER:+--model '$MODEL_MARKER'} ${API_MODEL:+--api-model '$API_MODEL'} --stats-file '$STATS_FILE'" >> "$MARKER_TASKS"
+            echo "python3 '$SRC_DIR/agents/marker.py' --activity A$activity --student '$canonical_name' --submission '$submission_path' --output '$output_file' --provider '$DEFAULT_PROVIDER' ${MODEL_MARKER:+--model '$MODEL_MARKER'} ${API_MODEL:+--api-model '$API_MODEL'} ${CASCADE_MODEL:+--cascade-model '$CASCADE_MODEL'} --stats-file '$STATS_FILE'" >> "$MARKER_TASKS"
         fi
     done
 done
+trace_end
 
 # Count tasks and report
 TASKS_TO_RUN=$(wc -l < "$MARKER_TASKS" | tr -d ' ')
@@ -611,6 +834,18 @@ fi
 
 # Run markers in parallel
 if [[ $TASKS_TO_RUN -gt 0 ]]; then
+    # Preflight (see src/preflight.py): check each provider and model of the
+    # run with one small probe call before the tasks fan out, so a missing
+    # API key, expired login or unknown model stops the run here. Failing
+    # provider pool members are dropped from the pool instead.
+    if ! python3 "$SRC_DIR/preflight.py" --provider "$DEFAULT_PROVIDER" \
+            --marker-model "$MODEL_MARKER" --normalizer-model "$MODEL_NORMALIZER" \
+            --unifier-model "$MODEL_UNIFIER" --api-model "$API_MODEL" \
+            --cascade-model "$CASCADE_MODEL" --calls "$TASKS_TO_RUN" --stats-file "$STATS_FILE"; then
+        log_error "Preflight check failed (see above); fix it and re-run with --resume"
+        exit 1
+    fi
+
     # Clear marker_logs to avoid counting old stdout files in progress calculation
     if [[ $RESUME == true ]]; then
         rm -rf "$LOGS_DIR/marker_logs"
@@ -621,6 +856,8 @@ if [[ $TASKS_TO_RUN -gt 0 ]]; then
         --tasks "$MARKER_TASKS"
         --concurrency "$MAX_PARALLEL"
         --output-dir "$LOGS_DIR/marker_logs"
+        --stage marker
+        --stats-file "$STATS_FILE"
         --verbose
     )
 
@@ -635,6 +872,32 @@ else
     log_info "No marker tasks to run"
 fi
 
+# Cascade: escalate cheap markings that disagree with identical submissions,
+# then record the escalation rate and savings per activity
+if [[ -n "$CASCADE_MODEL" ]]; then
+    CASCADE_TASKS="$PROCESSED_DIR/cascade_tasks.txt"
+    ESCALATIONS=$(python3 "$SRC_DIR/utils/cascade.py" review --markings-dir "$MARKINGS_DIR" --tasks "$MARKER_TASKS" --output "$CASCADE_TASKS")
+    if [[ "${ESCALATIONS:-0}" -gt 0 && "$DEADLINE_BEHIND" == true ]]; then
+        log_warning "Cascade: behind the deadline, keeping $ESCALATIONS disagreeing marking(s) unescalated"
+    elif [[ "${ESCALATIONS:-0}" -gt 0 ]]; then
+        log_info "Cascade: re-marking $ESCALATIONS marking(s) that disagree with identical submissions"
+        CASCADE_ARGS=(
+            --tasks "$CASCADE_TASKS"
+            --concurrency "$MAX_PARALLEL"
+            --output-dir "$LOGS_DIR/cascade_logs"
+            --stage marker
+            --stats-file "$STATS_FILE"
+            --verbose
+        )
+        if [[ $FORCE_XARGS == true ]]; then
+            CASCADE_ARGS+=(--force-xargs)
+        fi
+        "$SRC_DIR/parallel_runner.sh" "${CASCADE_ARGS[@]}" || true
+    fi
+    python3 "$SRC_DIR/utils/cascade.py" report --markings-dir "$MARKINGS_DIR" --stats-file "$STATS_FILE" \
+        --output "$STATS_DIR/cascade_report.json" || log_warning "Could not write the cascade report"
+fi
+
 # Check for missing marker outputs (more reliable than checking stderr files which may be stale)
 TOTAL_STUDENTS=$(jq -r '.submissions | length' "$SUBMISSIONS_MANIFEST")
 EXPECTED_MARKINGS=$((TOTAL_STUDENTS * NUM_ACTIVITIES))
@@ -701,13 +964,22 @@ fi
 # STAGE 5: Normalizer Agents (Per Activity)
 # ============================================================================
 
+trace_stage "Stage 5: Normalizer Agents"
+
 log_info "Stage 5: Running Normalizer Agents..."
+deadline_checkpoint "Stage 5" "$MODEL_NORMALIZER"
+
+# In deadline mode the activities are normalized in parallel
+NORMALIZER_TASKS="$PROCESSED_DIR/normalizer_tasks.txt"
+> "$NORMALIZER_TASKS"
 
 for activity in $(seq 1 $NUM_ACTIVITIES); do
     SCORING_OUTPUT="$NORMALIZED_DIR/A${activity}_scoring.md"
 
     if [[ $RESUME == true && -f "$SCORING_OUTPUT" ]]; then
         log_info "Activity $activity: Skipping (scoring already exists)"
+    elif [[ -n "$DEADLINE" ]]; then
+        echo "python3 '$SRC_DIR/agents/normalizer.py' --activity A$activity --markings-dir '$MARKINGS_DIR' --processed-dir '$PROCESSED_DIR' --output '$SCORING_OUTPUT' --provider '$DEFAULT_PROVIDER' ${MODEL_NORMALIZER:+--model '$MODEL_NORMALIZER'} ${API_MODEL:+--api-model '$API_MODEL'} --type structured --stats-file '$STATS_FILE'" >> "$NORMALIZER_TASKS"
     else
         log_info "Normalizing Activity $activity..."
 
@@ -732,6 +1004,30 @@ for activity in $(seq 1 $NUM_ACTIVITIES); do
     fi
 done
 
+if [[ -s "$NORMALIZER_TASKS" ]]; then
+    log_info "Normalizing $(wc -l < "$NORMALIZER_TASKS" | tr -d ' ') activities in parallel..."
+    NORMALIZER_ARGS=(
+        --tasks "$NORMALIZER_TASKS"
+        --concurrency "$MAX_PARALLEL"
+        --output-dir "$LOGS_DIR/normalizer_logs"
+        --stage normalizer
+        --stats-file "$STATS_FILE"
+        --verbose
+    )
+    if [[ $FORCE_XARGS == true ]]; then
+        NORMALIZER_ARGS+=(--force-xargs)
+    fi
+    "$SRC_DIR/parallel_runner.sh" "${NORMALIZER_ARGS[@]}" || true
+
+    for activity in $(seq 1 $NUM_ACTIVITIES); do
+        if [[ ! -f "$NORMALIZED_DIR/A${activity}_scoring.md" ]]; then
+            log_error "Normalizer failed for Activity $activity (see $LOGS_DIR/normalizer_logs)"
+            exit 1
+        fi
+    done
+    log_success "Activities normalized"
+fi
+
 # Create combined scoring file for dashboard
 log_info "Creating combined scoring data..."
 python3 "$SRC_DIR/utils/combine_normalized.py" \
@@ -755,7 +1051,10 @@ fi
 # STAGE 6: Create Adjustment Dashboard
 # ============================================================================
 
+trace_stage "Stage 6: Create Adjustment Dashboard"
+
 DASHBOARD_NOTEBOOK="$PROCESSED_DIR/adjustment_dashboard.ipynb"
+DASHBOARD_HTML="$PROCESSED_DIR/adjustment_dashboard.html"
 APPROVED_SCHEME="$PROCESSED_DIR/approved_scheme.json"
 
 if [[ $RESUME == true && -f "$APPROVED_SCHEME" ]]; then
@@ -769,6 +1068,7 @@ else
         "$NORMALIZED_DIR/combined_scoring.json"
         "$NORMALIZED_DIR/student_mappings.json"
         --output "$DASHBOARD_NOTEBOOK"
+        --html "$DASHBOARD_HTML"
         --type structured)
 
     if [[ "$AUTO_APPROVE" == true ]]; then
@@ -783,6 +1083,8 @@ else
         log_success "Dashboard created: $DASHBOARD_NOTEBOOK"
         log_warning "Please open the dashboard in Jupyter and approve the marking scheme:"
         log_info "  jupyter notebook \"$DASHBOARD_NOTEBOOK\""
+        log_info "Or, without Jupyter, open in a browser and export approved_scheme.json to $PROCESSED_DIR:"
+        log_info "  $DASHBOARD_HTML"
         log_info ""
         read -p "Press Enter when you have saved the approved scheme..."
     fi
@@ -806,7 +1108,10 @@ fi
 # STAGE 7: Unifier Agents (Parallel)
 # ============================================================================
 
+trace_stage "Stage 7: Unifier Agents"
+
 log_info "Stage 7: Running Unifier Agents (Parallel)..."
+deadline_checkpoint "Stage 7" "$MODEL_UNIFIER"
 
 # Create task list
 UNIFIER_TASKS="$PROCESSED_DIR/unifier_tasks.txt"
@@ -814,6 +1119,7 @@ UNIFIER_TASKS="$PROCESSED_DIR/unifier_tasks.txt"
 
 # Generate unifier tasks (one per student)
 # In resume mode, skip tasks where output file already exists
+trace_begin "Plan unifier tasks" planning
 jq -r '.submissions[] | .path + "|" + .student_name' "$SUBMISSIONS_MANIFEST" | while IFS='|' read -r submission_path student_name; do
     # Get canonical name from name mapping (if available)
     canonical_name=$(get_canonical_name "$submission_path" "$student_name")
@@ -827,6 +1133,7 @@ jq -r '.submissions[] | .path + "|" + .student_name' "$SUBMISSIONS_MANIFEST" | w
         echo "python3 '$SRC_DIR/agents/unifier.py' --student '$canonical_name' --submission '$submission_path' --scheme '$APPROVED_SCHEME' --markings-dir '$MARKINGS_DIR' --output '$output_file' --type structured --provider '$DEFAULT_PROVIDER' ${MODEL_UNIFIER:+--model '$MODEL_UNIFIER'} ${API_MODEL:+--api-model '$API_MODEL'} --stats-file '$STATS_FILE'" >> "$UNIFIER_TASKS"
     fi
 done
+trace_end
 
 # Count tasks and report
 UNIFIER_TASKS_TO_RUN=$(wc -l < "$UNIFIER_TASKS" | tr -d ' ')
@@ -849,6 +1156,8 @@ else
         --tasks "$UNIFIER_TASKS"
         --concurrency "$MAX_PARALLEL"
         --output-dir "$LOGS_DIR/unifier_logs"
+        --stage unifier
+        --stats-file "$STATS_FILE"
         --verbose
     )
 
@@ -904,6 +1213,8 @@ fi
 # STAGE 7.5: Duplicate Group Feedback (Group Assignments Only)
 # ============================================================================
 
+trace_stage "Stage 7.5: Duplicate Group Feedback"
+
 GROUPS_CSV="$ASSIGNMENT_DIR/groups.csv"
 
 if [[ "$GROUP_ASSIGNMENT" == "true" ]]; then
@@ -937,6 +1248,8 @@ fi
 # STAGE 8: Aggregator Agent (Interactive)
 # ============================================================================
 
+trace_stage "Stage 8: Aggregator Agent"
+
 GRADES_CSV="$FINAL_DIR/grades.csv"
 
 if [[ $RESUME == true && -f "$GRADES_CSV" ]]; then
@@ -973,6 +1286,8 @@ fi
 # STAGE 8.5: Artifact Cleaning (Automatic)
 # ============================================================================
 
+trace_stage "Stage 8.5: Artifact Cleaning"
+
 if [[ $CLEAN_ARTIFACTS == true ]]; then
     log_info "Stage 8.5: Cleaning artifacts from grades.csv..."
 
@@ -991,11 +1306,20 @@ fi
 # STAGE 9: Gradebook Translation (Optional, Automatic)
 # ============================================================================
 
+trace_stage "Stage 9: Gradebook Translation"
+
 TRANSLATION_DIR="$PROCESSED_DIR/translation"
 TRANSLATION_MAPPING="$TRANSLATION_DIR/translation_mapping.json"
 
+# Translation is not needed for grades.csv: past the deadline it is deferred
+deadline_checkpoint "Stage 9" "" false
+
 # Check if gradebook CSVs are provided
-if [[ -d "$GRADEBOOKS_DIR" ]] && compgen -G "$GRADEBOOKS_DIR/*.csv" > /dev/null; then
+if [[ "$DEADLINE_BEHIND" == true ]] && compgen -G "$GRADEBOOKS_DIR/*.csv" > /dev/null; then
+    log_warning "Stage 9: Deferring gradebook translation (deadline reached, grades.csv is ready)"
+    log_info "Run it later with:"
+    log_info "  ./utils/translate_grades.sh --assignment-dir \"$ASSIGNMENT_DIR\" --gradebooks <files>"
+elif [[ -d "$GRADEBOOKS_DIR" ]] && compgen -G "$GRADEBOOKS_DIR/*.csv" > /dev/null; then
     log_info "Stage 9: Gradebook translation (automatic)..."
 
     # Count gradebook files
@@ -1089,6 +1413,7 @@ if [[ -d "$GRADEBOOKS_DIR" ]] && compgen -G "$GRADEBOOKS_DIR/*.csv" > /dev/null;
                                 --provider "$DEFAULT_PROVIDER" \
                                 ${MODEL_AGGREGATOR:+--model "$MODEL_AGGREGATOR"} \
                                 ${API_MODEL:+--api-model "$API_MODEL"} \
+                                --parallel "$MAX_PARALLEL" \
                                 --total-marks "$TOTAL_MARKS"
 
                             if [[ $? -eq 0 ]]; then
@@ -1129,6 +1454,8 @@ fi
 # FINAL SUMMARY
 # ============================================================================
 
+trace_stage "Final summary"
+
 echo ""
 echo "========================================================================"
 log_success "MARKING COMPLETE"
@@ -1147,6 +1474,17 @@ if [[ -f "$TRANSLATION_MAPPING" && -f "$TRANSLATION_DIR/translation_report.txt"
     log_info "  Translation report: $TRANSLATION_DIR/translation_report.txt"
 fi
 
+# Outputs that failed validation in this run (see src/utils/output_validator.py)
+VALIDATION_SUMMARY=$(python3 "$SRC_DIR/utils/output_validator.py" summary --stats-file "$STATS_FILE" \
+    --since "$RUN_START_TS" 2>/dev/null || true)
+if [[ -n "$VALIDATION_SUMMARY" ]]; then
+    echo ""
+    log_warning "Output validation:"
+    while IFS= read -r line; do
+        log_info "  $line"
+    done <<< "$VALIDATION_SUMMARY"
+fi
+
 echo ""
 log_success "All marking artifacts saved to: $PROCESSED_DIR"
 echo "========================================================================"
@@ -13,6 +13,7 @@ from pathlib import Path
 # Import utilities
 sys.path.insert(0, str(Path(__file__).parent.parent / "utils"))
 from system_config import get_default_provider, get_default_model
+from prompt_store import save_prompt
 
 
 def load_prompt_template() -> str:
@@ -139,10 +140,8 @@ def main():
             output_path=args.output_dir
         )
 
-        # Save prompt for debugging
-        prompt_debug_file = Path(args.session_log).with_suffix('.prompt.txt')
-        with open(prompt_debug_file, 'w') as f:
-            f.write(prompt)
+        # Store the prompt (passed to llm_caller.sh by path; also the debug copy)
+        prompt_file = save_prompt(prompt, args.session_log)
 
         print("="*70)
         print("AGGREGATOR - INTERACTIVE SESSION")
@@ -172,7 +171,7 @@ def main():
 
         cmd = [
             str(llm_caller),
-            "--prompt", prompt,
+            "--prompt-file", str(prompt_file),
             "--mode", "interactive",
             "--provider", args.provider,
             "--output", args.session_log
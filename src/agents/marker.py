@@ -9,12 +9,19 @@ import argparse
 import json
 import subprocess
 import sys
+import tempfile
 from pathlib import Path
 
 # Import utilities
 sys.path.insert(0, str(Path(__file__).parent.parent / "utils"))
 from quota_detector import is_quota_error, print_quota_warning
 from system_config import get_default_provider, get_default_model, resolve_provider_from_model
+from prompt_store import save_prompt
+from task_watchdog import run_llm_call
+from provider_pool import call_with_failover, write_output_meta
+from cascade import CONFIDENCE_INSTRUCTIONS, get_cascade_config, parse_cheap_output, work_hash
+from output_validator import check_output, validate_marker
+from tracing import complete as trace_complete, now_us, span
 
 
 def load_prompt_template(assignment_type: str) -> str:
@@ -45,32 +52,35 @@ def extract_student_work(notebook_path: str, activity_id: str = None) -> str:
     notebook = load_notebook(notebook_path)
 
     if activity_id:
-        # Use activity extractor for structured assignments
+        # Use activity extractor for structured assignments. Each call gets its own
+        # output directory: markers run in parallel and would otherwise read each
+        # other's (possibly half-written) extractions.
         extractor_path = Path(__file__).parent.parent / "extract_activities.py"
-        result = subprocess.run([
-            sys.executable,
-            str(extractor_path),
-            notebook_path,
-            "--output", "/tmp/extracted_activities"
-        ], capture_output=True, text=True)
-
-        if result.returncode != 0:
-            raise RuntimeError(f"Activity extraction failed: {result.stderr}")
-
-        # Load extracted activity
-        activity_file = Path(f"/tmp/extracted_activities/{activity_id}.json")
-        if activity_file.exists():
-            with open(activity_file, 'r') as f:
-                activity_data = json.load(f)
-                # Format cells for display
-                cells_text = []
-                for cell in activity_data['cells']:
-                    cell_type = cell['cell_type']
-                    source = cell['source']
-                    cells_text.append(f"[{cell_type}]\n{source}\n")
-                return "\n".join(cells_text)
-        else:
-            raise FileNotFoundError(f"Activity {activity_id} not found in submission")
+        with tempfile.TemporaryDirectory(prefix="extracted_activities_") as extract_dir:
+            result = subprocess.run([
+                sys.executable,
+                str(extractor_path),
+                notebook_path,
+                "--output", extract_dir
+            ], capture_output=True, text=True)
+
+            if result.returncode != 0:
+                raise RuntimeError(f"Activity extraction failed: {result.stderr}")
+
+            # Load extracted activity
+            activity_file = Path(extract_dir) / f"{activity_id}.json"
+            if activity_file.exists():
+                with open(activity_file, 'r') as f:
+                    activity_data = json.load(f)
+                    # Format cells for display
+                    cells_text = []
+                    for cell in activity_data['cells']:
+                        cell_type = cell['cell_type']
+                        source = cell['source']
+                        cells_text.append(f"[{cell_type}]\n{source}\n")
+                    return "\n".join(cells_text)
+            else:
+                raise FileNotFoundError(f"Activity {activity_id} not found in submission")
     else:
         # Return entire notebook formatted for display
         cells_text = []
@@ -198,10 +208,28 @@ def main():
         "--api-model",
         help="Model for direct API calls (uses API instead of CLI for headless)"
     )
+    parser.add_argument(
+        "--cascade-model",
+        help="Cheap model to mark with first; uncertain markings are escalated to the marker model "
+             "(an API model when --api-model is set)"
+    )
+    parser.add_argument(
+        "--min-confidence",
+        type=float,
+        default=get_cascade_config()['min_confidence'],
+        help="Escalate cheap markings below this self-reported confidence (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--escalate",
+        metavar="REASON",
+        help="Skip the cheap model and mark with the marker model (cascade escalation)"
+    )
 
     args = parser.parse_args()
 
     try:
+        build_start = now_us()
+
         # Load prompt template
         prompt_template = load_prompt_template(args.type)
 
@@ -238,74 +266,156 @@ def main():
             problem_context=problem_context
         )
 
-        # Save prompt for debugging
-        prompt_debug_file = Path(args.output).with_suffix('.prompt.txt')
-        with open(prompt_debug_file, 'w') as f:
-            f.write(prompt)
+        # Store the prompt (passed to llm_caller.sh by path; also the debug copy)
+        prompt_file = save_prompt(prompt, args.output)
+        trace_complete("build_prompt", "agent", build_start, now_us(), student=args.student, activity=args.activity)
 
         # Call LLM via unified caller
         llm_caller = Path(__file__).parent.parent / "llm_caller.sh"
 
-        cmd = [
-            str(llm_caller),
-            "--prompt", prompt,
-            "--mode", "headless",
-            "--provider", args.provider,
-            "--auto-approve"  # Skip permission prompts for automated marking
-        ]
+        context = f"{args.student}"
+        if args.activity:
+            context += f"/{args.activity}"
+
+        def build_cmd(provider, model, prompt_file=prompt_file, api_model=args.api_model):
+            cmd = [
+                str(llm_caller),
+                "--prompt-file", str(prompt_file),
+                "--mode", "headless",
+                "--provider", provider,
+                "--auto-approve"  # Skip permission prompts for automated marking
+            ]
 
-        if args.model:
-            cmd.extend(["--model", args.model])
+            if model:
+                cmd.extend(["--model", model])
 
-        if args.api_model:
-            cmd.extend(["--api-model", args.api_model])
+            if api_model:
+                # Followed as it streams (when streaming is enabled)
+                cmd.extend(["--api-model", api_model, "--stream-file", f"{args.output}.partial"])
 
-        if args.stats_file:
-            context = f"{args.student}"
-            if args.activity:
-                context += f"/{args.activity}"
-            cmd.extend([
-                "--stats-file", args.stats_file,
-                "--stats-stage", "marker",
-                "--stats-context", context
-            ])
-
-        result = subprocess.run(cmd, capture_output=True, text=True)
-
-        if result.returncode != 0:
-            # Check if this is a quota/rate limit error
-            error_output = result.stderr + result.stdout
-
-            # Determine the actual provider used for error reporting
-            # When --api-model is set, resolve provider from the model name
-            effective_provider = args.provider
+            if args.stats_file:
+                cmd.extend([
+                    "--stats-file", args.stats_file,
+                    "--stats-stage", "marker",
+                    "--stats-context", context
+                ])
+            return cmd
+
+        # Cascade: mark with the cheap model first, and keep its marking
+        # unless it is malformed or not confident enough
+        output_text = None
+        cascade = None
+        api_model = args.api_model
+        if args.cascade_model:
+            strong_provider = args.provider
             if args.api_model:
-                resolved = resolve_provider_from_model(args.api_model)
-                if resolved:
-                    # Normalize provider name for quota detection
-                    if resolved in ('codex', 'openai'):
-                        effective_provider = 'codex'
-                    elif resolved in ('claude', 'anthropic'):
-                        effective_provider = 'claude'
-                    elif resolved in ('gemini', 'google'):
-                        effective_provider = 'gemini'
-                    else:
-                        effective_provider = resolved
-
-            quota_detected = is_quota_error(error_output, effective_provider)
-
-            if quota_detected:
-                print_quota_warning(effective_provider, error_output)
+                strong_provider = resolve_provider_from_model(args.api_model) or args.provider
+            cascade = {
+                'activity': args.activity or 'full',
+                'work_hash': work_hash(student_work),
+                'cheap_model': args.cascade_model,
+                'strong_provider': strong_provider,
+                'strong_model': args.api_model or args.model or '',
+            }
+
+        if cascade and args.escalate:
+            # Second round (duplicate cluster review): keep the cheap pass's fields
+            meta_file = Path(f"{args.output}.meta.json")
+            if meta_file.exists():
+                previous = json.loads(meta_file.read_text(encoding='utf-8')).get('cascade') or {}
+                cascade.update({k: previous[k] for k in ('confidence', 'fields') if k in previous})
+            cascade['escalated'] = args.escalate
+        elif cascade:
+            cheap_api_model = args.cascade_model if args.api_model else None
+            section = 'api_models' if args.api_model else 'cli_models'
+            cheap_provider = resolve_provider_from_model(args.cascade_model, section) or args.provider
+            cheap_prompt_file = save_prompt(prompt + CONFIDENCE_INSTRUCTIONS, args.output)
+            cheap_cmd = build_cmd(cheap_provider, None if cheap_api_model else args.cascade_model,
+                                  cheap_prompt_file, cheap_api_model)
+            result = run_llm_call(cheap_cmd, "marker", args.stats_file, context)
+
+            if result.returncode != 0:
+                reason = 'cheap_call_failed'
+            else:
+                body, fields, problem = parse_cheap_output(result.stdout)
+                cascade['confidence'] = fields['confidence'] if fields else None
+                cascade['fields'] = fields
+                if problem:
+                    reason = 'malformed'
+                elif fields['confidence'] < args.min_confidence:
+                    reason = 'low_confidence'
+                else:
+                    reason = None
+            cascade['escalated'] = reason
+
+            if reason:
+                print(f"⚠ Cascade: escalating {context} from {args.cascade_model} ({reason})", file=sys.stderr)
             else:
-                print(f"Error: LLM call failed: {result.stderr}", file=sys.stderr)
-            sys.exit(1)
+                output_text = body
+                used, failovers = {'provider': cheap_provider, 'model': args.cascade_model}, []
+                api_model = cheap_api_model
+
+        if output_text is None:
+            # Spread across the provider pool when one is enabled (CLI mode)
+            result, used, failovers = call_with_failover(
+                build_cmd,
+                lambda cmd: run_llm_call(cmd, "marker", args.stats_file, context),
+                args.provider, args.model, use_pool=not args.api_model
+            )
+
+            if result.returncode != 0:
+                # Check if this is a quota/rate limit error
+                error_output = result.stderr + result.stdout
+
+                # Determine the actual provider used for error reporting
+                # When --api-model is set, resolve provider from the model name
+                effective_provider = used['provider']
+                if args.api_model:
+                    resolved = resolve_provider_from_model(args.api_model)
+                    if resolved:
+                        # Normalize provider name for quota detection
+                        if resolved in ('codex', 'openai'):
+                            effective_provider = 'codex'
+                        elif resolved in ('claude', 'anthropic'):
+                            effective_provider = 'claude'
+                        elif resolved in ('gemini', 'google'):
+                            effective_provider = 'gemini'
+                        else:
+                            effective_provider = resolved
+
+                quota_detected = is_quota_error(error_output, effective_provider)
+
+                if quota_detected:
+                    print_quota_warning(effective_provider, error_output)
+                else:
+                    print(f"Error: LLM call failed: {result.stderr}", file=sys.stderr)
+                sys.exit(1)
+
+            output_text = result.stdout
 
         # Write output to file (Python handles file writing since shell redirection is unreliable)
-        with open(args.output, 'w', encoding='utf-8') as f:
-            f.write(result.stdout)
+        with span("write_output", "io", path=args.output):
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(output_text)
+            write_output_meta(args.output, "marker", context, used, failovers, api_model,
+                              extra={'cascade': cascade} if cascade else None)
+
+        # Check the sections the normalizer reads; a malformed marking is
+        # sent back to the marker model with its problems
+        def call_repair(repair_prompt):
+            repair_file = save_prompt(repair_prompt, args.output)
+            result, _, _ = call_with_failover(
+                lambda provider, model: build_cmd(provider, model, repair_file),
+                lambda cmd: run_llm_call(cmd, "marker", args.stats_file, context),
+                args.provider, args.model, use_pool=not args.api_model
+            )
+            return result
+
+        check_output(args.output, validate_marker, prompt, call_repair, "marker", context, args.stats_file)
 
         print(f"✓ Marking complete for {args.student} ({args.activity or 'full submission'})")
         print(f"  Output: {args.output}")
+        print(f"  Prompt: {prompt_file}")
 
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
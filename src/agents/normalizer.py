@@ -7,7 +7,6 @@ Aggregates marker assessments and creates unified scoring scheme.
 
 import argparse
 import json
-import subprocess
 import sys
 from pathlib import Path
 from typing import List, Dict
@@ -15,6 +14,14 @@ from typing import List, Dict
 # Import utilities
 sys.path.insert(0, str(Path(__file__).parent.parent / "utils"))
 from system_config import get_default_provider, get_default_model
+from prompt_store import save_prompt
+from task_watchdog import run_llm_call
+from output_validator import check_output, validate_normalizer, validate_normalizer_json
+from structured_output import (
+    get_structured_output_config, json_instructions, json_path, render_scoring,
+    save_structured_output, schema_path
+)
+from tracing import complete as trace_complete, now_us, span
 
 
 def load_prompt_template(assignment_type: str) -> str:
@@ -132,6 +139,8 @@ def main():
     args = parser.parse_args()
 
     try:
+        build_start = now_us()
+
         # Load prompt template
         prompt_template = load_prompt_template(args.type)
 
@@ -165,49 +174,85 @@ def main():
             rubric_section=rubric  # Same as rubric for now
         )
 
-        # Save prompt for debugging
-        prompt_debug_file = Path(args.output).with_suffix('.prompt.txt')
-        with open(prompt_debug_file, 'w') as f:
-            f.write(prompt)
+        # Ask for the scoring as JSON (rendered to Markdown below)
+        structured = get_structured_output_config()['enabled']
+        if structured:
+            prompt += json_instructions("normalizer")
+
+        # Store the prompt (passed to llm_caller.sh by path; also the debug copy)
+        prompt_file = save_prompt(prompt, args.output)
+        trace_complete("build_prompt", "agent", build_start, now_us(), activity=args.activity)
 
         print(f"Normalizing assessments for {args.activity or 'entire assignment'}...")
 
         # Call LLM via unified caller
         llm_caller = Path(__file__).parent.parent / "llm_caller.sh"
 
-        cmd = [
-            str(llm_caller),
-            "--prompt", prompt,
-            "--mode", "headless",
-            "--provider", args.provider,
-            "--auto-approve"  # Skip permission prompts for automated operation
-        ]
+        def build_cmd(prompt_file):
+            cmd = [
+                str(llm_caller),
+                "--prompt-file", str(prompt_file),
+                "--mode", "headless",
+                "--provider", args.provider,
+                "--auto-approve"  # Skip permission prompts for automated operation
+            ]
+
+            if args.model:
+                cmd.extend(["--model", args.model])
 
-        if args.model:
-            cmd.extend(["--model", args.model])
+            if args.api_model:
+                # Followed as it streams (when streaming is enabled)
+                cmd.extend(["--api-model", args.api_model, "--stream-file", f"{args.output}.partial"])
 
-        if args.api_model:
-            cmd.extend(["--api-model", args.api_model])
+            if structured:
+                cmd.extend(["--json-schema", str(schema_path("normalizer"))])
 
-        if args.stats_file:
-            cmd.extend([
-                "--stats-file", args.stats_file,
-                "--stats-stage", "normalizer",
-                "--stats-context", args.activity or "full"
-            ])
+            if args.stats_file:
+                cmd.extend([
+                    "--stats-file", args.stats_file,
+                    "--stats-stage", "normalizer",
+                    "--stats-context", args.activity or "full"
+                ])
+            return cmd
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = run_llm_call(build_cmd(prompt_file), "normalizer", args.stats_file, args.activity or "full")
 
         if result.returncode != 0:
             print(f"✗ Normalization failed: {result.stderr}", file=sys.stderr)
             sys.exit(1)
 
         # Write output to file (Python handles file writing since shell redirection is unreliable)
-        with open(args.output, 'w', encoding='utf-8') as f:
-            f.write(result.stdout)
+        with span("write_output", "io", path=args.output):
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(result.stdout)
+            # A JSON from an earlier run would be read instead of this output
+            json_path(args.output).unlink(missing_ok=True)
+
+        # Check the tables and the per-student mapping combine_normalized.py
+        # reads; a malformed scoring file is sent back with its problems
+        students = [a['student_name'] for a in assessments]
+        if structured:
+            validate = lambda text: validate_normalizer_json(text, students)
+        else:
+            validate = lambda text: validate_normalizer(Path(args.output), students, args.activity)
+        check_output(
+            args.output,
+            validate,
+            prompt,
+            lambda repair_prompt: run_llm_call(build_cmd(save_prompt(repair_prompt, args.output)), "normalizer",
+                                               args.stats_file, args.activity or "full"),
+            "normalizer", args.activity or "full", args.stats_file
+        )
+
+        # Keep the JSON next to the scoring file and render it as Markdown
+        if structured and not save_structured_output(
+                args.output, "normalizer", lambda data: render_scoring(data, args.activity)):
+            print(f"⚠ Normalizer output for {args.activity or 'assignment'} is not JSON matching the "
+                  f"schema; kept as returned", file=sys.stderr)
 
         print(f"✓ Normalization complete for {args.activity or 'assignment'}")
         print(f"  Output: {args.output}")
+        print(f"  Prompt: {prompt_file}")
 
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
@@ -13,6 +13,7 @@ from pathlib import Path
 # Import utilities
 sys.path.insert(0, str(Path(__file__).parent.parent / "utils"))
 from system_config import get_default_provider, get_default_model
+from prompt_store import save_prompt
 
 
 def load_prompt_template(assignment_type: str) -> str:
@@ -162,10 +163,8 @@ The marker agents will receive each group's specific problem description along w
                 auto_approve_note + "\n## Assignment Context"
             )
 
-        # Save prompt for debugging
-        prompt_debug_file = Path(args.session_log).with_suffix('.prompt.txt')
-        with open(prompt_debug_file, 'w') as f:
-            f.write(prompt)
+        # Store the prompt (passed to llm_caller.sh by path; also the debug copy)
+        prompt_file = save_prompt(prompt, args.session_log)
 
         # Pattern designer always uses interactive mode because it needs Write tools
         # to create rubric and criteria files. Auto-approve just skips permission prompts.
@@ -199,7 +198,7 @@ The marker agents will receive each group's specific problem description along w
 
         cmd = [
             str(llm_caller),
-            "--prompt", prompt,
+            "--prompt-file", str(prompt_file),
             "--mode", mode,
             "--provider", args.provider,
             "--output", args.session_log
@@ -15,6 +15,8 @@ from pathlib import Path
 # Add src/utils to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / 'utils'))
 from system_config import resolve_provider_from_model, format_available_models
+from prompt_store import save_prompt
+from task_watchdog import run_llm_call
 
 
 def read_csv_content(csv_path: str, max_lines: int = None) -> str:
@@ -257,13 +259,14 @@ def run_translator(assignment_name: str, total_marks: int, assignment_type: str,
     script_dir = Path(__file__).parent.parent
     llm_caller = script_dir / 'llm_caller.sh'
     session_log = Path(output_path) / 'translator_session.log'
+    prompt_file = save_prompt(prompt, session_log)
 
     # Use API mode if api_model is specified
     if api_model:
         cmd = [
             'bash',
             str(llm_caller),
-            '--prompt', prompt,
+            '--prompt-file', str(prompt_file),
             '--mode', 'headless',
             '--api-model', api_model,
             '--provider', provider  # Fallback provider
@@ -272,7 +275,7 @@ def run_translator(assignment_name: str, total_marks: int, assignment_type: str,
             cmd.extend(['--model', model])
 
         # Run headless API call
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = run_llm_call(cmd, 'translator')
 
         if result.returncode != 0:
             print(f"\nError: Translator API call failed: {result.stderr}")
@@ -341,7 +344,7 @@ def run_translator(assignment_name: str, total_marks: int, assignment_type: str,
     cmd = [
         'bash',
         str(llm_caller),
-        '--prompt', prompt,
+        '--prompt-file', str(prompt_file),
         '--mode', 'interactive',
         '--provider', provider,
         '--output', str(session_log)
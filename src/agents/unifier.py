@@ -7,7 +7,6 @@ Applies approved marking scheme and creates final feedback for a student.
 
 import argparse
 import json
-import subprocess
 import sys
 from pathlib import Path
 from typing import Dict, List
@@ -15,6 +14,15 @@ from typing import Dict, List
 # Import utilities
 sys.path.insert(0, str(Path(__file__).parent.parent / "utils"))
 from system_config import get_default_provider, get_default_model
+from prompt_store import save_prompt
+from task_watchdog import run_llm_call
+from provider_pool import call_with_failover, write_output_meta
+from output_validator import check_output, validate_unifier, validate_unifier_json
+from structured_output import (
+    get_structured_output_config, json_instructions, json_path, render_feedback,
+    save_structured_output, schema_path
+)
+from tracing import complete as trace_complete, now_us, span
 
 
 def load_prompt_template() -> str:
@@ -132,6 +140,8 @@ def main():
     args = parser.parse_args()
 
     try:
+        build_start = now_us()
+
         # Load prompt template
         prompt_template = load_prompt_template()
 
@@ -186,49 +196,92 @@ Total: [sum] / [total_available]
             marks_breakdown="[Activity/Component marks listed here]"
         )
 
-        # Save prompt for debugging
-        prompt_debug_file = Path(args.output).with_suffix('.prompt.txt')
-        with open(prompt_debug_file, 'w') as f:
-            f.write(prompt)
+        # Ask for the marks and feedback as JSON (rendered to Markdown below)
+        structured = get_structured_output_config()['enabled']
+        if structured:
+            prompt += json_instructions("unifier")
+
+        # Store the prompt (passed to llm_caller.sh by path; also the debug copy)
+        prompt_file = save_prompt(prompt, args.output)
+        trace_complete("build_prompt", "agent", build_start, now_us(), student=args.student)
 
         print(f"Creating final feedback for {args.student}...")
 
         # Call LLM via unified caller
         llm_caller = Path(__file__).parent.parent / "llm_caller.sh"
 
-        cmd = [
-            str(llm_caller),
-            "--prompt", prompt,
-            "--mode", "headless",
-            "--provider", args.provider,
-            "--auto-approve"  # Skip permission prompts for automated operation
-        ]
-
-        if args.model:
-            cmd.extend(["--model", args.model])
-
-        if args.api_model:
-            cmd.extend(["--api-model", args.api_model])
-
-        if args.stats_file:
-            cmd.extend([
-                "--stats-file", args.stats_file,
-                "--stats-stage", "unifier",
-                "--stats-context", args.student
-            ])
-
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        def build_cmd(provider, model, prompt_file=prompt_file):
+            cmd = [
+                str(llm_caller),
+                "--prompt-file", str(prompt_file),
+                "--mode", "headless",
+                "--provider", provider,
+                "--auto-approve"  # Skip permission prompts for automated operation
+            ]
+
+            if model:
+                cmd.extend(["--model", model])
+
+            if args.api_model:
+                # Followed as it streams (when streaming is enabled)
+                cmd.extend(["--api-model", args.api_model, "--stream-file", f"{args.output}.partial"])
+
+            if structured:
+                cmd.extend(["--json-schema", str(schema_path("unifier"))])
+
+            if args.stats_file:
+                cmd.extend([
+                    "--stats-file", args.stats_file,
+                    "--stats-stage", "unifier",
+                    "--stats-context", args.student
+                ])
+            return cmd
+
+        # Spread across the provider pool when one is enabled (CLI mode)
+        result, used, failovers = call_with_failover(
+            build_cmd,
+            lambda cmd: run_llm_call(cmd, "unifier", args.stats_file, args.student),
+            args.provider, args.model, use_pool=not args.api_model
+        )
 
         if result.returncode != 0:
             print(f"✗ Unifier failed: {result.stderr}", file=sys.stderr)
             sys.exit(1)
 
         # Write output to file (Python handles file writing since shell redirection is unreliable)
-        with open(args.output, 'w', encoding='utf-8') as f:
-            f.write(result.stdout)
+        with span("write_output", "io", path=args.output):
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(result.stdout)
+            # A JSON from an earlier run would be read instead of this output
+            json_path(args.output).unlink(missing_ok=True)
+            write_output_meta(args.output, "unifier", args.student, used, failovers, args.api_model)
+
+        # Check the feedback card aggregate_grades.py reads; a malformed one is
+        # sent back with its problems
+        def call_repair(repair_prompt):
+            repair_file = save_prompt(repair_prompt, args.output)
+            result, _, _ = call_with_failover(
+                lambda provider, model: build_cmd(provider, model, repair_file),
+                lambda cmd: run_llm_call(cmd, "unifier", args.stats_file, args.student),
+                args.provider, args.model, use_pool=not args.api_model
+            )
+            return result
+
+        if structured:
+            validate = lambda text: validate_unifier_json(text, args.student)
+        else:
+            validate = lambda text: validate_unifier(text, args.student, args.type)
+        check_output(args.output, validate, prompt, call_repair, "unifier", args.student, args.stats_file)
+
+        # Keep the JSON next to the feedback and render it as Markdown
+        if structured and not save_structured_output(
+                args.output, "unifier", lambda data: render_feedback(data, args.type)):
+            print(f"⚠ Unifier output for {args.student} is not JSON matching the schema; kept as returned",
+                  file=sys.stderr)
 
         print(f"✓ Final feedback created for {args.student}")
         print(f"  Output: {args.output}")
+        print(f"  Prompt: {prompt_file}")
 
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
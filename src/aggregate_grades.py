@@ -4,15 +4,29 @@ Grade Aggregator - Deterministic CSV Generation
 
 Reads all feedback cards and generates grades.csv with proper formatting.
 This is a simple, deterministic script - no LLM needed.
+
+With --student-feedback, inserts or replaces a single student's row instead
+(student-major runs write each row as soon as the student's feedback card is
+done). Such a grades.csv is partial until the next full aggregation.
+
+Names and marks come from the JSON the unifier keeps next to each feedback
+card (Name_feedback.json, see utils/structured_output.py) when there is one,
+and are parsed from the card otherwise.
 """
 
 import argparse
 import csv
+import fcntl
+import os
 import re
 import statistics
+import sys
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).parent / "utils"))
+from structured_output import feedback_from_json, load_json_output
+
 
 def parse_feedback_card(content: str, filename: str) -> dict:
     """Extract student name, marks, and feedback from a feedback card."""
@@ -43,6 +57,92 @@ def parse_feedback_card(content: str, filename: str) -> dict:
     }
 
 
+def load_feedback_card(feedback_file: Path) -> dict:
+    """Read a feedback card (from the unifier's JSON when it is there, see parse_feedback_card)."""
+    with open(feedback_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+    data = load_json_output(feedback_file, 'unifier')
+    if data is not None:
+        return feedback_from_json(data, content, feedback_file.name)
+    return parse_feedback_card(content, feedback_file.name)
+
+
+def partial_marker(grades_csv: Path) -> Path:
+    """Marker file present while grades.csv holds rows written one student at a time."""
+    return grades_csv.with_name(f".{grades_csv.name}.partial")
+
+
+def upsert_grade_row(grades_csv: Path, feedback_file: Path, assignment_type: str,
+                     num_activities: int = 0, partial: bool = False) -> str:
+    """
+    Insert or replace one student's row in grades.csv.
+
+    Uses the same parsing and column layout as generate_csv() so the merged
+    file is indistinguishable from a full regeneration.
+
+    Args:
+        grades_csv: CSV to update (created if missing)
+        feedback_file: The student's feedback card
+        assignment_type: 'structured' or 'freeform'
+        num_activities: Activity columns of a new structured CSV
+        partial: Mark grades.csv as partial and hold the marker's lock while
+                 updating, for concurrent updates from parallel tasks
+
+    Returns:
+        Student name as written to grades.csv
+    """
+    student = load_feedback_card(feedback_file)
+
+    grades_csv.parent.mkdir(parents=True, exist_ok=True)
+    lock = open(partial_marker(grades_csv), 'a') if partial else None
+    try:
+        if lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+        rows = []
+        headers = None
+        if grades_csv.exists():
+            with open(grades_csv, 'r', encoding='utf-8', newline='') as f:
+                reader = csv.reader(f)
+                headers = next(reader, None)
+                rows = [row for row in reader]
+
+        if not headers:
+            if assignment_type == 'structured' and num_activities:
+                activity_cols = [f'Activity {n}' for n in range(1, num_activities + 1)]
+                headers = ['Student Name', 'Total Mark'] + activity_cols + ['Feedback Card']
+            else:
+                headers = ['Student Name', 'Total Mark', 'Feedback Card']
+
+        new_row = []
+        for header in headers:
+            if header == 'Student Name':
+                new_row.append(student['name'])
+            elif header == 'Total Mark':
+                new_row.append(student['total_mark'])
+            elif header == 'Feedback Card':
+                new_row.append(student['feedback'])
+            else:
+                new_row.append(student['activities'].get(header, 0.0))
+
+        rows = [row for row in rows if row and row[0] != student['name']]
+        rows.append(new_row)
+        rows.sort(key=lambda row: row[0])
+
+        # Replace the file in one step so readers never see a half-written CSV
+        tmp_path = grades_csv.with_name(f"{grades_csv.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+            writer.writerow(headers)
+            writer.writerows(rows)
+        os.replace(tmp_path, grades_csv)
+    finally:
+        if lock:
+            lock.close()
+
+    return student['name']
+
+
 def generate_csv(feedback_dir: Path, output_path: Path, total_marks: int, assignment_type: str):
     """Generate grades.csv from all feedback cards."""
 
@@ -60,10 +160,7 @@ def generate_csv(feedback_dir: Path, output_path: Path, total_marks: int, assign
     all_activities = set()
 
     for feedback_file in feedback_files:
-        with open(feedback_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        student_data = parse_feedback_card(content, feedback_file.name)
+        student_data = load_feedback_card(feedback_file)
         students.append(student_data)
         all_activities.update(student_data['activities'].keys())
 
@@ -94,6 +191,9 @@ def generate_csv(feedback_dir: Path, output_path: Path, total_marks: int, assign
 
             writer.writerow(row)
 
+    # Rows written one student at a time are now all regenerated
+    partial_marker(output_path).unlink(missing_ok=True)
+
     # Generate statistics
     marks = [s['total_mark'] for s in students]
     stats = {
@@ -164,12 +264,23 @@ def main():
     parser.add_argument('--output', required=True, help='Output CSV path')
     parser.add_argument('--total-marks', type=int, required=True, help='Total marks for assignment')
     parser.add_argument('--type', choices=['structured', 'freeform'], required=True, help='Assignment type')
+    parser.add_argument('--student-feedback',
+                        help='Only insert or replace the row of this feedback card (marks the CSV as partial)')
 
     args = parser.parse_args()
 
     feedback_dir = Path(args.feedback_dir)
     output_path = Path(args.output)
 
+    if args.student_feedback:
+        feedback_file = Path(args.student_feedback)
+        if not feedback_file.exists():
+            print(f"Error: Feedback card does not exist: {feedback_file}")
+            return 1
+        name = upsert_grade_row(output_path, feedback_file, args.type, partial=True)
+        print(f"✓ {name} added to {output_path} (partial)")
+        return 0
+
     if not feedback_dir.exists():
         print(f"Error: Feedback directory does not exist: {feedback_dir}")
         return 1
@@ -6,9 +6,22 @@ Provides direct API access to Anthropic, Google, and OpenAI models.
 Used by llm_caller.sh when --api-model is specified in headless mode.
 
 Environment variables for API keys:
-  - ANTHROPIC_API_KEY
+  - CLAUDE_API_KEY (or ANTHROPIC_API_KEY)
   - GOOGLE_API_KEY (or GEMINI_API_KEY)
   - OPENAI_API_KEY
+  - CLAUDE_API_KEYS, GEMINI_API_KEYS, OPENAI_API_KEYS: several keys, comma
+    separated, used as a pool (see key_pool.py)
+
+Calls that outlast their stage's observed p95 latency can be hedged with a
+duplicate request when hedging is enabled in config.yaml (see hedging.py).
+
+With streaming enabled in config.yaml, responses are streamed and cancelled
+(then sent again) as soon as they degenerate; see stream_guard.py.
+
+With --json-schema, the response is one JSON object matching the schema,
+enforced by the provider: forced tool use (Anthropic), response_schema
+(Gemini) or a strict json_schema response format (OpenAI). See
+utils/structured_output.py.
 
 Usage:
   python3 caller.py --model <model> --prompt "text" [OPTIONS]
@@ -34,52 +47,34 @@ Output:
 
 import argparse
 import json
-import os
 import sys
-from datetime import datetime
+import time
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent / "utils"))
+from hedging import call_hedged, claim_hedge, get_hedging_config, hedge_delay
+from key_pool import KEY_ENV_VARS, call_with_keys, discover_keys
+from llm_telemetry import append_stats_entry, build_stats_entry, timing_fields
+from quota_ledger import BudgetExhausted, acquire, settle
+from stream_guard import DegenerateOutput, StreamGuard, consume, get_streaming_config
+from system_config import resolve_provider_from_model
+from tracing import span
 
-def resolve_provider(model: str, models_config: Path) -> str | None:
-    """Resolve provider from model name using models.yaml.
-
-    Checks both api_models and cli_models sections.
-    """
-    if not models_config.exists():
-        return None
 
-    with open(models_config, 'r') as f:
-        content = f.read()
-
-    # Simple YAML parsing - check both api_models and cli_models sections
-    for section in ['api_models', 'cli_models']:
-        in_section = False
-        for line in content.split('\n'):
-            if line.strip() == f'{section}:':
-                in_section = True
-                continue
-            if in_section:
-                if line and not line.startswith(' ') and not line.startswith('#'):
-                    in_section = False  # New top-level section
-                    continue
-                if model + ':' in line:
-                    # Extract provider
-                    parts = line.split(':')
-                    if len(parts) >= 2:
-                        return parts[-1].strip().strip('"').strip("'")
-
-    return None
-
-
-def call_anthropic(model: str, prompt: str, max_tokens: int = 8192,
-                   system_prompt: str | None = None) -> tuple[str, dict]:
+def call_anthropic(api_key: str, model: str, prompt: str, max_tokens: int = 8192,
+                   system_prompt: str | None = None,
+                   guard: StreamGuard | None = None,
+                   json_schema: dict | None = None) -> tuple[str, dict]:
     """Call Anthropic/Claude API with optional prompt caching.
 
     Args:
+        api_key: API key for this call (from the key pool)
         model: Model name (e.g., claude-sonnet-4-5)
         prompt: User prompt (variable content)
         max_tokens: Maximum output tokens
         system_prompt: Optional system prompt to cache (static content, min 1024 tokens)
+        guard: Stream the response through this guard (None = no streaming)
+        json_schema: Return a JSON object matching this schema (forced tool use)
 
     Claude prompt caching:
         - System prompt is marked with cache_control for automatic caching
@@ -93,12 +88,6 @@ def call_anthropic(model: str, prompt: str, max_tokens: int = 8192,
         print("Error: anthropic package not installed. Run: pip install anthropic", file=sys.stderr)
         sys.exit(1)
 
-    # Check CLAUDE_API_KEY first, fall back to ANTHROPIC_API_KEY for compatibility
-    api_key = os.environ.get('CLAUDE_API_KEY') or os.environ.get('ANTHROPIC_API_KEY')
-    if not api_key:
-        print("Error: CLAUDE_API_KEY (or ANTHROPIC_API_KEY) environment variable not set", file=sys.stderr)
-        sys.exit(1)
-
     client = anthropic.Anthropic(api_key=api_key)
 
     # Build request with optional caching
@@ -122,13 +111,39 @@ def call_anthropic(model: str, prompt: str, max_tokens: int = 8192,
             }
         ]
 
-    response = client.messages.create(**request_kwargs)
+    # Structured output: the model must call a tool whose input is the object
+    if json_schema:
+        tool_name = json_schema.get('title', 'output')
+        request_kwargs['tools'] = [{
+            "name": tool_name,
+            "description": json_schema.get('description', 'Record the response'),
+            "input_schema": json_schema,
+        }]
+        request_kwargs['tool_choice'] = {"type": "tool", "name": tool_name}
+
+    request_start = time.time()
+    if guard:
+        # Leaving the stream's context (also on DegenerateOutput) closes the connection
+        with client.messages.stream(**request_kwargs) as stream:
+            if json_schema:
+                # The tool input arrives as partial JSON
+                consume(guard, (event.partial_json for event in stream if event.type == 'input_json'))
+            else:
+                text = consume(guard, stream.text_stream)
+            response = stream.get_final_message()
+    else:
+        response = client.messages.create(**request_kwargs)
+    provider_s = time.time() - request_start
 
     # Extract text from response
-    text = ""
-    for block in response.content:
-        if block.type == "text":
-            text += block.text
+    if json_schema:
+        text = next((json.dumps(block.input, ensure_ascii=False) for block in response.content
+                     if block.type == "tool_use"), "")
+    elif not guard:
+        text = ""
+        for block in response.content:
+            if block.type == "text":
+                text += block.text
 
     # Extract usage stats including cache info
     stats = {
@@ -136,19 +151,45 @@ def call_anthropic(model: str, prompt: str, max_tokens: int = 8192,
         'output_tokens': response.usage.output_tokens,
         'cache_creation_tokens': getattr(response.usage, 'cache_creation_input_tokens', 0) or 0,
         'cache_read_tokens': getattr(response.usage, 'cache_read_input_tokens', 0) or 0,
-        'cost_usd': 0,  # Could calculate from token counts and model pricing
+        'cost_usd': 0,  # Computed from the models.yaml pricing table
+        'provider_s': provider_s,
+        'first_token_ts': guard.first_token_ts if guard else None,
     }
 
     return text, stats
 
 
-def call_google(model: str, prompt: str, system_prompt: str | None = None) -> tuple[str, dict]:
+def _gemini_chunk_text(chunk) -> str:
+    """Text of a streamed Gemini chunk ('' for chunks without text parts)."""
+    try:
+        return chunk.text
+    except ValueError:
+        return ''
+
+
+def _gemini_schema(schema):
+    """A JSON schema in the OpenAPI subset Gemini's response_schema accepts."""
+    if isinstance(schema, dict):
+        return {key: _gemini_schema(value) for key, value in schema.items()
+                if key not in ('additionalProperties', 'title')}
+    if isinstance(schema, list):
+        return [_gemini_schema(value) for value in schema]
+    return schema
+
+
+def call_google(api_key: str, model: str, prompt: str,
+                system_prompt: str | None = None,
+                guard: StreamGuard | None = None,
+                json_schema: dict | None = None) -> tuple[str, dict]:
     """Call Google Generative AI API with optional system instruction.
 
     Args:
+        api_key: API key for this call (from the key pool)
         model: Model name (e.g., gemini-2.5-pro)
         prompt: User prompt (variable content)
         system_prompt: Optional system instruction (for Gemini's implicit caching)
+        guard: Stream the response through this guard (None = no streaming)
+        json_schema: Return a JSON object matching this schema (response_schema)
 
     Gemini caching (2.5 models):
         - Implicit caching is automatic (no API changes needed)
@@ -162,11 +203,6 @@ def call_google(model: str, prompt: str, system_prompt: str | None = None) -> tu
         print("Error: google-generativeai package not installed. Run: pip install google-generativeai", file=sys.stderr)
         sys.exit(1)
 
-    api_key = os.environ.get('GOOGLE_API_KEY') or os.environ.get('GEMINI_API_KEY')
-    if not api_key:
-        print("Error: GOOGLE_API_KEY or GEMINI_API_KEY environment variable not set", file=sys.stderr)
-        sys.exit(1)
-
     genai.configure(api_key=api_key)
 
     # Create model with system instruction if provided
@@ -176,9 +212,23 @@ def call_google(model: str, prompt: str, system_prompt: str | None = None) -> tu
     else:
         gen_model = genai.GenerativeModel(model)
 
-    response = gen_model.generate_content(prompt)
+    request_kwargs = {}
+    if json_schema:
+        request_kwargs['generation_config'] = {
+            'response_mime_type': 'application/json',
+            'response_schema': _gemini_schema(json_schema),
+        }
 
-    text = response.text
+    request_start = time.time()
+    if guard:
+        # Usage metadata is complete once the stream has been read to the end;
+        # a cancelled stream is dropped unread
+        response = gen_model.generate_content(prompt, stream=True, **request_kwargs)
+        text = consume(guard, (_gemini_chunk_text(chunk) for chunk in response))
+    else:
+        response = gen_model.generate_content(prompt, **request_kwargs)
+        text = response.text
+    provider_s = time.time() - request_start
 
     # Extract usage stats including cache info (Gemini 2.5 reports cached_content_token_count)
     usage_metadata = getattr(response, 'usage_metadata', None)
@@ -191,6 +241,7 @@ def call_google(model: str, prompt: str, system_prompt: str | None = None) -> tu
             'cache_creation_tokens': 0,  # Gemini doesn't differentiate creation vs read
             'cache_read_tokens': cached_tokens,
             'cost_usd': 0,
+            'provider_s': provider_s,
         }
     else:
         stats = {
@@ -199,18 +250,26 @@ def call_google(model: str, prompt: str, system_prompt: str | None = None) -> tu
             'cache_creation_tokens': 0,
             'cache_read_tokens': 0,
             'cost_usd': 0,
+            'provider_s': provider_s,
         }
+    stats['first_token_ts'] = guard.first_token_ts if guard else None
 
     return text, stats
 
 
-def call_openai(model: str, prompt: str, system_prompt: str | None = None) -> tuple[str, dict]:
+def call_openai(api_key: str, model: str, prompt: str,
+                system_prompt: str | None = None,
+                guard: StreamGuard | None = None,
+                json_schema: dict | None = None) -> tuple[str, dict]:
     """Call OpenAI API with optional system message.
 
     Args:
+        api_key: API key for this call (from the key pool)
         model: Model name (e.g., gpt-5.1)
         prompt: User prompt (variable content)
         system_prompt: Optional system message (helps with automatic caching)
+        guard: Stream the response through this guard (None = no streaming)
+        json_schema: Return a JSON object matching this schema (strict json_schema format)
 
     OpenAI caching:
         - Automatic for prompts > 1024 tokens
@@ -224,11 +283,6 @@ def call_openai(model: str, prompt: str, system_prompt: str | None = None) -> tu
         print("Error: openai package not installed. Run: pip install openai", file=sys.stderr)
         sys.exit(1)
 
-    api_key = os.environ.get('OPENAI_API_KEY')
-    if not api_key:
-        print("Error: OPENAI_API_KEY environment variable not set", file=sys.stderr)
-        sys.exit(1)
-
     client = openai.OpenAI(api_key=api_key)
 
     # Build messages with optional system prompt
@@ -237,15 +291,52 @@ def call_openai(model: str, prompt: str, system_prompt: str | None = None) -> tu
         messages.append({"role": "system", "content": system_prompt})
     messages.append({"role": "user", "content": prompt})
 
-    response = client.chat.completions.create(
-        model=model,
-        messages=messages
-    )
+    request_kwargs = {}
+    if json_schema:
+        request_kwargs['response_format'] = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": json_schema.get('title', 'output'),
+                "strict": True,
+                "schema": {key: value for key, value in json_schema.items() if key != 'title'},
+            },
+        }
 
-    text = response.choices[0].message.content or ""
+    request_start = time.time()
+    if guard:
+        # Usage arrives in a last chunk without choices
+        stream = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **request_kwargs
+        )
+        usage = None
+
+        def chunks():
+            nonlocal usage
+            for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content or ""
+
+        try:
+            text = consume(guard, chunks())
+        finally:
+            stream.close()
+    else:
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            **request_kwargs
+        )
+        text = response.choices[0].message.content or ""
+        usage = response.usage
+    provider_s = time.time() - request_start
 
     # Extract usage stats including cache info
-    usage = response.usage
     if usage:
         # OpenAI reports cached tokens in prompt_tokens_details
         prompt_details = getattr(usage, 'prompt_tokens_details', None)
@@ -259,6 +350,7 @@ def call_openai(model: str, prompt: str, system_prompt: str | None = None) -> tu
             'cache_creation_tokens': 0,  # OpenAI doesn't differentiate
             'cache_read_tokens': cached_tokens,
             'cost_usd': 0,
+            'provider_s': provider_s,
         }
     else:
         stats = {
@@ -267,11 +359,25 @@ def call_openai(model: str, prompt: str, system_prompt: str | None = None) -> tu
             'cache_creation_tokens': 0,
             'cache_read_tokens': 0,
             'cost_usd': 0,
+            'provider_s': provider_s,
         }
+    stats['first_token_ts'] = guard.first_token_ts if guard else None
 
     return text, stats
 
 
+def normalize_provider(provider: str) -> str:
+    """Map provider aliases to claude, gemini or openai."""
+    provider = provider.lower()
+    if provider in ('anthropic', 'claude'):
+        return 'claude'
+    if provider in ('google', 'gemini'):
+        return 'gemini'
+    if provider in ('openai', 'codex'):
+        return 'openai'
+    return provider
+
+
 def main():
     parser = argparse.ArgumentParser(description='Direct LLM API caller')
     parser.add_argument('--model', required=True, help='Model name (provider auto-resolved)')
@@ -284,6 +390,9 @@ def main():
     parser.add_argument('--stats-stage', default='unknown', help='Stage name for stats')
     parser.add_argument('--stats-context', default='', help='Additional context')
     parser.add_argument('--max-tokens', type=int, default=8192, help='Max output tokens')
+    parser.add_argument('--wrapper-start-ts', type=float, help='When llm_caller.sh started (epoch seconds)')
+    parser.add_argument('--stream-file', help='Write the response here as it streams (streaming enabled)')
+    parser.add_argument('--json-schema', help='Return one JSON object matching this schema file')
     args = parser.parse_args()
 
     # Get prompt
@@ -308,59 +417,210 @@ def main():
     if args.provider:
         provider = args.provider
     else:
-        script_dir = Path(__file__).parent.parent.parent
-        models_config = script_dir / "configs" / "models.yaml"
-        provider = resolve_provider(args.model, models_config)
+        provider = resolve_provider_from_model(args.model)
 
         if not provider:
             print(f"Error: Cannot resolve provider for model '{args.model}'", file=sys.stderr)
             print("Add it to configs/models.yaml or use --provider", file=sys.stderr)
             sys.exit(1)
 
-    # Normalize provider name
-    provider = provider.lower()
-    if provider in ('anthropic', 'claude'):
-        provider = 'claude'
-    elif provider in ('google', 'gemini'):
-        provider = 'gemini'
-    elif provider in ('openai', 'codex'):
-        provider = 'openai'
+    provider = normalize_provider(provider)
 
-    # Call appropriate API with system prompt for caching
-    try:
+    json_schema = None
+    if args.json_schema:
+        with open(args.json_schema, 'r') as f:
+            json_schema = json.load(f)
+
+    streaming = get_streaming_config()
+
+    def new_guard(stream_file: str | None):
+        if not streaming['enabled']:
+            return None
+        # A JSON response has no Markdown headers to look for
+        return StreamGuard(args.stats_stage, prompt, streaming, stream_file, check_header=not json_schema)
+
+    def make_call(provider: str, model: str, stream_file: str | None = args.stream_file):
+        """SDK call (api_key) -> (text, stats) for a provider, or None if unknown."""
         if provider == 'claude':
-            text, stats = call_anthropic(args.model, prompt, args.max_tokens, system_prompt)
-        elif provider == 'gemini':
-            text, stats = call_google(args.model, prompt, system_prompt)
-        elif provider == 'openai':
-            text, stats = call_openai(args.model, prompt, system_prompt)
-        else:
-            print(f"Error: Unknown provider '{provider}'", file=sys.stderr)
+            return lambda api_key: call_anthropic(api_key, model, prompt, args.max_tokens, system_prompt,
+                                                  new_guard(stream_file), json_schema)
+        if provider == 'gemini':
+            return lambda api_key: call_google(api_key, model, prompt, system_prompt, new_guard(stream_file),
+                                               json_schema)
+        if provider == 'openai':
+            return lambda api_key: call_openai(api_key, model, prompt, system_prompt, new_guard(stream_file),
+                                               json_schema)
+        return None
+
+    call = make_call(provider, args.model)
+    if call is None:
+        print(f"Error: Unknown provider '{provider}'", file=sys.stderr)
+        sys.exit(1)
+
+    keys = discover_keys(provider)
+    if not keys:
+        names = KEY_ENV_VARS[provider]
+        print(f"Error: No {provider} API key set ({', '.join(names[:-1])} or {names[-1]})", file=sys.stderr)
+        sys.exit(1)
+
+    def record_stats(stats: dict, exit_status: int, start_ts: float, end_ts: float,
+                     key_fingerprint: str | None, provider: str = provider,
+                     model: str = args.model, **extra):
+        if not args.stats_file:
+            return
+        stats = dict(stats)
+        timing = timing_fields(start_ts, end_ts,
+                               wrapper_start_ts=args.wrapper_start_ts,
+                               first_token_ts=stats.pop('first_token_ts', None),
+                               provider_s=stats.pop('provider_s', None))
+        entry = build_stats_entry(provider, model, args.stats_stage,
+                                  args.stats_context, stats, timing,
+                                  exit_status=exit_status, interface='api',
+                                  key_fingerprint=key_fingerprint, **extra)
+        append_stats_entry(args.stats_file, entry)
+
+    no_tokens = {'input_tokens': 0, 'output_tokens': 0,
+                 'cache_creation_tokens': 0, 'cache_read_tokens': 0, 'cost_usd': 0}
+    prompt_tokens = (len(prompt) + len(system_prompt or '')) // 4 + 1
+    ledger_context = f"{args.stats_stage} {args.stats_context}".strip()
+
+    def spent_tokens(attempts: list) -> int:
+        return sum(attempt['tokens'] for attempt in attempts)
+
+    def send(t_provider: str, t_model: str, t_call, t_keys: list, spent: list):
+        """call_with_keys, sending the request again when the stream guard cancels it.
+
+        Cancelled attempts are recorded and appended to `spent` ({tokens, end_ts}).
+        """
+        for attempt in range(streaming['retries'] + 1):
+            try:
+                return call_with_keys(t_provider, t_keys, t_call)
+            except DegenerateOutput as e:
+                # Billed: the prompt and the output streamed before the cancel
+                guard = e.guard
+                spent.append({'tokens': prompt_tokens + guard.output_tokens, 'end_ts': guard.end_ts})
+                record_stats(dict(no_tokens, input_tokens=prompt_tokens, output_tokens=guard.output_tokens,
+                                  first_token_ts=guard.first_token_ts),
+                             1, guard.start_ts, guard.end_ts, getattr(e, 'key_fingerprint', None),
+                             t_provider, t_model, stream_abort=e.reason, tokens_estimated=True)
+                if attempt == streaming['retries']:
+                    raise
+                print(f"⚠ Stream guard: cancelled {ledger_context} ({e}); sending it again",
+                      file=sys.stderr)
+
+    # Reserve the call in the shared quota ledger (waits while other runs use
+    # the provider's per-minute budget)
+    try:
+        ledger_id = acquire('api', provider, prompt_tokens, ledger_context)
+    except BudgetExhausted as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    hedging = get_hedging_config()
+    delay = hedge_delay(args.stats_file, args.stats_stage, hedging)
+    if delay is not None:
+        # Hedged: duplicate the call once it outlasts the stage's p95, on
+        # another key or the alternate model, and keep the first response
+        # Only the primary request writes the stream file
+        targets = {'primary': (provider, args.model, call, keys),
+                   'hedge': (provider, args.model, make_call(provider, args.model, None), keys)}
+        alternate = hedging['alternate_model']
+        if alternate:
+            alt_provider = normalize_provider(resolve_provider_from_model(alternate, 'api_models') or '')
+            alt_call, alt_keys = make_call(alt_provider, alternate, None), discover_keys(alt_provider)
+            if alt_call and alt_keys:
+                targets['hedge'] = (alt_provider, alternate, alt_call, alt_keys)
+            else:
+                print(f"⚠ Hedging: alternate model '{alternate}' has no API key or provider; "
+                      f"hedging on {provider}", file=sys.stderr)
+        ledger_ids = {'primary': ledger_id}
+        spent = {'primary': [], 'hedge': []}
+
+        def request(role):
+            t_provider, t_model, t_call, t_keys = targets[role]
+            if role == 'hedge':
+                ledger_ids[role] = acquire('api', t_provider, prompt_tokens, ledger_context)
+            return send(t_provider, t_model, t_call, t_keys, spent[role])
+
+        def may_hedge():
+            if not claim_hedge(args.stats_file, args.stats_stage, args.stats_context, delay, hedging):
+                return False
+            print(f"⚠ Hedging: {ledger_context} outstanding for {delay:.1f}s; "
+                  f"sending a duplicate to {targets['hedge'][1]}", file=sys.stderr)
+            return True
+
+        with span("api_request", "llm", provider=provider, model=args.model, hedge_delay_s=round(delay, 1)):
+            finished, abandoned = call_hedged(lambda: request('primary'), lambda: request('hedge'),
+                                              delay, may_hedge)
+
+        hedged = len(finished) > 1 or abandoned is not None
+        for outcome in finished:
+            role = outcome['role']
+            t_provider, t_model = targets[role][:2]
+            extra = {}
+            if hedged:
+                won = outcome is finished[-1] and 'result' in outcome
+                extra = {'hedge': role,
+                         'hedge_outcome': 'won' if won else 'lost' if 'result' in outcome else 'failed'}
+            if 'result' in outcome:
+                text, stats, key_fingerprint = outcome['result']
+                settle(ledger_ids.get(role),
+                       stats['input_tokens'] + stats['output_tokens'] + spent_tokens(spent[role]))
+                record_stats(stats, 0, outcome['start'], outcome['end'], key_fingerprint,
+                             t_provider, t_model, **extra)
+            else:
+                settle(ledger_ids.get(role), spent_tokens(spent[role]))
+                if not isinstance(outcome['error'], DegenerateOutput):
+                    # Cancelled streams are already recorded
+                    record_stats(no_tokens, 1, outcome['start'], outcome['end'],
+                                 getattr(outcome['error'], 'key_fingerprint', None), t_provider, t_model, **extra)
+        if abandoned:
+            # Input tokens are billed for the abandoned request; its output is unknown
+            role = abandoned['role']
+            t_provider, t_model = targets[role][:2]
+            settle(ledger_ids.get(role), prompt_tokens)
+            record_stats(dict(no_tokens, input_tokens=prompt_tokens), 0, abandoned['start'], time.time(),
+                         None, t_provider, t_model, hedge=role, hedge_outcome='abandoned',
+                         tokens_estimated=True)
+
+        if 'error' in finished[-1]:
+            print(f"Error: API call failed: {finished[-1]['error']}", file=sys.stderr)
             sys.exit(1)
+        print(finished[-1]['result'][0], end='')
+        if args.stream_file:
+            Path(args.stream_file).unlink(missing_ok=True)
+        return
+
+    # Call appropriate API with system prompt for caching, using the
+    # least-loaded key (another key is tried if one is rate limited)
+    start_ts = time.time()
+    spent = []
+    try:
+        with span("api_request", "llm", provider=provider, model=args.model):
+            text, stats, key_fingerprint = send(provider, args.model, call, keys, spent)
+    except DegenerateOutput as e:
+        settle(ledger_id, spent_tokens(spent))
+        print(f"Error: API call failed: degenerate output ({e}), "
+              f"{len(spent)} attempt(s) cancelled by the stream guard", file=sys.stderr)
+        sys.exit(1)
     except Exception as e:
+        settle(ledger_id, spent_tokens(spent))
+        record_stats(no_tokens, 1, start_ts, time.time(), getattr(e, 'key_fingerprint', None))
         print(f"Error: API call failed: {e}", file=sys.stderr)
         sys.exit(1)
+    end_ts = time.time()
+    settle(ledger_id, stats['input_tokens'] + stats['output_tokens'] + spent_tokens(spent))
+    if spent:
+        # The cancelled attempts have their own entries
+        start_ts = spent[-1]['end_ts']
 
     # Output text to stdout
     print(text, end='')
+    if args.stream_file:
+        Path(args.stream_file).unlink(missing_ok=True)
 
     # Append stats if requested
-    if args.stats_file:
-        stats_entry = {
-            'timestamp': datetime.now().isoformat(),
-            'provider': provider,
-            'model': args.model,
-            'stage': args.stats_stage,
-            'context': args.stats_context,
-            'interface': 'api',
-            **stats
-        }
-
-        stats_path = Path(args.stats_file)
-        stats_path.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(stats_path, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(stats_entry) + '\n')
+    record_stats(stats, 0, start_ts, end_ts, key_fingerprint)
 
 
 if __name__ == '__main__':
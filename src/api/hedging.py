@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Hedged API requests: cut the tail latency of a stage.
+
+A stage's wall time is set by its slowest calls, and a single provider stall
+holds up the next stage for the whole class. With hedging enabled, caller.py
+issues a duplicate of a call that has been outstanding longer than the
+stage's observed latency percentile (p95 by default) in this run. The
+duplicate goes to another key of the same provider (the key pool picks the
+least-loaded key, which is not the one already in flight) or, with
+`alternate_model` set, to a second provider. The first non-empty response
+wins. The other request is abandoned: SDK calls cannot be interrupted, so
+it is left running in a daemon thread that dies with the caller, which
+closes its connection.
+
+The percentile comes from the successful calls of the stage in the run's
+stats file, once `min_samples` are there. Hedges are logged to hedges.jsonl
+next to the stats file when they start, and no new hedge starts while the
+stage's hedges exceed `max_rate` of its calls, so concurrent callers share
+the cap. Every request of a hedged call gets its own stats entry, marked
+with its role (primary, hedge) and outcome (won, lost, failed, abandoned).
+An abandoned request is recorded with its estimated input tokens (output
+tokens are unknown), so its cost shows up as the extra cost of hedging in
+utils/show_stats.sh.
+"""
+
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from system_config import load_snapshot
+
+# Stats entries read for the latency percentile and the hedge rate
+STATS_TAIL = 5000
+
+
+def get_hedging_config() -> dict:
+    """
+    Get the hedging settings from config.yaml.
+
+    Returns:
+        dict: enabled (bool), percentile, min_samples, min_delay (seconds),
+              max_rate (hedges per call) and alternate_model
+    """
+    config = load_snapshot()['system'].get('hedging') or {}
+    return {
+        'enabled': bool(config.get('enabled', False)),
+        'percentile': float(config.get('percentile', 95)),
+        'min_samples': int(config.get('min_samples', 20)),
+        'min_delay': float(config.get('min_delay', 10)),
+        'max_rate': float(config.get('max_rate', 0.05)),
+        'alternate_model': config.get('alternate_model') or '',
+    }
+
+
+def _hedge_log(stats_file: str) -> Path:
+    return Path(stats_file).with_name('hedges.jsonl')
+
+
+def _read_jsonl(path: Path, tail: int = STATS_TAIL) -> list:
+    try:
+        lines = path.read_text(encoding='utf-8').splitlines()[-tail:]
+    except OSError:
+        return []
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return entries
+
+
+def _percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def hedge_delay(stats_file: str | None, stage: str, config: dict) -> float | None:
+    """
+    Time after which a call of a stage is hedged.
+
+    Args:
+        stats_file: Stats JSONL of the run
+        stage: Stage of the call
+        config: From get_hedging_config()
+
+    Returns:
+        Seconds (at least min_delay), or None when hedging is off or the
+        stage has fewer than min_samples successful API calls so far
+    """
+    if not config['enabled'] or not stats_file:
+        return None
+    latencies = [e['latency_s'] for e in _read_jsonl(Path(stats_file))
+                 if e.get('stage') == stage and e.get('interface') == 'api'
+                 and e.get('exit_status', 0) == 0 and e.get('latency_s') is not None
+                 and e.get('hedge') != 'hedge' and e.get('hedge_outcome') != 'abandoned']
+    if len(latencies) < config['min_samples']:
+        return None
+    return max(_percentile(latencies, config['percentile']), config['min_delay'])
+
+
+def claim_hedge(stats_file: str, stage: str, context: str, delay: float, config: dict) -> bool:
+    """
+    Check the stage's hedge rate and, if under the cap, log a new hedge.
+
+    Args:
+        stats_file: Stats JSONL of the run
+        stage: Stage of the call
+        context: Stats context of the call
+        delay: Hedge delay that expired
+        config: From get_hedging_config()
+
+    Returns:
+        bool: True if the hedge may start
+    """
+    calls = sum(1 for e in _read_jsonl(Path(stats_file))
+                if e.get('stage') == stage and e.get('hedge') != 'hedge' and not e.get('event'))
+    log = _hedge_log(stats_file)
+    hedges = sum(1 for e in _read_jsonl(log) if e.get('stage') == stage)
+    if hedges + 1 > config['max_rate'] * (calls + 1):
+        return False
+    with open(log, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'timestamp': datetime.now().isoformat(), 'stage': stage,
+                            'context': context, 'delay_s': round(delay, 3)}) + '\n')
+    return True
+
+
+def call_hedged(primary, hedge, delay: float, may_hedge) -> tuple[list, dict | None]:
+    """
+    Run a call, and a duplicate of it if it is still outstanding after `delay`.
+
+    Args:
+        primary: Function () -> result making the call
+        hedge: Function () -> result making the duplicate call
+        delay: Seconds to wait before hedging
+        may_hedge: Function () -> bool, asked once the delay expires
+
+    Returns:
+        Tuple of (finished requests, abandoned request or None). Finished
+        requests are dicts {role, result or error, start, end}; the last one
+        is the winner (a non-empty response if there is one, else any
+        response, else the last error). The abandoned request is {role, start}.
+    """
+    results = queue.Queue()
+    starts = {}
+
+    def run(role, fn):
+        start = time.time()
+        try:
+            results.put({'role': role, 'result': fn(), 'start': start, 'end': time.time()})
+        except Exception as e:
+            results.put({'role': role, 'error': e, 'start': start, 'end': time.time()})
+
+    def launch(role, fn):
+        starts[role] = time.time()
+        threading.Thread(target=run, args=(role, fn), daemon=True).start()
+
+    launch('primary', primary)
+    try:
+        return [results.get(timeout=delay)], None
+    except queue.Empty:
+        pass
+    if not may_hedge():
+        return [results.get()], None
+
+    launch('hedge', hedge)
+    first = results.get()
+    if 'result' in first and first['result'][0].strip():
+        pending = 'hedge' if first['role'] == 'primary' else 'primary'
+        return [first], {'role': pending, 'start': starts[pending]}
+    second = results.get()
+    if 'error' in first or ('result' in second and second['result'][0].strip()):
+        return [first, second], None
+    return [second, first], None
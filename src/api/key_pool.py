@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+API key pool: spread direct API calls over several keys per provider.
+
+Each key has its own rate limits, so a department with several project keys
+can run API mode at their combined limit. caller.py draws a key for every
+call from the keys found for the provider:
+
+    CLAUDE_API_KEYS=key1,key2,key3        (comma or whitespace separated)
+    CLAUDE_API_KEY / ANTHROPIC_API_KEY    (single key, as before)
+
+and likewise GEMINI_API_KEYS / GOOGLE_API_KEYS and OPENAI_API_KEYS.
+utils/load_api_keys.sh fills the *_API_KEYS variables from .secrets/ files
+holding one key per line.
+
+The least-loaded key is chosen: fewest calls in flight, then fewest requests
+and tokens in the last `window` seconds. A key that gets a 429 (rate limit
+or quota) is put in cooldown for the Retry-After time or `cooldown` seconds,
+and the call is retried on another key, or on the first key to come out of
+cooldown when all of them are resting. Per-key accounting lives in a JSON
+state file shared by all processes (.cache/api_keys/state.json), updated
+under a file lock. Keys are only ever stored and reported by fingerprint.
+
+Usage:
+    key_pool.py status [--provider P]    Show keys, load and cooldowns
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "utils"))
+from quota_detector import is_quota_error
+from system_config import get_project_root, load_snapshot
+
+# Overrides the state file location (benchmarks use a per-run file)
+STATE_ENV = 'AGENTIC_KEY_POOL_STATE'
+
+# Environment variables searched for each provider's keys, in order
+KEY_ENV_VARS = {
+    'claude': ['CLAUDE_API_KEYS', 'ANTHROPIC_API_KEYS', 'CLAUDE_API_KEY', 'ANTHROPIC_API_KEY'],
+    'gemini': ['GEMINI_API_KEYS', 'GOOGLE_API_KEYS', 'GOOGLE_API_KEY', 'GEMINI_API_KEY'],
+    'openai': ['OPENAI_API_KEYS', 'OPENAI_API_KEY'],
+}
+
+
+def get_key_pool_config() -> dict:
+    """
+    Get the api_keys settings from config.yaml.
+
+    Returns:
+        dict: cooldown, window and max_wait (seconds)
+    """
+    config = load_snapshot()['system'].get('api_keys') or {}
+    return {
+        'cooldown': int(config.get('cooldown', 60)),
+        'window': int(config.get('window', 60)),
+        'max_wait': int(config.get('max_wait', 300)),
+    }
+
+
+def discover_keys(provider: str) -> list[str]:
+    """
+    Find the API keys for a provider in the environment.
+
+    Args:
+        provider: claude, gemini or openai
+
+    Returns:
+        list: Distinct keys, in the order found (empty if none are set)
+    """
+    keys = []
+    for name in KEY_ENV_VARS.get(provider, []):
+        for key in re.split(r'[\s,]+', os.environ.get(name, '')):
+            if key and key not in keys:
+                keys.append(key)
+    return keys
+
+
+def fingerprint(key: str) -> str:
+    """Short, non-reversible identifier of a key, safe for logs and stats."""
+    return 'sha256:' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:12]
+
+
+def get_state_path() -> Path:
+    """Path of the key pool state file."""
+    override = os.environ.get(STATE_ENV)
+    return Path(override) if override else get_project_root() / ".cache" / "api_keys" / "state.json"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@contextmanager
+def _locked_state(state_path: Path):
+    """Load the key state under an exclusive lock and save it on exit."""
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(state_path.with_name(state_path.name + '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            state = json.loads(state_path.read_text(encoding='utf-8'))
+        except (OSError, json.JSONDecodeError):
+            state = {}
+        keys = state.setdefault('keys', {})
+        yield keys
+        tmp = state_path.with_name(state_path.name + f'.{os.getpid()}.tmp')
+        tmp.write_text(json.dumps(state, indent=2), encoding='utf-8')
+        os.replace(tmp, state_path)
+
+
+def _prune(entry: dict, now: float, window: int):
+    """Drop calls of dead processes and requests older than the window."""
+    entry['in_flight'] = {mark: ts for mark, ts in entry.get('in_flight', {}).items()
+                          if _pid_alive(int(mark.split(':')[0]))}
+    entry['recent'] = [r for r in entry.get('recent', []) if r[0] > now - window]
+
+
+def _load(entry: dict) -> tuple:
+    recent = entry.get('recent', [])
+    return len(entry['in_flight']), len(recent), sum(r[1] for r in recent)
+
+
+def acquire_key(provider: str, keys: list[str], exclude: set = frozenset(),
+                state_path: Path = None, window: int = 60) -> tuple[str, float, str]:
+    """
+    Take the least-loaded key for a call and mark it in flight.
+
+    Keys in cooldown are skipped. If every key is in cooldown, the one whose
+    cooldown ends first is returned with the time to wait before using it.
+    Each call gets its own in-flight mark (process ID and a per-call token),
+    so concurrent calls of one process on a key (a hedged duplicate and its
+    primary) are each counted until they are released.
+
+    Args:
+        provider: Provider the keys belong to
+        keys: Keys from discover_keys()
+        exclude: Fingerprints already tried for this call (ignored once
+                 every key has been tried)
+        state_path: Key pool state file (default: get_state_path())
+        window: Seconds of request history counted as load
+
+    Returns:
+        Tuple of (key, seconds to wait before the call, in-flight mark to
+        pass to release_key())
+    """
+    state_path = state_path or get_state_path()
+    candidates = [k for k in keys if fingerprint(k) not in exclude] or keys
+    now = time.time()
+    with _locked_state(state_path) as state:
+        entries = {}
+        for key in candidates:
+            entry = state.setdefault(fingerprint(key), {'provider': provider})
+            _prune(entry, now, window)
+            entries[key] = entry
+
+        ready = [k for k in candidates if entries[k].get('cooldown_until', 0) <= now]
+        if ready:
+            key = min(ready, key=lambda k: _load(entries[k]))
+            wait = 0.0
+        else:
+            key = min(candidates, key=lambda k: entries[k].get('cooldown_until', 0))
+            wait = entries[key]['cooldown_until'] - now
+        mark = f"{os.getpid()}:{uuid.uuid4().hex[:12]}"
+        entries[key]['in_flight'][mark] = now + wait
+        return key, wait, mark
+
+
+def release_key(key: str, mark: str, tokens: int = 0, error: str | None = None,
+                cooldown: float = 0, state_path: Path = None):
+    """
+    Record the outcome of a call made with a key and clear its in-flight mark.
+
+    Args:
+        key: The key used
+        mark: The call's in-flight mark from acquire_key()
+        tokens: Input plus output tokens of the call
+        error: None on success, 'rate_limit' or 'error'
+        cooldown: Seconds to keep the key out of rotation
+        state_path: Key pool state file (default: get_state_path())
+    """
+    state_path = state_path or get_state_path()
+    now = time.time()
+    with _locked_state(state_path) as state:
+        entry = state.setdefault(fingerprint(key), {})
+        entry.setdefault('in_flight', {}).pop(mark, None)
+        entry['requests'] = entry.get('requests', 0) + 1
+        entry['tokens'] = entry.get('tokens', 0) + tokens
+        entry.setdefault('recent', []).append([now, tokens])
+        if error:
+            entry['failures'] = entry.get('failures', 0) + 1
+        if error == 'rate_limit':
+            entry['rate_limited'] = entry.get('rate_limited', 0) + 1
+        if cooldown:
+            entry['cooldown_until'] = max(entry.get('cooldown_until', 0), now + cooldown)
+
+
+def rate_limit_delay(error: Exception, provider: str, default: int) -> float | None:
+    """
+    Tell whether an SDK error is a 429, and for how long to rest the key.
+
+    Args:
+        error: Exception raised by the SDK call
+        provider: Provider name, for the error text patterns
+        default: Cooldown when the response has no Retry-After header
+
+    Returns:
+        Cooldown in seconds, or None if the error is not a rate limit
+    """
+    status = getattr(error, 'status_code', None) or getattr(error, 'code', None)
+    if status != 429 and not is_quota_error(str(error), provider):
+        return None
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return float(default)
+
+
+def call_with_keys(provider: str, keys: list[str], call):
+    """
+    Make an API call with the least-loaded key, moving to another key when
+    one is rate limited.
+
+    Args:
+        provider: Provider name
+        keys: Keys from discover_keys()
+        call: Function (api_key) -> (text, stats) making the SDK call
+
+    Returns:
+        Tuple of (text, stats, fingerprint of the key that made the call)
+
+    Raises:
+        The SDK's exception for errors other than rate limits, or for a
+        rate limit once the call has been retried for `max_wait` seconds
+        (with the key's fingerprint set as its key_fingerprint attribute).
+    """
+    config = get_key_pool_config()
+    state_path = get_state_path()
+    give_up_at = time.time() + config['max_wait']
+    tried = set()
+    while True:
+        key, wait, mark = acquire_key(provider, keys, tried, state_path, config['window'])
+        tried.add(fingerprint(key))
+        if wait > 0:
+            print(f"⚠ All {provider} API keys are rate limited; waiting {wait:.1f}s", file=sys.stderr)
+            time.sleep(wait)
+        try:
+            text, stats = call(key)
+        except Exception as e:
+            cooldown = rate_limit_delay(e, provider, config['cooldown'])
+            e.key_fingerprint = fingerprint(key)
+            if cooldown is None:
+                release_key(key, mark, error='error', state_path=state_path)
+                raise
+            release_key(key, mark, error='rate_limit', cooldown=cooldown, state_path=state_path)
+            if time.time() >= give_up_at:
+                raise
+            if len(keys) > 1:
+                print(f"⚠ API key {fingerprint(key)} rate limited, resting it {cooldown:.1f}s; "
+                      f"retrying with another key", file=sys.stderr)
+            continue
+        release_key(key, mark, stats.get('input_tokens', 0) + stats.get('output_tokens', 0),
+                    state_path=state_path)
+        return text, stats, fingerprint(key)
+
+
+def cmd_status(args):
+    try:
+        state = json.loads(get_state_path().read_text(encoding='utf-8')).get('keys', {})
+    except (OSError, json.JSONDecodeError):
+        state = {}
+    providers = [args.provider] if args.provider else list(KEY_ENV_VARS)
+    window = get_key_pool_config()['window']
+    now = time.time()
+    print(f"{'provider':8s} {'key':20s} {'requests':>8s} {'tokens':>10s} {'429s':>5s} "
+          f"{'in-flight':>9s} {'last ' + str(window) + 's':>8s}  status")
+    for provider in providers:
+        for key in discover_keys(provider):
+            entry = state.get(fingerprint(key), {})
+            _prune(entry, now, window)
+            remaining = entry.get('cooldown_until', 0) - now
+            status = f"cooldown {remaining:.0f}s" if remaining > 0 else "ok"
+            print(f"{provider:8s} {fingerprint(key):20s} {entry.get('requests', 0):8d} "
+                  f"{entry.get('tokens', 0):10d} {entry.get('rate_limited', 0):5d} "
+                  f"{len(entry['in_flight']):9d} {len(entry['recent']):8d}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API key pool for direct API calls")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    status = sub.add_parser('status', help='Show keys, load and cooldowns')
+    status.add_argument('--provider', choices=list(KEY_ENV_VARS), help='Only this provider')
+    status.set_defaults(func=cmd_status)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Stream guard: stop degenerate API responses early.
+
+Without streaming, a response that loops, repeats the prompt or ignores the
+output format still runs until max_tokens, at full latency and output cost.
+With streaming enabled in config.yaml, api/caller.py streams every response
+(Anthropic, Google and OpenAI SDKs alike) and feeds the text to a
+StreamGuard as it arrives. The guard cancels the request when the output:
+
+- loops: a run of `ngram` words has occurred more than `max_repeats` times
+- echoes the prompt: the first `echo_chars` characters of the prompt appear
+- is off-format: none of the stage's `headers` (a regex per stage) has
+  appeared after `header_tokens` output tokens
+- is over the stage's output budget (`budgets`, in tokens)
+
+Output tokens are estimated at 4 characters per token as the text arrives.
+A cancelled request is recorded in the stats file (exit_status 1,
+stream_abort with the reason) and sent again, up to `retries` times; the
+call fails if the last attempt is cancelled as well. The time of the first
+streamed token goes to the stats entry (first_token_ts, ttft_s).
+
+The text received so far is written to the call's stream file (the agent's
+output path plus .partial) as it arrives, so a long call can be followed
+with tail -f. It is removed once the call succeeds and kept when it fails.
+"""
+
+import re
+import time
+from collections import Counter
+from pathlib import Path
+
+from system_config import load_snapshot
+
+# Characters per output token, for the running estimate
+CHARS_PER_TOKEN = 4
+
+
+class DegenerateOutput(Exception):
+    """Raised by StreamGuard.feed() when the response is cancelled."""
+
+    def __init__(self, reason: str, guard: 'StreamGuard'):
+        super().__init__(f"{reason} after ~{guard.output_tokens} output tokens")
+        self.reason = reason
+        self.guard = guard
+
+
+def get_streaming_config() -> dict:
+    """
+    Get the streaming settings from config.yaml.
+
+    Returns:
+        dict: enabled (bool), ngram, max_repeats, echo_chars, header_tokens,
+              headers ({stage: regex}), budgets ({stage: tokens}) and retries
+    """
+    config = load_snapshot()['system'].get('streaming') or {}
+    return {
+        'enabled': bool(config.get('enabled', False)),
+        'ngram': int(config.get('ngram', 12)),
+        'max_repeats': int(config.get('max_repeats', 8)),
+        'echo_chars': int(config.get('echo_chars', 200)),
+        'header_tokens': int(config.get('header_tokens', 400)),
+        'headers': dict(config.get('headers') or {}),
+        'budgets': {stage: int(tokens or 0) for stage, tokens in (config.get('budgets') or {}).items()},
+        'retries': int(config.get('retries', 1)),
+    }
+
+
+class StreamGuard:
+    """Online checks on one streamed response."""
+
+    def __init__(self, stage: str, prompt: str, config: dict, stream_file: str | None = None,
+                 check_header: bool = True):
+        """
+        Args:
+            stage: Stats stage of the call (selects the header and budget)
+            prompt: Prompt sent (for the echo check)
+            config: From get_streaming_config()
+            stream_file: File to write the text to as it arrives, or None
+            check_header: Run the off-format check (off for JSON responses)
+        """
+        self.config = config
+        self.header = config['headers'].get(stage) if check_header else None
+        self.budget = config['budgets'].get(stage, 0)
+        prompt = prompt.strip()
+        self.echo = prompt[:config['echo_chars']] if len(prompt) > config['echo_chars'] else None
+        self.stream_file = stream_file
+        self.start_ts = time.time()
+        self.first_token_ts = None
+        self.end_ts = None
+        self.text = ''
+        self._file = None
+        self._scanned = 0      # Characters split into words so far
+        self._words = []
+        self._ngrams = Counter()
+        self._header_checked = self.header is None
+
+    @property
+    def output_tokens(self) -> int:
+        return len(self.text) // CHARS_PER_TOKEN
+
+    def feed(self, chunk: str):
+        """
+        Add a chunk of the response.
+
+        Raises:
+            DegenerateOutput: When a check fails (the stream file is closed first)
+        """
+        if not chunk:
+            return
+        if self.first_token_ts is None:
+            self.first_token_ts = time.time()
+        self.text += chunk
+        if self.stream_file:
+            if self._file is None:
+                Path(self.stream_file).parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.stream_file, 'w', encoding='utf-8')
+            self._file.write(chunk)
+            self._file.flush()
+
+        reason = self._check(chunk)
+        if reason:
+            self.end_ts = time.time()
+            self.close()
+            raise DegenerateOutput(reason, self)
+
+    def _check(self, chunk: str) -> str | None:
+        if self.echo and self.echo in self.text[-(len(chunk) + len(self.echo)):]:
+            return 'prompt_echo'
+        if self.budget and self.output_tokens > self.budget:
+            return 'over_budget'
+        if not self._header_checked and self.output_tokens >= self.config['header_tokens']:
+            self._header_checked = True
+            if not re.search(self.header, self.text, re.MULTILINE):
+                return 'missing_header'
+
+        # Words completed by this chunk (the last one may continue in the next)
+        end = max(self.text.rfind(' ', self._scanned), self.text.rfind('\n', self._scanned))
+        if end <= self._scanned:
+            return None
+        n = self.config['ngram']
+        for word in self.text[self._scanned:end].split():
+            self._words.append(word)
+            if len(self._words) >= n:
+                gram = tuple(self._words[-n:])
+                self._ngrams[gram] += 1
+                if self._ngrams[gram] > self.config['max_repeats']:
+                    return 'repetition'
+        self._scanned = end
+        return None
+
+    def close(self):
+        """Close the stream file (kept on disk)."""
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def consume(guard: StreamGuard, chunks) -> str:
+    """
+    Feed a stream of text chunks to a guard.
+
+    Args:
+        guard: Guard of the request
+        chunks: Iterable of response text chunks
+
+    Returns:
+        The full response text
+
+    Raises:
+        DegenerateOutput: When the guard cancels the response. The caller
+        closes the SDK stream, which cancels the request.
+    """
+    try:
+        for chunk in chunks:
+            guard.feed(chunk)
+    finally:
+        guard.end_ts = guard.end_ts or time.time()
+        guard.close()
+    return guard.text
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+CLI Worker Pool
+
+Keeps long-lived provider CLI processes ready so headless calls in CLI mode
+don't pay the CLI's startup (Node runtime, credentials, session setup) on
+every prompt. The pool is a small daemon on a Unix socket, started once per
+run by the orchestrators; llm_caller.sh sends it each prompt instead of
+spawning the CLI, and gets back the same JSON the CLI prints with
+--output-format json, so stats extraction is unchanged.
+
+Workers are keyed by their CLI configuration (provider, arguments, working
+directory). The pool keeps `size` idle workers per configuration, started
+ahead of demand, and dispatches each prompt to the oldest idle worker (a
+worker that is still starting up simply reads the prompt when it is ready).
+A worker is recycled after `max_prompts` prompts, on an error, or when it
+exits.
+
+Protocol support:
+  claude   `claude -p --input-format stream-json --output-format stream-json`
+           reads one JSON user message per line and ends each turn with a
+           "result" event carrying the same fields as --output-format json.
+  gemini,  No streaming input mode: llm_caller.sh spawns one process per
+  codex    call as before.
+
+A claude worker keeps its conversation across prompts, so by default each
+worker serves a single prompt (max_prompts: 1): the gain is that the next
+worker has already started while earlier calls run. Raise max_prompts only
+for stages whose prompts may share context.
+
+The daemon exits when the process that started it (the orchestrator) exits.
+
+Usage:
+  cli_pool.py start --parent-pid PID [--parallel N] [--size N] [--max-prompts K] [--force]
+        Start the pool if enabled (cli_pool.enabled in config.yaml, or
+        --force) and print "export AGENTIC_CLI_POOL=<socket>" for eval
+  cli_pool.py request --provider claude --prompt-file FILE [--text] -- ARGS...
+        Run one prompt on a pooled worker (used by llm_caller.sh)
+  cli_pool.py status | stop
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+
+POOL_ENV = 'AGENTIC_CLI_POOL'
+
+# Providers whose CLI can take prompts on stdin as a stream of JSON messages
+STREAMING_PROVIDERS = {'claude'}
+
+# Idle workers of a configuration unused for this long are stopped
+IDLE_TIMEOUT = 120
+
+# Arguments replaced by the streaming-mode arguments
+OVERRIDDEN_OPTIONS = {'--output-format': 1, '--input-format': 1, '--print': 0, '-p': 0}
+
+
+def get_pool_config() -> dict:
+    """
+    Get the cli_pool settings from config.yaml.
+
+    Returns:
+        dict: enabled (bool), size (int, 0 = run's --parallel), max_prompts (int)
+    """
+    # Imported here to keep `request` (once per LLM call) light
+    sys.path.insert(0, str(Path(__file__).parent / "utils"))
+    from system_config import load_system_config
+
+    config = load_system_config().get('cli_pool') or {}
+    return {
+        'enabled': bool(config.get('enabled', False)),
+        'size': int(config.get('size') or 0),
+        'max_prompts': max(int(config.get('max_prompts') or 1), 1),
+    }
+
+
+def streaming_argv(provider: str, args: list) -> list:
+    """Build a worker's command line from the per-call CLI arguments."""
+    argv = [provider]
+    i = 0
+    while i < len(args):
+        skip = OVERRIDDEN_OPTIONS.get(args[i])
+        if skip is None:
+            argv.append(args[i])
+            i += 1
+        else:
+            i += 1 + skip
+    return argv + ['--print', '--input-format', 'stream-json',
+                   '--output-format', 'stream-json', '--verbose']
+
+
+def error_result(message: str) -> str:
+    """A claude-style result event for a call the pool could not complete."""
+    return json.dumps({'type': 'result', 'subtype': 'error_during_execution',
+                       'is_error': True, 'result': message})
+
+
+# ============================================================================
+# Daemon
+# ============================================================================
+
+class Worker:
+    """One long-lived CLI process in streaming-JSON mode."""
+
+    def __init__(self, proc: asyncio.subprocess.Process):
+        self.proc = proc
+        self.served = 0
+        self.started = time.time()
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.returncode is None
+
+    async def run(self, prompt: str) -> tuple[int, str]:
+        """
+        Send one prompt and wait for its result event.
+
+        Returns:
+            Tuple of (exit status, result event JSON line)
+        """
+        self.served += 1
+        message = {'type': 'user', 'message': {
+            'role': 'user', 'content': [{'type': 'text', 'text': prompt}]}}
+        try:
+            self.proc.stdin.write((json.dumps(message) + '\n').encode('utf-8'))
+            await self.proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            return 1, error_result('CLI worker exited before the prompt was sent')
+
+        while True:
+            line = await self.proc.stdout.readline()
+            if not line:
+                return 1, error_result('CLI worker exited during the call')
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(event, dict) and event.get('type') == 'result':
+                return (1 if event.get('is_error') else 0), line.decode('utf-8').strip()
+
+    def stop(self):
+        if self.alive:
+            try:
+                os.killpg(self.proc.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+class Pool:
+    """Idle workers per CLI configuration, replenished ahead of demand."""
+
+    def __init__(self, size: int, max_prompts: int, log_file):
+        self.size = size
+        self.max_prompts = max_prompts
+        self.log_file = log_file
+        self.idle = {}       # key -> deque of Workers
+        self.starting = {}   # key -> workers being spawned for idle
+        self.last_used = {}  # key -> time of the last call
+        self.busy = set()
+        self.counts = {'calls': 0, 'spawned': 0, 'recycled': 0, 'errors': 0}
+
+    async def spawn(self, key: tuple) -> Worker:
+        provider, args, cwd = key
+        proc = await asyncio.create_subprocess_exec(
+            *streaming_argv(provider, list(args)),
+            cwd=cwd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=self.log_file,
+            start_new_session=True,  # Own process group, stopped as a whole
+            limit=64 * 1024 * 1024,  # Result events hold the whole response
+        )
+        self.counts['spawned'] += 1
+        return Worker(proc)
+
+    async def replenish(self, key: tuple):
+        idle = self.idle.setdefault(key, deque())
+        while len(idle) + self.starting.get(key, 0) < self.size:
+            self.starting[key] = self.starting.get(key, 0) + 1
+            try:
+                idle.append(await self.spawn(key))
+            except OSError as e:
+                print(f"Warning: Failed to start {key[0]} worker: {e}", file=sys.stderr)
+                return
+            finally:
+                self.starting[key] -= 1
+
+    async def acquire(self, key: tuple) -> Worker:
+        idle = self.idle.setdefault(key, deque())
+        while idle:
+            worker = idle.popleft()
+            if worker.alive:
+                return worker
+            self.counts['recycled'] += 1
+        return await self.spawn(key)
+
+    def release(self, key: tuple, worker: Worker, status: int):
+        idle = self.idle.setdefault(key, deque())
+        if status == 0 and worker.alive and worker.served < self.max_prompts \
+                and len(idle) < self.size:
+            idle.append(worker)
+        else:
+            worker.stop()
+            self.counts['recycled'] += 1
+
+    async def call(self, key: tuple, prompt: str) -> tuple[int, str]:
+        self.counts['calls'] += 1
+        self.last_used[key] = time.time()
+        try:
+            worker = await self.acquire(key)
+        except OSError as e:
+            self.counts['errors'] += 1
+            return 1, error_result(f"Failed to start {key[0]} CLI: {e}")
+        self.busy.add(worker)
+        # Start the replacement while this call runs
+        asyncio.get_running_loop().create_task(self.replenish(key))
+        try:
+            status, output = await worker.run(prompt)
+        except asyncio.CancelledError:
+            # The client went away mid-call (e.g. killed by the task watchdog)
+            worker.stop()
+            self.counts['recycled'] += 1
+            raise
+        finally:
+            self.busy.discard(worker)
+        if status != 0:
+            self.counts['errors'] += 1
+        self.release(key, worker, status)
+        return status, output
+
+    def reap_idle(self):
+        """Stop idle workers of configurations that are no longer in use."""
+        now = time.time()
+        for key, idle in self.idle.items():
+            if idle and now - self.last_used.get(key, now) > IDLE_TIMEOUT:
+                while idle:
+                    idle.popleft().stop()
+                    self.counts['recycled'] += 1
+
+    def status(self) -> dict:
+        return {
+            **self.counts,
+            'size': self.size,
+            'max_prompts': self.max_prompts,
+            'busy': len(self.busy),
+            'idle': sum(len([w for w in q if w.alive]) for q in self.idle.values()),
+            'configurations': len(self.idle),
+        }
+
+    def shutdown(self):
+        for idle in self.idle.values():
+            for worker in idle:
+                worker.stop()
+        for worker in self.busy:
+            worker.stop()
+
+
+async def serve(socket_path: Path, parent_pid: int, size: int, max_prompts: int):
+    """Run the pool daemon until stopped or the parent process exits."""
+    log_file = open(socket_path.parent / "pool.log", 'ab')
+    pool = Pool(size, max_prompts, log_file)
+    stop = asyncio.Event()
+
+    async def handle(reader, writer):
+        try:
+            request = json.loads(await reader.readline())
+            op = request.get('op')
+            if op == 'call':
+                try:
+                    prompt = Path(request['prompt_file']).read_text(encoding='utf-8')
+                except OSError as e:
+                    response = {'status': 1, 'output': error_result(f"Cannot read prompt: {e}")}
+                else:
+                    key = (request['provider'], tuple(request['args']), request['cwd'])
+                    call = asyncio.ensure_future(pool.call(key, prompt))
+                    # Clients send nothing more, so EOF means the client exited
+                    gone = asyncio.ensure_future(reader.read())
+                    await asyncio.wait({call, gone}, return_when=asyncio.FIRST_COMPLETED)
+                    gone.cancel()
+                    if not call.done():
+                        call.cancel()
+                        return
+                    status, output = call.result()
+                    response = {'status': status, 'output': output}
+            elif op == 'status':
+                response = {'status': 0, 'pool': pool.status()}
+            elif op == 'stop':
+                response = {'status': 0}
+                stop.set()
+            else:
+                response = {'status': 1, 'output': error_result(f"Unknown request: {op}")}
+            writer.write((json.dumps(response) + '\n').encode('utf-8'))
+            await writer.drain()
+        except (ConnectionError, json.JSONDecodeError, KeyError):
+            pass
+        finally:
+            writer.close()
+
+    async def watch_parent():
+        while not stop.is_set():
+            try:
+                os.kill(parent_pid, 0)
+            except ProcessLookupError:
+                stop.set()
+            except PermissionError:
+                pass
+            pool.reap_idle()
+            await asyncio.sleep(1)
+
+    server = await asyncio.start_unix_server(handle, path=str(socket_path), limit=1024 * 1024)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    watcher = loop.create_task(watch_parent())
+
+    await stop.wait()
+    server.close()
+    watcher.cancel()
+    pool.shutdown()
+    log_file.close()
+    shutil.rmtree(socket_path.parent, ignore_errors=True)
+
+
+# ============================================================================
+# Client
+# ============================================================================
+
+def send(socket_path: str, request: dict, timeout: float | None = None) -> dict:
+    """Send one request to the pool and return its response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        data = b''
+        while not data.endswith(b'\n'):
+            chunk = sock.recv(1024 * 1024)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data)
+
+
+def pool_alive(socket_path: str | None) -> bool:
+    """Whether a pool daemon is listening on socket_path."""
+    if not socket_path or not Path(socket_path).is_socket():
+        return False
+    try:
+        send(socket_path, {'op': 'status'}, timeout=5)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def cmd_start(args):
+    if pool_alive(os.environ.get(POOL_ENV)):
+        return  # Inherited from an enclosing run (e.g., batch_mark.sh)
+
+    config = get_pool_config()
+    if not (args.force or config['enabled']):
+        return
+
+    size = args.size or config['size'] or args.parallel or 2
+    max_prompts = args.max_prompts or config['max_prompts']
+    socket_path = Path(tempfile.mkdtemp(prefix='agentic_cli_pool.')) / "pool.sock"
+
+    subprocess.Popen(
+        [sys.executable, __file__, 'serve', '--socket', str(socket_path),
+         '--parent-pid', str(args.parent_pid), '--size', str(size),
+         '--max-prompts', str(max_prompts)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=open(socket_path.parent / "pool.log", 'ab'),
+        start_new_session=True,
+    )
+
+    deadline = time.time() + 10
+    while not pool_alive(str(socket_path)):
+        if time.time() > deadline:
+            print(f"Error: CLI worker pool did not start (see {socket_path.parent}/pool.log)",
+                  file=sys.stderr)
+            sys.exit(1)
+        time.sleep(0.05)
+
+    print(f"export {POOL_ENV}={socket_path}")
+
+
+def cmd_serve(args):
+    asyncio.run(serve(Path(args.socket), args.parent_pid, args.size, args.max_prompts))
+
+
+def cmd_request(args):
+    socket_path = os.environ.get(POOL_ENV)
+    if not socket_path:
+        print(f"Error: {POOL_ENV} is not set", file=sys.stderr)
+        sys.exit(1)
+    if args.provider not in STREAMING_PROVIDERS:
+        print(f"Error: {args.provider} CLI has no streaming input mode", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        response = send(socket_path, {
+            'op': 'call',
+            'provider': args.provider,
+            'args': args.cli_args,
+            'cwd': os.getcwd(),
+            'prompt_file': str(Path(args.prompt_file).resolve()),
+        })
+    except (OSError, ValueError) as e:
+        print(f"Error: CLI worker pool unavailable: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    output = response.get('output', '')
+    if args.text:
+        try:
+            output = json.loads(output).get('result', '')
+        except (json.JSONDecodeError, AttributeError):
+            pass
+    print(output)
+    sys.exit(response.get('status', 1))
+
+
+def cmd_status(args):
+    socket_path = os.environ.get(POOL_ENV)
+    if not pool_alive(socket_path):
+        print("No CLI worker pool running")
+        sys.exit(1)
+    print(json.dumps(send(socket_path, {'op': 'status'})['pool'], indent=2))
+
+
+def cmd_stop(args):
+    socket_path = os.environ.get(POOL_ENV)
+    if pool_alive(socket_path):
+        send(socket_path, {'op': 'stop'}, timeout=5)
+        print("✓ CLI worker pool stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent CLI worker pool")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    start = sub.add_parser('start', help='Start the pool daemon (if enabled)')
+    start.add_argument('--parent-pid', type=int, required=True,
+                       help='Stop the pool when this process exits')
+    start.add_argument('--size', type=int, default=0,
+                       help='Idle workers per CLI configuration (default: cli_pool.size, else --parallel)')
+    start.add_argument('--parallel', type=int, default=0,
+                       help="The run's concurrency, used as the size when cli_pool.size is 0")
+    start.add_argument('--max-prompts', type=int, default=0,
+                       help='Prompts per worker before it is recycled (default: cli_pool.max_prompts)')
+    start.add_argument('--force', action='store_true',
+                       help='Start even if cli_pool.enabled is false in config.yaml')
+    start.set_defaults(func=cmd_start)
+
+    serve_parser = sub.add_parser('serve', help='Run the pool daemon in the foreground')
+    serve_parser.add_argument('--socket', required=True)
+    serve_parser.add_argument('--parent-pid', type=int, required=True)
+    serve_parser.add_argument('--size', type=int, default=2)
+    serve_parser.add_argument('--max-prompts', type=int, default=1)
+    serve_parser.set_defaults(func=cmd_serve)
+
+    request = sub.add_parser('request', help='Run one prompt on a pooled worker')
+    request.add_argument('--provider', required=True)
+    request.add_argument('--prompt-file', required=True)
+    request.add_argument('--text', action='store_true',
+                         help='Print the response text instead of the result JSON')
+    request.add_argument('cli_args', nargs=argparse.REMAINDER,
+                         help='CLI arguments after --')
+    request.set_defaults(func=cmd_request)
+
+    sub.add_parser('status', help='Show pool counters').set_defaults(func=cmd_status)
+    sub.add_parser('stop', help='Stop the pool').set_defaults(func=cmd_stop)
+
+    args = parser.parse_args()
+    if getattr(args, 'cli_args', None) and args.cli_args[0] == '--':
+        args.cli_args = args.cli_args[1:]
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
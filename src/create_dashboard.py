@@ -3,14 +3,23 @@
 Create interactive adjustment dashboard for marking scheme approval.
 
 Generates a Jupyter notebook with ipywidgets for instructor to adjust
-mark deductions and see live distribution updates.
+mark deductions and see live distribution updates, and optionally a
+self-contained HTML version that needs only a browser.
 """
 
+import array
+import base64
 import json
 import argparse
+import sys
 from pathlib import Path
 from typing import Dict, List
 
+# Directory containing mark_matrix.py, imported by the generated notebook
+MARK_MATRIX_DIR = Path(__file__).resolve().parent / "utils"
+
+HTML_TEMPLATE = Path(__file__).resolve().parent / "templates" / "dashboard.html"
+
 
 def create_dashboard_notebook(
     normalized_data_path: str,
@@ -69,10 +78,12 @@ This interactive dashboard allows you to:
     """.strip()))
 
     # Cell 1: Imports
-    notebook["cells"].append(_code_cell("""
+    notebook["cells"].append(_code_cell(f"""
 # @title Import Required Libraries
 
+import asyncio
 import json
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -81,6 +92,9 @@ import ipywidgets as widgets
 from IPython.display import display, clear_output
 from pathlib import Path
 from ipywidgets import interact, interactive, fixed, interact_manual, widgets
+
+sys.path.insert(0, '{MARK_MATRIX_DIR}')
+from mark_matrix import MarkMatrix, GRADE_BAND_LABELS, grade_band_histogram, mark_histogram
     """))
 
     # Cell 2: Plotting setup
@@ -286,73 +300,72 @@ print(f"\\n✓ Created {len(positive_widgets)} positive adjustment sliders with
     notebook["cells"].append(_code_cell("""
 # @title Define Mark Calculation Functions
 
+# Precompute the student x code incidence matrix once; every recompute is then
+# a single matrix-vector product plus clip
+mark_matrix = MarkMatrix(students, [m['id'] for m in mistakes], [p['id'] for p in positives], total_marks)
+
+# Histogram and grade band counts are updated only for students whose bin changed
+HISTOGRAM_BINS = 20
+bin_counts = mark_histogram(total_marks, bins=HISTOGRAM_BINS)
+band_counts = grade_band_histogram(total_marks)
+
+# The figure is created once and its bars are resized on each update
+fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
+plt.close(fig)
+
+hist_bars = ax1.bar(np.linspace(0, total_marks, HISTOGRAM_BINS + 1)[:-1], np.zeros(HISTOGRAM_BINS),
+                    width=total_marks / HISTOGRAM_BINS, align='edge', edgecolor='black', alpha=0.7)
+mean_line = ax1.axvline(0, color='red', linestyle='--')
+median_line = ax1.axvline(0, color='green', linestyle='--')
+ax1.set_xlim(0, total_marks)
+ax1.set_xlabel('Marks')
+ax1.set_ylabel('Number of Students')
+ax1.set_title('Mark Distribution')
+
+# Grade bands shown A to F
+band_labels = GRADE_BAND_LABELS[::-1]
+band_bars = ax2.bar(band_labels, np.zeros(len(band_labels)), edgecolor='black', alpha=0.7)
+ax2.set_xlabel('Grade Band')
+ax2.set_ylabel('Number of Students')
+ax2.set_title('Grade Distribution')
+ax2.tick_params(axis='x', rotation=45)
+fig.tight_layout()
+
 def calculate_marks(mistake_vals, positive_vals, mistake_checks, positive_checks):
     \"\"\"Calculate marks for all students based on current adjustments.\"\"\"
-    marks = {}
-
-    # Filter out metadata keys
-    student_data = {k: v for k, v in students.items() if not k.startswith('_')}
+    return mark_matrix.calculate_marks(mistake_vals, positive_vals, mistake_checks, positive_checks)
 
-    for student_name, mapping in student_data.items():
-        student_mark = total_marks
-
-        # Apply mistake deductions (only if checkbox is enabled)
-        for mistake_id in mapping.get('mistakes', []):
-            if mistake_id in mistake_vals and mistake_checks.get(mistake_id, True):
-                student_mark -= mistake_vals[mistake_id]
-
-        # Apply positive bonuses (only if checkbox is enabled)
-        for positive_id in mapping.get('positives', []):
-            if positive_id in positive_vals and positive_checks.get(positive_id, True):
-                student_mark += positive_vals[positive_id]
-
-        # Clamp to valid range
-        student_mark = max(0, min(total_marks, student_mark))
-        marks[student_name] = student_mark
-
-    return marks
-
-def plot_distribution(marks_dict):
+def plot_distribution(marks):
     \"\"\"Plot histogram of mark distribution.\"\"\"
-    if not marks_dict:
+    if len(marks) == 0:
         print("⚠️  No student data available for distribution")
         return
 
-    marks = list(marks_dict.values())
-
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
+    hist = bin_counts.update(marks)
+    grade_bands = dict(zip(band_labels, band_counts.update(marks)[::-1].tolist()))
 
     # Histogram
-    ax1.hist(marks, bins=20, edgecolor='black', alpha=0.7)
-    ax1.set_xlabel('Marks')
-    ax1.set_ylabel('Number of Students')
-    ax1.set_title('Mark Distribution')
-    ax1.axvline(np.mean(marks), color='red', linestyle='--', label=f'Mean: {np.mean(marks):.1f}')
-    ax1.axvline(np.median(marks), color='green', linestyle='--', label=f'Median: {np.median(marks):.1f}')
+    for bar, count in zip(hist_bars, hist):
+        bar.set_height(count)
+    mean, median = np.mean(marks), np.median(marks)
+    mean_line.set_xdata([mean, mean])
+    mean_line.set_label(f'Mean: {mean:.1f}')
+    median_line.set_xdata([median, median])
+    median_line.set_label(f'Median: {median:.1f}')
+    ax1.set_ylim(0, max(hist.max(), 1) * 1.1)
     ax1.legend()
 
     # Grade bands
-    grade_bands = {
-        'A (90-100%)': len([m for m in marks if m >= total_marks * 0.9]),
-        'B (80-89%)': len([m for m in marks if total_marks * 0.8 <= m < total_marks * 0.9]),
-        'C (70-79%)': len([m for m in marks if total_marks * 0.7 <= m < total_marks * 0.8]),
-        'D (60-69%)': len([m for m in marks if total_marks * 0.6 <= m < total_marks * 0.7]),
-        'F (<60%)': len([m for m in marks if m < total_marks * 0.6]),
-    }
+    for bar, count in zip(band_bars, grade_bands.values()):
+        bar.set_height(count)
+    ax2.set_ylim(0, max(max(grade_bands.values()), 1) * 1.1)
 
-    ax2.bar(grade_bands.keys(), grade_bands.values(), edgecolor='black', alpha=0.7)
-    ax2.set_xlabel('Grade Band')
-    ax2.set_ylabel('Number of Students')
-    ax2.set_title('Grade Distribution')
-    ax2.tick_params(axis='x', rotation=45)
-
-    plt.tight_layout()
-    plt.show()
+    display(fig)
 
     # Statistics
     print("\\nStatistics:")
-    print(f"  Mean: {np.mean(marks):.2f} / {total_marks}")
-    print(f"  Median: {np.median(marks):.2f} / {total_marks}")
+    print(f"  Mean: {mean:.2f} / {total_marks}")
+    print(f"  Median: {median:.2f} / {total_marks}")
     print(f"  Std Dev: {np.std(marks):.2f}")
     print(f"  Min: {np.min(marks):.2f} / {total_marks}")
     print(f"  Max: {np.max(marks):.2f} / {total_marks}")
@@ -372,7 +385,19 @@ def update_display():
     positive_checks = {k: w.value for k, w in positive_checkboxes.items()}
     marks = calculate_marks(mistake_vals, positive_vals, mistake_checks, positive_checks)
     plot_distribution(marks)
-    return marks
+    return mark_matrix.as_dict(marks)
+
+def debounce(wait):
+    \"\"\"Run the decorated callback only once no call has arrived for `wait` seconds.\"\"\"
+    def decorator(fn):
+        handle = None
+        def debounced(*args, **kwargs):
+            nonlocal handle
+            if handle is not None:
+                handle.cancel()
+            handle = asyncio.get_event_loop().call_later(wait, lambda: fn(*args, **kwargs))
+        return debounced
+    return decorator
 
 print("✓ Calculation functions defined")
     """))
@@ -381,7 +406,7 @@ print("✓ Calculation functions defined")
     notebook["cells"].append(_markdown_cell("""
 ## Mark Distribution
 
-The chart below updates as you adjust sliders above. Click "Update Distribution" to refresh.
+The chart below updates shortly after you stop adjusting the sliders or checkboxes above. Click "Update Distribution" to refresh manually.
     """))
 
     notebook["cells"].append(_code_cell("""
@@ -395,17 +420,29 @@ update_button = widgets.Button(
 )
 output = widgets.Output()
 
-def on_update_click(b):
+def refresh_distribution():
+    global current_marks
     with output:
         current_marks = update_display()
 
+def on_update_click(b):
+    refresh_distribution()
+
+# Redraw once after a burst of widget changes rather than on every change
+@debounce(0.3)
+def on_widget_change(change):
+    refresh_distribution()
+
+for w in [*mistake_widgets.values(), *mistake_checkboxes.values(),
+          *positive_widgets.values(), *positive_checkboxes.values()]:
+    w.observe(on_widget_change, names='value')
+
 update_button.on_click(on_update_click)
 display(update_button)
 display(output)
 
 # Initial display
-with output:
-    current_marks = update_display()
+refresh_distribution()
     """))
 
     # Save scheme cell
@@ -469,6 +506,124 @@ approved_scheme = save_approved_scheme('approved_scheme.json')
     return str(output_file)
 
 
+def _encode_array(values: List[int], typecode: str) -> str:
+    """Encode integers as base64 little-endian bytes for a JS typed array."""
+    data = array.array(typecode, values)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return base64.b64encode(data.tobytes()).decode('ascii')
+
+
+def create_dashboard_html(
+    normalized_data_path: str,
+    student_mappings_path: str,
+    output_path: str,
+    assignment_type: str = "structured"
+) -> str:
+    """
+    Create a self-contained HTML dashboard with client-side mark recomputation.
+
+    The scoring data and a CSR student x code incidence matrix are embedded in
+    the page, so it opens instantly without Jupyter. Sliders and checkboxes
+    mirror the notebook, and the exported approved_scheme.json is byte-for-byte
+    what the notebook's save cell would write.
+
+    Args:
+        normalized_data_path: Path to normalized scoring JSON
+        student_mappings_path: Path to per-student mistake/positive mappings JSON
+        output_path: Where to save the HTML file
+        assignment_type: "structured" or "freeform"
+
+    Returns:
+        Path to created HTML file
+    """
+    with open(normalized_data_path, 'r') as f:
+        normalized_data = json.load(f)
+    with open(student_mappings_path, 'r') as f:
+        student_mappings = json.load(f)
+
+    total_marks = normalized_data.get('total_marks', 100)
+    activity_marks = normalized_data.get('activity_marks', {})
+    students = {k: v for k, v in student_mappings.items() if not k.startswith('_')}
+
+    # Same code order and duplicate handling as the notebook's widget dicts
+    mistakes = list({m['id']: m for m in normalized_data.get('mistakes', [])}.values())
+    positives = list({p['id']: p for p in normalized_data.get('positives', [])}.values())
+
+    codes = []
+    for mistake in mistakes:
+        suggested = float(mistake['suggested_deduction'])
+        maximum = mistake.get('activity_marks', 100)
+        codes.append({
+            'kind': 'mistake',
+            'id': mistake['id'],
+            'description': mistake.get('description', ''),
+            'activity': mistake.get('activity'),
+            'activity_marks': mistake.get('activity_marks'),
+            'frequency': mistake.get('frequency'),
+            'score': mistake.get('severity'),
+            'value': min(max(suggested, 0), maximum),
+            'max': maximum,
+        })
+    for positive in positives:
+        suggested = float(positive['suggested_bonus'])
+        maximum = min(suggested * 2, 10)
+        codes.append({
+            'kind': 'positive',
+            'id': positive['id'],
+            'description': positive.get('description', ''),
+            'activity': positive.get('activity'),
+            'activity_marks': positive.get('activity_marks'),
+            'frequency': positive.get('frequency'),
+            'score': positive.get('quality'),
+            'value': min(max(suggested, 0), maximum),
+            'max': maximum,
+        })
+
+    # CSR incidence matrix: row i lists the code columns applied to student i
+    mistake_columns = {m['id']: i for i, m in enumerate(mistakes)}
+    positive_columns = {p['id']: len(mistakes) + i for i, p in enumerate(positives)}
+    indptr = [0]
+    indices = []
+    for mapping in students.values():
+        indices.extend(mistake_columns[c] for c in mapping.get('mistakes', []) if c in mistake_columns)
+        indices.extend(positive_columns[c] for c in mapping.get('positives', []) if c in positive_columns)
+        indptr.append(len(indices))
+    index_type, index_typecode = ('uint16', 'H') if len(codes) <= 0xFFFF else ('int32', 'i')
+
+    # total_marks and activity_marks are copied verbatim, so keep their JSON text
+    scheme_prefix = json.dumps({'total_marks': total_marks, 'activity_marks': activity_marks}, indent=2)
+    scheme_prefix = scheme_prefix[:-len('\n}')]
+
+    data = {
+        'assignment_type': assignment_type.title(),
+        'total_marks': total_marks,
+        'activity_summary': ', '.join(f'{k}={v}' for k, v in sorted(activity_marks.items())),
+        'approved_scheme_path': str(Path(output_path).resolve().parent / 'approved_scheme.json'),
+        'scheme_prefix': scheme_prefix,
+        'codes': codes,
+        'matrix': {
+            'indptr': _encode_array(indptr, 'i'),
+            'indices': _encode_array(indices, index_typecode),
+            'index_type': index_type,
+        },
+    }
+
+    # Keep embedded text from closing the script element
+    data_json = json.dumps(data, separators=(',', ':')).replace('</', '<\\/')
+
+    with open(HTML_TEMPLATE, 'r', encoding='utf-8') as f:
+        html = f.read()
+    html = html.replace('/*__DASHBOARD_DATA__*/null', data_json)
+
+    output_file = Path(output_path)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+    return str(output_file)
+
+
 def _markdown_cell(text: str) -> Dict:
     """Create a markdown cell."""
     return {
@@ -513,6 +668,11 @@ def main():
         default="structured",
         help="Assignment type"
     )
+    parser.add_argument(
+        "--html",
+        metavar="PATH",
+        help="Also write a self-contained HTML dashboard (no Jupyter needed)"
+    )
     parser.add_argument(
         "--auto-approve",
         action="store_true",
@@ -530,6 +690,15 @@ def main():
 
     print(f"✓ Dashboard created: {notebook_path}")
 
+    if args.html:
+        html_path = create_dashboard_html(
+            args.normalized_data,
+            args.student_mappings,
+            args.html,
+            args.type
+        )
+        print(f"✓ HTML dashboard created: {html_path}")
+
     if args.auto_approve:
         # Auto-approve: create approved_scheme.json using the default values
         print("Auto-approving marking scheme...")
@@ -557,6 +726,8 @@ def main():
     else:
         print(f"\nTo use:")
         print(f"  jupyter notebook \"{notebook_path}\"")
+        if args.html:
+            print(f"  or open in a browser: {args.html}")
 
 
 if __name__ == "__main__":
@@ -21,6 +21,7 @@ import json
 import re
 import subprocess
 import sys
+import tempfile
 from pathlib import Path
 
 # Add src/utils to path for imports
@@ -183,10 +184,15 @@ def call_llm(prompt: str, provider: str, model: str = None) -> str:
     if not llm_caller.exists():
         raise FileNotFoundError(f"llm_caller.sh not found at {llm_caller}")
 
+    # Write prompt to temp file: it embeds the whole notebook, too large for argv
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as f:
+        f.write(prompt)
+        prompt_file = f.name
+
     # Call llm_caller.sh in headless mode
     cmd = [
         str(llm_caller),
-        "--prompt", prompt,
+        "--prompt-file", prompt_file,
         "--mode", "headless",
         "--provider", provider,
         "--auto-approve"  # Skip permission prompts for automated operation
@@ -207,6 +213,8 @@ def call_llm(prompt: str, provider: str, model: str = None) -> str:
         print(f"Error calling LLM: {e}", file=sys.stderr)
         print(f"STDERR: {e.stderr}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        Path(prompt_file).unlink(missing_ok=True)
 
 
 def main():
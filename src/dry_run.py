@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Dry run (--plan): estimate the calls, tokens, cost and time of a marking run.
+
+Builds the prompt of every headless call the run still has to make (markers
+for the markings missing, then the normalizers and unifiers), from the agents'
+templates, the submissions and the activity cache in processed/, without
+calling an LLM. Tokens are counted with a character-ratio approximation of
+each provider's tokenizer. Parts of a prompt that an earlier stage has not
+written yet (marking criteria, markings, the approved scheme) are counted at
+their projected size: the output tokens measured for that stage, or a default.
+
+Output tokens and seconds per call come from the stats files of this and the
+neighbouring assignments (processed/stats/token_usage.jsonl), the model's
+own calls when there are enough of them, as in deadline mode (see
+src/task_planner.py). Wall time is projected in waves of the run's
+parallelism, and with the quota ledger's per-minute budget if it is enabled.
+Cost uses the pricing table in models.yaml; a CLI run without a model is
+priced as the first model of the provider's faster_models chain that is not
+expensive (the CLI's default model is not known in advance).
+
+Interactive and one-off calls (pattern design, name resolution, gradebook
+translation) and the marker cascade's escalations are not included.
+
+Usage:
+    dry_run.py plan --assignment-dir D --type T --provider P --parallel N
+                    [--marker-model M] [--normalizer-model M] [--unifier-model M]
+                    [--api-model M] [--base-file F] [--json F]
+        Print the plan of one assignment (and write it as JSON)
+    dry_run.py total F [F ...]
+        Print the plans of several assignments (batch_mark.sh) and their sum
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent / "utils"))
+sys.path.insert(0, str(Path(__file__).parent / "agents"))
+import marker as marker_agent
+import normalizer as normalizer_agent
+import unifier as unifier_agent
+from extract_activities import ActivityExtractor
+from find_submissions import SubmissionFinder
+from llm_telemetry import compute_cost
+from quota_ledger import get_budget, get_ledger_config, normalize_provider
+from structured_output import get_structured_output_config, json_instructions
+from system_config import is_expensive_model, load_models_config, resolve_provider_from_model
+from task_planner import (
+    DEFAULT_CALL_SECONDS, MIN_MODEL_SAMPLES, STAGES, _duration, call_profile, load_call_stats, project,
+    remaining_calls,
+)
+
+# Characters per token of each provider's tokenizer, on the mix of English
+# prose, Markdown and Python code in marking prompts
+CHARS_PER_TOKEN = {'claude': 3.5, 'gemini': 4.0, 'codex': 4.0}
+
+# Output tokens per call until the stats files have samples for a stage
+DEFAULT_OUTPUT_TOKENS = {'marker': 1200, 'normalizer': 3000, 'unifier': 1500}
+
+# Projected size of the pattern designer's outputs before stage 3 has run
+DEFAULT_CRITERIA_TOKENS = {'structured': 800, 'freeform': 2500}  # Per activity / per assignment
+DEFAULT_RUBRIC_TOKENS = 2000
+
+
+def count_tokens(text: str, provider: str) -> int:
+    """Approximate token count of a text for a provider's tokenizer."""
+    return round(len(text) / CHARS_PER_TOKEN.get(normalize_provider(provider), 4.0))
+
+
+def pricing_model(provider: str, model: str, interface: str) -> str:
+    """Model to price calls with (the CLI default is assumed as in deadline mode)."""
+    if model:
+        return model
+    models = load_models_config()
+    default = (models.get('defaults') or {}).get(provider)
+    if default:
+        return default
+    available = models.get('api_models' if interface == 'api' else 'cli_models') or {}
+    chain = [m for m in (models.get('faster_models') or {}).get(provider) or [] if m in available]
+    cheap = [m for m in chain if not is_expensive_model(m)]
+    return cheap[0] if cheap else ''
+
+
+def load_history(assignment_dir: Path) -> tuple[list, int]:
+    """
+    Successful calls from the stats files of this and the neighbouring assignments.
+
+    Returns:
+        Tuple of (stats entries, number of stats files read)
+    """
+    files = sorted(set(assignment_dir.parent.glob('*/processed/stats/token_usage.jsonl'))
+                   | {assignment_dir / 'processed' / 'stats' / 'token_usage.jsonl'})
+    files = [f for f in files if f.exists()]
+    entries = []
+    for stats_file in files:
+        entries.extend(e for e in load_call_stats(stats_file) if e.get('stage') in STAGES)
+    return entries, len(files)
+
+
+def output_profile(entries: list, stage: str, model: str) -> dict:
+    """Mean output tokens and seconds per call of a stage (defaults without history)."""
+    stage_entries = [e for e in entries if e.get('stage') == stage]
+    own = [e for e in stage_entries if (e.get('model') or '') == (model or '')]
+    chosen = own if len(own) >= MIN_MODEL_SAMPLES else stage_entries
+    profile = call_profile(chosen, stage, model)
+    if not profile:
+        return {'output_tokens': DEFAULT_OUTPUT_TOKENS[stage], 'seconds': DEFAULT_CALL_SECONDS[stage],
+                'samples': 0}
+    return {
+        'output_tokens': sum(e.get('output_tokens') or 0 for e in chosen) / len(chosen),
+        'seconds': profile['seconds'],
+        'samples': profile['samples'],
+    }
+
+
+def find_students(assignment_dir: Path, base_file: str | None) -> list:
+    """
+    Submissions of the assignment, as {student_name, path}.
+
+    Uses the submissions manifest of an earlier run, else searches
+    submissions/ as stage 1 would (without writing the manifest). Names are
+    mapped to their canonical form when the name resolver has run.
+    """
+    processed_dir = assignment_dir / 'processed'
+    manifest = processed_dir / 'submissions_manifest.json'
+    if manifest.exists():
+        submissions = json.loads(manifest.read_text(encoding='utf-8')).get('submissions', [])
+    else:
+        submissions = SubmissionFinder(str(assignment_dir / 'submissions'), base_file).find_all_submissions()
+
+    mapping = {}
+    mapping_file = processed_dir / 'name_mapping.json'
+    if mapping_file.exists():
+        mapping = json.loads(mapping_file.read_text(encoding='utf-8')).get('name_mapping', {})
+    return [{'student_name': mapping.get(s['path'], s['student_name']), 'path': s['path']}
+            for s in submissions]
+
+
+def find_activities(assignment_dir: Path) -> list:
+    """Activity IDs, from the activity cache or the base notebook."""
+    cached = sorted((assignment_dir / 'processed' / 'activities').glob('A*.json'),
+                    key=lambda p: int(p.stem[1:]) if p.stem[1:].isdigit() else 0)
+    cached = [p.stem for p in cached if p.stem[1:].isdigit()]
+    if cached:
+        return cached
+    base = next((p for p in sorted(assignment_dir.glob('*.ipynb'))), None)
+    if base is None:
+        return []
+    extractor = ActivityExtractor(str(base))
+    if not extractor.load_notebook():
+        return []
+    return sorted(extractor.extract_activities(), key=lambda a: int(a[1:]))
+
+
+def _read(path: Path) -> str | None:
+    try:
+        return path.read_text(encoding='utf-8')
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _activity_work(path: str) -> dict:
+    """
+    Each activity's student work, formatted as marker.py sends it (extracted
+    in-process, not through extract_activities.py once per activity).
+    """
+    extractor = ActivityExtractor(path)
+    if not extractor.load_notebook():
+        return {}
+    return {activity: "\n".join(f"[{cell['cell_type']}]\n{cell['source']}\n" for cell in cells)
+            for activity, cells in extractor.extract_activities().items()}
+
+
+class Stage:
+    """Token totals of one stage, with the parts counted at a projected size."""
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.projected = set()
+
+    def add(self, tokens: int, projected_tokens: int = 0, projected: tuple = ()):
+        self.calls += 1
+        self.input_tokens += tokens + projected_tokens
+        self.projected.update(projected)
+
+
+def build_plan(args) -> dict:
+    """Build the prompts still to send and project the run's tokens, cost and time."""
+    assignment_dir = Path(args.assignment_dir).resolve()
+    processed_dir = assignment_dir / 'processed'
+    markings_dir = processed_dir / 'markings'
+    final_dir = processed_dir / 'final'
+    structured = args.type == 'structured'
+    json_output = get_structured_output_config()['enabled']
+
+    interface = 'api' if args.api_model else 'cli'
+    provider = args.provider
+    if args.api_model:
+        provider = resolve_provider_from_model(args.api_model, 'api_models') or provider
+    models = {stage: args.api_model or getattr(args, f"{stage}_model") or '' for stage in STAGES}
+
+    entries, history_files = load_history(assignment_dir)
+    profiles = {stage: output_profile(entries, stage, models[stage]) for stage in STAGES}
+    out = {stage: round(profiles[stage]['output_tokens']) for stage in STAGES}
+
+    def tokens(text):
+        return count_tokens(text, provider)
+
+    students = find_students(assignment_dir, args.base_file)
+    activities = find_activities(assignment_dir) if structured else []
+    stages = {stage: Stage() for stage in STAGES}
+
+    # Markers: one call per missing marking
+    template = marker_agent.load_prompt_template(args.type)
+    contexts = {}
+    if not structured and (processed_dir / 'problem_contexts.json').exists():
+        contexts = json.loads((processed_dir / 'problem_contexts.json').read_text(encoding='utf-8'))
+    criteria_text = {}
+    for activity in activities or [None]:
+        criteria_file = (processed_dir / 'activities' / f"{activity}_criteria.md" if activity
+                         else processed_dir / 'marking_criteria.md')
+        criteria_text[activity] = _read(criteria_file)
+
+    for student in students:
+        name, path = student['student_name'], student['path']
+        if structured:
+            missing = [a for a in activities if not (markings_dir / f"{name}_{a}.md").exists()]
+            work = _activity_work(path) if missing else {}
+        else:
+            missing = [None] if not (markings_dir / f"{name}.md").exists() else []
+            work = {None: marker_agent.extract_student_work(path)} if missing else {}
+        for activity in missing:
+            criteria = criteria_text[activity]
+            problem_context = ''
+            if name in contexts:
+                problem_context = contexts[name].get('problem_description', '')
+            prompt = template.format(
+                activity_id=activity or "N/A", student_name=name, submission_path=path,
+                student_work=work.get(activity, ''), marking_criteria=criteria or '',
+                problem_context=problem_context)
+            if criteria is None:
+                stages['marker'].add(tokens(prompt), DEFAULT_CRITERIA_TOKENS[args.type], ('marking criteria',))
+            else:
+                stages['marker'].add(tokens(prompt))
+
+    # Normalizers: one per activity (structured) or one for the class
+    rubric = _read(processed_dir / 'rubric.md')
+    template = normalizer_agent.load_prompt_template(args.type)
+    suffix = json_instructions('normalizer') if json_output else ''
+    for activity in activities or [None]:
+        scoring = processed_dir / 'normalized' / (f"{activity}_scoring.md" if activity else 'scoring.md')
+        if scoring.exists():
+            continue
+        assessments = normalizer_agent.load_marker_assessments(markings_dir, activity)
+        written = "\n---\n\n".join(f"## Student {i}: {a['student_name']}\n\n{a['content']}\n"
+                                   for i, a in enumerate(assessments, 1))
+        prompt = template.format(activity_id=activity or "N/A", num_students=len(students),
+                                 marker_assessments=written, rubric=rubric or '',
+                                 rubric_section=rubric or '') + suffix
+        projected = []
+        extra = (len(students) - len(assessments)) * out['marker']
+        if extra > 0:
+            projected.append('markings')
+        if rubric is None:
+            extra += DEFAULT_RUBRIC_TOKENS
+            projected.append('rubric')
+        stages['normalizer'].add(tokens(prompt), extra, tuple(projected))
+
+    # Unifiers: one per student without a feedback card
+    scheme = _read(processed_dir / 'approved_scheme.json')
+    template = unifier_agent.load_prompt_template()
+    suffix = json_instructions('unifier') if json_output else ''
+    for student in students:
+        name, path = student['student_name'], student['path']
+        if (final_dir / f"{name}_feedback.md").exists():
+            continue
+        previous = unifier_agent.load_previous_assessments(markings_dir, name, args.type)
+        prompt = template.format(
+            student_name=name, submission_path=path, approved_scheme=scheme or '',
+            previous_assessments=previous, student_notebook=unifier_agent.load_student_notebook(path),
+            assignment_type_specific_calculation='', structured_output='', marks_breakdown='') + suffix
+        projected = []
+        written = len(list(markings_dir.glob(f"{name}_A*.md"))) if structured \
+            else int((markings_dir / f"{name}.md").exists())
+        extra = (max(len(activities), 1) - written) * out['marker']
+        if extra > 0:
+            projected.append('markings')
+        if scheme is None:
+            extra += max(len(activities), 1) * out['normalizer']
+            projected.append('approved scheme')
+        stages['unifier'].add(tokens(prompt), extra, tuple(projected))
+
+    # Calls, cost and time per stage
+    calls = remaining_calls(processed_dir, args.type, len(students), len(activities))
+    ledger = get_ledger_config()
+    budget = get_budget(ledger, interface, provider) if ledger['enabled'] else {}
+    plan_stages = {}
+    for stage in STAGES:
+        s = stages[stage]
+        n = s.calls or calls[stage]
+        output_tokens = n * out[stage]
+        model = pricing_model(provider, models[stage], interface)
+        cost = compute_cost(provider, model, {'input_tokens': s.input_tokens, 'output_tokens': output_tokens})
+        per_call = {'seconds': profiles[stage]['seconds'],
+                    'tokens': (s.input_tokens + output_tokens) / n if n else 0}
+        plan_stages[stage] = {
+            'calls': n,
+            'input_tokens': s.input_tokens,
+            'output_tokens': output_tokens,
+            'cost_usd': cost,
+            'priced_as': model or None,
+            'seconds_per_call': round(profiles[stage]['seconds'], 1),
+            'samples': profiles[stage]['samples'],
+            'wall_s': round(project({stage: n}, {stage: per_call}, args.parallel, budget, structured), 1),
+            'projected': sorted(s.projected),
+        }
+
+    return {
+        'assignment': assignment_dir.name,
+        'type': args.type,
+        'students': len(students),
+        'activities': len(activities),
+        'interface': interface,
+        'provider': provider,
+        'models': models,
+        'parallel': args.parallel,
+        'history': {'files': history_files, 'calls': len(entries)},
+        'stages': plan_stages,
+    }
+
+
+def _total(stages: dict) -> dict:
+    costs = [s['cost_usd'] for s in stages.values() if s['calls']]
+    return {
+        'calls': sum(s['calls'] for s in stages.values()),
+        'input_tokens': sum(s['input_tokens'] for s in stages.values()),
+        'output_tokens': sum(s['output_tokens'] for s in stages.values()),
+        'cost_usd': None if any(c is None for c in costs) else sum(costs),
+        'wall_s': sum(s['wall_s'] for s in stages.values()),
+    }
+
+
+def _row(label: str, s: dict) -> str:
+    cost = f"{s['cost_usd']:.2f}" if s['cost_usd'] is not None else 'n/a'
+    return (f"{label:20s} {s['calls']:>7,} {s['input_tokens']:>12,} {s['output_tokens']:>11,} "
+            f"{cost:>9s} {_duration(s['wall_s']):>10s}")
+
+
+HEADER = f"{'':20s} {'calls':>7s} {'input tok':>12s} {'output tok':>11s} {'cost USD':>9s} {'wall time':>10s}"
+
+
+def print_plan(plan: dict):
+    models = sorted({m or 'CLI default' for m in plan['models'].values()})
+    print(f"Plan: {plan['assignment']} ({plan['type']}, {plan['students']} students"
+          + (f", {plan['activities']} activities" if plan['type'] == 'structured' else '') + ")")
+    print(f"  {plan['interface'].upper()} {plan['provider']}: {', '.join(models)}; {plan['parallel']} parallel")
+    history = plan['history']
+    print(f"  History: {history['calls']} calls in {history['files']} stats file(s)")
+    print()
+    print(HEADER)
+    for stage, s in plan['stages'].items():
+        print(_row(stage, s))
+    print(_row('total', _total(plan['stages'])))
+    print()
+    for stage, s in plan['stages'].items():
+        if not s['calls']:
+            continue
+        notes = [f"{s['seconds_per_call']:.0f}s per call " +
+                 (f"({s['samples']} measured)" if s['samples'] else "(default, no history)")]
+        if s['priced_as']:
+            notes.append(f"priced as {s['priced_as']}")
+        if s['projected']:
+            notes.append(f"projected: {', '.join(s['projected'])}")
+        print(f"  {stage}: {'; '.join(notes)}")
+    if plan['interface'] == 'cli':
+        print("  CLI calls on a subscription are not billed per token; cost is their API price")
+    print("  Not included: pattern design, name resolution, gradebook translation, cascade escalations")
+
+
+def cmd_plan(args):
+    if not Path(args.assignment_dir).is_dir():
+        print(f"Error: Assignment directory not found: {args.assignment_dir}", file=sys.stderr)
+        sys.exit(1)
+    plan = build_plan(args)
+    print_plan(plan)
+    if args.json:
+        Path(args.json).write_text(json.dumps(plan, indent=2) + '\n', encoding='utf-8')
+
+
+def cmd_total(args):
+    plans = []
+    for path in args.plans:
+        try:
+            plans.append(json.loads(Path(path).read_text(encoding='utf-8')))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠ Skipping {path}: {e}", file=sys.stderr)
+    if not plans:
+        print("Error: No plans to add up", file=sys.stderr)
+        sys.exit(1)
+
+    print(HEADER)
+    totals = []
+    for plan in plans:
+        total = _total(plan['stages'])
+        totals.append(total)
+        print(_row(plan['assignment'][:20], total))
+    costs = [t['cost_usd'] for t in totals]
+    print(_row('total', {
+        'calls': sum(t['calls'] for t in totals),
+        'input_tokens': sum(t['input_tokens'] for t in totals),
+        'output_tokens': sum(t['output_tokens'] for t in totals),
+        'cost_usd': None if any(c is None for c in costs) else sum(costs),
+        'wall_s': sum(t['wall_s'] for t in totals),  # The assignments are marked one after another
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate a marking run without calling an LLM")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    plan = sub.add_parser('plan', help='Plan the remaining calls of one assignment')
+    plan.add_argument('--assignment-dir', required=True, help='Assignment directory')
+    plan.add_argument('--type', choices=['structured', 'freeform'], required=True, help='Assignment type')
+    plan.add_argument('--provider', required=True, help='Default provider of the run')
+    plan.add_argument('--parallel', type=int, required=True, help='Parallel tasks per stage')
+    plan.add_argument('--marker-model', default='', help='Marker model (empty = the CLI default)')
+    plan.add_argument('--normalizer-model', default='', help='Normalizer model')
+    plan.add_argument('--unifier-model', default='', help='Unifier model')
+    plan.add_argument('--api-model', default='', help='The run\'s API model (API mode)')
+    plan.add_argument('--base-file', help='Base notebook file name to exclude from submissions')
+    plan.add_argument('--json', help='Also write the plan to this JSON file')
+    plan.set_defaults(func=cmd_plan)
+
+    total = sub.add_parser('total', help='Print several plans and their sum')
+    total.add_argument('plans', nargs='+', help='Plan JSON files from `plan --json`')
+    total.set_defaults(func=cmd_total)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
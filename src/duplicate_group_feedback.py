@@ -73,17 +73,21 @@ def duplicate_feedback(groups_file: str, feedback_dir: str, use_symlinks: bool =
                 skipped_count += 1
                 continue
 
+            # The unifier's JSON next to the card (structured outputs) goes with it
+            pairs = [(group_feedback, student_feedback)]
+            if group_feedback.with_suffix('.json').exists():
+                pairs.append((group_feedback.with_suffix('.json'), student_feedback.with_suffix('.json')))
+
             try:
-                if use_symlinks:
-                    # Create relative symlink
-                    os.symlink(group_feedback.name, student_feedback)
-                    if verbose:
-                        print(f"  - {student_name}: created symlink")
-                else:
-                    # Copy file
-                    shutil.copy2(group_feedback, student_feedback)
-                    if verbose:
-                        print(f"  - {student_name}: copied feedback")
+                for source, target in pairs:
+                    if use_symlinks:
+                        # Create relative symlink
+                        os.symlink(source.name, target)
+                    else:
+                        # Copy file (keeps the modification times the JSON check relies on)
+                        shutil.copy2(source, target)
+                if verbose:
+                    print(f"  - {student_name}: {'created symlink' if use_symlinks else 'copied feedback'}")
 
                 created_count += 1
 
@@ -26,7 +26,8 @@
 #
 # Prompt (one required):
 #   --prompt <text>         Prompt text
-#   --prompt-file <file>    Read prompt from file
+#   --prompt-file <file>    Read prompt from file (preferred for large prompts;
+#                           headless calls stream it to the CLI on stdin)
 #
 # Optional:
 #   --model <name>          Model to use for CLI calls (passed directly to CLI)
@@ -35,9 +36,16 @@
 #   --max-tokens <n>        Max output tokens for API calls (default: 8192)
 #   --mode <mode>           interactive or headless (default: interactive)
 #   --output <file>         Capture output to file
+#   --stream-file <file>    API calls with streaming enabled (config.yaml): write the
+#                           response here as it arrives (removed once the call succeeds)
+#   --json-schema <file>    API calls: have the provider return one JSON object that
+#                           matches this schema (tool use, JSON mode); CLI calls rely
+#                           on the JSON instructions in the prompt
 #   --working-dir <dir>     Set working directory for file operations
 #   --auto-approve          Skip all permission prompts (use with caution)
 #   --write-dirs <dirs>     Space-separated list of directories to allow writes
+#   --print-config          Print the resolved provider and models, then exit
+#                           (no prompt needed)
 #   --help                  Show this help message
 #
 # API Mode:
@@ -45,6 +53,7 @@
 #   instead of CLI tools. Requires:
 #     - Python SDK: pip install anthropic google-generativeai openai
 #     - API key in environment: ANTHROPIC_API_KEY, GOOGLE_API_KEY, OPENAI_API_KEY
+#       (or several per provider, e.g. CLAUDE_API_KEYS=k1,k2, used as a key pool)
 #
 # Config File Format (YAML):
 #   default_provider: claude
@@ -61,6 +70,18 @@
 
 set -euo pipefail
 
+# Epoch timestamp with sub-second precision (EPOCHREALTIME needs bash 5)
+now_ts() {
+    if [[ -n "${EPOCHREALTIME:-}" ]]; then
+        echo "${EPOCHREALTIME/,/.}"
+    else
+        date +%s
+    fi
+}
+
+# Recorded in the stats entry to measure startup overhead in the wrapper chain
+WRAPPER_START_TS=$(now_ts)
+
 # ============================================================================
 # Defaults - No hardcoded model names or provider preferences
 # ============================================================================
@@ -71,6 +92,8 @@ MODE="interactive"
 PROMPT=""
 PROMPT_FILE=""
 OUTPUT_FILE=""
+STREAM_FILE=""
+JSON_SCHEMA=""
 WORKING_DIR=""
 AUTO_APPROVE=false
 WRITE_DIRS=""
@@ -81,12 +104,21 @@ STATS_CONTEXT=""
 MAX_TOKENS=""
 MODEL_FROM_CLI=false
 API_MODEL_FROM_CLI=false
+PRINT_CONFIG=false
 
 # Script directory for finding models.yaml
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 PROJECT_ROOT="$(cd "$SCRIPT_DIR/.." && pwd)"
 MODELS_CONFIG="$PROJECT_ROOT/configs/models.yaml"
 
+# Optional run-wide tracing (active when AGENTIC_TRACE_DIR is set)
+if [[ -f "$SCRIPT_DIR/utils/tracing.sh" ]]; then
+    source "$SCRIPT_DIR/utils/tracing.sh"
+else
+    trace_begin() { :; }
+    trace_end() { :; }
+fi
+
 # ============================================================================
 # Help
 # ============================================================================
@@ -95,6 +127,60 @@ show_help() {
     exit 0
 }
 
+# ============================================================================
+# Load the resolved config snapshot (compiled from config.yaml and models.yaml
+# by system_config.py). Sourcing it replaces parsing models.yaml on every call;
+# it is recompiled when a source file's mtime or size differs from the key
+# recorded in the snapshot (so restoring an older file also invalidates it).
+# ============================================================================
+CONFIG_SNAPSHOT="${AGENTIC_CONFIG_CACHE_DIR:-$PROJECT_ROOT/.cache/config}/snapshot.env"
+
+# Source key as system_config.py records it: "<mtime>:<size>" per file
+# ('-' if missing), config.yaml then models.yaml, comma separated
+config_source_key() {
+    local file stamp key=""
+    for file in "$PROJECT_ROOT/configs/config.yaml" "$MODELS_CONFIG"; do
+        stamp=-
+        if [[ -f "$file" ]]; then
+            stamp=$(stat -c '%Y:%s' "$file" 2>/dev/null || stat -f '%m:%z' "$file") || return 1
+        fi
+        key+="${key:+,}$stamp"
+    done
+    echo "$key"
+}
+
+load_config_snapshot() {
+    local line="" key
+    if [[ -f "$CONFIG_SNAPSHOT" ]]; then
+        while IFS= read -r line && [[ "$line" != CFG_SNAPSHOT_SOURCES=* ]]; do :; done < "$CONFIG_SNAPSHOT"
+    fi
+    if [[ -n "$line" ]] && key=$(config_source_key) \
+          && [[ "${line#CFG_SNAPSHOT_SOURCES=}" == "$key" ]]; then
+        if ! source "$CONFIG_SNAPSHOT"; then
+            echo "Error: Failed to load the config snapshot $CONFIG_SNAPSHOT" >&2
+            exit 1
+        fi
+        return
+    fi
+
+    # Standalone copy (no config helper or no models.yaml): no models are
+    # known, so --provider is required and --model is passed through as is
+    if [[ ! -f "$SCRIPT_DIR/utils/config_snapshot.py" || ! -f "$MODELS_CONFIG" ]]; then
+        declare -gA CFG_API_MODELS=() CFG_CLI_MODELS=() CFG_PROVIDER_DEFAULTS=()
+        CFG_EXPENSIVE_MODELS=()
+        return
+    fi
+
+    local env
+    if ! env=$(python3 "$SCRIPT_DIR/utils/config_snapshot.py" --env); then
+        echo "Error: Failed to load configs/models.yaml and configs/config.yaml" >&2
+        exit 1
+    fi
+    eval "$env"
+}
+
+load_config_snapshot
+
 # ============================================================================
 # Resolve provider from model name using models.yaml (strict validation)
 # Checks both api_models and cli_models sections
@@ -103,34 +189,15 @@ resolve_provider_from_model() {
     local model_name="$1"
     local section="${2:-}"  # Optional: api_models or cli_models
 
-    if [[ ! -f "$MODELS_CONFIG" ]]; then
-        return 1
+    if [[ "$section" != cli_models && -n "${CFG_API_MODELS[$model_name]:-}" ]]; then
+        echo "${CFG_API_MODELS[$model_name]}"
+        return 0
     fi
-
-    # Determine which sections to check
-    local sections_to_check
-    if [[ -n "$section" ]]; then
-        sections_to_check="$section"
-    else
-        sections_to_check="api_models cli_models"
+    if [[ "$section" != api_models && -n "${CFG_CLI_MODELS[$model_name]:-}" ]]; then
+        echo "${CFG_CLI_MODELS[$model_name]}"
+        return 0
     fi
 
-    for sec in $sections_to_check; do
-        local in_section=false
-        while IFS= read -r line; do
-            if [[ "$line" =~ ^${sec}: ]]; then
-                in_section=true
-            elif [[ "$in_section" == true && "$line" =~ ^[a-z_]+: && ! "$line" =~ ^[[:space:]] ]]; then
-                in_section=false
-            elif [[ "$in_section" == true && "$line" =~ ^[[:space:]]+${model_name}:[[:space:]]*(.+) ]]; then
-                local provider="${BASH_REMATCH[1]}"
-                provider=$(echo "$provider" | tr -d '"' | tr -d "'" | xargs)
-                echo "$provider"
-                return 0
-            fi
-        done < "$MODELS_CONFIG"
-    done
-
     # No fallback - model must be in models.yaml
     return 1
 }
@@ -139,56 +206,21 @@ resolve_provider_from_model() {
 # Get default model for a provider from models.yaml
 # ============================================================================
 get_default_model_for_provider() {
-    local provider="$1"
-
-    if [[ -f "$MODELS_CONFIG" ]]; then
-        # Look in defaults section
-        local in_defaults=false
-        while IFS= read -r line; do
-            if [[ "$line" =~ ^defaults: ]]; then
-                in_defaults=true
-            elif [[ "$in_defaults" == true && "$line" =~ ^[[:space:]]+${provider}: ]]; then
-                local model
-                model=$(echo "$line" | sed "s/.*${provider}:[[:space:]]*//" | tr -d '"' | tr -d "'")
-                if [[ -n "$model" ]]; then
-                    echo "$model"
-                fi
-                return 0
-            elif [[ "$in_defaults" == true && "$line" =~ ^[a-z]+: ]]; then
-                # New top-level section, stop looking
-                break
-            fi
-        done < "$MODELS_CONFIG"
-    fi
+    echo "${CFG_PROVIDER_DEFAULTS[$1]:-}"
 }
 
 # ============================================================================
 # Check if a model is marked as expensive in models.yaml
 # ============================================================================
 is_expensive_model() {
-    local model_name="$1"
-
-    if [[ -z "$model_name" || ! -f "$MODELS_CONFIG" ]]; then
-        return 1  # Not expensive (or can't determine)
-    fi
+    local model_name="$1" expensive_model
+    [[ -n "$model_name" ]] || return 1
 
-    # Look in expensive section
-    local in_expensive=false
-    while IFS= read -r line; do
-        if [[ "$line" =~ ^expensive: ]]; then
-            in_expensive=true
-        elif [[ "$in_expensive" == true && "$line" =~ ^[[:space:]]+-[[:space:]]*(.+) ]]; then
-            local expensive_model="${BASH_REMATCH[1]}"
-            expensive_model=$(echo "$expensive_model" | tr -d '"' | tr -d "'" | xargs)
-            if [[ "$expensive_model" == "$model_name" ]]; then
-                return 0  # Is expensive
-            fi
-        elif [[ "$in_expensive" == true && "$line" =~ ^[a-z]+: ]]; then
-            # New top-level section, stop
-            break
+    for expensive_model in "${CFG_EXPENSIVE_MODELS[@]}"; do
+        if [[ "$expensive_model" == "$model_name" ]]; then
+            return 0  # Is expensive
         fi
-    done < "$MODELS_CONFIG"
-
+    done
     return 1  # Not expensive
 }
 
@@ -196,25 +228,9 @@ is_expensive_model() {
 # Get list of expensive models
 # ============================================================================
 get_expensive_models() {
-    if [[ ! -f "$MODELS_CONFIG" ]]; then
-        return
-    fi
-
-    local in_expensive=false
-    local models=""
-    while IFS= read -r line; do
-        if [[ "$line" =~ ^expensive: ]]; then
-            in_expensive=true
-        elif [[ "$in_expensive" == true && "$line" =~ ^[[:space:]]+-[[:space:]]*(.+) ]]; then
-            local model="${BASH_REMATCH[1]}"
-            model=$(echo "$model" | tr -d '"' | tr -d "'" | xargs)
-            models="${models:+$models, }$model"
-        elif [[ "$in_expensive" == true && "$line" =~ ^[a-z]+: ]]; then
-            break
-        fi
-    done < "$MODELS_CONFIG"
-
-    echo "$models"
+    local IFS=,
+    local models="${CFG_EXPENSIVE_MODELS[*]}"
+    echo "${models//,/, }"
 }
 
 # ============================================================================
@@ -247,46 +263,15 @@ confirm_expensive_model() {
 show_available_models() {
     echo "Available models (from configs/models.yaml):" >&2
 
-    if [[ ! -f "$MODELS_CONFIG" ]]; then
-        echo "  (models.yaml not found)" >&2
-        return
-    fi
-
-    local in_models=false
-    local claude_models=""
-    local gemini_models=""
-    local codex_models=""
-
-    while IFS= read -r line; do
-        if [[ "$line" =~ ^models: ]]; then
-            in_models=true
-        elif [[ "$in_models" == true && "$line" =~ ^[a-z]+: && ! "$line" =~ ^[[:space:]] ]]; then
-            # New top-level section, stop
-            break
-        elif [[ "$in_models" == true && "$line" =~ ^[[:space:]]+([^:]+):[[:space:]]*(.+) ]]; then
-            local model_name="${BASH_REMATCH[1]}"
-            local provider="${BASH_REMATCH[2]}"
-            # Clean up whitespace and quotes
-            model_name=$(echo "$model_name" | tr -d '"' | tr -d "'" | xargs)
-            provider=$(echo "$provider" | tr -d '"' | tr -d "'" | xargs)
-
-            case "$provider" in
-                claude)
-                    claude_models="${claude_models:+$claude_models, }$model_name"
-                    ;;
-                gemini)
-                    gemini_models="${gemini_models:+$gemini_models, }$model_name"
-                    ;;
-                codex)
-                    codex_models="${codex_models:+$codex_models, }$model_name"
-                    ;;
-            esac
-        fi
-    done < "$MODELS_CONFIG"
-
-    echo "  claude: ${claude_models:-(none configured)}" >&2
-    echo "  gemini: ${gemini_models:-(none configured)}" >&2
-    echo "  codex:  ${codex_models:-(none configured)}" >&2
+    local provider model list
+    for provider in claude gemini codex; do
+        list=$(for model in "${!CFG_API_MODELS[@]}" "${!CFG_CLI_MODELS[@]}"; do
+            if [[ "${CFG_API_MODELS[$model]:-${CFG_CLI_MODELS[$model]:-}}" == "$provider" ]]; then
+                echo "$model"
+            fi
+        done | sort -u | paste -sd, - | sed 's/,/, /g')
+        printf '  %-7s %s\n' "$provider:" "${list:-(none configured)}" >&2
+    done
     echo "" >&2
     echo "To add a new model, update configs/models.yaml" >&2
 }
@@ -400,6 +385,18 @@ while [[ $# -gt 0 ]]; do
             STATS_CONTEXT="$2"
             shift 2
             ;;
+        --stream-file)
+            STREAM_FILE="$2"
+            shift 2
+            ;;
+        --json-schema)
+            JSON_SCHEMA="$2"
+            shift 2
+            ;;
+        --print-config)
+            PRINT_CONFIG=true
+            shift
+            ;;
         *)
             echo "Unknown option: $1" >&2
             echo "Use --help for usage information" >&2
@@ -416,22 +413,31 @@ if [[ -n "$CONFIG_FILE" ]]; then
 fi
 
 # ============================================================================
-# Load prompt from file if specified
+# Prompt transport
+# Headless calls never put the prompt on a command line (ARG_MAX and
+# per-argument limits): the CLIs read it from stdin and api/caller.py reads
+# the file. Inline --prompt text is spooled to a temporary file for this.
+# Interactive sessions take the prompt as an argument, so it is loaded.
 # ============================================================================
 if [[ -n "$PROMPT_FILE" ]]; then
     if [[ ! -f "$PROMPT_FILE" ]]; then
         echo "Error: Prompt file not found: $PROMPT_FILE" >&2
         exit 1
     fi
-    PROMPT="$(cat "$PROMPT_FILE")"
-fi
-
-# ============================================================================
-# Validate required arguments
-# ============================================================================
-if [[ -z "$PROMPT" ]]; then
+    if [[ ! -s "$PROMPT_FILE" ]]; then
+        echo "Error: Prompt file is empty: $PROMPT_FILE" >&2
+        exit 1
+    fi
+    if [[ "$MODE" != "headless" ]]; then
+        PROMPT="$(cat "$PROMPT_FILE")"
+    fi
+elif [[ -z "$PROMPT" && "$PRINT_CONFIG" != true ]]; then
     echo "Error: --prompt or --prompt-file is required" >&2
     exit 1
+elif [[ -n "$PROMPT" && "$MODE" == "headless" ]]; then
+    PROMPT_FILE=$(mktemp "${TMPDIR:-/tmp}/llm_prompt.XXXXXX")
+    trap 'rm -f "$PROMPT_FILE"' EXIT
+    printf '%s' "$PROMPT" > "$PROMPT_FILE"
 fi
 
 # ============================================================================
@@ -459,6 +465,15 @@ if [[ -z "$PROVIDER" && -z "$API_MODEL" ]]; then
     exit 1
 fi
 
+if [[ "$PRINT_CONFIG" == true ]]; then
+    echo "provider:  ${PROVIDER:-(none)}"
+    echo "model:     ${MODEL:-(CLI default)}"
+    echo "api_model: ${API_MODEL:-(none)}"
+    echo "expensive: $(get_expensive_models)"
+    echo "snapshot:  $CONFIG_SNAPSHOT"
+    exit 0
+fi
+
 # ============================================================================
 # Expensive model validation
 # - Expensive models cannot be used as defaults (config/overview.md)
@@ -495,6 +510,86 @@ if [[ -n "$WORKING_DIR" ]]; then
     cd "$WORKING_DIR"
 fi
 
+# ============================================================================
+# Shared quota ledger (see src/utils/quota_ledger.py)
+# Headless CLI calls reserve a request in the ledger before they start, which
+# waits while other runs use the provider's per-minute budget. The reservation
+# is settled with the actual tokens by extract_llm_stats.py; without stats it
+# stays at the prompt's estimate. API calls use the ledger from api/caller.py.
+# ============================================================================
+LEDGER_ID=""
+
+ledger_acquire() {
+    if [[ "${CFG_QUOTA_LEDGER_ENABLED:-false}" != true && -z "${AGENTIC_QUOTA_LEDGER:-}" ]]; then
+        return 0
+    fi
+    LEDGER_ID=$(python3 "$SCRIPT_DIR/utils/quota_ledger.py" acquire --interface cli \
+        --provider "$1" --prompt-file "$PROMPT_FILE" --pid $$ \
+        --context "$STATS_STAGE${STATS_CONTEXT:+ $STATS_CONTEXT}")
+}
+
+# ============================================================================
+# Run a headless CLI call with stats tracking
+# The CLI runs to completion first so its timing and exit status can be
+# recorded; extract_llm_stats.py then extracts the text and appends stats.
+# Usage: run_with_stats <provider> <command> [args...]
+# ============================================================================
+run_with_stats() {
+    local provider="$1"
+    shift
+
+    local raw_output raw_errors
+    raw_output=$(mktemp)
+    raw_errors=$(mktemp)
+    local exit_status=0
+    local start_ts end_ts
+    start_ts=$(now_ts)
+    "$@" < "$PROMPT_FILE" > "$raw_output" 2> "$raw_errors" || exit_status=$?
+    end_ts=$(now_ts)
+
+    # Pass the CLI's errors on (agents detect quota/overload errors from them)
+    if [[ $exit_status -ne 0 ]]; then
+        cat "$raw_errors" >&2
+    fi
+
+    local extract_args=(
+        --provider "$provider"
+        --stats-file "$STATS_FILE"
+        --stats-stage "$STATS_STAGE"
+        --stats-context "$STATS_CONTEXT"
+        --model "$MODEL"
+        --wrapper-start-ts "$WRAPPER_START_TS"
+        --start-ts "$start_ts"
+        --end-ts "$end_ts"
+        --exit-status "$exit_status"
+    )
+    if [[ -n "$LEDGER_ID" ]]; then
+        extract_args+=(--ledger-id "$LEDGER_ID")
+    fi
+    local extract_script="$SCRIPT_DIR/utils/extract_llm_stats.py"
+
+    if [[ -n "$OUTPUT_FILE" ]]; then
+        python3 "$extract_script" "${extract_args[@]}" < "$raw_output" > "$OUTPUT_FILE"
+    else
+        python3 "$extract_script" "${extract_args[@]}" < "$raw_output"
+    fi
+    rm -f "$raw_output" "$raw_errors"
+
+    return "$exit_status"
+}
+
+# ============================================================================
+# Run a provider call inside an "llm" trace span
+# Usage: traced_call <function> [args...]
+# ============================================================================
+traced_call() {
+    trace_begin "llm ${STATS_STAGE}${STATS_CONTEXT:+: $STATS_CONTEXT} (${PROVIDER:-api} ${API_MODEL:-$MODEL})" llm
+    local status=0
+    "$@" || status=$?
+    trace_end
+    return "$status"
+}
+
 # ============================================================================
 # Claude Code
 # ============================================================================
@@ -530,38 +625,33 @@ call_claude() {
             claude "${cmd_args[@]}" "$PROMPT"
         fi
     else
-        # Headless mode: use -p/--print flag
+        # Headless mode: use -p/--print flag, prompt on stdin
         cmd_args+=(--print)
         if [[ "$AUTO_APPROVE" != true ]]; then
             cmd_args+=(--permission-mode bypassPermissions)
         fi
 
-        if [[ -n "$STATS_FILE" ]]; then
-            # Stats tracking: use JSON output and extract text/stats
-            cmd_args+=(--output-format json)
-            local extract_script="$SCRIPT_DIR/utils/extract_llm_stats.py"
-
-            if [[ -n "$OUTPUT_FILE" ]]; then
-                claude "${cmd_args[@]}" "$PROMPT" 2>/dev/null | \
-                    python3 "$extract_script" --provider claude \
-                        --stats-file "$STATS_FILE" \
-                        --stats-stage "$STATS_STAGE" \
-                        --stats-context "$STATS_CONTEXT" \
-                        --model "$MODEL" > "$OUTPUT_FILE"
+        if [[ -n "${AGENTIC_CLI_POOL:-}" && -S "$AGENTIC_CLI_POOL" ]]; then
+            # Persistent worker from the run's CLI pool (see src/cli_pool.py)
+            local pool_cmd=(python3 "$SCRIPT_DIR/cli_pool.py" request --provider claude
+                            --prompt-file "$PROMPT_FILE")
+            if [[ -n "$STATS_FILE" ]]; then
+                run_with_stats claude "${pool_cmd[@]}" -- "${cmd_args[@]}"
+            elif [[ -n "$OUTPUT_FILE" ]]; then
+                "${pool_cmd[@]}" --text -- "${cmd_args[@]}" > "$OUTPUT_FILE" 2>&1
             else
-                claude "${cmd_args[@]}" "$PROMPT" 2>/dev/null | \
-                    python3 "$extract_script" --provider claude \
-                        --stats-file "$STATS_FILE" \
-                        --stats-stage "$STATS_STAGE" \
-                        --stats-context "$STATS_CONTEXT" \
-                        --model "$MODEL"
+                "${pool_cmd[@]}" --text -- "${cmd_args[@]}"
             fi
+        elif [[ -n "$STATS_FILE" ]]; then
+            # Stats tracking: use JSON output and extract text/stats
+            cmd_args+=(--output-format json)
+            run_with_stats claude claude "${cmd_args[@]}"
         else
             # No stats tracking: plain text output
             if [[ -n "$OUTPUT_FILE" ]]; then
-                claude "${cmd_args[@]}" "$PROMPT" > "$OUTPUT_FILE" 2>&1
+                claude "${cmd_args[@]}" < "$PROMPT_FILE" > "$OUTPUT_FILE" 2>&1
             else
-                claude "${cmd_args[@]}" "$PROMPT"
+                claude "${cmd_args[@]}" < "$PROMPT_FILE"
             fi
         fi
     fi
@@ -603,40 +693,18 @@ call_gemini() {
             gemini "${cmd_args[@]}" -i "$PROMPT"
         fi
     else
-        # Headless mode: use -p flag (or positional with --yolo)
-        local prompt_args=()
-        if [[ "$AUTO_APPROVE" == true ]]; then
-            prompt_args=("$PROMPT")
-        else
-            prompt_args=(-p "$PROMPT")
-        fi
-
+        # Headless mode: a piped stdin makes gemini run non-interactively
+        # with stdin as the prompt
         if [[ -n "$STATS_FILE" ]]; then
             # Stats tracking: use JSON output and extract text/stats
             cmd_args+=(--output-format json)
-            local extract_script="$SCRIPT_DIR/utils/extract_llm_stats.py"
-
-            if [[ -n "$OUTPUT_FILE" ]]; then
-                gemini "${cmd_args[@]}" "${prompt_args[@]}" 2>/dev/null | \
-                    python3 "$extract_script" --provider gemini \
-                        --stats-file "$STATS_FILE" \
-                        --stats-stage "$STATS_STAGE" \
-                        --stats-context "$STATS_CONTEXT" \
-                        --model "$MODEL" > "$OUTPUT_FILE"
-            else
-                gemini "${cmd_args[@]}" "${prompt_args[@]}" 2>/dev/null | \
-                    python3 "$extract_script" --provider gemini \
-                        --stats-file "$STATS_FILE" \
-                        --stats-stage "$STATS_STAGE" \
-                        --stats-context "$STATS_CONTEXT" \
-                        --model "$MODEL"
-            fi
+            run_with_stats gemini gemini "${cmd_args[@]}"
         else
             # No stats tracking: plain text output
             if [[ -n "$OUTPUT_FILE" ]]; then
-                gemini "${cmd_args[@]}" "${prompt_args[@]}" > "$OUTPUT_FILE" 2>&1
+                gemini "${cmd_args[@]}" < "$PROMPT_FILE" > "$OUTPUT_FILE" 2>&1
             else
-                gemini "${cmd_args[@]}" "${prompt_args[@]}"
+                gemini "${cmd_args[@]}" < "$PROMPT_FILE"
             fi
         fi
     fi
@@ -680,7 +748,7 @@ call_codex() {
             codex "${cmd_args[@]}" "$PROMPT"
         fi
     else
-        # Headless mode: use 'exec' subcommand
+        # Headless mode: use 'exec' subcommand ('-' reads the prompt from stdin)
         if [[ "$AUTO_APPROVE" == true ]]; then
             cmd_args+=(--dangerously-bypass-approvals-and-sandbox)
         else
@@ -690,30 +758,14 @@ call_codex() {
         if [[ -n "$STATS_FILE" ]]; then
             # Stats tracking: use JSON output and extract text/stats
             cmd_args+=(--json)
-            local extract_script="$SCRIPT_DIR/utils/extract_llm_stats.py"
-
-            if [[ -n "$OUTPUT_FILE" ]]; then
-                codex exec "${cmd_args[@]}" "$PROMPT" 2>/dev/null | \
-                    python3 "$extract_script" --provider codex \
-                        --stats-file "$STATS_FILE" \
-                        --stats-stage "$STATS_STAGE" \
-                        --stats-context "$STATS_CONTEXT" \
-                        --model "$MODEL" > "$OUTPUT_FILE"
-            else
-                codex exec "${cmd_args[@]}" "$PROMPT" 2>/dev/null | \
-                    python3 "$extract_script" --provider codex \
-                        --stats-file "$STATS_FILE" \
-                        --stats-stage "$STATS_STAGE" \
-                        --stats-context "$STATS_CONTEXT" \
-                        --model "$MODEL"
-            fi
+            run_with_stats codex codex exec "${cmd_args[@]}" -
         else
             # No stats tracking: plain text output
             if [[ -n "$OUTPUT_FILE" ]]; then
                 # Codex has -o for output file
-                codex exec "${cmd_args[@]}" -o "$OUTPUT_FILE" "$PROMPT"
+                codex exec "${cmd_args[@]}" -o "$OUTPUT_FILE" - < "$PROMPT_FILE"
             else
-                codex exec "${cmd_args[@]}" "$PROMPT"
+                codex exec "${cmd_args[@]}" - < "$PROMPT_FILE"
             fi
         fi
     fi
@@ -732,38 +784,54 @@ if [[ -n "$API_MODEL" && "$MODE" == "headless" ]]; then
 
     api_args=(
         --model "$API_MODEL"
-        --prompt "$PROMPT"
+        --prompt-file "$PROMPT_FILE"
     )
 
     if [[ -n "$STATS_FILE" ]]; then
         api_args+=(--stats-file "$STATS_FILE")
         api_args+=(--stats-stage "$STATS_STAGE")
         api_args+=(--stats-context "$STATS_CONTEXT")
+        api_args+=(--wrapper-start-ts "$WRAPPER_START_TS")
     fi
 
     if [[ -n "$MAX_TOKENS" ]]; then
         api_args+=(--max-tokens "$MAX_TOKENS")
     fi
 
-    if [[ -n "$OUTPUT_FILE" ]]; then
-        python3 "$API_CALLER" "${api_args[@]}" > "$OUTPUT_FILE"
-    else
-        python3 "$API_CALLER" "${api_args[@]}"
+    if [[ -n "$STREAM_FILE" ]]; then
+        api_args+=(--stream-file "$STREAM_FILE")
     fi
 
+    if [[ -n "$JSON_SCHEMA" ]]; then
+        api_args+=(--json-schema "$JSON_SCHEMA")
+    fi
+
+    call_api() {
+        if [[ -n "$OUTPUT_FILE" ]]; then
+            python3 "$API_CALLER" "${api_args[@]}" > "$OUTPUT_FILE"
+        else
+            python3 "$API_CALLER" "${api_args[@]}"
+        fi
+    }
+
+    traced_call call_api
     exit $?
 fi
 
 # ============================================================================
 # Route to provider (CLI mode)
 # ============================================================================
+if [[ "$MODE" == "headless" ]]; then
+    ledger_acquire "$PROVIDER" || exit 1
+fi
+
 case "$PROVIDER" in
     claude)
         if ! command -v claude &> /dev/null; then
             echo "Error: claude CLI not found. Install from: https://claude.ai/code" >&2
             exit 1
         fi
-        call_claude
+        traced_call call_claude
         exit $?
         ;;
     gemini)
@@ -771,7 +839,7 @@ case "$PROVIDER" in
             echo "Error: gemini CLI not found. Install from: https://github.com/google-gemini/gemini-cli" >&2
             exit 1
         fi
-        call_gemini
+        traced_call call_gemini
         exit $?
         ;;
     codex|openai)
@@ -779,7 +847,7 @@ case "$PROVIDER" in
             echo "Error: codex CLI not found. Install from: https://github.com/openai/codex" >&2
             exit 1
         fi
-        call_codex
+        traced_call call_codex
         exit $?
         ;;
     *)
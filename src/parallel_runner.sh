@@ -2,6 +2,12 @@
 #
 # Parallel Task Runner - Execute tasks in parallel with configurable concurrency
 # Usage: parallel_runner.sh --tasks tasks.txt --concurrency N --output-dir dir [--command "cmd {}"]
+#                           [--stage NAME [--stats-file FILE]]
+#
+# With --stage, tasks run under the stage's timeouts from config.yaml
+# (see utils/task_watchdog.py); killed tasks are re-queued at the end.
+# The task file is also reordered longest task first and the predicted and
+# actual makespan are recorded (see task_planner.py).
 #
 
 set -euo pipefail
@@ -13,6 +19,8 @@ OUTPUT_DIR=""
 COMMAND=""
 VERBOSE=false
 FORCE_XARGS=false
+STAGE=""
+STATS_FILE=""
 
 # Parse arguments
 while [[ $# -gt 0 ]]; do
@@ -41,6 +49,14 @@ while [[ $# -gt 0 ]]; do
             FORCE_XARGS=true
             shift
             ;;
+        --stage)
+            STAGE="$2"
+            shift 2
+            ;;
+        --stats-file)
+            STATS_FILE="$2"
+            shift 2
+            ;;
         *)
             echo "Unknown option: $1" >&2
             exit 1
@@ -65,9 +81,49 @@ if [[ -n "$OUTPUT_DIR" ]]; then
     mkdir -p "$OUTPUT_DIR"
 fi
 
+# All tasks are queued now; llm_caller.sh records the wait in the stats file
+export LLM_ENQUEUE_TS="${EPOCHREALTIME:-$(date +%s)}"
+LLM_ENQUEUE_TS="${LLM_ENQUEUE_TS/,/.}"
+
+# Tracing (enabled by --trace on the orchestrators)
+source "$(dirname "${BASH_SOURCE[0]}")/utils/tracing.sh"
+trace_now
+RUNNER_TRACE_START="$TRACE_NOW_US"
+
 # Count total tasks
 TOTAL_TASKS=$(wc -l < "$TASKS_FILE" | tr -d ' ')
 
+# Timeouts and watchdog for this stage (0 = no limit)
+WATCHDOG=""
+TASK_TIMEOUT=0
+TASK_IDLE_TIMEOUT=0
+TASK_RETRIES=0
+if [[ -n "$STAGE" ]]; then
+    read -r TASK_TIMEOUT TASK_IDLE_TIMEOUT TASK_RETRIES <<< \
+        "$(python3 "$(dirname "${BASH_SOURCE[0]}")/utils/task_watchdog.py" --limits "$STAGE" || echo "0 0 0")"
+    if [[ $TASK_TIMEOUT -gt 0 || $TASK_IDLE_TIMEOUT -gt 0 ]]; then
+        WATCHDOG="$(dirname "${BASH_SOURCE[0]}")/utils/task_watchdog.py"
+    fi
+fi
+# Task IDs killed by the watchdog with retries left (xargs mode; the other
+# modes retry in place)
+REQUEUE_FILE=""
+# Task IDs that failed in their latest attempt (xargs mode with re-queueing)
+FAILED_FILE=""
+export WATCHDOG STAGE STATS_FILE TASK_TIMEOUT TASK_IDLE_TIMEOUT TASK_RETRIES REQUEUE_FILE FAILED_FILE
+
+# Longest tasks first, so no large task starts when the other workers are
+# nearly done; the predicted makespan is compared with the actual one below
+PREDICTED_MAKESPAN=""
+FILE_ORDER_MAKESPAN=""
+if [[ -n "$STAGE" && $TOTAL_TASKS -gt 1 ]]; then
+    read -r PREDICTED_MAKESPAN FILE_ORDER_MAKESPAN <<< \
+        "$(python3 "$(dirname "${BASH_SOURCE[0]}")/task_planner.py" order --tasks "$TASKS_FILE" \
+            --stage "$STAGE" --concurrency "$CONCURRENCY" ${STATS_FILE:+--stats-file "$STATS_FILE"} || true)" || true
+fi
+RUNNER_START="${EPOCHREALTIME:-$(date +%s)}"
+RUNNER_START="${RUNNER_START/,/.}"
+
 if [[ $VERBOSE == true ]]; then
     echo "Parallel Task Runner"
     echo "===================="
@@ -75,9 +131,35 @@ if [[ $VERBOSE == true ]]; then
     echo "Total tasks: $TOTAL_TASKS"
     echo "Concurrency: $CONCURRENCY"
     echo "Output directory: ${OUTPUT_DIR:-none}"
+    if [[ -n "$WATCHDOG" ]]; then
+        echo "Timeouts: task ${TASK_TIMEOUT}s, idle ${TASK_IDLE_TIMEOUT}s, retries $TASK_RETRIES"
+    fi
     echo ""
 fi
 
+# Run a task command, under the watchdog when this stage has timeouts
+# Usage: run_task_command <command> <task_id>
+run_task_command() {
+    if [[ -n "$WATCHDOG" ]]; then
+        local watchdog_args=(
+            --stage "$STAGE"
+            --timeout "$TASK_TIMEOUT"
+            --idle-timeout "$TASK_IDLE_TIMEOUT"
+            --retries "$TASK_RETRIES"
+            --task-id "$2"
+        )
+        if [[ -n "$STATS_FILE" ]]; then
+            watchdog_args+=(--stats-file "$STATS_FILE")
+        fi
+        if [[ -n "$REQUEUE_FILE" ]]; then
+            watchdog_args+=(--requeue-file "$REQUEUE_FILE")
+        fi
+        python3 "$WATCHDOG" "${watchdog_args[@]}" -- bash -c "$1"
+    else
+        eval "$1"
+    fi
+}
+
 # Function to execute a single task
 execute_task() {
     local task="$1"
@@ -85,6 +167,19 @@ execute_task() {
     local output_dir="$3"
     local command="$4"
 
+    # Task start, for the queue/startup split in the stats file
+    export LLM_TASK_START_TS="${EPOCHREALTIME:-$(date +%s)}"
+    LLM_TASK_START_TS="${LLM_TASK_START_TS/,/.}"
+
+    # Each task gets its own trace track; agents and LLM calls nest under it
+    local trace_start=""
+    if [[ -n "${AGENTIC_TRACE_DIR:-}" ]]; then
+        export AGENTIC_TRACE_TID=$$
+        _trace_metadata thread_name "task $task_id"
+        trace_now
+        trace_start="$TRACE_NOW_US"
+    fi
+
     # Create output file if directory specified
     local output_file=""
     if [[ -n "$output_dir" ]]; then
@@ -96,21 +191,27 @@ execute_task() {
         # Use custom command (replace {} with task)
         local cmd="${command//\{\}/$task}"
         if [[ -n "$output_file" ]]; then
-            eval "$cmd" > "$output_file" 2>&1
+            run_task_command "$cmd" "$task_id" > "$output_file" 2>&1
         else
-            eval "$cmd"
+            run_task_command "$cmd" "$task_id"
         fi
     else
         # Execute task directly as shell command
         if [[ -n "$output_file" ]]; then
-            eval "$task" > "$output_file" 2>&1
+            run_task_command "$task" "$task_id" > "$output_file" 2>&1
         else
-            eval "$task"
+            run_task_command "$task" "$task_id"
         fi
     fi
 
     local exit_code=$?
 
+    if [[ -n "$trace_start" ]]; then
+        local task_label
+        task_label=$(_trace_escape "${task:0:300}")
+        trace_complete "task $task_id" task "$trace_start" "{\"command\":\"$task_label\",\"exit_code\":$exit_code}"
+    fi
+
     # Record result
     if [[ -n "$output_file" ]]; then
         echo "EXIT_CODE=$exit_code" >> "$output_file"
@@ -131,13 +232,20 @@ execute_task_by_line() {
     local task=$(sed -n "${line_num}p" "$tasks_file")
 
     if [[ -n "$task" ]]; then
-        execute_task "$task" "$line_num" "$output_dir" "$command"
+        local exit_code=0
+        execute_task "$task" "$line_num" "$output_dir" "$command" || exit_code=$?
+        if [[ $exit_code -ne 0 && -n "${FAILED_FILE:-}" ]]; then
+            echo "$line_num" >> "$FAILED_FILE"
+        fi
+        return $exit_code
     fi
 }
 
 # Export functions for use in subshells
 export -f execute_task
 export -f execute_task_by_line
+export -f run_task_command
+export -f trace_now trace_complete _trace_escape _trace_write _trace_metadata
 
 # Check if GNU parallel is available
 if command -v parallel &> /dev/null && [[ $FORCE_XARGS == false ]]; then
@@ -152,6 +260,13 @@ if command -v parallel &> /dev/null && [[ $FORCE_XARGS == false ]]; then
     PARALLEL_CMD+=" --jobs $CONCURRENCY"
     PARALLEL_CMD+=" --line-buffer"
 
+    # Under the watchdog, each task runs through run_task_command (job number
+    # as task ID). Killed tasks are retried in place rather than re-queued.
+    if [[ -n "$WATCHDOG" && -z "$COMMAND" ]]; then
+        COMMAND="run_task_command {} {#}"
+        export PARALLEL_SHELL=bash
+    fi
+
     # Redirect parallel output to log file and poll progress
     PARALLEL_LOG=$(mktemp)
 
@@ -245,6 +360,7 @@ elif command -v xargs &> /dev/null; then
     # Instead of passing the command line through xargs, we pass line numbers
     # and read the actual command from the file inside the worker
     EXIT_CODE=0
+    TASK_WORKER=execute_task_by_line
 
     # Create a progress tracking mechanism for xargs
     if [[ $VERBOSE == true ]]; then
@@ -305,16 +421,53 @@ elif command -v xargs &> /dev/null; then
             return $result
         }
         export -f task_with_progress
+        TASK_WORKER=task_with_progress
 
         # Show initial progress
         printf "\n[0%%] 0/%d tasks\n" "$TOTAL_TASKS" >&2
+    fi
 
-        if [[ -n "$COMMAND" ]]; then
-            seq 1 "$TOTAL_TASKS" | xargs -P "$CONCURRENCY" -I {} bash -c 'task_with_progress "{}" "'"$TASKS_FILE"'" "'"$OUTPUT_DIR"'" "'"$COMMAND"'"' || EXIT_CODE=$?
-        else
-            seq 1 "$TOTAL_TASKS" | xargs -P "$CONCURRENCY" -I {} bash -c 'task_with_progress "{}" "'"$TASKS_FILE"'" "'"$OUTPUT_DIR"'" ""' || EXIT_CODE=$?
+    # Run the tasks whose line numbers are on stdin
+    run_pass() {
+        xargs -P "$CONCURRENCY" -I {} bash -c "$TASK_WORKER"' "{}" "'"$TASKS_FILE"'" "'"$OUTPUT_DIR"'" "'"$COMMAND"'"'
+    }
+
+    if [[ -n "$WATCHDOG" ]]; then
+        REQUEUE_FILE=$(mktemp)
+        FAILED_FILE=$(mktemp)
+    fi
+    seq 1 "$TOTAL_TASKS" | run_pass || EXIT_CODE=$?
+
+    # Re-queue tasks killed by the watchdog, behind the rest of the stage
+    while [[ -n "$REQUEUE_FILE" && -s "$REQUEUE_FILE" ]]; do
+        REQUEUED=$(sort -n -u "$REQUEUE_FILE")
+        : > "$REQUEUE_FILE"
+        REQUEUED_COUNT=$(wc -l <<< "$REQUEUED" | tr -d ' ')
+        export LLM_ATTEMPT=$((${LLM_ATTEMPT:-0} + 1))
+        echo "⚠ Re-queued $REQUEUED_COUNT task(s) killed by the watchdog (retry $LLM_ATTEMPT of $TASK_RETRIES)" >&2
+        if [[ $VERBOSE == true ]]; then
+            echo "$((TOTAL_TASKS - REQUEUED_COUNT))" > "$PROGRESS_COUNTER"
         fi
+        # A re-queued task's earlier failure is replaced by the result of its retry
+        grep -vxF -f <(echo "$REQUEUED") "$FAILED_FILE" > "$FAILED_FILE.tmp" || true
+        mv "$FAILED_FILE.tmp" "$FAILED_FILE"
+        RETRY_EXIT=0
+        run_pass <<< "$REQUEUED" || RETRY_EXIT=$?
+        if [[ $RETRY_EXIT -ne 0 && $RETRY_EXIT -ne 123 ]]; then
+            EXIT_CODE=$RETRY_EXIT  # xargs itself failed, not a task
+        fi
+    done
+    if [[ -n "$REQUEUE_FILE" ]]; then
+        # Task failures (xargs exit 123) count only if a task failed its last attempt
+        if [[ $EXIT_CODE -eq 123 && ! -s "$FAILED_FILE" ]]; then
+            EXIT_CODE=0
+        elif [[ $EXIT_CODE -eq 0 && -s "$FAILED_FILE" ]]; then
+            EXIT_CODE=123
+        fi
+        rm -f "$REQUEUE_FILE" "$FAILED_FILE"
+    fi
 
+    if [[ $VERBOSE == true ]]; then
         # Show final status with error count
         ERROR_COUNT=$(find "$OUTPUT_DIR" -name stderr -type f -size +0 2>/dev/null | wc -l | tr -d ' ')
         if [[ $ERROR_COUNT -gt 0 ]]; then
@@ -325,13 +478,6 @@ elif command -v xargs &> /dev/null; then
 
         # Clean up temp directory
         rm -rf "$PROGRESS_DIR"
-    else
-        # Non-verbose mode - no progress tracking
-        if [[ -n "$COMMAND" ]]; then
-            seq 1 "$TOTAL_TASKS" | xargs -P "$CONCURRENCY" -I {} bash -c 'execute_task_by_line "{}" "'"$TASKS_FILE"'" "'"$OUTPUT_DIR"'" "'"$COMMAND"'"' || EXIT_CODE=$?
-        else
-            seq 1 "$TOTAL_TASKS" | xargs -P "$CONCURRENCY" -I {} bash -c 'execute_task_by_line "{}" "'"$TASKS_FILE"'" "'"$OUTPUT_DIR"'" ""' || EXIT_CODE=$?
-        fi
     fi
 
 else
@@ -357,6 +503,14 @@ else
     done < "$TASKS_FILE"
 fi
 
+trace_complete "parallel_runner ($TOTAL_TASKS tasks, concurrency $CONCURRENCY)" runner "$RUNNER_TRACE_START"
+
+if [[ -n "$PREDICTED_MAKESPAN" ]]; then
+    python3 "$(dirname "${BASH_SOURCE[0]}")/task_planner.py" makespan --stage "$STAGE" --tasks "$TOTAL_TASKS" \
+        --concurrency "$CONCURRENCY" --predicted "$PREDICTED_MAKESPAN" --file-order "$FILE_ORDER_MAKESPAN" \
+        --start "$RUNNER_START" ${STATS_FILE:+--stats-file "$STATS_FILE"} || true
+fi
+
 # Check for quota/rate limit errors
 check_quota_errors() {
     local output_dir="$1"
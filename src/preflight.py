@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Preflight: check every provider and model of a run before the markers fan out.
+
+A missing API key, an expired CLI login or a model that is not in
+configs/models.yaml otherwise shows up only when the first marker task fails,
+and then in every other task of the stage too. Before the marker stage the
+orchestrators list the providers and models the run will call (the stage
+models on the default provider, or the --api-model; the cascade's cheap
+model; the provider pool's members) and check each one:
+
+  1. model: the model is listed for the interface in configs/models.yaml,
+     for the provider it is called on
+  2. credentials: the provider's CLI is on the PATH, or an API key is set
+  3. quota: with the quota ledger enabled, the per-day budgets of the
+     provider are not used up (and cover the stage's calls, else a warning)
+  4. probe: one tiny headless call through llm_caller.sh returns text
+     (this catches expired logins, revoked keys, and exhausted quotas)
+
+A target that passed is cached for `cache_ttl` seconds in
+~/.cache/agentic-marker/preflight.json, shared by all runs (a batch probes
+each provider once, not once per assignment). Failures are never cached.
+
+A pool member that fails is dropped from the provider pool for the run; the
+run is aborted if any other target fails, or if no pool member is left.
+Probe calls are recorded in the stats file as stage "preflight".
+
+Usage (orchestrators):
+    preflight.py --provider claude [--marker-model M] [--normalizer-model M]
+                 [--unifier-model M] [--api-model M] [--cascade-model M]
+                 [--calls N] [--stats-file F]
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "utils"))
+sys.path.insert(0, str(Path(__file__).parent / "api"))
+from key_pool import KEY_ENV_VARS, discover_keys
+from provider_pool import POOL_ENV, classify_error, drop_member, get_pool_config, member_key
+from quota_ledger import get_ledger_config, normalize_provider, remaining
+from system_config import load_snapshot, resolve_provider_from_model
+from task_watchdog import run_guarded
+
+# Overrides the cache location (benchmarks use a per-run file)
+CACHE_ENV = 'AGENTIC_PREFLIGHT_CACHE'
+
+PROBE_PROMPT = "This is a connectivity check. Reply with the single word OK."
+PROBE_MAX_TOKENS = 16
+
+LLM_CALLER = Path(__file__).parent / "llm_caller.sh"
+
+
+def get_preflight_config() -> dict:
+    """
+    Get the preflight settings from config.yaml.
+
+    Returns:
+        dict: enabled (bool), cache (Path), cache_ttl and timeout (seconds)
+    """
+    config = load_snapshot()['system'].get('preflight') or {}
+    path = os.environ.get(CACHE_ENV) or config.get('cache')
+    if not path:
+        cache_home = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+        path = Path(cache_home) / 'agentic-marker' / 'preflight.json'
+    return {
+        'enabled': bool(config.get('enabled', True)),
+        'cache': Path(path).expanduser(),
+        'cache_ttl': int(config.get('cache_ttl', 300)),
+        'timeout': int(config.get('timeout', 120)),
+    }
+
+
+def target_key(target: dict) -> str:
+    """Cache key of a target, e.g. 'api:gemini/gemini-2.5-flash'."""
+    return f"{target['interface']}:{target['provider']}/{target['model'] or 'default'}"
+
+
+def collect_targets(args) -> list:
+    """
+    List the distinct (interface, provider, model) targets of the run.
+
+    Returns:
+        list: {interface, provider, model, roles, pool_member, required}
+              dicts; a target that is only a pool member (not required) is
+              dropped from the pool when it fails instead of aborting the run
+    """
+    targets = {}
+
+    def add(interface, provider, model, role, pool_member=None):
+        target = {'interface': interface, 'provider': provider, 'model': model or '',
+                  'roles': [], 'pool_member': None, 'required': False}
+        target = targets.setdefault(target_key(target), target)
+        if role not in target['roles']:
+            target['roles'].append(role)
+        if pool_member is None:
+            target['required'] = True
+        else:
+            target['pool_member'] = pool_member
+
+    if args.api_model:
+        for role, model in (('stages', args.api_model), ('cascade', args.cascade_model)):
+            if model:
+                add('api', resolve_provider_from_model(model, 'api_models') or args.provider, model, role)
+        return list(targets.values())
+
+    pool = get_pool_config() if os.environ.get(POOL_ENV) else None
+    pooled = {'marker', 'unifier'} if pool and pool['members'] else set()
+    for role, model in (('marker', args.marker_model), ('normalizer', args.normalizer_model),
+                        ('unifier', args.unifier_model)):
+        if role not in pooled:
+            add('cli', args.provider, model, role)
+    if args.cascade_model:
+        add('cli', resolve_provider_from_model(args.cascade_model, 'cli_models') or args.provider,
+            args.cascade_model, 'cascade')
+    for member in (pool['members'] if pooled else []):
+        add('cli', member['provider'], member['model'], 'pool', member)
+    return list(targets.values())
+
+
+def check_model(target: dict) -> str | None:
+    """Problem with the target's model in models.yaml, or None."""
+    if not target['model']:
+        return None
+    section = 'api_models' if target['interface'] == 'api' else 'cli_models'
+    provider = resolve_provider_from_model(target['model'], section)
+    if provider is None:
+        return f"model '{target['model']}' is not in {section} in configs/models.yaml"
+    if normalize_provider(provider) != normalize_provider(target['provider']):
+        return f"model '{target['model']}' is a {provider} model, not {target['provider']}"
+    return None
+
+
+def check_credentials(target: dict) -> str | None:
+    """Problem with the target's CLI or API key, or None."""
+    if target['interface'] == 'cli':
+        if not shutil.which(target['provider']):
+            return f"the {target['provider']} CLI is not on the PATH"
+        return None
+    key_provider = {'anthropic': 'claude', 'google': 'gemini', 'codex': 'openai'}.get(
+        target['provider'], target['provider'])
+    if not discover_keys(key_provider):
+        names = KEY_ENV_VARS.get(key_provider, [])
+        return f"no {target['provider']} API key set ({', '.join(names)})"
+    return None
+
+
+def check_quota(target: dict, calls: int) -> tuple:
+    """
+    Check the provider's per-day budgets in the quota ledger.
+
+    Returns:
+        Tuple of (problem or None, warning or None)
+    """
+    if not get_ledger_config()['enabled']:
+        return None, None
+    scope = f"{target['interface']}:{normalize_provider(target['provider'])}"
+    entry = remaining(target['interface'], target['provider']).get(scope)
+    if not entry:
+        return None, None
+    for key in ('requests_per_day', 'tokens_per_day'):
+        if key in entry and entry[key]['remaining'] <= 0:
+            return f"quota ledger: {key} used up ({entry[key]['limit']:,})", None
+    budget = entry.get('requests_per_day')
+    if budget and calls > budget['remaining']:
+        return None, (f"quota ledger: {budget['remaining']:,} requests_per_day left for "
+                      f"{calls:,} calls")
+    return None, None
+
+
+def probe(target: dict, timeout: int, stats_file: str | None) -> str | None:
+    """
+    Send the probe prompt to the target through llm_caller.sh.
+
+    Returns:
+        str: Problem (error class and the end of the error output), or None
+    """
+    cmd = [str(LLM_CALLER), "--prompt", PROBE_PROMPT, "--mode", "headless",
+           "--provider", target['provider'], "--max-tokens", str(PROBE_MAX_TOKENS), "--auto-approve"]
+    if target['interface'] == 'api':
+        cmd.extend(["--api-model", target['model']])
+    elif target['model']:
+        cmd.extend(["--model", target['model']])
+    if stats_file:
+        cmd.extend(["--stats-file", stats_file, "--stats-stage", "preflight",
+                     "--stats-context", target_key(target)])
+
+    result = run_guarded(cmd, timeout=timeout)
+    if result.killed:
+        return f"probe got no response within {timeout}s"
+    if result.returncode == 0 and result.stdout.strip():
+        return None
+    output = (result.stderr or '') + (result.stdout or '')
+    lines = [line.strip() for line in output.strip().splitlines() if line.strip()]
+    detail = lines[-1][:200] if lines else f"exit status {result.returncode}, no output"
+    return f"probe failed ({classify_error(output, target['provider'])} error): {detail}"
+
+
+def load_cache(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_cache(path: Path, passed: dict):
+    """Merge passed targets ({key: checked_at}) into the cache file under a lock."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        cache = load_cache(path)
+        cache.update(passed)
+        tmp = path.with_name(path.name + f'.{os.getpid()}.tmp')
+        tmp.write_text(json.dumps(cache, indent=2), encoding='utf-8')
+        os.replace(tmp, path)
+
+
+def run_preflight(targets: list, config: dict, calls: int = 0,
+                  stats_file: str | None = None) -> list:
+    """
+    Check each target, using cached passes younger than cache_ttl.
+
+    Args:
+        targets: Targets from collect_targets()
+        config: Settings from get_preflight_config()
+        calls: Calls the stage will make (for the quota warning)
+        stats_file: Stats JSONL for the probe calls (optional)
+
+    Returns:
+        list: (target, problem or None) pairs, in the order of targets
+    """
+    cache = load_cache(config['cache'])
+    now = time.time()
+    results = []
+    passed = {}
+    for target in targets:
+        key = target_key(target)
+        label = f"{key} ({', '.join(target['roles'])})"
+        problem = check_model(target) or check_credentials(target)
+        warning = None
+        if not problem:
+            problem, warning = check_quota(target, calls)
+        if warning:
+            print(f"  ⚠ {label}: {warning}")
+        if not problem:
+            age = now - cache.get(key, 0)
+            if age < config['cache_ttl']:
+                print(f"  ✓ {label}: passed {age:.0f}s ago (cached)")
+                results.append((target, None))
+                continue
+            start = time.monotonic()
+            problem = probe(target, config['timeout'], stats_file)
+            if not problem:
+                passed[key] = time.time()
+                print(f"  ✓ {label}: probe answered in {time.monotonic() - start:.1f}s")
+        if problem:
+            print(f"  ⚠ {label}: {problem}")
+        results.append((target, problem))
+    if passed:
+        save_cache(config['cache'], passed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check the run's providers and models before the marker stage")
+    parser.add_argument('--provider', required=True, help='Default provider of the run')
+    parser.add_argument('--marker-model', default='', help='Marker model (empty = the CLI default)')
+    parser.add_argument('--normalizer-model', default='', help='Normalizer model')
+    parser.add_argument('--unifier-model', default='', help='Unifier model')
+    parser.add_argument('--api-model', default='', help='The run\'s API model (API mode)')
+    parser.add_argument('--cascade-model', default='', help='The cascade\'s cheap model')
+    parser.add_argument('--calls', type=int, default=0, help='Calls the marker stage will make')
+    parser.add_argument('--stats-file', help='Stats JSONL for the probe calls')
+    args = parser.parse_args()
+
+    config = get_preflight_config()
+    if not config['enabled']:
+        return 0
+
+    targets = collect_targets(args)
+    print(f"Preflight: {len(targets)} provider/model target(s)")
+    results = run_preflight(targets, config, args.calls, args.stats_file)
+
+    failed = [(t, p) for t, p in results if p and t['required']]
+    dropped = [(t, p) for t, p in results if p and not t['required']]
+    members = [(t, p) for t, p in results if t['pool_member'] is not None]
+    if members and all(p for _, p in members):
+        failed.extend(dropped)
+        print("Error: No provider pool member passed the preflight check", file=sys.stderr)
+    elif dropped:
+        state_path = Path(os.environ[POOL_ENV])
+        for target, problem in dropped:
+            drop_member(state_path, target['pool_member'], f"preflight: {problem}")
+            print(f"⚠ {member_key(target['pool_member'])} dropped from the provider pool for this run")
+
+    if failed:
+        for target, problem in failed:
+            print(f"Error: {target_key(target)}: {problem}", file=sys.stderr)
+        return 1
+    print(f"✓ Preflight passed ({len(targets) - len(dropped)} of {len(targets)} target(s) usable)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
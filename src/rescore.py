@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Re-scoring Engine - Deterministic Mark Recalculation
+
+Recomputes every student's activity and total marks from an (edited)
+approved_scheme.json and student_mappings.json, patches the numeric lines of
+the feedback cards in final/ (and the marks of the unifier's JSON next to
+them), then regenerates grades.csv and the filled gradebooks. No LLM calls
+are made, so a policy change (e.g. dropping a penalty) is applied to a whole
+class in seconds and cannot drift from the scheme.
+
+Usage:
+    python3 rescore.py --assignment-dir assignments/lab1
+    python3 rescore.py --assignment-dir assignments/lab1 --dry-run
+    python3 rescore.py --assignment-dir assignments/lab1 --zero-matching random_state
+"""
+
+import argparse
+import json
+import re
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent / "utils"))
+from aggregate_grades import generate_csv
+from apply_translation import apply_gradebook_updates, load_grades_csv, normalize_name
+from clean_artifacts import clean_file, load_artifacts
+from config_parser import parse_overview
+from marking_scheme import (
+    compute_student_marks,
+    format_mark,
+    load_scheme,
+    load_student_mappings,
+    scheme_values,
+)
+from structured_output import activity_number, load_json_output, write_json_output
+
+
+ARTIFACTS_FILE = Path(__file__).parent.parent / "configs" / "processing_artifacts.jsonl"
+
+# "Total Mark: 83 / 100", "**Total Mark**: 83/100"
+TOTAL_MARK_PATTERN = re.compile(r'(\*{0,2}Total Mark\*{0,2}\s*:\s*\*{0,2}\s*)([\d.]+)(\s*/\s*[\d.]+)',
+                                re.IGNORECASE)
+# "- Activity 1: 6 / 20", "**Activity 1**: 6/20"
+ACTIVITY_MARK_PATTERN = re.compile(r'(Activity\s+(\d+)\*{0,2}\s*:\s*\*{0,2}\s*)([\d.]+)(\s*/\s*[\d.]+)',
+                                   re.IGNORECASE)
+# Calculation block line "Total: 83 / 100"
+CALCULATION_TOTAL_PATTERN = re.compile(r'^([ \t>*-]*\*{0,2}Total\*{0,2}\s*:\s*)([\d.]+)(\s*/\s*[\d.]+)',
+                                       re.IGNORECASE | re.MULTILINE)
+
+
+def patch_feedback_marks(content: str, activity_results: Dict[str, float], total: float) -> str:
+    """Replace the numeric mark lines of a feedback card with recomputed values."""
+    total_text = format_mark(total)
+    content = TOTAL_MARK_PATTERN.sub(lambda m: f"{m.group(1)}{total_text}{m.group(3)}", content)
+    content = CALCULATION_TOTAL_PATTERN.sub(lambda m: f"{m.group(1)}{total_text}{m.group(3)}", content)
+
+    def replace_activity(match):
+        activity_id = f"A{match.group(2)}"
+        if activity_id not in activity_results:
+            return match.group(0)
+        return f"{match.group(1)}{format_mark(activity_results[activity_id])}{match.group(4)}"
+
+    return ACTIVITY_MARK_PATTERN.sub(replace_activity, content)
+
+
+def patch_json_marks(data: Dict, activity_results: Dict[str, float], total: float) -> Dict:
+    """Set the marks of a unifier JSON (utils/structured_output.py) to recomputed values."""
+    activity_marks = []
+    for entry in data['activity_marks']:
+        number = activity_number(entry['activity'])
+        if number and f"A{number}" in activity_results:
+            entry = dict(entry, mark=activity_results[f"A{number}"])
+        activity_marks.append(entry)
+    return dict(data, total_mark=total, activity_marks=activity_marks)
+
+
+def zero_matching_codes(scheme: Dict, combined_scoring: Dict, text: str) -> List[str]:
+    """
+    Set every code whose description mentions text to 0 in the scheme (in place).
+
+    Returns:
+        List of codes that were changed
+    """
+    needle = text.lower()
+    descriptions = {}
+    for entry in combined_scoring.get('mistakes', []) + combined_scoring.get('positives', []):
+        descriptions[entry.get('id', '')] = entry.get('description', '')
+
+    changed = []
+    for side, value_key in (('mistakes', 'suggested_deduction'), ('positives', 'suggested_bonus')):
+        entries = scheme.get(side, {})
+        if isinstance(entries, dict):
+            for code, value in entries.items():
+                description = descriptions.get(code.replace('`', ''), '')
+                if needle in description.lower() and value != 0.0:
+                    entries[code] = 0.0
+                    changed.append(code)
+        elif isinstance(entries, list):
+            for entry in entries:
+                description = entry.get('description', '') or descriptions.get(entry.get('id', ''), '')
+                if needle in description.lower() and entry.get(value_key, 0.0) != 0.0:
+                    entry[value_key] = 0.0
+                    changed.append(entry.get('id', ''))
+    return changed
+
+
+def index_feedback_files(final_dir: Path) -> Dict[str, Path]:
+    """Index feedback cards by normalized file stem and by card header name."""
+    index = {}
+    for feedback_file in sorted(final_dir.glob('*_feedback.md')):
+        index.setdefault(normalize_name(feedback_file.name[:-len('_feedback.md')]), feedback_file)
+        with open(feedback_file, 'r', encoding='utf-8') as f:
+            header = re.search(r'ASSIGNMENT FEEDBACK - (.+?)$', f.read(), re.MULTILINE)
+        if header:
+            index.setdefault(normalize_name(header.group(1)), feedback_file)
+    return index
+
+
+def rescore(assignment_dir: Path, scheme: Dict, mappings_path: Path,
+            assignment_type: str, dry_run: bool = False) -> Tuple[List[Dict], List[str], List[Path]]:
+    """
+    Recompute marks and patch feedback cards.
+
+    Returns:
+        Tuple of (changes, unmatched_students, untouched_feedback_files)
+    """
+    final_dir = assignment_dir / "processed" / "final"
+    mistake_values, positive_values = scheme_values(scheme)
+    total_marks = float(scheme.get('total_marks', 100))
+    activity_marks = scheme.get('activity_marks', {}) if assignment_type == 'structured' else {}
+
+    mappings = load_student_mappings(mappings_path)
+    feedback_index = index_feedback_files(final_dir)
+
+    changes = []
+    unmatched = []
+    touched = set()
+
+    for student_name, mapping in sorted(mappings.items()):
+        feedback_file = feedback_index.get(normalize_name(student_name))
+        if feedback_file is None:
+            unmatched.append(student_name)
+            continue
+        touched.add(feedback_file)
+
+        activity_results, total = compute_student_marks(
+            mapping, mistake_values, positive_values, activity_marks, total_marks)
+
+        with open(feedback_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        data = load_json_output(feedback_file, 'unifier')
+        old_total = TOTAL_MARK_PATTERN.search(content)
+        patched = patch_feedback_marks(content, activity_results, total)
+        if patched == content:
+            continue
+
+        changes.append({
+            'student': student_name,
+            'file': feedback_file.name,
+            'old_total': float(old_total.group(2)) if old_total else None,
+            'new_total': total,
+        })
+        if not dry_run:
+            with open(feedback_file, 'w', encoding='utf-8') as f:
+                f.write(patched)
+            if data is not None:
+                write_json_output(feedback_file, patch_json_marks(data, activity_results, total))
+
+    untouched = sorted(set(feedback_index.values()) - touched)
+    return changes, unmatched, untouched
+
+
+def refresh_outputs(assignment_dir: Path, total_marks: float, assignment_type: str,
+                    clean_artifacts: bool = True, update_gradebooks: bool = True) -> bool:
+    """Regenerate grades.csv and the filled gradebooks from the feedback cards."""
+    processed_dir = assignment_dir / "processed"
+    final_dir = processed_dir / "final"
+    grades_csv = final_dir / "grades.csv"
+
+    if not generate_csv(final_dir, grades_csv, total_marks, assignment_type):
+        return False
+
+    if clean_artifacts:
+        artifacts = load_artifacts(ARTIFACTS_FILE, quiet=True)
+        if artifacts:
+            clean_file(grades_csv, artifacts, in_place=True, quiet=True)
+
+    mapping_path = processed_dir / "translation" / "translation_mapping.json"
+    if update_gradebooks and mapping_path.exists():
+        with open(mapping_path, 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+        grades = load_grades_csv(str(grades_csv))
+        for gradebook_config in mapping.get('gradebooks', []):
+            apply_gradebook_updates(gradebook_config, grades, mapping_path.parent)
+
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Recompute marks from the approved scheme without calling an LLM'
+    )
+    parser.add_argument('--assignment-dir', required=True, help='Assignment directory')
+    parser.add_argument('--scheme', help='Approved scheme (default: processed/approved_scheme.json)')
+    parser.add_argument('--mappings',
+                        help='Student mappings (default: processed/normalized/student_mappings.json)')
+    parser.add_argument('--type', choices=['structured', 'freeform'],
+                        help='Assignment type (default: from overview.md)')
+    parser.add_argument('--zero-matching', metavar='TEXT',
+                        help='Set codes whose description contains TEXT to 0 before re-scoring '
+                             '(the scheme is updated; a .bak copy is kept)')
+    parser.add_argument('--dry-run', action='store_true', help='Show changes without writing files')
+    parser.add_argument('--no-gradebooks', action='store_true',
+                        help='Do not refresh the filled gradebooks')
+    parser.add_argument('--no-clean-artifacts', action='store_true',
+                        help='Do not clean artifacts from grades.csv')
+    parser.add_argument('-v', '--verbose', action='store_true', help='List every changed student')
+
+    args = parser.parse_args()
+
+    assignment_dir = Path(args.assignment_dir)
+    processed_dir = assignment_dir / "processed"
+    scheme_path = Path(args.scheme) if args.scheme else processed_dir / "approved_scheme.json"
+    mappings_path = (Path(args.mappings) if args.mappings
+                     else processed_dir / "normalized" / "student_mappings.json")
+
+    for path in (scheme_path, mappings_path, processed_dir / "final"):
+        if not path.exists():
+            print(f"Error: Not found: {path}", file=sys.stderr)
+            return 1
+
+    assignment_type = args.type or parse_overview(str(assignment_dir / "overview.md"))['assignment_type']
+
+    scheme = load_scheme(scheme_path)
+
+    if args.zero_matching:
+        combined_path = processed_dir / "normalized" / "combined_scoring.json"
+        combined = {}
+        if combined_path.exists():
+            with open(combined_path, 'r', encoding='utf-8') as f:
+                combined = json.load(f)
+        zeroed = zero_matching_codes(scheme, combined, args.zero_matching)
+        print(f"Codes matching '{args.zero_matching}': {len(zeroed)} set to 0")
+        for code in zeroed:
+            print(f"  - {code}")
+        if zeroed and not args.dry_run:
+            shutil.copy2(scheme_path, scheme_path.with_suffix('.json.bak'))
+            with open(scheme_path, 'w', encoding='utf-8') as f:
+                json.dump(scheme, f, indent=2)
+            print(f"✓ Scheme updated: {scheme_path} (backup: {scheme_path.name}.bak)")
+
+    changes, unmatched, untouched = rescore(
+        assignment_dir, scheme, mappings_path, assignment_type, args.dry_run)
+
+    print(f"\n{'='*60}")
+    print("RE-SCORE SUMMARY" + (" (DRY RUN)" if args.dry_run else ""))
+    print('='*60)
+    print(f"Feedback cards changed: {len(changes)}")
+    if changes:
+        deltas = [c['new_total'] - c['old_total'] for c in changes if c['old_total'] is not None]
+        if deltas:
+            print(f"Average change: {sum(deltas) / len(deltas):+.2f} marks")
+        if args.verbose:
+            for change in changes:
+                old = format_mark(change['old_total']) if change['old_total'] is not None else '?'
+                print(f"  {change['student']}: {old} -> {format_mark(change['new_total'])}")
+    if unmatched:
+        print(f"\n⚠ {len(unmatched)} student(s) in student_mappings.json have no feedback card:")
+        for name in unmatched:
+            print(f"  - {name}")
+    if untouched:
+        print(f"\n⚠ {len(untouched)} feedback card(s) have no student mapping and were left unchanged:")
+        for path in untouched:
+            print(f"  - {path.name}")
+
+    if args.dry_run:
+        return 0
+
+    if not refresh_outputs(assignment_dir, scheme.get('total_marks', 100), assignment_type,
+                           clean_artifacts=not args.no_clean_artifacts,
+                           update_gradebooks=not args.no_gradebooks):
+        return 1
+
+    print("✓ Re-score complete")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
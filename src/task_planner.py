@@ -0,0 +1,656 @@
+#!/usr/bin/env python3
+"""
+Task Planner: task ordering and deadline-driven scheduling for a marking run.
+
+Task order: parallel_runner.sh hands tasks out in file order, which is sorted
+by student and activity, so a large notebook that happens to come last keeps
+the stage running long after the other workers are idle. Before a stage runs,
+`order` estimates each task's time from its prompt size (the submission, and
+the markings the normalizer and unifier read) and the latency measured for
+its activity in the run's stats file (90 s per call, or 180 s for the
+normalizer, until there are samples):
+
+    seconds = activity latency * (1 - SIZE_WEIGHT + SIZE_WEIGHT * size / mean size)
+
+and rewrites the task file longest first (LPT), with tasks that failed or
+were killed earlier in the run ahead of the rest (they are the likeliest to
+need a retry). `task_order: file` in config.yaml keeps the file order. The
+predicted makespan (a list schedule of the estimates over the stage's
+workers) is printed with the file-order prediction, and `makespan` records
+it with the actual wall time as a stats event (event: makespan), shown by
+utils/show_stats.sh.
+
+Deadline mode: with --deadline, the orchestrators ask the planner at each stage boundary
+whether the run will finish in time. The remaining work is read from the
+processed/ directory (markings, normalized scoring files and feedback cards
+still missing); each remaining call is costed with the latency measured for
+its stage and model in the run's stats file (defaults until there are
+samples) and, when the quota ledger has a per-minute token or request budget
+for the provider, with that throughput limit. Stages run in waves of the
+run's parallelism, one after another, so the projection is
+
+    sum over stages of max(ceil(calls / parallel) * seconds per call,
+                           calls / budget per minute)
+
+When the projected finish is after the deadline, the planner
+
+  1. raises the parallelism, up to deadline.max_parallel in config.yaml
+     (0 = twice the run's max_parallel), to the lowest value that finishes
+     in time, then
+  2. if that is not enough, moves the remaining stages one step down the
+     provider's chain of faster models (faster_models in models.yaml), and
+  3. reports the run as behind schedule, so the orchestrators defer work that
+     is not on the critical path to grades.csv (the cascade's second round
+     and gradebook translation) and run the normalizers in parallel.
+
+Interactive stages (pattern design, dashboard approval) are not projected.
+Every projection is appended to processed/logs/deadline.log; `monitor` adds
+one every deadline.monitor_interval seconds while the orchestrator runs.
+
+Usage (parallel_runner.sh):
+    task_planner.py order --tasks F --stage S --concurrency N [--stats-file F]
+        Reorder a task file; print the predicted and file-order makespans
+    task_planner.py makespan --stage S --tasks N --concurrency N --predicted P
+                             --file-order P --start T [--stats-file F]
+        Record the predicted and actual makespan of a stage
+
+Usage (orchestrators):
+    task_planner.py plan --processed-dir D --type T --students S --activities A
+                         --deadline "2026-10-20 09:00" --concurrency N --base-parallel N
+                         [--provider P] [--model M] [--api-model M] [--checkpoint LABEL]
+        Print MAX_PARALLEL=, DEADLINE_MODEL= and DEADLINE_BEHIND= for eval
+    task_planner.py monitor --parent-pid PID (same projection arguments)
+        Log a projection periodically until PID exits
+    task_planner.py share --deadline D --parts N
+        Print the deadline of the next of N runs that share D (batch_mark.sh)
+"""
+
+import argparse
+import functools
+import glob
+import heapq
+import json
+import math
+import os
+import re
+import shlex
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "utils"))
+from extract_activities import ActivityExtractor
+from llm_telemetry import append_stats_entry
+from quota_ledger import get_budget, get_ledger_config, normalize_provider
+from system_config import is_expensive_model, load_models_config, load_snapshot, resolve_provider_from_model
+
+# Stages with headless LLM calls, in pipeline order
+STAGES = ['marker', 'normalizer', 'unifier']
+
+# Seconds per call until the stats file has samples for a stage
+DEFAULT_CALL_SECONDS = {'marker': 90, 'normalizer': 180, 'unifier': 90}
+
+# Parallel stages whose tasks make the calls of several stages in turn
+# (free-form student-major order: a student's marker, then their unifier)
+COMPOSITE_STAGES = {'student': ('marker', 'unifier')}
+
+# Samples needed before a model's own latency is used for its stage
+MIN_MODEL_SAMPLES = 3
+
+# Share of a call's latency taken to grow with its prompt size (the rest is
+# output and overhead, about the same for every task of an activity)
+SIZE_WEIGHT = 0.5
+
+ACTIVITY = re.compile(r'^A\d+$')
+
+
+def get_deadline_config() -> dict:
+    """
+    Get the deadline settings from config.yaml.
+
+    Returns:
+        dict: max_parallel (0 = twice the run's), downgrade (bool),
+              downgrade_speedup, margin and monitor_interval
+    """
+    config = load_snapshot()['system'].get('deadline') or {}
+    return {
+        'max_parallel': int(config.get('max_parallel', 0)),
+        'downgrade': bool(config.get('downgrade', True)),
+        'downgrade_speedup': float(config.get('downgrade_speedup', 0.6)),
+        'margin': float(config.get('margin', 0.1)),
+        'monitor_interval': int(config.get('monitor_interval', 60)),
+    }
+
+
+def parse_deadline(value: str) -> datetime:
+    """Parse a deadline such as '2026-10-20 09:00' (local time)."""
+    try:
+        return datetime.fromisoformat(value.strip())
+    except ValueError:
+        print(f"Error: Invalid deadline '{value}' (expected e.g. \"2026-10-20 09:00\")", file=sys.stderr)
+        sys.exit(1)
+
+
+def remaining_calls(processed_dir: Path, assignment_type: str, students: int, activities: int) -> dict:
+    """
+    Count the headless calls still to make, from the outputs missing so far.
+
+    Args:
+        processed_dir: The assignment's processed/ directory
+        assignment_type: structured or freeform
+        students: Number of submissions
+        activities: Number of activities (structured)
+
+    Returns:
+        dict: {stage: calls left}
+    """
+    markings = processed_dir / 'markings'
+    normalized = processed_dir / 'normalized'
+    if assignment_type == 'structured':
+        marker = students * activities - len(list(markings.glob('*_A*.md')))
+        normalizer = activities - len(list(normalized.glob('A*_scoring.md')))
+    else:
+        marker = students - len(list(markings.glob('*.md')))
+        normalizer = 0 if (normalized / 'scoring.md').exists() else 1
+    unifier = students - len(list((processed_dir / 'final').glob('*_feedback.md')))
+    return {'marker': max(marker, 0), 'normalizer': max(normalizer, 0), 'unifier': max(unifier, 0)}
+
+
+def load_call_stats(stats_file: Path) -> list:
+    """Successful, timed calls from a stats file."""
+    entries = []
+    try:
+        lines = stats_file.read_text(encoding='utf-8').splitlines()
+    except OSError:
+        return entries
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if entry.get('exit_status', 0) == 0 and entry.get('latency_s') is not None \
+                and entry.get('hedge_outcome') != 'abandoned':
+            entries.append(entry)
+    return entries
+
+
+def call_profile(entries: list, stage: str, model: str) -> dict | None:
+    """
+    Mean seconds and tokens per call of a stage, from the model's own calls
+    when there are enough of them, else from all calls of the stage.
+
+    Returns:
+        dict: {seconds, tokens, samples}, or None without samples
+    """
+    stage_entries = [e for e in entries if e.get('stage') == stage]
+    own = [e for e in stage_entries if (e.get('model') or '') == (model or '')]
+    chosen = own if len(own) >= MIN_MODEL_SAMPLES else stage_entries
+    if not chosen:
+        return None
+    return {
+        'seconds': sum(e['latency_s'] + (e.get('startup_s') or 0) for e in chosen) / len(chosen),
+        'tokens': sum((e.get('input_tokens') or 0) + (e.get('output_tokens') or 0) for e in chosen) / len(chosen),
+        'samples': len(chosen),
+    }
+
+
+def project(calls: dict, profiles: dict, parallel: int, budget: dict,
+            parallel_normalizers: bool) -> float:
+    """
+    Projected seconds to finish the remaining calls.
+
+    Args:
+        calls: {stage: calls left}
+        profiles: {stage: {seconds, tokens}}
+        parallel: Parallel tasks per stage
+        budget: Quota ledger budget of the provider ({} if none)
+        parallel_normalizers: Whether the normalizers run in parallel
+
+    Returns:
+        float: Seconds
+    """
+    total = 0.0
+    for stage in STAGES:
+        n = calls.get(stage, 0)
+        if not n:
+            continue
+        width = parallel if stage != 'normalizer' or parallel_normalizers else 1
+        seconds = math.ceil(n / width) * profiles[stage]['seconds']
+        if budget.get('tokens_per_minute'):
+            seconds = max(seconds, n * profiles[stage]['tokens'] / budget['tokens_per_minute'] * 60)
+        if budget.get('requests_per_minute'):
+            seconds = max(seconds, n / budget['requests_per_minute'] * 60)
+        total += seconds
+    return total
+
+
+def faster_model(provider: str, model: str, interface: str) -> str | None:
+    """
+    Next model down the provider's faster_models chain in models.yaml.
+
+    The CLI's default model (no model set) is taken to be the first model of
+    the chain that is not marked expensive.
+
+    Returns:
+        str: Model name, or None at the end of the chain
+    """
+    models = load_models_config()
+    chain = (models.get('faster_models') or {}).get(provider) or []
+    available = models.get('api_models' if interface == 'api' else 'cli_models') or {}
+    chain = [m for m in chain if m in available]
+    if model in chain:
+        position = chain.index(model)
+    else:
+        cheap = [i for i, m in enumerate(chain) if not is_expensive_model(m)]
+        position = cheap[0] if cheap else 0
+    return chain[position + 1] if position + 1 < len(chain) else None
+
+
+def _duration(seconds: float) -> str:
+    seconds = abs(seconds)
+    if seconds >= 3600:
+        return f"{int(seconds // 3600)}h{int(seconds % 3600 // 60):02d}m"
+    return f"{int(seconds // 60)}m{int(seconds % 60):02d}s"
+
+
+def build_plan(args) -> dict:
+    """Project the run and choose parallelism and model to meet the deadline."""
+    config = get_deadline_config()
+    deadline = parse_deadline(args.deadline)
+    processed_dir = Path(args.processed_dir)
+    calls = remaining_calls(processed_dir, args.type, args.students, args.activities)
+
+    interface = 'api' if args.api_model else 'cli'
+    model = args.api_model or args.model or ''
+    provider = args.provider
+    if args.api_model:
+        provider = resolve_provider_from_model(args.api_model, 'api_models') or provider
+    provider = normalize_provider(provider) if provider else ''
+    entries = load_call_stats(processed_dir / 'stats' / 'token_usage.jsonl')
+    profiles = {stage: call_profile(entries, stage, model)
+                or {'seconds': DEFAULT_CALL_SECONDS[stage], 'tokens': 0, 'samples': 0}
+                for stage in STAGES}
+
+    ledger = get_ledger_config()
+    budget = get_budget(ledger, interface, provider) if ledger['enabled'] and provider else {}
+
+    now = time.time()
+    available = (deadline.timestamp() - now) * (1 - config['margin'])
+    parallel_normalizers = args.type == 'structured'
+    projected = project(calls, profiles, args.concurrency, budget, parallel_normalizers)
+
+    plan = {
+        'checkpoint': args.checkpoint,
+        'calls': calls,
+        'seconds_per_call': {s: round(p['seconds'], 1) for s, p in profiles.items()},
+        'projected_s': round(projected, 1),
+        'deadline': deadline.isoformat(sep=' ', timespec='minutes'),
+        'parallel': args.concurrency,
+        'model': None,
+        'behind': projected > available,
+    }
+    if not plan['behind'] or args.monitor:
+        return plan
+
+    # 1. More parallel tasks, up to the cap
+    cap = config['max_parallel'] or 2 * args.base_parallel
+    for parallel in range(args.concurrency + 1, max(cap, args.concurrency) + 1):
+        plan['parallel'] = parallel
+        projected = project(calls, profiles, parallel, budget, parallel_normalizers)
+        if projected <= available:
+            break
+
+    # 2. A faster model for the remaining stages
+    if projected > available and config['downgrade'] and provider:
+        faster = faster_model(provider, model, interface)
+        if faster:
+            faster_profiles = {}
+            for stage in STAGES:
+                measured = call_profile([e for e in entries if e.get('model') == faster], stage, faster)
+                faster_profiles[stage] = measured or dict(
+                    profiles[stage], seconds=profiles[stage]['seconds'] * config['downgrade_speedup'])
+            plan['model'] = faster
+            projected = project(calls, faster_profiles, plan['parallel'], budget, parallel_normalizers)
+
+    plan['projected_s'] = round(projected, 1)
+    plan['behind'] = projected > available
+    return plan
+
+
+def log_plan(plan: dict, processed_dir: Path, echo: bool):
+    """Append a projection to processed/logs/deadline.log (and stderr if echo)."""
+    finish = datetime.fromtimestamp(time.time() + plan['projected_s'])
+    spare = datetime.fromisoformat(plan['deadline']).timestamp() - finish.timestamp()
+    left = ', '.join(f"{n} {stage}" for stage, n in plan['calls'].items() if n) or 'no'
+    status = f"{_duration(spare)} spare" if spare >= 0 else f"{_duration(spare)} late"
+    line = (f"{plan['checkpoint']}: {left} calls left; projected finish "
+            f"{finish.strftime('%Y-%m-%d %H:%M')} ({status}, deadline {plan['deadline']}) "
+            f"at {plan['parallel']} parallel")
+    if plan['model']:
+        line += f", model {plan['model']}"
+
+    log_file = processed_dir / 'logs' / 'deadline.log'
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_file, 'a', encoding='utf-8') as f:
+        f.write(f"[{datetime.now().strftime('%H:%M:%S')}] {line}\n")
+    if echo:
+        marker = '⚠' if plan['behind'] else '✓'
+        print(f"{marker} Deadline: {line}", file=sys.stderr)
+
+
+def get_task_order() -> str:
+    """Task order of parallel stages from config.yaml: lpt (default) or file."""
+    order = str(load_snapshot()['system'].get('task_order') or 'lpt').lower()
+    return order if order in ('lpt', 'file') else 'lpt'
+
+
+def _notebook_chars(path: Path) -> int:
+    """Characters of a notebook's sources and text outputs (images are not sent)."""
+    try:
+        notebook = json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError):
+        return path.stat().st_size if path.exists() else 0
+    chars = 0
+    for cell in notebook.get('cells', []):
+        chars += len(''.join(cell.get('source', [])))
+        for output in cell.get('outputs', []):
+            chars += len(''.join(output.get('text', [])))
+            chars += len(''.join(output.get('data', {}).get('text/plain', [])))
+    return chars
+
+
+@functools.lru_cache(maxsize=None)
+def _activity_chars(path: str) -> dict:
+    """Characters of each activity's student input in a structured notebook."""
+    extractor = ActivityExtractor(path)
+    if not extractor.load_notebook():
+        return {}
+    return {activity: sum(len(cell['source']) for cell in cells)
+            for activity, cells in extractor.extract_activities().items()}
+
+
+def _path_size(path: Path) -> int:
+    """Prompt characters of a file, or of the files under a directory."""
+    try:
+        if path.is_dir():
+            return sum(_path_size(f) for f in path.rglob('*') if f.is_file())
+        if path.suffix == '.ipynb':
+            return _notebook_chars(path)
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _marking_files(markings_dir: Path, student: str, activity: str, assignment_type: str) -> list:
+    """Marker assessments a task reads, named as the unifier and normalizer look them up."""
+    if not student:
+        return list(markings_dir.glob(f"*_{activity}.md"))
+    if assignment_type == 'freeform':
+        marking = markings_dir / f"{student}.md"
+        return [marking] if marking.exists() else []
+    # Exact <student>_A<n>.md, so "Ann" doesn't also count Ann_Lee_A1.md
+    pattern = re.compile(rf"{re.escape(student)}_A\d+\.md")
+    return [f for f in markings_dir.glob(f"{glob.escape(student)}_A*.md") if pattern.fullmatch(f.name)]
+
+
+def parse_task(line: str) -> dict:
+    """
+    Read the stage arguments of a task line (an agent command).
+
+    Returns:
+        dict: student, activity, context (as in the stats file) and size
+              (bytes of prompt input: submission plus markings read)
+    """
+    try:
+        words = shlex.split(line)
+    except ValueError:
+        words = line.split()
+    options = {}
+    for i, word in enumerate(words[:-1]):
+        if word.startswith('--'):
+            options[word[2:]] = words[i + 1]
+
+    student = options.get('student', '')
+    activity = options.get('activity', '')
+    submission = options.get('submission')
+    if submission and activity and submission.endswith('.ipynb'):
+        # Structured markers only see the activity's cells
+        size = _activity_chars(submission).get(activity, 0)
+    else:
+        size = _path_size(Path(submission)) if submission else 0
+    markings = options.get('markings-dir')
+    if markings:
+        size += sum(_path_size(f) for f in _marking_files(Path(markings), student, activity,
+                                                            options.get('type', 'structured')))
+    return {
+        'student': student,
+        'activity': activity,
+        'context': '/'.join(part for part in (student, activity) if part),
+        'size': size,
+    }
+
+
+def _history(stats_file: Path | None) -> tuple[dict, dict]:
+    """
+    Latency by stage and activity, and failed contexts by stage, from a stats file.
+
+    Returns:
+        Tuple of ({stage: {activity or '': [seconds]}},
+                  {stage: {contexts that failed or were killed}})
+    """
+    latencies, failed = {}, {}
+    if not stats_file:
+        return latencies, failed
+    try:
+        lines = stats_file.read_text(encoding='utf-8').splitlines()
+    except OSError:
+        return latencies, failed
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        stage = entry.get('stage')
+        if not stage or entry.get('hedge') == 'hedge':
+            continue
+        context = entry.get('context') or ''
+        if entry.get('event') == 'watchdog_kill' or entry.get('exit_status', 0) != 0:
+            failed.setdefault(stage, set()).add(context)
+        elif entry.get('latency_s') is not None and not entry.get('event'):
+            last = context.rsplit('/', 1)[-1]
+            activity = last if ACTIVITY.match(last) else ''
+            if entry.get('task_start_ts') and entry.get('end_ts'):
+                # Whole task: agent startup, prompt building and the call
+                seconds = entry['end_ts'] - entry['task_start_ts']
+            else:
+                seconds = entry['latency_s'] + (entry.get('startup_s') or 0)
+            latencies.setdefault(stage, {}).setdefault(activity, []).append(seconds)
+    return latencies, failed
+
+
+def _mean(values: list) -> float:
+    return sum(values) / len(values)
+
+
+def _stage_seconds(stage: str, history: dict) -> float:
+    """Mean task seconds of a stage, or its default scaled by the other stages' history."""
+    every = [s for values in history.get(stage, {}).values() for s in values]
+    if every:
+        return _mean(every)
+    ratios = [_mean([s for values in by_activity.values() for s in values]) / DEFAULT_CALL_SECONDS[other]
+              for other, by_activity in history.items() if other in DEFAULT_CALL_SECONDS]
+    return DEFAULT_CALL_SECONDS.get(stage, 90) * (_mean(ratios) if ratios else 1.0)
+
+
+def estimate_tasks(tasks: list, stage: str, stats_file: Path | None) -> list:
+    """
+    Estimate the seconds of each task of a stage.
+
+    A stage without history in the run is costed at its default, scaled by
+    how the run's other stages compare with theirs. A task of a composite
+    stage is costed as one call of each of its stages.
+
+    Args:
+        tasks: Task lines
+        stage: Stage of the tasks
+        stats_file: Stats JSONL of the run (history), or None
+
+    Returns:
+        list: One dict per task (parse_task() fields plus line, seconds,
+              failed, and measured: whether the run has history to go by)
+    """
+    history, failed = _history(stats_file)
+    latencies = history.get(stage, {})
+    default = sum(_stage_seconds(part, history) for part in COMPOSITE_STAGES.get(stage, (stage,)))
+
+    estimates = [dict(parse_task(line), line=line) for line in tasks]
+    sizes = {}
+    for task in estimates:
+        sizes.setdefault(task['activity'], []).append(task['size'])
+    for task in estimates:
+        history_seconds = latencies.get(task['activity'])
+        base = _mean(history_seconds) if history_seconds else default
+        mean_size = _mean(sizes[task['activity']])
+        ratio = task['size'] / mean_size if mean_size else 1.0
+        task['seconds'] = base * (1 - SIZE_WEIGHT + SIZE_WEIGHT * ratio)
+        task['failed'] = task['context'] in failed.get(stage, set())
+        task['measured'] = bool(history)
+    return estimates
+
+
+def simulate_makespan(durations: list, workers: int) -> float:
+    """Makespan of handing out tasks in order to the first free of N workers."""
+    finish = [0.0] * max(1, min(workers, len(durations)))
+    for seconds in durations:
+        heapq.heappush(finish, heapq.heappop(finish) + seconds)
+    return max(finish)
+
+
+def cmd_order(args):
+    path = Path(args.tasks)
+    tasks = [line for line in path.read_text(encoding='utf-8').splitlines() if line.strip()]
+    estimates = estimate_tasks(tasks, args.stage, Path(args.stats_file) if args.stats_file else None)
+    file_order = simulate_makespan([t['seconds'] for t in estimates], args.concurrency)
+
+    order = get_task_order()
+    if order == 'lpt':
+        # Stable: equal estimates keep their file order
+        estimates.sort(key=lambda t: (not t['failed'], -t['seconds']))
+        path.write_text(''.join(f"{t['line']}\n" for t in estimates), encoding='utf-8')
+    predicted = simulate_makespan([t['seconds'] for t in estimates], args.concurrency)
+
+    failed = sum(t['failed'] for t in estimates)
+    label = 'longest first' + (f", {failed} previously failed first" if failed else '') \
+        if order == 'lpt' else 'file order'
+    basis = '' if any(t['measured'] for t in estimates) else ', default latencies until calls are measured'
+    print(f"✓ Task order: {label}; predicted makespan {predicted:.0f}s "
+          f"(file order {file_order:.0f}s{basis})", file=sys.stderr)
+    print(f"{predicted:.1f} {file_order:.1f}")
+
+
+def cmd_makespan(args):
+    actual = time.time() - args.start
+    print(f"✓ Makespan: {actual:.0f}s (predicted {args.predicted:.0f}s, "
+          f"file order {args.file_order:.0f}s)", file=sys.stderr)
+    if args.stats_file:
+        append_stats_entry(args.stats_file, {
+            'timestamp': datetime.now().isoformat(),
+            'event': 'makespan',
+            'stage': args.stage,
+            'tasks': args.tasks,
+            'concurrency': args.concurrency,
+            'order': get_task_order(),
+            'predicted_s': round(args.predicted, 1),
+            'file_order_s': round(args.file_order, 1),
+            'actual_s': round(actual, 1),
+        })
+
+
+def cmd_plan(args):
+    plan = build_plan(args)
+    log_plan(plan, Path(args.processed_dir), echo=True)
+    print(f"MAX_PARALLEL={plan['parallel']}")
+    print(f"DEADLINE_MODEL={plan['model'] or ''}")
+    print(f"DEADLINE_BEHIND={'true' if plan['behind'] else 'false'}")
+
+
+def cmd_monitor(args):
+    interval = get_deadline_config()['monitor_interval']
+    while True:
+        time.sleep(interval)
+        # The orchestrator starts the monitor; once it exits the monitor is
+        # reparented (its pid may linger as a zombie, so kill(pid, 0) is not enough)
+        if os.getppid() != args.parent_pid:
+            return
+        log_plan(build_plan(args), Path(args.processed_dir), echo=False)
+
+
+def cmd_share(args):
+    # Runs of a batch go one after another: the next run gets an equal share
+    # of the time left (its own projection covers the rest of its stages)
+    deadline = parse_deadline(args.deadline).timestamp()
+    now = time.time()
+    share = now + max(deadline - now, 0) / max(args.parts, 1)
+    print(datetime.fromtimestamp(share).strftime('%Y-%m-%d %H:%M:%S'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deadline-driven scheduling for marking runs")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def projection_args(p):
+        p.add_argument('--processed-dir', required=True, help="Assignment's processed/ directory")
+        p.add_argument('--type', choices=['structured', 'freeform'], required=True, help='Assignment type')
+        p.add_argument('--students', type=int, required=True, help='Number of submissions')
+        p.add_argument('--activities', type=int, default=1, help='Number of activities (structured)')
+        p.add_argument('--deadline', required=True, help='Deadline, e.g. "2026-10-20 09:00" (local time)')
+        p.add_argument('--concurrency', type=int, required=True, help='Current parallel tasks')
+        p.add_argument('--base-parallel', type=int, help='The run\'s configured max_parallel '
+                       '(default: --concurrency)')
+        p.add_argument('--provider', default='', help='Provider of the headless stages '
+                       '(default with --api-model: the model\'s provider)')
+        p.add_argument('--model', default='', help='CLI model of the headless stages')
+        p.add_argument('--api-model', default='', help='API model of the headless stages')
+        p.add_argument('--checkpoint', default='Run', help='Label for the log (e.g. "Stage 4")')
+
+    plan = sub.add_parser('plan', help='Project the run and print parallelism/model for eval')
+    projection_args(plan)
+    plan.set_defaults(func=cmd_plan, monitor=False)
+
+    monitor = sub.add_parser('monitor', help='Log a projection periodically while the run goes')
+    projection_args(monitor)
+    monitor.add_argument('--parent-pid', type=int, required=True, help='Stop when this process exits')
+    monitor.set_defaults(func=cmd_monitor, monitor=True)
+
+    order = sub.add_parser('order', help='Reorder a stage\'s task file, longest first')
+    order.add_argument('--tasks', required=True, help='Task file to reorder in place')
+    order.add_argument('--stage', required=True, help='Stage of the tasks (marker, normalizer, unifier)')
+    order.add_argument('--concurrency', type=int, required=True, help='Parallel tasks of the stage')
+    order.add_argument('--stats-file', help='Stats JSONL of the run (latency history)')
+    order.set_defaults(func=cmd_order)
+
+    makespan = sub.add_parser('makespan', help='Record the predicted and actual makespan of a stage')
+    makespan.add_argument('--stage', required=True, help='Stage of the tasks')
+    makespan.add_argument('--tasks', type=int, required=True, help='Number of tasks')
+    makespan.add_argument('--concurrency', type=int, required=True, help='Parallel tasks of the stage')
+    makespan.add_argument('--predicted', type=float, required=True, help='Predicted makespan (seconds)')
+    makespan.add_argument('--file-order', type=float, required=True,
+                          help='Predicted makespan in file order (seconds)')
+    makespan.add_argument('--start', type=float, required=True, help='Start of the stage (epoch seconds)')
+    makespan.add_argument('--stats-file', help='Stats JSONL to record the makespan in')
+    makespan.set_defaults(func=cmd_makespan)
+
+    share = sub.add_parser('share', help='Deadline of the next of several runs sharing a deadline')
+    share.add_argument('--deadline', required=True, help='Deadline of all the runs')
+    share.add_argument('--parts', type=int, required=True, help='Runs left, including the next one')
+    share.set_defaults(func=cmd_share)
+
+    args = parser.parse_args()
+    if args.command in ('plan', 'monitor'):
+        args.base_parallel = args.base_parallel or args.concurrency
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Marker cascade: mark with a cheap model first, escalate uncertain markings.
+
+With the cascade on, marker.py sends each task to a fast, cheap model
+(cascade.cli_model, or cascade.api_model in API mode) with an extra
+instruction to end the assessment with a self-assessment block:
+
+    ### Confidence
+    ```json
+    {"confidence": 0.8, "requirements_met": 4, "requirements_total": 5,
+     "mistakes": 2, "max_severity": "minor"}
+    ```
+
+The block is stripped from the saved marking and kept in the marking's
+<output>.meta.json sidecar. The task is re-marked by the stage's normal
+(stronger) model right away when the cheap call fails, its output is
+malformed (no summary or no valid block), or the confidence is below
+cascade.min_confidence.
+
+After all markers have run, `review` groups the markings the cheap model
+kept by activity and a hash of the student's work. Identical work should get
+identical fields; members that differ from their cluster's majority (or the
+whole cluster, when there is no majority) are escalated in a second round.
+`report` then joins the sidecars with the stats file and records the
+escalation rate and token and cost savings per activity.
+
+Usage (orchestrators):
+    cascade.py init [--force] [--api-model M]            Print CASCADE_MODEL=... if enabled
+    cascade.py review --markings-dir D --tasks F --output F
+    cascade.py report --markings-dir D --stats-file F --output F
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import shlex
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from llm_telemetry import compute_cost
+from system_config import load_snapshot
+
+# Appended to the marker prompt for the cheap pass
+CONFIDENCE_INSTRUCTIONS = """
+
+## Confidence Report
+
+After the assessment, end your response with this section, filled in for
+this submission:
+
+### Confidence
+```json
+{"confidence": 0.0, "requirements_met": 0, "requirements_total": 0, "mistakes": 0, "max_severity": "none"}
+```
+
+- confidence: 0.0 to 1.0, how sure you are that a careful senior marker would
+  reach the same assessment. Use low values when the work is ambiguous, the
+  criteria are unclear, or you could not verify the code's behaviour.
+- requirements_met / requirements_total: requirements satisfied, out of those checked
+- mistakes: number of entries under Mistakes Found
+- max_severity: most severe mistake: none, minor, major or critical
+"""
+
+CONFIDENCE_BLOCK = re.compile(r'\n*#+\s*Confidence\s*\n+```(?:json)?\s*\n(.*?)\n```\s*$', re.DOTALL)
+FIELDS = ('requirements_met', 'requirements_total', 'mistakes', 'max_severity')
+SEVERITIES = ('none', 'minor', 'major', 'critical')
+
+
+def get_cascade_config() -> dict:
+    """
+    Get the cascade settings from config.yaml.
+
+    Returns:
+        dict: enabled (bool), cli_model, api_model and min_confidence
+    """
+    config = load_snapshot()['system'].get('cascade') or {}
+    return {
+        'enabled': bool(config.get('enabled', False)),
+        'cli_model': config.get('cli_model') or '',
+        'api_model': config.get('api_model') or '',
+        'min_confidence': float(config.get('min_confidence', 0.7)),
+    }
+
+
+def work_hash(student_work: str) -> str:
+    """Hash of a student's work, ignoring whitespace differences."""
+    normalized = ' '.join(student_work.split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def parse_cheap_output(text: str) -> tuple[str, dict | None, str | None]:
+    """
+    Split a cheap-pass marking into the assessment and its confidence block.
+
+    Args:
+        text: Model output
+
+    Returns:
+        Tuple of (assessment without the block, fields or None,
+        problem with the output or None)
+    """
+    match = CONFIDENCE_BLOCK.search(text.rstrip())
+    if not match:
+        return text, None, 'no confidence block'
+    body = text.rstrip()[:match.start()].rstrip() + '\n'
+    try:
+        fields = json.loads(match.group(1))
+        confidence = float(fields['confidence'])
+        for name in ('requirements_met', 'requirements_total', 'mistakes'):
+            fields[name] = int(fields[name])
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return body, None, 'invalid confidence block'
+    fields['confidence'] = confidence
+    fields['max_severity'] = str(fields.get('max_severity', '')).lower()
+    if not 0 <= confidence <= 1 or fields['max_severity'] not in SEVERITIES:
+        return body, None, 'invalid confidence block'
+    if not re.search(r'^#+\s*Summary', body, re.MULTILINE):
+        return body, fields, 'no summary'
+    return body, fields, None
+
+
+def load_cascade_metas(markings_dir: Path) -> dict:
+    """Cascade sidecar entries of the markings in a directory, by output path."""
+    metas = {}
+    for meta_file in sorted(markings_dir.glob('*.md.meta.json')):
+        try:
+            meta = json.loads(meta_file.read_text(encoding='utf-8'))
+        except (OSError, json.JSONDecodeError):
+            continue
+        if meta.get('cascade'):
+            metas[str(meta_file.resolve())[:-len('.meta.json')]] = {**meta['cascade'], 'context': meta['context']}
+    return metas
+
+
+def find_disagreements(metas: dict) -> dict:
+    """
+    Find cheap markings that disagree with their duplicate cluster.
+
+    Args:
+        metas: Cascade entries by output path, from load_cascade_metas()
+
+    Returns:
+        dict: {output path: 'duplicate_disagreement'} for markings to escalate
+    """
+    clusters = defaultdict(list)
+    for output, meta in metas.items():
+        if meta.get('escalated') is None and meta.get('fields'):
+            clusters[(meta['activity'], meta['work_hash'])].append(output)
+
+    escalate = {}
+    for members in clusters.values():
+        if len(members) < 2:
+            continue
+        answers = {m: tuple(metas[m]['fields'].get(f) for f in FIELDS) for m in members}
+        (majority, count), = Counter(answers.values()).most_common(1)
+        has_majority = count * 2 > len(members)
+        for member, answer in answers.items():
+            if answer != majority or not has_majority:
+                escalate[member] = 'duplicate_disagreement'
+    return escalate
+
+
+def cmd_init(args):
+    config = get_cascade_config()
+    if not (config['enabled'] or args.force):
+        return
+    model = config['api_model'] if args.api_model else config['cli_model']
+    if not model:
+        key = 'api_model' if args.api_model else 'cli_model'
+        print(f"Error: cascade.{key} in config.yaml is empty", file=sys.stderr)
+        sys.exit(1)
+    print(f"CASCADE_MODEL={shlex.quote(model)}")
+    print(f"✓ Marker cascade: {model} first, escalating below confidence "
+          f"{config['min_confidence']:g}", file=sys.stderr)
+
+
+def cmd_review(args):
+    metas = load_cascade_metas(Path(args.markings_dir))
+    escalate = find_disagreements(metas)
+
+    # Re-run the original task of each escalated marking with --escalate
+    tasks = []
+    if Path(args.tasks).exists():
+        for line in Path(args.tasks).read_text(encoding='utf-8').splitlines():
+            match = re.search(r"--output '([^']+)'", line)
+            output = str(Path(match.group(1)).resolve()) if match else None
+            if output in escalate:
+                tasks.append(f"{line} --escalate {escalate[output]}")
+
+    Path(args.output).write_text(''.join(f"{t}\n" for t in tasks), encoding='utf-8')
+    print(len(tasks))
+
+
+def _tokens(entry: dict) -> int:
+    return (entry.get('input_tokens', 0) or 0) + (entry.get('output_tokens', 0) or 0)
+
+
+def build_report(metas: dict, stats_file: Path) -> dict:
+    """
+    Summarize the cascade per activity.
+
+    Args:
+        metas: Cascade entries by output path, from load_cascade_metas()
+        stats_file: Stats JSONL of the run
+
+    Returns:
+        dict: {activity: {tasks, escalated, escalation_rate, reasons,
+        cheap_tokens, strong_tokens, all_strong_tokens, strong_tokens_saved,
+        cost_usd, all_strong_cost_usd, savings_usd}}
+    """
+    calls = defaultdict(list)
+    if stats_file.exists():
+        for line in stats_file.read_text(encoding='utf-8').splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get('stage') == 'marker' and entry.get('context'):
+                calls[entry['context']].append(entry)
+
+    report = {}
+    for meta in metas.values():
+        row = report.setdefault(meta['activity'], {
+            'tasks': 0, 'escalated': 0, 'reasons': {},
+            'cheap_tokens': 0, 'strong_tokens': 0, 'all_strong_tokens': 0,
+            'cost_usd': 0.0, 'all_strong_cost_usd': 0.0, 'priced': True,
+        })
+        row['tasks'] += 1
+        if meta.get('escalated'):
+            row['escalated'] += 1
+            row['reasons'][meta['escalated']] = row['reasons'].get(meta['escalated'], 0) + 1
+
+        for entry in calls.get(meta['context'], []):
+            cost = entry.get('cost_usd')
+            if entry.get('model') == meta['cheap_model']:
+                row['cheap_tokens'] += _tokens(entry)
+                if not meta.get('escalated'):
+                    # The strong model would have read the same prompt; its
+                    # output length is taken to be the cheap model's
+                    row['all_strong_tokens'] += _tokens(entry)
+                    cost = compute_cost(meta['strong_provider'], meta['strong_model'], entry)
+                    row['all_strong_cost_usd'] += cost or 0.0
+                    row['priced'] &= cost is not None
+            else:
+                row['strong_tokens'] += _tokens(entry)
+                row['all_strong_tokens'] += _tokens(entry)
+                row['all_strong_cost_usd'] += cost or 0.0
+            row['cost_usd'] += entry.get('cost_usd') or 0.0
+            row['priced'] &= entry.get('cost_usd') is not None
+
+    for row in report.values():
+        row['escalation_rate'] = round(row['escalated'] / row['tasks'], 3)
+        # Tokens kept off the marker model (the cheap tokens are the price)
+        row['strong_tokens_saved'] = row['all_strong_tokens'] - row['strong_tokens']
+        if row.pop('priced'):
+            row['cost_usd'] = round(row['cost_usd'], 6)
+            row['all_strong_cost_usd'] = round(row['all_strong_cost_usd'], 6)
+            row['savings_usd'] = round(row['all_strong_cost_usd'] - row['cost_usd'], 6)
+        else:
+            # Some model has no pricing entry (e.g. the CLI's default model)
+            row['cost_usd'] = row['all_strong_cost_usd'] = row['savings_usd'] = None
+    return dict(sorted(report.items()))
+
+
+def cmd_report(args):
+    metas = load_cascade_metas(Path(args.markings_dir))
+    if not metas:
+        return
+    report = build_report(metas, Path(args.stats_file))
+    Path(args.output).write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+
+    print(f"{'activity':10s} {'tasks':>5s} {'escalated':>9s} {'rate':>6s} {'cheap tok':>10s} "
+          f"{'strong tok':>10s} {'strong saved':>12s} {'saved $':>8s}")
+    for activity, row in report.items():
+        saved = f"{row['savings_usd']:.4f}" if row['savings_usd'] is not None else '-'
+        print(f"{activity:10s} {row['tasks']:5d} {row['escalated']:9d} {row['escalation_rate']:6.0%} "
+              f"{row['cheap_tokens']:10d} {row['strong_tokens']:10d} {row['strong_tokens_saved']:12d} {saved:>8s}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cheap-first marker cascade")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    init = sub.add_parser('init', help='Print the cheap model assignment if the cascade is enabled')
+    init.add_argument('--force', action='store_true', help='Enable even if cascade.enabled is false')
+    init.add_argument('--api-model', default='', help='The run\'s API model (selects cascade.api_model)')
+    init.set_defaults(func=cmd_init)
+
+    review = sub.add_parser('review', help='Write tasks escalating markings that disagree with duplicates')
+    review.add_argument('--markings-dir', required=True, help='Marker output directory')
+    review.add_argument('--tasks', required=True, help='Marker task list of the run')
+    review.add_argument('--output', required=True, help='Escalation task list to write')
+    review.set_defaults(func=cmd_review)
+
+    report = sub.add_parser('report', help='Record escalation rate and savings per activity')
+    report.add_argument('--markings-dir', required=True, help='Marker output directory')
+    report.add_argument('--stats-file', required=True, help='Stats JSONL of the run')
+    report.add_argument('--output', required=True, help='Report JSON to write')
+    report.set_defaults(func=cmd_report)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,10 @@ Combine normalized scoring files into combined JSON for dashboard.
 Reads all A*_scoring.md files and creates:
 - combined_scoring.json: Aggregated mistakes/positives across all activities with mark allocations
 - student_mappings.json: Per-student mistake/positive mappings
+
+The tables and mappings come from the JSON the normalizer keeps next to each
+scoring file (A1_scoring.json, see structured_output.py) when there is one,
+and are parsed from the Markdown otherwise.
 """
 
 import argparse
@@ -13,6 +17,8 @@ import re
 from pathlib import Path
 from typing import Dict, List, Any
 
+from structured_output import load_json_output, scoring_from_json
+
 
 def parse_rubric_marks(rubric_path: Path) -> Dict[str, int]:
     """
@@ -266,6 +272,27 @@ def parse_scoring_markdown(filepath: Path) -> Dict[str, Any]:
     }
 
 
+def load_scoring_file(filepath: Path, activity_id: str = None) -> tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Read the tables and per-student mappings of a scoring file.
+
+    Args:
+        filepath: Scoring Markdown (A1_scoring.md or scoring.md)
+        activity_id: Activity ID (structured) or None (free-form)
+
+    Returns:
+        Tuple of (parse_scoring_markdown() result, student mappings), from
+        the normalizer's JSON when it is there, else from the Markdown
+    """
+    data = load_json_output(filepath, 'normalizer')
+    if data is not None:
+        return scoring_from_json(data, activity_id)
+
+    if activity_id:
+        return parse_scoring_markdown(filepath), parse_student_mappings(filepath, activity_id)
+    return parse_scoring_markdown(filepath), parse_freeform_student_mappings(filepath)
+
+
 def combine_scoring_files(normalized_dir: Path, rubric_path: Path = None, assignment_type: str = 'structured') -> tuple[Dict[str, Any], Dict[str, Any]]:
     """
     Combine scoring files into unified data structures.
@@ -301,8 +328,8 @@ def combine_scoring_files(normalized_dir: Path, rubric_path: Path = None, assign
 
         print(f"Processing {scoring_file.name} (freeform)...")
 
-        # Parse tables
-        data = parse_scoring_markdown(scoring_file)
+        # Tables and freeform student mappings
+        data, all_student_mappings = load_scoring_file(scoring_file)
 
         # Add mistakes without activity prefix (freeform has no activities)
         for mistake in data['mistakes']:
@@ -315,9 +342,6 @@ def combine_scoring_files(normalized_dir: Path, rubric_path: Path = None, assign
             positive['activity_marks'] = 100
             all_positives.append(positive)
 
-        # Parse freeform student mappings
-        all_student_mappings = parse_freeform_student_mappings(scoring_file)
-
         scoring_files = [scoring_file]
 
     else:
@@ -338,8 +362,8 @@ def combine_scoring_files(normalized_dir: Path, rubric_path: Path = None, assign
             activity_id = scoring_file.stem.replace('_scoring', '')  # e.g., "A1"
             print(f"Processing {scoring_file.name}...")
 
-            # Parse tables
-            data = parse_scoring_markdown(scoring_file)
+            # Tables and student mappings
+            data, student_mappings = load_scoring_file(scoring_file, activity_id)
 
             # Add activity prefix to IDs and add activity mark allocation
             for mistake in data['mistakes']:
@@ -354,9 +378,6 @@ def combine_scoring_files(normalized_dir: Path, rubric_path: Path = None, assign
                 positive['activity_marks'] = activity_marks.get(activity_id, 0)
                 all_positives.append(positive)
 
-            # Parse student mappings
-            student_mappings = parse_student_mappings(scoring_file, activity_id)
-
             # Merge into all_student_mappings
             for student_name, mapping in student_mappings.items():
                 if student_name not in all_student_mappings:
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Compile configs/config.yaml and configs/models.yaml into the resolved
+config snapshot (.cache/config/snapshot.json and snapshot.env).
+
+The snapshot is rebuilt automatically whenever either file's mtime changes;
+this command exists for the bash side and for inspecting the result.
+
+Usage:
+    config_snapshot.py           Ensure the snapshot is current, print its location
+    config_snapshot.py --env     Print the bash env file (eval-able)
+    config_snapshot.py --print   Print the resolved snapshot as JSON
+"""
+
+import argparse
+import json
+import sys
+
+from system_config import build_snapshot, format_snapshot_env, get_snapshot_dir, load_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the resolved config snapshot")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--env', action='store_true',
+                       help='Print the bash-sourceable env file to stdout')
+    group.add_argument('--print', dest='print_json', action='store_true',
+                       help='Print the resolved snapshot as JSON')
+    group.add_argument('--rebuild', action='store_true',
+                       help='Rebuild the snapshot even if it is current')
+    args = parser.parse_args()
+
+    snapshot = build_snapshot() if args.rebuild else load_snapshot()
+
+    if args.env:
+        sys.stdout.write(format_snapshot_env(snapshot))
+    elif args.print_json:
+        print(json.dumps(snapshot, indent=2, default=str))
+    else:
+        print(f"✓ Config snapshot: {get_snapshot_dir()}")
+
+
+if __name__ == '__main__':
+    main()
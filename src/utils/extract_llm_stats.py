@@ -4,12 +4,15 @@ Extract text response and token stats from LLM CLI JSON output.
 
 Supports Claude, Gemini, and Codex JSON formats.
 Outputs text to stdout, appends stats to file if --stats-file provided.
+
+llm_caller.sh runs the CLI to completion first and passes its timing and
+exit status, so failed calls are recorded too (see llm_telemetry.py).
 """
 
 import json
 import sys
-from datetime import datetime
-from pathlib import Path
+
+from llm_telemetry import append_stats_entry, build_stats_entry, timing_fields
 
 
 def extract_claude(data: dict) -> tuple[str, dict]:
@@ -24,6 +27,8 @@ def extract_claude(data: dict) -> tuple[str, dict]:
         'cache_read_tokens': usage.get('cache_read_input_tokens', 0),
         'cost_usd': data.get('total_cost_usd', 0),
     }
+    if data.get('duration_api_ms') is not None:
+        stats['provider_s'] = data['duration_api_ms'] / 1000
     return text, stats
 
 
@@ -34,20 +39,28 @@ def extract_gemini(data: dict) -> tuple[str, dict]:
     # Aggregate stats across all models used
     total_input = 0
     total_output = 0
+    total_cached = 0
+    api_latency_ms = None
     models_stats = data.get('stats', {}).get('models', {})
 
     for model_name, model_stats in models_stats.items():
         tokens = model_stats.get('tokens', {})
         total_input += tokens.get('prompt', 0)
         total_output += tokens.get('candidates', 0)
+        total_cached += tokens.get('cached', 0)
+        latency = model_stats.get('api', {}).get('totalLatencyMs')
+        if latency is not None:
+            api_latency_ms = (api_latency_ms or 0) + latency
 
     stats = {
         'input_tokens': total_input,
         'output_tokens': total_output,
         'cache_creation_tokens': 0,
-        'cache_read_tokens': 0,
+        'cache_read_tokens': total_cached,
         'cost_usd': 0,  # Gemini doesn't report cost
     }
+    if api_latency_ms is not None:
+        stats['provider_s'] = api_latency_ms / 1000
     return text, stats
 
 
@@ -97,11 +110,24 @@ def main():
     parser.add_argument('--stats-stage', default='unknown', help='Stage name for stats')
     parser.add_argument('--stats-context', default='', help='Additional context (e.g., student name)')
     parser.add_argument('--model', default='', help='Model name used')
+    parser.add_argument('--wrapper-start-ts', type=float, help='When llm_caller.sh started (epoch seconds)')
+    parser.add_argument('--start-ts', type=float, help='When the CLI process started (epoch seconds)')
+    parser.add_argument('--end-ts', type=float, help='When the CLI process exited (epoch seconds)')
+    parser.add_argument('--exit-status', type=int, default=0, help='Exit status of the CLI process')
+    parser.add_argument('--ledger-id', type=int, help='Quota ledger reservation to settle')
     args = parser.parse_args()
 
     # Read JSON from stdin
     raw_input = sys.stdin.read()
 
+    text = None
+    stats = {
+        'input_tokens': 0,
+        'output_tokens': 0,
+        'cache_creation_tokens': 0,
+        'cache_read_tokens': 0,
+        'cost_usd': 0,
+    }
     try:
         if args.provider == 'codex':
             # Codex outputs JSONL (multiple lines)
@@ -114,31 +140,30 @@ def main():
                 text, stats = extract_claude(data)
             else:
                 text, stats = extract_gemini(data)
-    except (json.JSONDecodeError, KeyError) as e:
+    except (json.JSONDecodeError, KeyError, AttributeError) as e:
         # If JSON parsing fails, output raw input as text
         print(raw_input, end='')
-        print(f"Warning: Failed to parse JSON: {e}", file=sys.stderr)
-        sys.exit(0)
-
-    # Output text to stdout
-    print(text, end='')
-
-    # Append stats to file if requested
+        if args.exit_status == 0:
+            print(f"Warning: Failed to parse JSON: {e}", file=sys.stderr)
+    else:
+        # Output text to stdout
+        print(text, end='')
+
+    if args.ledger_id is not None:
+        # Imported here: the quota ledger is only used when it is enabled
+        from quota_ledger import settle
+        settle(args.ledger_id, stats['input_tokens'] + stats['output_tokens'])
+
+    # Append stats to file if requested (failed calls included)
     if args.stats_file:
-        stats_entry = {
-            'timestamp': datetime.now().isoformat(),
-            'provider': args.provider,
-            'model': args.model,
-            'stage': args.stats_stage,
-            'context': args.stats_context,
-            **stats
-        }
-
-        stats_path = Path(args.stats_file)
-        stats_path.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(stats_path, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(stats_entry) + '\n')
+        provider_s = stats.pop('provider_s', None)
+        timing = timing_fields(args.start_ts, args.end_ts,
+                               wrapper_start_ts=args.wrapper_start_ts,
+                               provider_s=provider_s)
+        entry = build_stats_entry(args.provider, args.model, args.stats_stage,
+                                  args.stats_context, stats, timing,
+                                  exit_status=args.exit_status)
+        append_stats_entry(args.stats_file, entry)
 
 
 if __name__ == '__main__':
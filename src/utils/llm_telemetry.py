@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Per-call LLM telemetry for the stats JSONL.
+
+Timing is threaded through the wrapper chain (agent -> llm_caller.sh ->
+CLI or api/caller.py) as epoch-second timestamps:
+
+    LLM_ENQUEUE_TS      task queued (exported by parallel_runner.sh)
+    LLM_TASK_START_TS   task process started (parallel_runner.sh, xargs mode)
+    wrapper_start_ts    llm_caller.sh started
+    start_ts / end_ts   around the CLI process or the SDK call
+    first_token_ts      first streamed token, where streaming is used
+
+LLM_ATTEMPT carries the retry count (0 for a first attempt), set when the
+task watchdog re-queues or retries a killed task.
+
+Derived durations written with each entry:
+    queue_s     waiting for a concurrency slot
+    startup_s   process startup inside the wrapper chain, up to the call
+    latency_s   the call itself (CLI process lifetime or SDK call)
+    provider_s  time the provider reports (or the SDK request alone);
+                latency_s - provider_s is local process overhead
+    ttft_s      time to first token
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from system_config import load_models_config
+
+# Providers whose input_tokens exclude cache reads (billed separately).
+# The others report cached tokens as a subset of input_tokens.
+CACHE_EXCLUSIVE_PROVIDERS = {'claude'}
+
+_pricing_cache = None
+
+
+def env_timestamp(name: str) -> float | None:
+    """Read an epoch timestamp from the environment (None if unset or invalid)."""
+    value = os.environ.get(name, '').replace(',', '.')
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def env_attempt() -> int:
+    """Retry count for this call from LLM_ATTEMPT (0 for a first attempt)."""
+    try:
+        return int(os.environ.get('LLM_ATTEMPT', '0'))
+    except ValueError:
+        return 0
+
+
+def _seconds(start: float | None, end: float | None) -> float | None:
+    if start is None or end is None:
+        return None
+    return round(max(end - start, 0.0), 3)
+
+
+def timing_fields(start_ts: float | None, end_ts: float | None,
+                  wrapper_start_ts: float | None = None,
+                  first_token_ts: float | None = None,
+                  provider_s: float | None = None) -> dict:
+    """
+    Build the timing fields of a stats entry.
+
+    Args:
+        start_ts: When the CLI process or SDK call started
+        end_ts: When it finished
+        wrapper_start_ts: When llm_caller.sh started (None if called directly)
+        first_token_ts: When the first streamed token arrived (None if not streaming)
+        provider_s: Provider-side duration, if known
+
+    Returns:
+        Dictionary of timestamps and derived durations
+    """
+    enqueue_ts = env_timestamp('LLM_ENQUEUE_TS')
+    task_start_ts = env_timestamp('LLM_TASK_START_TS')
+    process_start_ts = task_start_ts or wrapper_start_ts or start_ts
+
+    return {
+        'enqueue_ts': enqueue_ts,
+        'task_start_ts': task_start_ts,
+        'wrapper_start_ts': wrapper_start_ts,
+        'start_ts': start_ts,
+        'first_token_ts': first_token_ts,
+        'end_ts': end_ts,
+        'queue_s': _seconds(enqueue_ts, process_start_ts),
+        'startup_s': _seconds(process_start_ts, start_ts),
+        'latency_s': _seconds(start_ts, end_ts),
+        'provider_s': round(provider_s, 3) if provider_s is not None else None,
+        'ttft_s': _seconds(start_ts, first_token_ts),
+        'attempt': env_attempt(),
+    }
+
+
+def load_pricing() -> dict:
+    """
+    Load the pricing table from models.yaml (cached per process).
+
+    Returns:
+        Dictionary of {model: {input, output, cache_write, cache_read}} in
+        USD per million tokens
+    """
+    global _pricing_cache
+    if _pricing_cache is None:
+        _pricing_cache = load_models_config().get('pricing') or {}
+    return _pricing_cache
+
+
+def compute_cost(provider: str, model: str, stats: dict) -> float | None:
+    """
+    Compute the cost of a call from its token counts and the pricing table.
+
+    Args:
+        provider: Provider name (claude, gemini, codex/openai)
+        model: Model name as listed under pricing in models.yaml
+        stats: Token counts (input_tokens, output_tokens,
+            cache_creation_tokens, cache_read_tokens)
+
+    Returns:
+        Cost in USD, or None if the model has no pricing entry
+    """
+    rates = load_pricing().get(model) if model else None
+    if not rates:
+        return None
+
+    input_tokens = stats.get('input_tokens', 0) or 0
+    cache_read = stats.get('cache_read_tokens', 0) or 0
+    cache_write = stats.get('cache_creation_tokens', 0) or 0
+    if provider not in CACHE_EXCLUSIVE_PROVIDERS:
+        input_tokens = max(input_tokens - cache_read, 0)
+
+    input_rate = rates.get('input', 0)
+    cost = (
+        input_tokens * input_rate
+        + (stats.get('output_tokens', 0) or 0) * rates.get('output', 0)
+        + cache_write * rates.get('cache_write', input_rate)
+        + cache_read * rates.get('cache_read', input_rate)
+    ) / 1_000_000
+    return round(cost, 6)
+
+
+def build_stats_entry(provider: str, model: str, stage: str, context: str,
+                      stats: dict, timing: dict, exit_status: int = 0,
+                      **extra) -> dict:
+    """
+    Build a stats JSONL entry, filling in cost from the pricing table when
+    the provider does not report it.
+
+    Args:
+        provider: Provider name
+        model: Model name ('' when the CLI default was used)
+        stage: Pipeline stage (marker, unifier, ...)
+        context: Additional context (e.g., student name)
+        stats: Token counts and provider-reported cost_usd
+        timing: Output of timing_fields()
+        exit_status: Exit status of the CLI process or API call
+        **extra: Additional fields (e.g., interface='api')
+
+    Returns:
+        Stats entry dictionary
+    """
+    stats = dict(stats)
+    cost_source = 'provider' if stats.get('cost_usd') else None
+    if cost_source is None:
+        computed = compute_cost(provider, model, stats)
+        if computed is not None:
+            stats['cost_usd'] = computed
+            cost_source = 'pricing'
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'provider': provider,
+        'model': model,
+        'stage': stage,
+        'context': context,
+        **extra,
+        **stats,
+        'cost_source': cost_source,
+        'exit_status': exit_status,
+        **timing,
+    }
+
+
+def append_stats_entry(stats_file: str, entry: dict) -> None:
+    """Append one entry to a stats JSONL file."""
+    stats_path = Path(stats_file)
+    stats_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(stats_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + '\n')
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Vectorized Mark Computation for the Adjustment Dashboard
+
+Precomputes a student x code incidence matrix once so that recomputing every
+student's mark after a slider change is a single matrix-vector product plus a
+clip, instead of nested Python loops over students and their codes.
+
+Uses scipy.sparse when available and falls back to a dense NumPy array
+otherwise (a 5000 x 300 float matrix is ~12 MB, so dense is fine at class
+sizes).
+
+Usage:
+    python3 mark_matrix.py --benchmark
+    python3 mark_matrix.py --benchmark --students 1000 5000 --codes 150
+"""
+
+import argparse
+import random
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+
+# Grade band lower bounds as a fraction of total marks, lowest band first
+GRADE_BAND_LABELS = ['F (<60%)', 'D (60-69%)', 'C (70-79%)', 'B (80-89%)', 'A (90-100%)']
+GRADE_BAND_THRESHOLDS = [0.6, 0.7, 0.8, 0.9]
+
+
+class MarkMatrix:
+    """Student x code incidence matrix with a vectorized mark calculation."""
+
+    def __init__(self, students: Dict[str, Dict[str, List[str]]],
+                 mistake_ids: Sequence[str], positive_ids: Sequence[str],
+                 total_marks: float, use_sparse: Optional[bool] = None):
+        """
+        Build the incidence matrix.
+
+        Args:
+            students: {student_name: {'mistakes': [...], 'positives': [...]}}
+            mistake_ids: Mistake codes in the scheme (column order)
+            positive_ids: Positive codes in the scheme (column order)
+            total_marks: Total marks for the assignment
+            use_sparse: Force sparse/dense storage (default: sparse if scipy is installed)
+        """
+        self.student_names = list(students.keys())
+        self.mistake_ids = list(mistake_ids)
+        self.positive_ids = list(positive_ids)
+        self.total_marks = float(total_marks)
+
+        mistake_columns = {code: i for i, code in enumerate(self.mistake_ids)}
+        positive_columns = {code: len(self.mistake_ids) + i for i, code in enumerate(self.positive_ids)}
+
+        # A code listed twice for a student is applied twice, as in the loop version
+        rows, cols = [], []
+        for row, name in enumerate(self.student_names):
+            mapping = students[name]
+            for code in mapping.get('mistakes', []):
+                if code in mistake_columns:
+                    rows.append(row)
+                    cols.append(mistake_columns[code])
+            for code in mapping.get('positives', []):
+                if code in positive_columns:
+                    rows.append(row)
+                    cols.append(positive_columns[code])
+
+        shape = (len(self.student_names), len(self.mistake_ids) + len(self.positive_ids))
+        data = np.ones(len(rows), dtype=np.float64)
+
+        if use_sparse is None:
+            use_sparse = sparse is not None
+        if use_sparse and sparse is not None:
+            # Duplicate (row, col) entries are summed on conversion
+            self.matrix = sparse.coo_matrix((data, (rows, cols)), shape=shape).tocsr()
+        else:
+            self.matrix = np.zeros(shape, dtype=np.float64)
+            np.add.at(self.matrix, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1.0)
+
+    def weights(self, mistake_vals: Dict[str, float], positive_vals: Dict[str, float],
+                mistake_checks: Optional[Dict[str, bool]] = None,
+                positive_checks: Optional[Dict[str, bool]] = None) -> np.ndarray:
+        """Build the signed per-code weight vector (deductions negative, bonuses positive)."""
+        mistake_checks = mistake_checks or {}
+        positive_checks = positive_checks or {}
+        mistake_weights = [
+            -float(mistake_vals.get(code, 0.0)) if mistake_checks.get(code, True) else 0.0
+            for code in self.mistake_ids
+        ]
+        positive_weights = [
+            float(positive_vals.get(code, 0.0)) if positive_checks.get(code, True) else 0.0
+            for code in self.positive_ids
+        ]
+        return np.array(mistake_weights + positive_weights, dtype=np.float64)
+
+    def compute(self, weights: np.ndarray) -> np.ndarray:
+        """
+        Compute all student marks for a weight vector, clamped to [0, total_marks].
+
+        Only the total is clamped, not each activity; rescore.py computes
+        totals with the same rule (marking_scheme.compute_student_marks).
+        """
+        marks = self.total_marks + self.matrix @ weights
+        return np.clip(np.asarray(marks).ravel(), 0.0, self.total_marks)
+
+    def calculate_marks(self, mistake_vals: Dict[str, float], positive_vals: Dict[str, float],
+                        mistake_checks: Optional[Dict[str, bool]] = None,
+                        positive_checks: Optional[Dict[str, bool]] = None) -> np.ndarray:
+        """Compute all student marks from slider values and checkbox states."""
+        return self.compute(self.weights(mistake_vals, positive_vals, mistake_checks, positive_checks))
+
+    def as_dict(self, marks: np.ndarray) -> Dict[str, float]:
+        """Map a marks array back to {student_name: mark}."""
+        return dict(zip(self.student_names, marks.tolist()))
+
+
+class IncrementalHistogram:
+    """
+    Histogram over fixed bin edges that is updated only for students whose bin changed.
+
+    A slider usually affects a handful of students, so after the first call
+    only the changed entries are moved between bins.
+    """
+
+    def __init__(self, edges: Sequence[float]):
+        """
+        Args:
+            edges: Inner bin boundaries, ascending. Values below edges[0] fall in
+                bin 0 and values >= edges[-1] in the last bin (len(edges) + 1 bins).
+        """
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.bins: Optional[np.ndarray] = None
+
+    def update(self, values: np.ndarray) -> np.ndarray:
+        """Update the counts for new values and return them."""
+        new_bins = np.searchsorted(self.edges, values, side='right')
+        if self.bins is None or len(self.bins) != len(new_bins):
+            self.counts = np.bincount(new_bins, minlength=len(self.counts)).astype(np.int64)
+        else:
+            changed = new_bins != self.bins
+            if changed.any():
+                np.subtract.at(self.counts, self.bins[changed], 1)
+                np.add.at(self.counts, new_bins[changed], 1)
+        self.bins = new_bins
+        return self.counts
+
+
+def grade_band_histogram(total_marks: float) -> IncrementalHistogram:
+    """Create an incremental counter for the A-F grade bands (F first)."""
+    return IncrementalHistogram([total_marks * t for t in GRADE_BAND_THRESHOLDS])
+
+
+def mark_histogram(total_marks: float, bins: int = 20) -> IncrementalHistogram:
+    """Create an incremental counter for equal-width mark bins over [0, total_marks]."""
+    return IncrementalHistogram(np.linspace(0.0, total_marks, bins + 1)[1:-1])
+
+
+def calculate_marks_loop(students: Dict[str, Dict[str, List[str]]], total_marks: float,
+                         mistake_vals: Dict[str, float], positive_vals: Dict[str, float]) -> Dict[str, float]:
+    """Reference per-student loop implementation (used by the benchmark)."""
+    marks = {}
+    for student_name, mapping in students.items():
+        student_mark = total_marks
+        for mistake_id in mapping.get('mistakes', []):
+            if mistake_id in mistake_vals:
+                student_mark -= mistake_vals[mistake_id]
+        for positive_id in mapping.get('positives', []):
+            if positive_id in positive_vals:
+                student_mark += positive_vals[positive_id]
+        marks[student_name] = max(0, min(total_marks, student_mark))
+    return marks
+
+
+def _synthetic_class(num_students: int, num_codes: int, seed: int = 0):
+    """Generate random student mappings with ~10 mistakes and ~3 positives each."""
+    rng = random.Random(seed)
+    mistake_ids = [f"A{i % 10 + 1}_M{i}" for i in range(num_codes)]
+    positive_ids = [f"A{i % 10 + 1}_P{i}" for i in range(max(1, num_codes // 5))]
+    students = {
+        f"Student {i}": {
+            'mistakes': rng.sample(mistake_ids, min(10, len(mistake_ids))),
+            'positives': rng.sample(positive_ids, min(3, len(positive_ids))),
+        }
+        for i in range(num_students)
+    }
+    mistake_vals = {code: rng.choice([0.5, 1.0, 2.0, 3.0]) for code in mistake_ids}
+    positive_vals = {code: rng.choice([0.5, 1.0]) for code in positive_ids}
+    return students, mistake_ids, positive_ids, mistake_vals, positive_vals
+
+
+def _time_call(func, repeats: int) -> float:
+    """Return the median wall time of func() in milliseconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def run_benchmark(student_counts: Iterable[int], num_codes: int, repeats: int) -> int:
+    """Compare the loop and matrix implementations on synthetic classes."""
+    total_marks = 100.0
+    storage = 'scipy.sparse' if sparse is not None else 'dense numpy (scipy not installed)'
+    print(f"Mark recompute benchmark: {num_codes} mistake codes, median of {repeats} runs, {storage}")
+    print(f"{'Students':>9} {'Build (ms)':>11} {'Loop (ms)':>10} {'Matrix (ms)':>12} {'Bands (ms)':>11} {'Speedup':>8}")
+
+    for num_students in student_counts:
+        students, mistake_ids, positive_ids, mistake_vals, positive_vals = _synthetic_class(num_students, num_codes)
+
+        start = time.perf_counter()
+        matrix = MarkMatrix(students, mistake_ids, positive_ids, total_marks)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        expected = calculate_marks_loop(students, total_marks, mistake_vals, positive_vals)
+        actual = matrix.as_dict(matrix.calculate_marks(mistake_vals, positive_vals))
+        if any(abs(expected[name] - actual[name]) > 1e-9 for name in expected):
+            print("Error: Matrix marks differ from loop marks", file=sys.stderr)
+            return 1
+
+        loop_ms = _time_call(lambda: calculate_marks_loop(students, total_marks, mistake_vals, positive_vals),
+                             repeats)
+        matrix_ms = _time_call(lambda: matrix.calculate_marks(mistake_vals, positive_vals), repeats)
+
+        # One slider nudge per run, so the band counter does incremental work
+        bands = grade_band_histogram(total_marks)
+        bands.update(matrix.calculate_marks(mistake_vals, positive_vals))
+        slider = mistake_ids[0]
+
+        def nudge():
+            mistake_vals[slider] = 5.0 - mistake_vals[slider]
+            bands.update(matrix.calculate_marks(mistake_vals, positive_vals))
+
+        bands_ms = _time_call(nudge, repeats)
+
+        print(f"{num_students:>9} {build_ms:>11.2f} {loop_ms:>10.2f} {matrix_ms:>12.3f} "
+              f"{bands_ms:>11.3f} {loop_ms / matrix_ms:>7.1f}x")
+
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Vectorized mark computation for the adjustment dashboard'
+    )
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Time loop vs matrix mark recomputation on synthetic data')
+    parser.add_argument('--students', type=int, nargs='+', default=[500, 1000, 5000],
+                        help='Class sizes to benchmark (default: 500 1000 5000)')
+    parser.add_argument('--codes', type=int, default=150,
+                        help='Number of mistake codes (default: 150)')
+    parser.add_argument('--repeats', type=int, default=20,
+                        help='Runs per measurement (default: 20)')
+
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        parser.print_help()
+        return 0
+
+    return run_benchmark(args.students, args.codes, args.repeats)
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Marking Scheme Utilities
+
+Shared helpers for reading approved_scheme.json and computing student marks
+from per-student mistake/positive mappings. The approved scheme exists in two
+formats:
+
+- Dashboard format: {"mistakes": {"A1_M1": 2.0, ...}, "positives": {...},
+  "excluded_mistakes": [...], "excluded_positives": [...]}
+- Auto-approve format: {"mistakes": [{"id": "A1_M1", "suggested_deduction": 2.0, ...}],
+  "positives": [{"id": "A1_P1", "suggested_bonus": 1.0, ...}]}
+
+Both are normalized to {code: value} dictionaries here.
+"""
+
+import json
+from typing import Dict, List, Tuple
+
+
+def _to_float(value) -> float:
+    """Convert a scheme value to float, treating malformed values as 0."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _code_values(entries, value_key: str, excluded: List[str]) -> Dict[str, float]:
+    """Normalize one side (mistakes or positives) of a scheme to {code: value}."""
+    values = {}
+    if isinstance(entries, dict):
+        for code, value in entries.items():
+            values[code.replace('`', '')] = _to_float(value)
+    elif isinstance(entries, list):
+        for entry in entries:
+            code = str(entry.get('id', '')).replace('`', '')
+            if code:
+                values[code] = _to_float(entry.get(value_key, 0.0))
+    for code in excluded:
+        values.pop(code.replace('`', ''), None)
+    return values
+
+
+def load_scheme(scheme_path) -> Dict:
+    """Load approved_scheme.json."""
+    with open(scheme_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def scheme_values(scheme: Dict) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """
+    Get deduction and bonus values from an approved scheme.
+
+    Excluded codes are dropped, so they carry no weight.
+
+    Returns:
+        Tuple of (mistake_values, positive_values), each {code: marks}
+    """
+    mistake_values = _code_values(scheme.get('mistakes', {}), 'suggested_deduction',
+                                  scheme.get('excluded_mistakes', []))
+    positive_values = _code_values(scheme.get('positives', {}), 'suggested_bonus',
+                                   scheme.get('excluded_positives', []))
+    return mistake_values, positive_values
+
+
+def code_activity(code: str) -> str:
+    """Get the activity a code belongs to ('A1_M2' -> 'A1', 'M2' -> 'ALL')."""
+    prefix, sep, _ = code.partition('_')
+    return prefix if sep else 'ALL'
+
+
+def load_student_mappings(mappings_path) -> Dict[str, Dict[str, List[str]]]:
+    """Load student_mappings.json without the _metadata entry."""
+    with open(mappings_path, 'r', encoding='utf-8') as f:
+        mappings = json.load(f)
+    return {name: m for name, m in mappings.items() if not name.startswith('_')}
+
+
+def compute_student_marks(mapping: Dict[str, List[str]], mistake_values: Dict[str, float],
+                          positive_values: Dict[str, float], activity_marks: Dict[str, float],
+                          total_marks: float) -> Tuple[Dict[str, float], float]:
+    """
+    Compute one student's marks from their mistake/positive codes.
+
+    The total is computed as on the adjustment dashboard (mark_matrix.py),
+    so a re-score with the approved scheme reproduces the approved totals:
+    total_marks minus every deduction plus every bonus, clamped once to
+    [0, total_marks]. Activity marks (structured) are only shown on the
+    feedback card: each activity's allocation with its own codes applied,
+    clamped to [0, allocation]. The total is not their sum, so a bonus can
+    make up for a deduction in another activity.
+
+    Returns:
+        Tuple of ({activity_id: mark}, total_mark)
+    """
+    adjustments: Dict[str, float] = {}
+    for code in mapping.get('mistakes', []):
+        code = code.replace('`', '')
+        if code in mistake_values:
+            activity = code_activity(code)
+            adjustments[activity] = adjustments.get(activity, 0.0) - mistake_values[code]
+    for code in mapping.get('positives', []):
+        code = code.replace('`', '')
+        if code in positive_values:
+            activity = code_activity(code)
+            adjustments[activity] = adjustments.get(activity, 0.0) + positive_values[code]
+
+    activity_results = {}
+    for activity, allocation in activity_marks.items():
+        mark = float(allocation) + adjustments.get(activity, 0.0)
+        activity_results[activity] = max(0.0, min(float(allocation), mark))
+    total = float(total_marks) + sum(adjustments.values())
+    return activity_results, max(0.0, min(float(total_marks), total))
+
+
+def format_mark(value: float) -> str:
+    """Format a mark the way feedback cards show it (83, 83.5, 83.25)."""
+    text = f"{round(value, 2):.2f}".rstrip('0').rstrip('.')
+    return text if text != '-0' else '0'
+
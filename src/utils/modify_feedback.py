@@ -4,6 +4,10 @@ Feedback Modifier Utility
 
 Takes an instruction prompt and applies it to modify feedback in a CSV file.
 Only makes the specific changes requested - preserves everything else.
+
+Rows are modified concurrently. Progress is checkpointed to
+<output>.checkpoint.jsonl so an interrupted run resumes where it stopped, and
+identical feedback (e.g. group cards copied to each member) is modified once.
 """
 
 import argparse
@@ -13,7 +17,12 @@ import sys
 import tempfile
 from pathlib import Path
 
-from system_config import resolve_provider_from_model, format_available_models
+from system_config import (
+    resolve_provider_from_model, format_available_models, get_max_parallel, get_api_max_parallel
+)
+from row_mapper import (
+    map_rows, content_key, checkpoint_path_for, anonymize, personalize, NAME_PLACEHOLDER
+)
 
 # Project root for finding llm_caller.sh
 PROJECT_ROOT = Path(__file__).parent.parent.parent
@@ -42,7 +51,7 @@ ORIGINAL FEEDBACK:
 OUTPUT the modified feedback below. If no changes are needed, output the original feedback exactly as-is:"""
 
 
-def call_llm(prompt: str, provider: str, model: str = None) -> str:
+def call_llm(prompt: str, provider: str, model: str = None, api_model: str = None) -> str:
     """Call LLM via llm_caller.sh and return the response."""
 
     # Write prompt to temp file to handle special characters
@@ -59,6 +68,8 @@ def call_llm(prompt: str, provider: str, model: str = None) -> str:
         ]
         if model:
             cmd.extend(['--model', model])
+        if api_model:
+            cmd.extend(['--api-model', api_model])
 
         result = subprocess.run(
             cmd,
@@ -77,12 +88,10 @@ def call_llm(prompt: str, provider: str, model: str = None) -> str:
         Path(prompt_file).unlink(missing_ok=True)
 
 
-def modify_feedback(student_name: str, total_mark: str, feedback: str,
-                    instruction: str, provider: str, model: str = None) -> str:
-    """Use LLM to apply a specific modification to feedback."""
-
-    if not feedback or not feedback.strip():
-        return feedback  # Nothing to modify
+def apply_modification(student_name: str, total_mark: str, feedback: str,
+                       instruction: str, provider: str, model: str = None,
+                       api_model: str = None) -> str:
+    """Use LLM to apply a specific modification to feedback (raises on failure)."""
 
     prompt = MODIFY_PROMPT.format(
         instruction=instruction,
@@ -91,16 +100,13 @@ def modify_feedback(student_name: str, total_mark: str, feedback: str,
         feedback=feedback
     )
 
-    try:
-        result = call_llm(
-            prompt=prompt,
-            provider=provider,
-            model=model
-        )
-        return result.strip()
-    except Exception as e:
-        print(f"  WARNING: Modification failed for {student_name}: {e}", file=sys.stderr)
-        return feedback  # Return original on failure
+    result = call_llm(
+        prompt=prompt,
+        provider=provider,
+        model=model,
+        api_model=api_model
+    )
+    return result.strip()
 
 
 def load_csv(csv_path: Path) -> tuple:
@@ -195,6 +201,15 @@ def main():
         action='store_true',
         help='Show what would be done without calling LLM'
     )
+    parser.add_argument(
+        '--api-model',
+        help='Model for direct API calls (uses API instead of CLI for headless)'
+    )
+    parser.add_argument(
+        '--parallel',
+        type=int,
+        help='Concurrent LLM calls (default: api_max_parallel with --api-model, else max_parallel)'
+    )
 
     args = parser.parse_args()
 
@@ -230,8 +245,22 @@ def main():
         output_path = csv_path.parent / f"{csv_path.stem}_modified{csv_path.suffix}"
         backup_path = None
 
-    print(f"Loading CSV from: {csv_path}")
-    fieldnames, records = load_csv(csv_path)
+    checkpoint_path = checkpoint_path_for(output_path)
+
+    # An in-place run that left a checkpoint resumes from its backup, so the
+    # rows are keyed on their original feedback and none is modified twice.
+    # A fresh run backs up first, so an interrupted run always has one.
+    source_path = csv_path
+    if args.in_place and backup_path.exists() and checkpoint_path.exists():
+        source_path = backup_path
+        print(f"Resuming from backup: {backup_path} (progress in {checkpoint_path.name})")
+    elif args.in_place and not args.dry_run:
+        import shutil
+        shutil.copy2(csv_path, backup_path)
+        print(f"Backup created: {backup_path}")
+
+    print(f"Loading CSV from: {source_path}")
+    fieldnames, records = load_csv(source_path)
     print(f"Found {len(records)} records")
 
     # Find feedback column
@@ -251,43 +280,54 @@ def main():
 
     # Process each record
     modified_count = 0
+    failed_count = 0
+    to_modify = []
 
     for i, row in enumerate(records, 1):
         student_name = get_student_name(row)
-        total_mark = get_total_mark(row)
         original_feedback = row.get(feedback_col, '')
 
-        print(f"[{i}/{len(records)}] Processing: {student_name}...", end=' ')
-
         if not original_feedback.strip():
-            print("(no feedback)")
-            continue
-
-        if args.dry_run:
-            print("(dry run)")
-            continue
-
-        modified_feedback = modify_feedback(
-            student_name=student_name,
-            total_mark=total_mark,
-            feedback=original_feedback,
-            instruction=args.instruction,
-            provider=provider,
-            model=model
-        )
-
-        if modified_feedback != original_feedback:
-            row[feedback_col] = modified_feedback
-            modified_count += 1
-            print("modified")
+            print(f"[{i}/{len(records)}] Processing: {student_name}... (no feedback)")
+        elif args.dry_run:
+            print(f"[{i}/{len(records)}] Processing: {student_name}... (dry run)")
         else:
-            print("unchanged")
+            to_modify.append((row, student_name, get_total_mark(row), original_feedback))
+
+    if to_modify:
+        parallel = args.parallel or (get_api_max_parallel() if args.api_model else get_max_parallel())
+
+        def modify_row(item):
+            # Identical feedback is modified once and shared, so the model
+            # gets the placeholder instead of any one student's name
+            _, student_name, total_mark, feedback = item
+            return apply_modification(NAME_PLACEHOLDER, total_mark, anonymize(feedback, student_name),
+                                      args.instruction, provider, model, args.api_model)
+
+        def modification_key(item):
+            # The same inputs as the (name-free) prompt, so group members share one result
+            _, student_name, total_mark, feedback = item
+            return content_key('modify', NAME_PLACEHOLDER, provider, model, args.api_model,
+                               args.instruction, total_mark, anonymize(feedback, student_name))
+
+        results, errors = map_rows(
+            to_modify,
+            modify_row,
+            modification_key,
+            parallel=parallel,
+            checkpoint_path=checkpoint_path,
+            label_func=lambda item: item[1]
+        )
 
-    # Create backup if in-place
-    if args.in_place and not args.dry_run:
-        import shutil
-        shutil.copy2(csv_path, backup_path)
-        print(f"\nBackup created: {backup_path}")
+        for i, (row, student_name, _, original_feedback) in enumerate(to_modify):
+            if i in errors:
+                # Keep the original on failure
+                failed_count += 1
+                continue
+            result = personalize(results[i], student_name)
+            if result != original_feedback:
+                row[feedback_col] = result
+                modified_count += 1
 
     # Write output
     if not args.dry_run:
@@ -302,6 +342,13 @@ def main():
     if not args.dry_run:
         print(f"✓ Output saved to: {output_path}")
 
+    if to_modify:
+        if failed_count:
+            print(f"⚠ {failed_count} modifications failed (original kept); re-run to retry only those "
+                  f"(progress kept in {checkpoint_path.name})", file=sys.stderr)
+        else:
+            checkpoint_path.unlink(missing_ok=True)
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Output validation: catch malformed agent outputs when each task finishes.
+
+The parsers downstream are lenient. combine_normalized.py returns an empty
+mapping for a scoring file whose per-student lines it cannot read, and
+aggregate_grades.py gives a feedback card without a total mark 0. A
+malformed output used to surface only stages later, as wrong grades or a
+whole-stage re-run. Each agent now checks its output as soon as it is
+written, against what the next stage reads:
+
+- marker: the Summary, Mistakes and Positive Points sections
+- normalizer: the Mistakes and Positive Points tables (rows the parser can
+  split, with a number in the deduction/bonus column) and a per-student
+  mapping, in the parser's format, for every student whose marking it read
+- unifier: the feedback card header with the student's name, a parseable
+  Total Mark line, and Activity lines (structured)
+
+With structured outputs (structured_output.py), normalizer and unifier
+responses are JSON instead, checked against their schema in src/schemas/
+(and, for the normalizer, a mapping for every student that only lists IDs
+of its tables; for the unifier, the student's name).
+
+An invalid output is sent back to the model right away, from the same task:
+the original prompt, the invalid response and the list of problems
+(`repairs` times at most, with LLM_ATTEMPT counting the repairs in the stats
+file). An output still invalid after that is kept, so the run continues as
+before, and reported. Every failed check is an event in the stats file
+(event: validation_failure); `summary` prints the counts per stage for the
+orchestrators' final summary, and utils/show_stats.sh shows them too.
+
+Usage (orchestrators):
+    output_validator.py summary --stats-file F [--since EPOCH]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from combine_normalized import parse_freeform_student_mappings, parse_student_mappings
+from llm_telemetry import append_stats_entry, env_attempt
+from structured_output import load_schema, parse_json_output, schema_problems
+from system_config import load_snapshot
+
+# Characters of the invalid response quoted in a repair prompt
+REPAIR_QUOTE_CHARS = 30000
+
+# Names listed in a missing-students problem
+MAX_LISTED = 5
+
+# Schema problems listed for a JSON response
+MAX_SCHEMA_PROBLEMS = 10
+
+MARKER_SECTIONS = (
+    ('Summary', r'Summary'),
+    ('Mistakes Found', r'Mistakes'),
+    ('Positive Points', r'Positive'),
+)
+
+# Formats the parsers of the next stage read (shown in repair prompts)
+STRUCTURED_MAPPING_FORMAT = "*   **Student 1 (Name)**: Mistakes: M1, M3; Positives: P2"
+FREEFORM_MAPPING_FORMAT = "### Student 1: Name\n- **Mistakes**: M001, M003\n- **Positives**: P002"
+
+REPAIR_INSTRUCTIONS = """
+
+## Repair Required
+
+Your previous response to this prompt (below) cannot be used, because:
+
+{problems}
+
+Write the complete response again, in the output format required above,
+fixing these problems. Keep the content of the previous response where it was correct.
+
+### Previous Response
+
+{previous}
+"""
+
+
+def get_validation_config() -> dict:
+    """
+    Get the output validation settings from config.yaml.
+
+    Returns:
+        dict: enabled (bool) and repairs (repair requests per task)
+    """
+    config = load_snapshot()['system'].get('validation') or {}
+    return {
+        'enabled': bool(config.get('enabled', True)),
+        'repairs': int(config.get('repairs', 1)),
+    }
+
+
+def _normalize_name(name: str) -> str:
+    return ' '.join(name.replace('*', '').split()).casefold()
+
+
+def _has_section(text: str, pattern: str) -> bool:
+    return re.search(rf'^#{{1,6}}\s*(?:\d+\.\s*)?{pattern}', text, re.MULTILINE | re.IGNORECASE) is not None
+
+
+def validate_marker(text: str) -> list:
+    """
+    Check a marker assessment.
+
+    Args:
+        text: Assessment as written by marker.py
+
+    Returns:
+        List of problems (empty if valid)
+    """
+    if not text.strip():
+        return ['the response is empty']
+    return [f"no '{name}' section heading" for name, pattern in MARKER_SECTIONS
+            if not _has_section(text, pattern)]
+
+
+def _table_problems(text: str, kind: str, value_column: str) -> list:
+    """Problems with a scoring table, as combine_normalized.parse_scoring_markdown reads it."""
+    if not re.search(rf'###?\s+{kind}.*?Table', text, re.IGNORECASE):
+        return [f"no '{kind} ... Table' heading"]
+    table = re.search(rf'###?\s+{kind}.*?Table.*?\n\|.*?\|\n\|[-: |]+\|\n(.*?)(?=\n###?|\Z)',
+                      text, re.DOTALL | re.IGNORECASE)
+    if not table:
+        return [f"the {kind} table has no header row and |---| separator right after its heading"]
+
+    problems = []
+    for row in table.group(1).strip().split('\n'):
+        row = row.strip()
+        if not row or row.startswith('#') or row.startswith('*') or not row.startswith('|'):
+            continue
+        cells = [c.strip() for c in row.split('|')]
+        cells = [c for c in cells if c]
+        if len(cells) < 5:
+            problems.append(f"{kind} table row '{row[:60]}' has fewer than 5 cells")
+        elif not re.search(r'\d', cells[4]):
+            problems.append(f"{kind} table row {cells[0]} has no number in its {value_column} column")
+    return problems
+
+
+def _missing_students(names: set, students: list, expected: str) -> list:
+    """A missing-students problem ([] if every student is in names)."""
+    missing = [name for name in students if _normalize_name(name) not in names]
+    if not missing:
+        return []
+    listed = ', '.join(missing[:MAX_LISTED]) + (', ...' if len(missing) > MAX_LISTED else '')
+    return [f"no per-student mapping for {len(missing)} of {len(students)} students "
+            f"({listed}); each student needs an entry in this format:\n{expected}"]
+
+
+def validate_normalizer(output: Path, students: list, activity_id: str | None) -> list:
+    """
+    Check a normalizer scoring file.
+
+    Args:
+        output: Scoring file as written by normalizer.py
+        students: Names of the students whose markings were in the prompt
+        activity_id: Activity (structured) or None (free-form)
+
+    Returns:
+        List of problems (empty if valid)
+    """
+    text = output.read_text(encoding='utf-8')
+    if not text.strip():
+        return ['the response is empty']
+
+    problems = _table_problems(text, 'Mistake', 'Suggested Deduction')
+    problems += _table_problems(text, 'Positive', 'Suggested Bonus')
+
+    if activity_id:
+        mappings = parse_student_mappings(output, activity_id)
+        expected = STRUCTURED_MAPPING_FORMAT
+    else:
+        mappings = parse_freeform_student_mappings(output)
+        expected = FREEFORM_MAPPING_FORMAT
+    problems += _missing_students({_normalize_name(name) for name in mappings}, students, expected)
+    return problems
+
+
+def _json_problems(text: str, stage: str) -> tuple[dict | None, list]:
+    """Parse a JSON response and check it against the stage's schema."""
+    if not text.strip():
+        return None, ['the response is empty']
+    data = parse_json_output(text)
+    if data is None:
+        return None, ['the response is not one JSON object']
+    problems = schema_problems(data, load_schema(stage))
+    if len(problems) > MAX_SCHEMA_PROBLEMS:
+        problems = problems[:MAX_SCHEMA_PROBLEMS] + [f"... and {len(problems) - MAX_SCHEMA_PROBLEMS} more"]
+    return (None if problems else data), problems
+
+
+def validate_normalizer_json(text: str, students: list) -> list:
+    """
+    Check a normalizer JSON response (structured outputs).
+
+    Args:
+        text: Response as written by normalizer.py
+        students: Names of the students whose markings were in the prompt
+
+    Returns:
+        List of problems (empty if valid)
+    """
+    data, problems = _json_problems(text, 'normalizer')
+    if data is None:
+        return problems
+
+    mappings = data['student_mappings']
+    problems = _missing_students({_normalize_name(m['student']) for m in mappings}, students,
+                                 '{"student": "Name", "mistakes": ["M1"], "positives": ["P2"], ...} '
+                                 'in student_mappings')
+    for side in ('mistakes', 'positives'):
+        known = {entry['id'].strip() for entry in data[side]}
+        unknown = sorted({code.strip() for m in mappings for code in m[side]
+                          if code.strip() and code.strip().lower() != 'none' and code.strip() not in known})
+        if unknown:
+            problems.append(f"student_mappings list {side} IDs that are not in the {side} table: "
+                            f"{', '.join(unknown[:MAX_LISTED])}")
+    return problems
+
+
+def validate_unifier_json(text: str, student: str) -> list:
+    """
+    Check a unifier JSON response (structured outputs).
+
+    Args:
+        text: Response as written by unifier.py
+        student: Student name
+
+    Returns:
+        List of problems (empty if valid)
+    """
+    data, problems = _json_problems(text, 'unifier')
+    if data is None:
+        return problems
+    if _normalize_name(student) not in _normalize_name(data['student_name']):
+        return [f"student_name is '{data['student_name'].strip()}', not '{student}'"]
+    return []
+
+
+def validate_unifier(text: str, student: str, assignment_type: str) -> list:
+    """
+    Check a unifier output, as aggregate_grades.parse_feedback_card reads it.
+
+    Args:
+        text: Output as written by unifier.py
+        student: Student name
+        assignment_type: 'structured' or 'freeform'
+
+    Returns:
+        List of problems (empty if valid)
+    """
+    if not text.strip():
+        return ['the response is empty']
+
+    problems = []
+    header = re.search(r'ASSIGNMENT FEEDBACK - (.+?)$', text, re.MULTILINE)
+    if not header:
+        problems.append(f"no 'ASSIGNMENT FEEDBACK - {student}' line in the feedback card")
+    elif _normalize_name(student) not in _normalize_name(header.group(1)):
+        problems.append(f"the feedback card is headed '{header.group(1).strip()}', not '{student}'")
+    if not re.search(r'Total Mark: [\d.]+', text):
+        problems.append("no 'Total Mark: X / Y' line with a numeric mark in the feedback card")
+    if assignment_type == 'structured' and not re.search(r'Activity \d+: [\d.]+ / [\d.]+', text):
+        problems.append("no 'Activity N: X / Y' lines in the feedback card")
+    return problems
+
+
+def repair_prompt(prompt: str, previous: str, problems: list) -> str:
+    """The original prompt with the invalid response and its problems appended."""
+    if len(previous) > REPAIR_QUOTE_CHARS:
+        previous = previous[:REPAIR_QUOTE_CHARS] + '\n[... truncated]'
+    return prompt + REPAIR_INSTRUCTIONS.format(
+        problems='\n'.join(f"- {p}" for p in problems),
+        previous=previous,
+    )
+
+
+def record_failure(stats_file: str | None, stage: str, context: str, problems: list,
+                   attempt: int, action: str):
+    """
+    Append a validation failure event to the stats file.
+
+    Args:
+        stats_file: Stats JSONL path (nothing is recorded if None)
+        stage: Pipeline stage
+        context: Student and/or activity
+        problems: Problems found
+        attempt: Retry count of the call that produced the output
+        action: 'repair' (a repair is requested) or 'kept' (output kept as is)
+    """
+    if not stats_file:
+        return
+    append_stats_entry(stats_file, {
+        'timestamp': datetime.now().isoformat(),
+        'event': 'validation_failure',
+        'stage': stage,
+        'context': context,
+        'problems': problems,
+        'attempt': attempt,
+        'action': action,
+    })
+
+
+def check_output(output: str | Path, validate, prompt: str, call, stage: str, context: str,
+                 stats_file: str | None = None) -> list:
+    """
+    Validate an output file and have it repaired until it passes.
+
+    Args:
+        output: Output file the agent wrote
+        validate: Function (text) -> list of problems
+        prompt: Prompt the output answers
+        call: Function (repair prompt) -> GuardedResult of the LLM call
+        stage: Pipeline stage
+        context: Student and/or activity
+        stats_file: Stats JSONL path
+
+    Returns:
+        Problems left (empty if the output is valid)
+    """
+    config = get_validation_config()
+    if not config['enabled']:
+        return []
+
+    output = Path(output)
+    text = output.read_text(encoding='utf-8')
+    problems = validate(text)
+    base_env = os.environ.get('LLM_ATTEMPT')
+    base_attempt = env_attempt()
+    repair = 0
+    try:
+        while problems:
+            if repair >= config['repairs']:
+                record_failure(stats_file, stage, context, problems, base_attempt + repair, 'kept')
+                print(f"⚠ Invalid {stage} output for {context}, kept: {'; '.join(problems)}", file=sys.stderr)
+                return problems
+
+            record_failure(stats_file, stage, context, problems, base_attempt + repair, 'repair')
+            print(f"⚠ Invalid {stage} output for {context}, asking for a repair: {'; '.join(problems)}",
+                  file=sys.stderr)
+            repair += 1
+            os.environ['LLM_ATTEMPT'] = str(base_attempt + repair)
+            result = call(repair_prompt(prompt, text, problems))
+            if result.returncode != 0 or not result.stdout.strip():
+                problems = problems + ['the repair call failed']
+                record_failure(stats_file, stage, context, problems, base_attempt + repair, 'kept')
+                print(f"⚠ Repair call failed for {context}, invalid {stage} output kept", file=sys.stderr)
+                return problems
+
+            text = result.stdout
+            output.write_text(text, encoding='utf-8')
+            problems = validate(text)
+    finally:
+        if base_env is None:
+            os.environ.pop('LLM_ATTEMPT', None)
+        else:
+            os.environ['LLM_ATTEMPT'] = base_env
+
+    if repair:
+        print(f"✓ Repaired {stage} output for {context}")
+    return []
+
+
+def summarize(stats_file: Path, since: float | None = None) -> dict:
+    """
+    Count validation failures per stage.
+
+    Args:
+        stats_file: Stats JSONL of the run
+        since: Only events after this epoch time (e.g. the start of the run)
+
+    Returns:
+        dict: {stage: {failures, outputs, repaired, kept}} where failures
+        counts failed checks and outputs the distinct outputs that failed one
+    """
+    after = datetime.fromtimestamp(since).isoformat() if since else ''
+    last_action = {}
+    failures = defaultdict(int)
+    if stats_file.exists():
+        for line in stats_file.read_text(encoding='utf-8').splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get('event') != 'validation_failure' or entry.get('timestamp', '') < after:
+                continue
+            failures[entry['stage']] += 1
+            last_action[(entry['stage'], entry.get('context'))] = entry.get('action')
+
+    summary = {}
+    for stage, count in failures.items():
+        actions = [action for (s, _), action in last_action.items() if s == stage]
+        kept = sum(1 for action in actions if action == 'kept')
+        summary[stage] = {'failures': count, 'outputs': len(actions),
+                          'repaired': len(actions) - kept, 'kept': kept}
+    return summary
+
+
+def cmd_summary(args):
+    summary = summarize(Path(args.stats_file), args.since)
+    order = ['marker', 'normalizer', 'unifier']
+    for stage in sorted(summary, key=lambda s: (order.index(s) if s in order else len(order), s)):
+        s = summary[stage]
+        print(f"{stage}: {s['failures']} failed checks on {s['outputs']} outputs, "
+              f"{s['repaired']} repaired, {s['kept']} kept invalid")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent output validation")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    summary = sub.add_parser('summary', help='Print validation failure counts per stage')
+    summary.add_argument('--stats-file', required=True, help='Stats JSONL of the run')
+    summary.add_argument('--since', type=float, help='Only count failures after this epoch time')
+    summary.set_defaults(func=cmd_summary)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Content-addressed prompt store.
+
+Agents write each prompt once to processed/prompts/<hash>.txt and pass the
+path to llm_caller.sh with --prompt-file, which streams it to the CLI on
+stdin (or to api/caller.py as a file). Prompts never travel through argv,
+so large notebooks can't hit ARG_MAX or per-argument limits, and identical
+prompts (retries, reruns) are stored once. The stored file is also the
+debug copy of the prompt.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+# Override for the store location (defaults to processed/prompts/)
+PROMPT_DIR_ENV = 'AGENTIC_PROMPT_DIR'
+
+
+def prompt_dir_for(path: str | Path) -> Path:
+    """
+    Find the prompt store for an agent output.
+
+    Uses $AGENTIC_PROMPT_DIR if set, else prompts/ under the nearest
+    enclosing processed/ directory, else prompts/ next to the output.
+
+    Args:
+        path: Output (or session log) path of the agent
+
+    Returns:
+        Path: Prompt store directory
+    """
+    override = os.environ.get(PROMPT_DIR_ENV)
+    if override:
+        return Path(override)
+
+    path = Path(path).resolve()
+    for parent in path.parents:
+        if parent.name == 'processed':
+            return parent / 'prompts'
+    return path.parent / 'prompts'
+
+
+def save_prompt(prompt: str, near: str | Path) -> Path:
+    """
+    Write a prompt to the store, keyed by its SHA-256.
+
+    Args:
+        prompt: Prompt text
+        near: Output path of the agent, used to locate the store
+
+    Returns:
+        Path: Stored prompt file
+    """
+    data = prompt.encode('utf-8')
+    store = prompt_dir_for(near)
+    prompt_file = store / f"{hashlib.sha256(data).hexdigest()[:16]}.txt"
+    if prompt_file.exists():
+        return prompt_file
+
+    store.mkdir(parents=True, exist_ok=True)
+    # Write atomically: parallel agents may store the same prompt
+    fd, tmp = tempfile.mkstemp(dir=store, prefix='.prompt.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, prompt_file)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return prompt_file
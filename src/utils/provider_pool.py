@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Provider pool: spread headless calls across several LLM providers.
+
+The provider_pool section of configs/config.yaml lists providers (and
+optionally models) with weights. Marker and unifier agents pick a member for
+each call by smooth weighted round-robin, so e.g. claude:2, gemini:1 sends
+two calls to claude for every one to gemini, all running at once.
+
+A member that returns a quota or overload error is put in cooldown and the
+call fails over to the next member. Later calls skip it until the cooldown
+ends, when it gets traffic again. A member that fails the run's preflight
+(src/preflight.py) is dropped for the rest of the run. The round-robin counters and cooldowns
+live in a JSON state file shared by all agents of a run
+(processed/stats/provider_pool.json), updated under a file lock.
+
+Marker and unifier outputs get a <output>.meta.json sidecar that records
+the provider and model that produced them, with or without the pool.
+
+Usage (orchestrators):
+    provider_pool.py init --state FILE [--force]   Print the export line if the pool is enabled
+    provider_pool.py status --state FILE           Show members, calls and cooldowns
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from quota_detector import is_overload_error, is_quota_error
+from system_config import load_snapshot
+
+# Set by the orchestrators when the pool is enabled: path of the state file
+POOL_ENV = 'AGENTIC_PROVIDER_POOL'
+
+
+def get_pool_config() -> dict:
+    """
+    Get the provider_pool settings from config.yaml.
+
+    Returns:
+        dict: enabled (bool), members (list of {provider, model, weight}),
+              cooldown and overload_cooldown (seconds)
+    """
+    config = load_snapshot()['system'].get('provider_pool') or {}
+    members = []
+    for entry in config.get('providers') or []:
+        if isinstance(entry, str):
+            entry = {'provider': entry}
+        if not entry.get('provider') or int(entry.get('weight', 1)) <= 0:
+            continue
+        members.append({
+            'provider': entry['provider'],
+            'model': entry.get('model') or '',
+            'weight': int(entry.get('weight', 1)),
+        })
+    return {
+        'enabled': bool(config.get('enabled', False)),
+        'members': members,
+        'cooldown': int(config.get('cooldown', 600)),
+        'overload_cooldown': int(config.get('overload_cooldown', 60)),
+    }
+
+
+def member_key(member: dict) -> str:
+    """State key of a pool member, e.g. 'gemini/gemini-2.5-flash'."""
+    return f"{member['provider']}/{member['model'] or 'default'}"
+
+
+@contextmanager
+def _locked_state(state_path: Path):
+    """Load the pool state under an exclusive lock and save it on exit."""
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(state_path.with_name(state_path.name + '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            state = json.loads(state_path.read_text(encoding='utf-8'))
+        except (OSError, json.JSONDecodeError):
+            state = {}
+        members = state.setdefault('members', {})
+        yield members
+        tmp = state_path.with_name(state_path.name + f'.{os.getpid()}.tmp')
+        tmp.write_text(json.dumps(state, indent=2), encoding='utf-8')
+        os.replace(tmp, state_path)
+
+
+def choose_member(state_path: Path, members: list, exclude: set = frozenset()) -> dict | None:
+    """
+    Pick the next member by smooth weighted round-robin.
+
+    Members in cooldown are skipped. If every remaining member is in
+    cooldown, the one whose cooldown ends first is tried anyway, so a call
+    is never refused while some member might have recovered.
+
+    Args:
+        state_path: Pool state file
+        members: Pool members from get_pool_config()
+        exclude: Keys of members already tried for this call
+
+    Returns:
+        dict: The chosen member, or None if all were excluded
+    """
+    candidates = [m for m in members if member_key(m) not in exclude]
+    if not candidates:
+        return None
+
+    now = time.time()
+    with _locked_state(state_path) as state:
+        entries = {member_key(m): state.setdefault(member_key(m), {}) for m in candidates}
+        healthy = [m for m in candidates if entries[member_key(m)].get('cooldown_until', 0) <= now]
+        if not healthy:
+            return min(candidates, key=lambda m: entries[member_key(m)].get('cooldown_until', 0))
+
+        total = sum(m['weight'] for m in healthy)
+        for m in healthy:
+            entry = entries[member_key(m)]
+            entry['current'] = entry.get('current', 0) + m['weight']
+        chosen = max(healthy, key=lambda m: entries[member_key(m)]['current'])
+        entries[member_key(chosen)]['current'] -= total
+        return chosen
+
+
+def report_result(state_path: Path, member: dict, error: str | None = None,
+                  cooldown: int = 0, message: str = ''):
+    """
+    Record the outcome of a call in the pool state.
+
+    Args:
+        state_path: Pool state file
+        member: The member that made the call
+        error: None on success, else 'quota', 'overload' or 'error'
+        cooldown: Seconds to keep the member out of rotation
+        message: Error excerpt, kept for `status`
+    """
+    with _locked_state(state_path) as state:
+        entry = state.setdefault(member_key(member), {})
+        entry['calls'] = entry.get('calls', 0) + 1
+        if error is None:
+            entry['successes'] = entry.get('successes', 0) + 1
+            return
+        entry['failures'] = entry.get('failures', 0) + 1
+        if cooldown:
+            entry['cooldown_until'] = max(entry.get('cooldown_until', 0), time.time() + cooldown)
+            entry['last_error'] = f"{error}: {message.strip()[-200:]}"
+
+
+def drop_member(state_path: Path, member: dict, reason: str):
+    """
+    Take a member out of the pool for the rest of the run (until the next init).
+
+    Args:
+        state_path: Pool state file
+        member: The member to drop
+        reason: Why, kept for `status`
+    """
+    with _locked_state(state_path) as state:
+        state.setdefault(member_key(member), {})['dropped'] = reason.strip()[-200:]
+
+
+def active_members(state_path: Path, members: list) -> list:
+    """Members that were not dropped (all of them, if every one was)."""
+    with _locked_state(state_path) as state:
+        active = [m for m in members if not state.get(member_key(m), {}).get('dropped')]
+    return active or members
+
+
+def classify_error(output: str, provider: str) -> str:
+    """Classify a failed call as 'quota', 'overload' or 'error'."""
+    if is_quota_error(output, provider):
+        return 'quota'
+    if is_overload_error(output):
+        return 'overload'
+    return 'error'
+
+
+def call_with_failover(build_cmd, run_call, provider: str, model: str | None,
+                       use_pool: bool = True):
+    """
+    Make an agent's LLM call through the pool, failing over on quota or
+    overload errors. Without an active pool, makes the single call as given.
+
+    Args:
+        build_cmd: Function (provider, model) -> llm_caller.sh command
+        run_call: Function (cmd) -> result with returncode, stdout, stderr
+        provider: The agent's --provider (used when the pool is inactive)
+        model: The agent's --model (used when the pool is inactive)
+        use_pool: False to bypass the pool (API mode calls use --api-model)
+
+    Returns:
+        Tuple of (result of the last call, {provider, model} that made it,
+        list of failed-over attempts as {provider, model, error})
+    """
+    state_file = os.environ.get(POOL_ENV) if use_pool else None
+    config = get_pool_config() if state_file else None
+    if not config or not config['members']:
+        return run_call(build_cmd(provider, model)), {'provider': provider, 'model': model or ''}, []
+
+    state_path = Path(state_file)
+    members = active_members(state_path, config['members'])
+    failovers = []
+    tried = set()
+    while True:
+        member = choose_member(state_path, members, tried)
+        if member is None:
+            return result, last, failovers
+        tried.add(member_key(member))
+
+        result = run_call(build_cmd(member['provider'], member['model'] or None))
+        last = {'provider': member['provider'], 'model': member['model']}
+        if result.returncode == 0:
+            report_result(state_path, member)
+            return result, last, failovers
+
+        output = (result.stderr or '') + (result.stdout or '')
+        error = classify_error(output, member['provider'])
+        cooldown = {'quota': config['cooldown'], 'overload': config['overload_cooldown']}.get(error, 0)
+        report_result(state_path, member, error, cooldown, output)
+        if not cooldown:
+            return result, last, failovers
+
+        failovers.append({**last, 'error': error})
+        print(f"⚠ {member_key(member)}: {error} error, out of rotation for {cooldown}s; failing over",
+              file=sys.stderr)
+
+
+def write_output_meta(output: str | Path, stage: str, context: str, used: dict,
+                      failovers: list = None, api_model: str | None = None,
+                      extra: dict | None = None):
+    """
+    Write the <output>.meta.json sidecar recording who produced an output.
+
+    Args:
+        output: Output file written by the agent
+        stage: Pipeline stage
+        context: Student and/or activity
+        used: {provider, model} that made the successful call
+        failovers: Members tried first, from call_with_failover()
+        api_model: API model, when the call went through the API
+        extra: Additional fields (e.g. the marker cascade's decision)
+    """
+    meta = {
+        'stage': stage,
+        'context': context,
+        'interface': 'api' if api_model else 'cli',
+        'provider': used['provider'],
+        'model': api_model or used['model'] or None,  # None = the CLI's default model
+        'failovers': failovers or [],
+        'timestamp': datetime.now().isoformat(),
+        **(extra or {}),
+    }
+    Path(f"{output}.meta.json").write_text(json.dumps(meta, indent=2) + '\n', encoding='utf-8')
+
+
+def cmd_init(args):
+    config = get_pool_config()
+    if not (config['enabled'] or args.force):
+        return
+    if not config['members']:
+        print("Error: provider_pool.providers in config.yaml is empty", file=sys.stderr)
+        sys.exit(1)
+    # Members dropped by an earlier run's preflight get another chance
+    if Path(args.state).exists():
+        with _locked_state(Path(args.state)) as state:
+            for entry in state.values():
+                entry.pop('dropped', None)
+    print(f"export {POOL_ENV}={Path(args.state).resolve()}")
+    members = ', '.join(f"{member_key(m)}:{m['weight']}" for m in config['members'])
+    print(f"✓ Provider pool: {members}", file=sys.stderr)
+
+
+def cmd_status(args):
+    config = get_pool_config()
+    try:
+        state = json.loads(Path(args.state).read_text(encoding='utf-8')).get('members', {})
+    except (OSError, json.JSONDecodeError):
+        state = {}
+    now = time.time()
+    print(f"{'member':40s} {'weight':>6s} {'calls':>6s} {'fail':>5s}  status")
+    for m in config['members']:
+        entry = state.get(member_key(m), {})
+        remaining = entry.get('cooldown_until', 0) - now
+        status = f"cooldown {remaining:.0f}s ({entry.get('last_error', '')[:60]})" if remaining > 0 else "ok"
+        if entry.get('dropped'):
+            status = f"dropped ({entry['dropped'][:60]})"
+        print(f"{member_key(m):40s} {m['weight']:6d} {entry.get('calls', 0):6d} "
+              f"{entry.get('failures', 0):5d}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provider pool for headless LLM calls")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    init = sub.add_parser('init', help='Print the export line for an enabled pool')
+    init.add_argument('--state', required=True, help='Pool state file for this run')
+    init.add_argument('--force', action='store_true', help='Enable even if provider_pool.enabled is false')
+    init.set_defaults(func=cmd_init)
+
+    status = sub.add_parser('status', help='Show members, calls and cooldowns')
+    status.add_argument('--state', default=os.environ.get(POOL_ENV), required=not os.environ.get(POOL_ENV),
+                        help='Pool state file (default: $AGENTIC_PROVIDER_POOL)')
+    status.set_defaults(func=cmd_status)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -76,6 +76,37 @@ def is_quota_error(error_output: str, provider: str) -> bool:
     return False
 
 
+def is_overload_error(error_output: str) -> bool:
+    """
+    Detect if error is due to the provider being temporarily overloaded.
+
+    Unlike quota errors, these usually clear within minutes.
+
+    Args:
+        error_output: Combined stderr and stdout from LLM call
+
+    Returns:
+        True if an overload/unavailable error detected, False otherwise
+    """
+    error_lower = error_output.lower()
+
+    overload_patterns = [
+        "overloaded",
+        "service unavailable",
+        "temporarily unavailable",
+        "server is busy",
+        "model is currently experiencing high demand",
+        "status: unavailable",
+        "error 529",
+        "status 529",
+        "error 503",
+        "status 503",
+        "503 unavailable"
+    ]
+
+    return any(pattern in error_lower for pattern in overload_patterns)
+
+
 def print_quota_warning(provider: str, error_output: str):
     """
     Print a clear, visible warning about quota exhaustion.
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Quota ledger: provider-wide request and token budgets shared by every run.
+
+Two runs on the same account (two assignments marked at once, or a batch
+overlapping an ad hoc run) each assume they have the whole rate limit. The
+ledger is a SQLite database shared by all processes of the user, by default
+~/.cache/agentic-marker/quota_ledger.db. Every headless call reserves a
+request and its estimated tokens before it starts (llm_caller.sh for CLI
+calls, api/caller.py for API calls) and settles the actual tokens after.
+
+Budgets are set per interface (cli, api) and provider in the quota_ledger
+section of configs/config.yaml, per minute and per day (rolling windows):
+
+    quota_ledger:
+      enabled: true
+      budgets:
+        api:
+          claude: {requests_per_minute: 50, tokens_per_minute: 40000}
+
+A call that would exceed a per-minute budget waits until enough of the
+window has passed. A call that would exceed a per-day budget fails at once
+with a quota error, so agents report it like a provider quota error.
+Reservations of processes that died are kept at their estimate.
+
+Usage:
+    quota_ledger.py acquire --interface cli --provider claude --prompt-file F [--pid PID]
+        Reserve a call (waits for per-minute budget); prints the reservation ID
+    quota_ledger.py settle --id ID --tokens N
+        Record the actual tokens of a reserved call
+    quota_ledger.py remaining [--interface I] [--provider P] [--json]
+        Show the remaining budgets
+    quota_ledger.py check --interface I --provider P [--requests N] [--tokens N]
+        Exit 3 if the per-day budgets cannot cover N more requests/tokens
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from system_config import load_snapshot
+
+# Ledger database path; setting it also enables the ledger (benchmarks use a
+# per-run ledger this way)
+LEDGER_ENV = 'AGENTIC_QUOTA_LEDGER'
+
+# Exit status of `check` when the per-day budget cannot cover the request
+EXHAUSTED_EXIT = 3
+
+WINDOWS = {'minute': 60, 'day': 86400}
+BUDGET_KEYS = ['requests_per_minute', 'tokens_per_minute', 'requests_per_day', 'tokens_per_day']
+
+# Seconds between checks while waiting for per-minute budget
+POLL_INTERVAL = 1.0
+
+
+class BudgetExhausted(Exception):
+    """A per-day budget cannot cover the call."""
+
+
+def get_ledger_config() -> dict:
+    """
+    Get the quota_ledger settings from config.yaml.
+
+    Returns:
+        dict: enabled (bool), path (Path), max_wait (seconds) and budgets
+              ({interface: {provider: {budget key: limit}}}, 0 = no limit)
+    """
+    config = load_snapshot()['system'].get('quota_ledger') or {}
+    path = os.environ.get(LEDGER_ENV) or config.get('path')
+    if not path:
+        cache_home = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+        path = Path(cache_home) / 'agentic-marker' / 'quota_ledger.db'
+    return {
+        'enabled': bool(config.get('enabled', False)) or bool(os.environ.get(LEDGER_ENV)),
+        'path': Path(path).expanduser(),
+        'max_wait': int(config.get('max_wait', 600)),
+        'budgets': config.get('budgets') or {},
+    }
+
+
+def normalize_provider(provider: str) -> str:
+    """Map provider aliases to the names used in budgets (openai -> codex)."""
+    return {'anthropic': 'claude', 'google': 'gemini', 'openai': 'codex'}.get(provider, provider)
+
+
+def get_budget(config: dict, interface: str, provider: str) -> dict:
+    """Budget limits for an interface and provider (empty if none are set)."""
+    budget = (config['budgets'].get(interface) or {}).get(normalize_provider(provider)) or {}
+    return {key: int(budget.get(key) or 0) for key in BUDGET_KEYS if budget.get(key)}
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS calls (
+            id INTEGER PRIMARY KEY,
+            scope TEXT NOT NULL,
+            ts REAL NOT NULL,
+            tokens INTEGER NOT NULL,
+            pid INTEGER,
+            settled INTEGER NOT NULL DEFAULT 0,
+            context TEXT
+        )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS calls_scope_ts ON calls (scope, ts)")
+    return conn
+
+
+def _pid_alive(pid: int | None) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _usage(conn: sqlite3.Connection, scope: str, now: float) -> dict:
+    """Requests and tokens used in each window."""
+    usage = {}
+    for name, seconds in WINDOWS.items():
+        requests, tokens = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(tokens), 0) FROM calls WHERE scope = ? AND ts > ?",
+            (scope, now - seconds)).fetchone()
+        usage[name] = {'requests': requests, 'tokens': tokens}
+    return usage
+
+
+def _over_budget(budget: dict, usage: dict, tokens: int) -> str | None:
+    """Name of the first budget the call would exceed, or None."""
+    for key in BUDGET_KEYS:
+        if key not in budget:
+            continue
+        kind, window = key.split('_per_')
+        used = usage[window][kind]
+        if used == 0:
+            continue  # A call larger than a whole budget is still let through alone
+        if used + (1 if kind == 'requests' else tokens) > budget[key]:
+            return key
+    return None
+
+
+def acquire(interface: str, provider: str, tokens: int, context: str = '',
+            pid: int | None = None) -> int | None:
+    """
+    Reserve a call in the ledger, waiting for per-minute budget if needed.
+
+    Args:
+        interface: 'cli' or 'api'
+        provider: Provider name
+        tokens: Estimated tokens of the call
+        context: Stage/context, kept for `remaining`
+        pid: Process that makes the call (default: this one); its
+             reservation is kept at the estimate if it dies unsettled
+
+    Returns:
+        int: Reservation ID, or None if the ledger is disabled or has no
+             budget for this provider
+
+    Raises:
+        BudgetExhausted: A per-day budget cannot cover the call
+    """
+    config = get_ledger_config()
+    budget = get_budget(config, interface, provider) if config['enabled'] else {}
+    if not budget:
+        return None
+
+    scope = f"{interface}:{normalize_provider(provider)}"
+    conn = _connect(config['path'])
+    give_up_at = time.time() + config['max_wait']
+    warned = False
+    try:
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM calls WHERE ts <= ?", (now - WINDOWS['day'],))
+            exceeded = _over_budget(budget, _usage(conn, scope, now), tokens)
+            if exceeded is None or (exceeded.endswith('_minute') and now >= give_up_at):
+                if exceeded:
+                    print(f"⚠ Quota ledger: {scope} still over {exceeded} after "
+                          f"{config['max_wait']}s; proceeding", file=sys.stderr)
+                cursor = conn.execute(
+                    "INSERT INTO calls (scope, ts, tokens, pid, context) VALUES (?, ?, ?, ?, ?)",
+                    (scope, now, tokens, pid or os.getpid(), context))
+                conn.execute("COMMIT")
+                return cursor.lastrowid
+            conn.execute("COMMIT")
+
+            if exceeded.endswith('_day'):
+                raise BudgetExhausted(f"{scope} {exceeded} budget ({budget[exceeded]:,}) exhausted: "
+                                      f"quota exceeded in the shared quota ledger")
+            if not warned:
+                print(f"⚠ Quota ledger: {scope} at its {exceeded} budget ({budget[exceeded]:,}); "
+                      f"waiting for other runs' calls to age out", file=sys.stderr)
+                warned = True
+            time.sleep(POLL_INTERVAL)
+    finally:
+        conn.close()
+
+
+def settle(reservation_id: int | None, tokens: int):
+    """
+    Record the actual tokens of a reserved call.
+
+    Args:
+        reservation_id: ID from acquire() (nothing is done for None)
+        tokens: Input plus output tokens reported for the call
+    """
+    if reservation_id is None:
+        return
+    conn = _connect(get_ledger_config()['path'])
+    try:
+        conn.execute("UPDATE calls SET tokens = ?, settled = 1 WHERE id = ?", (tokens, reservation_id))
+    finally:
+        conn.close()
+
+
+def remaining(interface: str | None = None, provider: str | None = None) -> dict:
+    """
+    Remaining budget for each interface and provider that has one.
+
+    Args:
+        interface: Only this interface (default: all)
+        provider: Only this provider (default: all)
+
+    Returns:
+        dict: {"<interface>:<provider>": {budget key: {limit, used,
+              remaining}, in_flight: n}}
+    """
+    config = get_ledger_config()
+    result = {}
+    if not config['budgets'] or not config['path'].exists():
+        conn = None
+    else:
+        conn = _connect(config['path'])
+    now = time.time()
+    try:
+        for iface, providers in config['budgets'].items():
+            if interface and iface != interface:
+                continue
+            for prov in (providers or {}):
+                if provider and prov != normalize_provider(provider):
+                    continue
+                budget = get_budget(config, iface, prov)
+                if not budget:
+                    continue
+                scope = f"{iface}:{prov}"
+                usage = _usage(conn, scope, now) if conn else \
+                    {w: {'requests': 0, 'tokens': 0} for w in WINDOWS}
+                entry = {}
+                for key, limit in budget.items():
+                    kind, window = key.split('_per_')
+                    used = usage[window][kind]
+                    entry[key] = {'limit': limit, 'used': used, 'remaining': max(limit - used, 0)}
+                in_flight = 0
+                if conn:
+                    pids = conn.execute("SELECT pid FROM calls WHERE scope = ? AND settled = 0 AND ts > ?",
+                                        (scope, now - WINDOWS['day'])).fetchall()
+                    in_flight = sum(1 for (pid,) in pids if _pid_alive(pid))
+                entry['in_flight'] = in_flight
+                result[scope] = entry
+    finally:
+        if conn:
+            conn.close()
+    return result
+
+
+def estimate_tokens(path: str | None) -> int:
+    """Rough token estimate of a prompt file (about four characters per token)."""
+    try:
+        return Path(path).stat().st_size // 4 + 1 if path else 0
+    except OSError:
+        return 0
+
+
+def cmd_acquire(args):
+    tokens = args.tokens if args.tokens is not None else estimate_tokens(args.prompt_file)
+    try:
+        reservation = acquire(args.interface, args.provider, tokens, args.context, args.pid)
+    except BudgetExhausted as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if reservation is not None:
+        print(reservation)
+
+
+def cmd_settle(args):
+    settle(args.id, args.tokens)
+
+
+def cmd_remaining(args):
+    budgets = remaining(args.interface, args.provider)
+    if args.json:
+        print(json.dumps(budgets, indent=2))
+        return
+    if not budgets:
+        print("No quota ledger budgets configured (quota_ledger.budgets in config.yaml)")
+        return
+    print(f"{'scope':14s} {'budget':20s} {'limit':>10s} {'used':>10s} {'remaining':>10s}")
+    for scope, entry in budgets.items():
+        for key in BUDGET_KEYS:
+            if key in entry:
+                b = entry[key]
+                print(f"{scope:14s} {key:20s} {b['limit']:10,d} {b['used']:10,d} {b['remaining']:10,d}")
+        print(f"{scope:14s} {'in flight':20s} {entry['in_flight']:10d}")
+
+
+def cmd_check(args):
+    config = get_ledger_config()
+    if not config['enabled']:
+        return
+    entry = remaining(args.interface, args.provider).get(
+        f"{args.interface}:{normalize_provider(args.provider)}")
+    if not entry:
+        return
+    short = []
+    for key, need in (('requests_per_day', args.requests), ('tokens_per_day', args.tokens)):
+        if key in entry and entry[key]['remaining'] < need:
+            short.append(f"{key} {entry[key]['remaining']:,} left of {entry[key]['limit']:,}")
+    scope = f"{args.interface}:{normalize_provider(args.provider)}"
+    if short:
+        print(f"{scope} " + ', '.join(short))
+        sys.exit(EXHAUSTED_EXIT)
+    left = ', '.join(f"{key} {entry[key]['remaining']:,}" for key in BUDGET_KEYS if key in entry)
+    print(f"{scope} {left}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared quota ledger for LLM calls")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def scope_args(p, required=True):
+        p.add_argument('--interface', choices=['cli', 'api'], required=required, help='Call interface')
+        p.add_argument('--provider', required=required, help='Provider (claude, gemini, codex)')
+
+    acq = sub.add_parser('acquire', help='Reserve a call; prints the reservation ID')
+    scope_args(acq)
+    acq.add_argument('--prompt-file', help='Prompt file, for the token estimate')
+    acq.add_argument('--tokens', type=int, help='Token estimate (default: from --prompt-file)')
+    acq.add_argument('--context', default='', help='Stage/context of the call')
+    acq.add_argument('--pid', type=int, help='Process making the call (default: this one)')
+    acq.set_defaults(func=cmd_acquire)
+
+    stl = sub.add_parser('settle', help='Record the actual tokens of a call')
+    stl.add_argument('--id', type=int, required=True, help='Reservation ID from acquire')
+    stl.add_argument('--tokens', type=int, required=True, help='Input plus output tokens')
+    stl.set_defaults(func=cmd_settle)
+
+    rem = sub.add_parser('remaining', help='Show the remaining budgets')
+    scope_args(rem, required=False)
+    rem.add_argument('--json', action='store_true', help='Print JSON')
+    rem.set_defaults(func=cmd_remaining)
+
+    chk = sub.add_parser('check', help='Exit 3 if the per-day budgets are exhausted')
+    scope_args(chk)
+    chk.add_argument('--requests', type=int, default=1, help='Requests needed (default: 1)')
+    chk.add_argument('--tokens', type=int, default=1, help='Tokens needed (default: 1)')
+    chk.set_defaults(func=cmd_check)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
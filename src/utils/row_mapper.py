@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Concurrent, checkpointed row mapping for per-student LLM calls.
+
+Used by the feedback summarizer and modifier to process CSV rows with:
+- bounded parallelism (a thread pool; the work is subprocess-bound)
+- a sidecar JSONL checkpoint, so a re-run after a crash skips finished rows
+- results returned in input order
+- deduplication: rows with the same content key (e.g. group feedback copied
+  to every member) are processed once and share the result; callers send
+  NAME_PLACEHOLDER instead of the student's name (see anonymize) and name
+  each row's copy afterwards (see personalize)
+"""
+
+import hashlib
+import json
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar('T')
+
+# Stands in for the student's name in the prompt of a deduplicated row, so a
+# result shared by several students never names one of them to the others
+NAME_PLACEHOLDER = '[STUDENT]'
+
+
+def content_key(*parts: str) -> str:
+    """Hash the inputs that determine a row's result."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def anonymize(text: str, student_name: str) -> str:
+    """Replace the student's name (as a whole word) with NAME_PLACEHOLDER."""
+    if not student_name:
+        return text
+    return re.sub(rf'(?<!\w){re.escape(student_name)}(?!\w)', NAME_PLACEHOLDER, text)
+
+
+def personalize(text: str, student_name: str) -> str:
+    """Put the student's name back in place of NAME_PLACEHOLDER."""
+    return text.replace(NAME_PLACEHOLDER, student_name)
+
+
+def checkpoint_path_for(output_path: Path) -> Path:
+    """Get the checkpoint sidecar path for an output file."""
+    return output_path.with_name(output_path.name + '.checkpoint.jsonl')
+
+
+def load_checkpoint(checkpoint_path: Optional[Path]) -> Dict[str, str]:
+    """
+    Load completed results from a checkpoint file.
+
+    A line truncated by a crash is ignored.
+
+    Returns:
+        Dictionary of {content_key: result}
+    """
+    results = {}
+    if not checkpoint_path or not checkpoint_path.exists():
+        return results
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                results[record['key']] = record['result']
+            except (json.JSONDecodeError, KeyError, TypeError):
+                continue
+    return results
+
+
+def map_rows(
+    items: Sequence[T],
+    func: Callable[[T], str],
+    key_func: Callable[[T], str],
+    parallel: int = 4,
+    checkpoint_path: Optional[Path] = None,
+    label_func: Optional[Callable[[T], str]] = None,
+) -> Tuple[List[Optional[str]], Dict[int, str]]:
+    """
+    Apply func to every item concurrently, with checkpointing and deduplication.
+
+    Args:
+        items: Rows to process
+        func: Produces the result for one row; raises on failure
+        key_func: Content key for a row (see content_key); rows with equal
+            keys are processed once
+        parallel: Maximum concurrent calls
+        checkpoint_path: JSONL file recording each successful result as it
+            completes; existing entries are reused instead of recomputed
+        label_func: Short description of a row for progress output
+
+    Returns:
+        Tuple of (results in input order, {index: error message}). Failed
+        rows have None as their result and are not checkpointed.
+    """
+    label_func = label_func or (lambda item: '')
+    keys = [key_func(item) for item in items]
+    cached = load_checkpoint(checkpoint_path)
+
+    # First index for each key not already in the checkpoint
+    pending: Dict[str, int] = {}
+    for index, key in enumerate(keys):
+        if key not in cached and key not in pending:
+            pending[key] = index
+
+    duplicates = len(items) - len(set(keys))
+    reused = len({k for k in keys if k in cached})
+    print(f"Rows: {len(items)} | to process: {len(pending)} | "
+          f"cached: {reused} | duplicates: {duplicates} | parallel: {parallel}")
+
+    completed: Dict[str, str] = dict(cached)
+    errors_by_key: Dict[str, str] = {}
+    checkpoint = open(checkpoint_path, 'a', encoding='utf-8') if checkpoint_path else None
+
+    try:
+        if pending:
+            done = 0
+            with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+                futures = {executor.submit(func, items[index]): key for key, index in pending.items()}
+                for future in as_completed(futures):
+                    key = futures[future]
+                    label = label_func(items[pending[key]])
+                    try:
+                        result = future.result()
+                        status = 'done'
+                    except Exception as e:
+                        result = None
+                        errors_by_key[key] = str(e)
+                        status = f'failed ({e})'
+
+                    # Results are consumed here on the main thread only
+                    done += 1
+                    if result is not None:
+                        completed[key] = result
+                        if checkpoint:
+                            checkpoint.write(json.dumps({'key': key, 'result': result}) + '\n')
+                            checkpoint.flush()
+                    stream = sys.stderr if result is None else sys.stdout
+                    print(f"[{done}/{len(pending)}] {label}: {status}", file=stream, flush=True)
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    results = [completed.get(key) for key in keys]
+    errors = {i: errors_by_key[key] for i, key in enumerate(keys) if key in errors_by_key}
+    return results, errors
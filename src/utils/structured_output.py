@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Structured outputs: JSON from the normalizer and unifier.
+
+The scoring tables, per-student mappings and marks used to be scraped from
+the agents' Markdown (combine_normalized.py, aggregate_grades.py), where a
+renamed heading or a reworded mark line made a student's mapping or mark
+silently disappear. With structured outputs enabled in config.yaml, both
+agents ask for one JSON object matching their schema in src/schemas/:
+
+- API calls enforce the schema with the provider's structured output mode
+  (Anthropic forced tool use, Gemini response_schema, OpenAI json_schema)
+- CLI calls get the schema and instructions in the prompt, and the response
+  is checked against it (output_validator.py asks for a repair)
+
+The agent keeps the JSON next to its output (A1_scoring.json,
+Name_feedback.json) and writes the Markdown rendered from it to the usual
+path, for instructors and the review dashboard. combine_normalized.py,
+aggregate_grades.py and rescore.py read the JSON when it is there and not
+older than the Markdown (a Markdown file edited by hand still wins), and
+parse the Markdown otherwise, as before.
+"""
+
+import json
+import re
+from pathlib import Path
+
+from system_config import load_snapshot
+
+SCHEMA_DIR = Path(__file__).parent.parent / "schemas"
+
+JSON_INSTRUCTIONS = """
+
+## JSON Output
+
+Give your whole response as one JSON object matching the schema below,
+instead of the Markdown layout of the Output Format section: the same
+content, one field per section. Output only the JSON object, with no text or
+code fence around it. Marks, counts and ratings are numbers; text fields may
+use Markdown.
+
+```json
+{schema}
+```
+"""
+
+# Leading ```json fence of a CLI response
+FENCE_PATTERN = re.compile(r'^```(?:json)?\s*\n(.*?)\n```\s*$', re.DOTALL)
+
+_TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'integer': int,
+    'number': (int, float),
+    'boolean': bool,
+}
+
+
+def get_structured_output_config() -> dict:
+    """
+    Get the structured output settings from config.yaml.
+
+    Returns:
+        dict: enabled (bool)
+    """
+    config = load_snapshot()['system'].get('structured_output') or {}
+    return {'enabled': bool(config.get('enabled', True))}
+
+
+def schema_path(stage: str) -> Path:
+    """Schema file of a stage ('normalizer' or 'unifier')."""
+    return SCHEMA_DIR / f"{stage}.json"
+
+
+def load_schema(stage: str) -> dict:
+    """Load the schema of a stage."""
+    with open(schema_path(stage), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def json_instructions(stage: str) -> str:
+    """Prompt section asking for the stage's JSON object (appended to the prompt)."""
+    return JSON_INSTRUCTIONS.format(schema=json.dumps(load_schema(stage), indent=2))
+
+
+def parse_json_output(text: str) -> dict | None:
+    """
+    Parse a JSON response.
+
+    Args:
+        text: Response text (a code fence around the object is accepted)
+
+    Returns:
+        The object, or None if the text is not one JSON object
+    """
+    text = text.strip()
+    fenced = FENCE_PATTERN.match(text)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def schema_problems(data, schema: dict, path: str = 'response') -> list:
+    """
+    Check a value against a schema (the subset src/schemas/ uses: type,
+    required, properties, items).
+
+    Returns:
+        List of problems (empty if the value matches)
+    """
+    expected = schema.get('type')
+    if expected:
+        ok = isinstance(data, _TYPES[expected]) and not (
+            isinstance(data, bool) and expected in ('integer', 'number'))
+        if expected == 'integer' and isinstance(data, float) and data.is_integer():
+            ok = True
+        if not ok:
+            return [f"{path} is not {'an' if expected[0] in 'aeiou' else 'a'} {expected}"]
+
+    problems = []
+    if expected == 'object':
+        for key in schema.get('required', []):
+            if key not in data:
+                problems.append(f"{path} has no '{key}' field")
+        for key, subschema in schema.get('properties', {}).items():
+            if key in data:
+                problems += schema_problems(data[key], subschema, f"{path}.{key}")
+    elif expected == 'array' and 'items' in schema:
+        for i, item in enumerate(data):
+            problems += schema_problems(item, schema['items'], f"{path}[{i}]")
+    return problems
+
+
+def json_path(output: str | Path) -> Path:
+    """JSON kept next to an agent output (A1_scoring.md -> A1_scoring.json)."""
+    return Path(output).with_suffix('.json')
+
+
+def load_json_output(output: str | Path, stage: str) -> dict | None:
+    """
+    Load the JSON kept next to an agent output.
+
+    Args:
+        output: The Markdown output (A1_scoring.md, Name_feedback.md)
+        stage: 'normalizer' or 'unifier' (selects the schema)
+
+    Returns:
+        The object, or None when there is no JSON, it does not match the
+        schema, or the Markdown has been modified after it
+    """
+    output = Path(output)
+    path = json_path(output)
+    if not path.exists():
+        return None
+    if output.exists() and output.stat().st_mtime > path.stat().st_mtime:
+        return None
+    try:
+        data = json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, json.JSONDecodeError):
+        return None
+    if not isinstance(data, dict) or schema_problems(data, load_schema(stage)):
+        return None
+    return data
+
+
+def write_json_output(output: str | Path, data: dict):
+    """Write the JSON next to an output (after its Markdown, so it is not older)."""
+    with open(json_path(output), 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def save_structured_output(output: str | Path, stage: str, render) -> bool:
+    """
+    Replace a JSON response written to an agent's output with its rendered
+    Markdown, and keep the JSON next to it.
+
+    Args:
+        output: Output file holding the response
+        stage: 'normalizer' or 'unifier'
+        render: Function (data) -> Markdown
+
+    Returns:
+        True if the response was JSON matching the schema; otherwise the
+        output is left as returned (the Markdown parsers read it)
+    """
+    output = Path(output)
+    data = parse_json_output(output.read_text(encoding='utf-8'))
+    if data is None or schema_problems(data, load_schema(stage)):
+        json_path(output).unlink(missing_ok=True)
+        return False
+    output.write_text(render(data), encoding='utf-8')
+    write_json_output(output, data)
+    return True
+
+
+# ============================================================================
+# Markdown rendering
+# ============================================================================
+
+def _fmt(value: float) -> str:
+    return f"{value:g}"
+
+
+def _cell(value) -> str:
+    """Table cell text (one line, no pipes; '-' when empty, as the parser drops empty cells)."""
+    text = ' '.join(str(value).split()).replace('|', '/')
+    return text or '-'
+
+
+def _codes(codes: list) -> list:
+    return [c.strip() for c in codes if c.strip() and c.strip().lower() != 'none']
+
+
+def _section(text: str, title: str) -> str:
+    """A Markdown section's body, without a heading repeating its title."""
+    text = text.strip()
+    first, _, rest = text.partition('\n')
+    if re.match(rf'#+\s*{re.escape(title)}\s*$', first, re.IGNORECASE):
+        text = rest.strip()
+    return text or 'None.'
+
+
+def activity_number(activity: str) -> str | None:
+    """'A1', 'Activity 1' or '1' -> '1'; None for a rubric component name."""
+    match = re.fullmatch(r'(?:A|Activity\s*)?(\d+)', activity.strip(), re.IGNORECASE)
+    return match.group(1) if match else None
+
+
+def render_scoring(data: dict, activity_id: str | None) -> str:
+    """
+    Render a normalizer JSON as the scoring Markdown the parsers read.
+
+    Args:
+        data: Object matching src/schemas/normalizer.json
+        activity_id: Activity (structured) or None (free-form)
+
+    Returns:
+        Markdown with the tables, the per-student mapping and the analysis
+    """
+    freeform = activity_id is None
+    students = len(data['student_mappings'])
+    heading = "Free-form Assignment" if freeform else f"Activity {activity_id}"
+    extra = " Category | Affects Rubric Component |" if freeform else ""
+
+    lines = [f"# Normalized Scoring - {heading}", "", "### Mistakes Table", "",
+             f"| Mistake ID | Description | Frequency | Severity (1-10) | Suggested Deduction |{extra} Notes |",
+             "|" + "---|" * (8 if freeform else 6)]
+    for m in data['mistakes']:
+        extra = f" {_cell(m['category'])} | {_cell(m['rubric_component'])} |" if freeform else ""
+        lines.append(f"| {_cell(m['id'])} | {_cell(m['description'])} | {int(m['frequency'])}/{students} students | "
+                     f"{int(m['severity'])} | {_fmt(abs(m['suggested_deduction']))} marks |{extra} {_cell(m['notes'])} |")
+
+    extra = " Category | Affects Rubric Component |" if freeform else ""
+    lines += ["", "### Positive Points Table", "",
+              f"| Positive ID | Description | Frequency | Quality (1-10) | Suggested Bonus |{extra} Notes |",
+              "|" + "---|" * (8 if freeform else 6)]
+    for p in data['positives']:
+        extra = f" {_cell(p['category'])} | {_cell(p['rubric_component'])} |" if freeform else ""
+        lines.append(f"| {_cell(p['id'])} | {_cell(p['description'])} | {int(p['frequency'])}/{students} students | "
+                     f"{int(p['quality'])} | {_fmt(abs(p['suggested_bonus']))} marks |{extra} {_cell(p['notes'])} |")
+    lines.append("")
+
+    if freeform:
+        lines += ["## Per-Student Mapping", ""]
+        for n, mapping in enumerate(data['student_mappings'], 1):
+            lines.append(f"### Student {n}: {mapping['student'].strip()}")
+            if mapping['requirements_coverage'].strip():
+                lines.append(f"- **Requirements Coverage**: {' '.join(mapping['requirements_coverage'].split())}")
+            lines += [f"- **Mistakes**: {', '.join(_codes(mapping['mistakes'])) or 'None'}",
+                      f"- **Positives**: {', '.join(_codes(mapping['positives'])) or 'None'}"]
+            if mapping['overall_assessment'].strip():
+                lines.append(f"- **Overall Assessment**: {' '.join(mapping['overall_assessment'].split())}")
+            lines.append("")
+    else:
+        lines += ["### Per-Student Mistake/Positive Mapping", ""]
+        for n, mapping in enumerate(data['student_mappings'], 1):
+            lines.append(f"*   **Student {n} ({mapping['student'].strip()})**: "
+                         f"Mistakes: {', '.join(_codes(mapping['mistakes'])) or 'None'}; "
+                         f"Positives: {', '.join(_codes(mapping['positives'])) or 'None'}")
+        lines.append("")
+
+    lines += ["### Distribution Analysis", "", _section(data['distribution_analysis'], 'Distribution Analysis'), "",
+              "### Marking Recommendations", "",
+              _section(data['marking_recommendations'], 'Marking Recommendations'), ""]
+    return "\n".join(lines)
+
+
+def render_feedback(data: dict, assignment_type: str) -> str:
+    """
+    Render a unifier JSON as the feedback Markdown (with the feedback card
+    aggregate_grades.py and rescore.py read).
+
+    Args:
+        data: Object matching src/schemas/unifier.json
+        assignment_type: 'structured' or 'freeform'
+
+    Returns:
+        Markdown of the mark breakdown, assessments and feedback card
+    """
+    marks = []
+    for entry in data['activity_marks']:
+        number = activity_number(entry['activity']) if assignment_type == 'structured' else None
+        label = f"Activity {number}" if number else entry['activity'].strip()
+        marks.append(f"{label}: {_fmt(entry['mark'])} / {_fmt(entry['available'])}")
+    total = f"{_fmt(data['total_mark'])} / {_fmt(data['total_available'])}"
+    holistic = data['holistic_assessment']
+    integrity = data['academic_integrity']
+    adjustments = data['suggested_adjustments']
+    card = data['feedback_card']
+
+    def bullets(items, mark='-'):
+        return [f"{mark} {' '.join(item.split())}" for item in items if item.strip()] or [f"{mark} None"]
+
+    breakdown = "Activity Breakdown" if assignment_type == 'structured' else "Component Breakdown"
+    lines = ["### Mark Breakdown", "", f"**{breakdown}**:"]
+    lines += [f"- {line}" for line in marks]
+    lines += [f"**Total Mark**: {total}", "",
+              "### Calculation Details", "", data['calculation_details'].strip() or 'None.', "",
+              "### Holistic Assessment", "",
+              f"**Overall Performance**: {holistic['overall_performance'].strip()}", "",
+              "**Key Strengths**:"] + bullets(holistic['key_strengths'])
+    lines += ["", "**Areas for Improvement**:"] + bullets(holistic['areas_for_improvement'])
+    lines += ["", "**Patterns Observed**:", holistic['patterns_observed'].strip() or 'None.', "",
+              "### Academic Integrity Assessment", "",
+              f"**Risk Level**: {integrity['risk_level'].strip()}",
+              f"**Confidence**: {integrity['confidence'].strip()}", "",
+              "**Evidence/Reasoning**:", integrity['evidence'].strip() or 'None.', "",
+              "**Recommendation**:", integrity['recommendation'].strip() or 'None.', "",
+              "### Suggested Adjustments", "",
+              f"**Recommendation**: {adjustments['recommendation'].strip()}", ""]
+    if adjustments['proposed_change'].strip():
+        lines += ["**If Adjustment Suggested**:",
+                  f"- **Proposed Change**: {adjustments['proposed_change'].strip()}",
+                  f"- **Justification**: {adjustments['justification'].strip()}"]
+        if adjustments['new_total'].strip():
+            lines.append(f"- **New Total**: {adjustments['new_total'].strip()}")
+        lines.append("")
+
+    lines += ["### Student Feedback Card", "", "```",
+              f"ASSIGNMENT FEEDBACK - {data['student_name'].strip()}", "",
+              f"Total Mark: {total}", ""]
+    if marks:
+        lines += marks + [""]
+    lines += ["OVERALL COMMENTS:", card['overall_comments'].strip(), "",
+              "STRENGTHS:"] + bullets(card['strengths'], '•')
+    lines += ["", "AREAS FOR IMPROVEMENT:"] + bullets(card['areas_for_improvement'], '•')
+    lines += ["```", ""]
+    return "\n".join(lines)
+
+
+# ============================================================================
+# Readers (same shapes as the Markdown parsers)
+# ============================================================================
+
+def scoring_from_json(data: dict, activity_id: str | None) -> tuple[dict, dict]:
+    """
+    Tables and mappings of a normalizer JSON, as combine_normalized.py's
+    parse_scoring_markdown() and mapping parsers return them. Deductions and
+    bonuses are read unsigned, as from the Markdown tables, so a negative
+    value (the schema's minimum is 0, but not every provider enforces it)
+    cannot turn a deduction into a bonus.
+
+    Args:
+        data: Object matching src/schemas/normalizer.json
+        activity_id: Activity (mapping codes get its prefix) or None (free-form)
+
+    Returns:
+        Tuple of ({'mistakes': [...], 'positives': [...]},
+        {student name: {'mistakes': [...], 'positives': [...]}})
+    """
+    prefix = f"{activity_id}_" if activity_id else ""
+    scoring = {
+        'mistakes': [{
+            'id': m['id'].strip(),
+            'description': m['description'],
+            'frequency': int(m['frequency']),
+            'severity': int(m['severity']),
+            'suggested_deduction': abs(float(m['suggested_deduction'])),
+        } for m in data['mistakes']],
+        'positives': [{
+            'id': p['id'].strip(),
+            'description': p['description'],
+            'frequency': int(p['frequency']),
+            'quality': int(p['quality']),
+            'suggested_bonus': abs(float(p['suggested_bonus'])),
+        } for p in data['positives']],
+    }
+    mappings = {}
+    for mapping in data['student_mappings']:
+        mappings[mapping['student'].strip()] = {
+            'mistakes': [f"{prefix}{code}" for code in _codes(mapping['mistakes'])],
+            'positives': [f"{prefix}{code}" for code in _codes(mapping['positives'])],
+        }
+    return scoring, mappings
+
+
+def feedback_from_json(data: dict, content: str, filename: str) -> dict:
+    """
+    Student record of a unifier JSON, as aggregate_grades.parse_feedback_card()
+    returns it.
+
+    Args:
+        data: Object matching src/schemas/unifier.json
+        content: The feedback Markdown (the CSV's feedback column)
+        filename: Feedback file name (name fallback)
+
+    Returns:
+        dict: name, total_mark, activities ({'Activity N': mark}) and feedback
+    """
+    activities = {}
+    for entry in data['activity_marks']:
+        number = activity_number(entry['activity'])
+        if number:
+            activities[f'Activity {number}'] = float(entry['mark'])
+    return {
+        'name': data['student_name'].strip() or filename.replace('_feedback.md', ''),
+        'total_mark': float(data['total_mark']),
+        'activities': activities,
+        'feedback': content,
+    }
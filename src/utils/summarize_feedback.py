@@ -5,6 +5,10 @@ Feedback Summarizer Utility
 Takes a grades CSV file (typically a _filled.csv gradebook) and adds a
 "Feedback Summary" column with summarized feedback for each student.
 The entire input file is copied with the new column added.
+
+Rows are summarized concurrently. Progress is checkpointed to
+<output>.checkpoint.jsonl so an interrupted run resumes where it stopped, and
+identical feedback (e.g. group cards copied to each member) is summarized once.
 """
 
 import argparse
@@ -15,7 +19,12 @@ import sys
 import tempfile
 from pathlib import Path
 
-from system_config import resolve_provider_from_model, format_available_models
+from system_config import (
+    resolve_provider_from_model, format_available_models, get_max_parallel, get_api_max_parallel
+)
+from row_mapper import (
+    map_rows, content_key, checkpoint_path_for, anonymize, personalize, NAME_PLACEHOLDER
+)
 
 # Project root for finding llm_caller.sh
 PROJECT_ROOT = Path(__file__).parent.parent.parent
@@ -83,13 +92,20 @@ def call_llm(prompt: str, provider: str, model: str = None, api_model: str = Non
         Path(prompt_file).unlink(missing_ok=True)
 
 
-def summarize_feedback(student_name: str, total_mark: str, feedback: str,
-                       provider: str, model: str = None, api_model: str = None,
-                       total_possible: int = 100) -> str:
-    """Use LLM to summarize feedback into a single paragraph."""
+def empty_feedback_summary(student_name: str, total_mark: str) -> str:
+    """Summary used when a student has no feedback."""
+    return f"{student_name} received {total_mark} marks. No detailed feedback available."
+
+
+def failed_summary(student_name: str, total_mark: str, error) -> str:
+    """Summary used when the LLM call fails."""
+    return f"{student_name} received {total_mark} marks. (Summary generation failed: {error})"
+
 
-    if not feedback or not feedback.strip():
-        return f"{student_name} received {total_mark} marks. No detailed feedback available."
+def generate_summary(student_name: str, total_mark: str, feedback: str,
+                     provider: str, model: str = None, api_model: str = None,
+                     total_possible: int = 100) -> str:
+    """Use LLM to summarize feedback into a single paragraph (raises on failure)."""
 
     prompt = SUMMARIZE_PROMPT.format(
         student_name=student_name,
@@ -98,25 +114,22 @@ def summarize_feedback(student_name: str, total_mark: str, feedback: str,
         feedback=feedback
     )
 
-    try:
-        result = call_llm(
-            prompt=prompt,
-            provider=provider,
-            model=model,
-            api_model=api_model
-        )
+    result = call_llm(
+        prompt=prompt,
+        provider=provider,
+        model=model,
+        api_model=api_model
+    )
 
-        # Clean up the result - remove any markdown or extra whitespace
-        summary = result.strip()
-        # Remove potential markdown artifacts
-        summary = summary.replace('**', '').replace('*', '')
-        summary = summary.replace('###', '').replace('##', '').replace('#', '')
-        # Collapse multiple spaces/newlines into single spaces
-        summary = ' '.join(summary.split())
+    # Clean up the result - remove any markdown or extra whitespace
+    summary = result.strip()
+    # Remove potential markdown artifacts
+    summary = summary.replace('**', '').replace('*', '')
+    summary = summary.replace('###', '').replace('##', '').replace('#', '')
+    # Collapse multiple spaces/newlines into single spaces
+    summary = ' '.join(summary.split())
 
-        return summary
-    except Exception as e:
-        return f"{student_name} received {total_mark} marks. (Summary generation failed: {e})"
+    return summary
 
 
 def get_student_name(row: dict) -> str:
@@ -208,6 +221,11 @@ def main():
         '--api-model',
         help='Model for direct API calls (uses API instead of CLI for headless)'
     )
+    parser.add_argument(
+        '--parallel',
+        type=int,
+        help='Concurrent LLM calls (default: api_max_parallel with --api-model, else max_parallel)'
+    )
 
     args = parser.parse_args()
 
@@ -260,35 +278,53 @@ def main():
     else:
         print(f"Column '{summary_col}' already exists, will be updated")
 
-    # Process each student
-    for i, row in enumerate(records, 1):
-        student_name = get_student_name(row)
-        total_mark = get_total_mark(row)
-
+    rows = []
+    for row in records:
         if args.feedback_col and args.feedback_col in row:
             feedback = row[args.feedback_col]
         else:
             feedback = get_feedback(row)
+        rows.append((row, get_student_name(row), get_total_mark(row), feedback))
 
-        print(f"[{i}/{len(records)}] Processing: {student_name} ({total_mark} marks)...", end=' ')
+    if args.dry_run:
+        for i, (row, student_name, total_mark, feedback) in enumerate(rows, 1):
+            print(f"[{i}/{len(records)}] Processing: {student_name} ({total_mark} marks)... (dry run)")
+            row[summary_col] = f"[DRY RUN] Would summarize {len(feedback)} chars of feedback"
+    else:
+        parallel = args.parallel or (get_api_max_parallel() if args.api_model else get_max_parallel())
+        checkpoint_path = checkpoint_path_for(output_path)
+        to_summarize = [r for r in rows if r[3] and r[3].strip()]
+
+        def summarize_row(item):
+            # Identical feedback is summarized once and shared, so the model
+            # gets the placeholder instead of any one student's name
+            _, student_name, total_mark, feedback = item
+            return generate_summary(NAME_PLACEHOLDER, total_mark, anonymize(feedback, student_name),
+                                    provider, model, args.api_model, args.total_marks)
+
+        def summary_key(item):
+            # The same inputs as the (name-free) prompt, so group members share one summary
+            _, student_name, total_mark, feedback = item
+            return content_key('summarize', NAME_PLACEHOLDER, provider, model, args.api_model,
+                               args.total_marks, total_mark, anonymize(feedback, student_name))
+
+        summaries, errors = map_rows(
+            to_summarize,
+            summarize_row,
+            summary_key,
+            parallel=parallel,
+            checkpoint_path=checkpoint_path,
+            label_func=lambda item: f"{item[1]} ({item[2]} marks)"
+        )
 
-        if args.dry_run:
-            summary = f"[DRY RUN] Would summarize {len(feedback)} chars of feedback"
-            print("(dry run)")
-        else:
-            summary = summarize_feedback(
-                student_name=student_name,
-                total_mark=total_mark,
-                feedback=feedback,
-                provider=provider,
-                model=model,
-                api_model=args.api_model,
-                total_possible=args.total_marks
-            )
-            print("done")
-
-        # Add summary to the row
-        row[summary_col] = summary
+        for i, (row, student_name, total_mark, _) in enumerate(to_summarize):
+            if i in errors:
+                row[summary_col] = failed_summary(student_name, total_mark, errors[i])
+            else:
+                row[summary_col] = personalize(summaries[i], student_name)
+        for row, student_name, total_mark, feedback in rows:
+            if not (feedback and feedback.strip()):
+                row[summary_col] = empty_feedback_summary(student_name, total_mark)
 
     # Write output CSV with all original columns plus summary
     print(f"\nWriting to: {output_path}")
@@ -300,6 +336,13 @@ def main():
     print(f"\n✓ Summarized {len(records)} feedback cards")
     print(f"✓ Output saved to: {output_path}")
 
+    if not args.dry_run:
+        if errors:
+            print(f"⚠ {len(errors)} summaries failed; re-run to retry only those "
+                  f"(progress kept in {checkpoint_path.name})", file=sys.stderr)
+        else:
+            checkpoint_path.unlink(missing_ok=True)
+
 
 if __name__ == '__main__':
     main()
@@ -5,14 +5,27 @@ System Configuration Loader
 Loads system-wide defaults from config.yaml and models.yaml at the project root.
 These are fallback values when not specified in assignment overview.md.
 
+Both files are compiled into a resolved snapshot in .cache/config/ (see
+load_snapshot), keyed by their mtimes, so the many short-lived processes of
+a run (agents, llm_caller.sh, stats extraction) read one small JSON file or
+source one bash env file instead of re-parsing YAML on every call.
+
 IMPORTANT: No model names or provider defaults are hardcoded here.
 All defaults come from configs/config.yaml. If that file is missing,
 the caller must provide explicit values.
 """
 
+import copy
+import json
+import os
+import shlex
 import sys
 from pathlib import Path
-import yaml
+
+SNAPSHOT_VERSION = 2
+SNAPSHOT_DIR_ENV = 'AGENTIC_CONFIG_CACHE_DIR'
+
+_snapshot = None
 
 
 def get_project_root():
@@ -31,26 +44,200 @@ def get_models_config_path():
     return get_project_root() / "configs" / "models.yaml"
 
 
-def load_system_config():
+def get_snapshot_dir():
+    """Get the directory holding the compiled config snapshot."""
+    override = os.environ.get(SNAPSHOT_DIR_ENV)
+    return Path(override) if override else get_project_root() / ".cache" / "config"
+
+
+def _source_key(path: Path):
+    """Key a source file by mtime and size (None if it doesn't exist)."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _source_keys():
+    return {
+        'config': _source_key(get_config_path()),
+        'models': _source_key(get_models_config_path()),
+    }
+
+
+def _bash_source_key(sources: dict) -> str:
     """
-    Load system-wide configuration from config.yaml.
+    Render the source keys as llm_caller.sh computes them with stat(1).
 
-    Returns:
-        dict: Configuration dictionary with system defaults.
-              Returns empty dict if config file doesn't exist.
+    Whole-second mtime and size per file ('-' if missing), config then
+    models, e.g. "1717171717:10054,1717171700:5541".
     """
-    config_file = get_config_path()
+    parts = []
+    for key in (sources['config'], sources['models']):
+        parts.append(f"{key[0] // 1_000_000_000}:{key[1]}" if key else '-')
+    return ','.join(parts)
+
+
+def _read_yaml(path: Path, label: str):
+    """Parse a YAML config file; returns (dict, ok)."""
+    if not path.exists():
+        return {}, True
 
-    if not config_file.exists():
-        return {}
+    import yaml  # Only needed when the snapshot is rebuilt
 
     try:
-        with open(config_file, 'r') as f:
+        with open(path, 'r') as f:
             config = yaml.safe_load(f)
-            return config if config else {}
+            return (config if config else {}), True
     except Exception as e:
-        print(f"Warning: Failed to load config.yaml: {e}", file=sys.stderr)
-        return {}
+        print(f"Warning: Failed to load {label}: {e}", file=sys.stderr)
+        return {}, False
+
+
+def _bash_value(value) -> str:
+    if value is None:
+        return "''"
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return shlex.quote(str(value))
+
+
+def _bash_map(name: str, mapping: dict) -> str:
+    items = ' '.join(f"[{shlex.quote(str(k))}]={_bash_value(v)}" for k, v in mapping.items())
+    return f"declare -gA {name}=({items})"
+
+
+def format_snapshot_env(snapshot: dict) -> str:
+    """
+    Render a snapshot as a bash-sourceable env file.
+
+    Defines CFG_SNAPSHOT_SOURCES (the source keys, which llm_caller.sh
+    compares before sourcing the file), CFG_<KEY> for each scalar in
+    config.yaml (CFG_<SECTION>_<KEY> for scalars one section deep), and
+    from models.yaml the
+    associative arrays CFG_API_MODELS and CFG_CLI_MODELS (model -> provider),
+    CFG_PROVIDER_DEFAULTS (provider -> model) and the array CFG_EXPENSIVE_MODELS.
+
+    Args:
+        snapshot: Snapshot dictionary from build_snapshot()
+
+    Returns:
+        str: Env file contents
+    """
+    system = snapshot['system']
+    models = snapshot['models']
+    lines = [
+        "# Generated by src/utils/system_config.py from configs/config.yaml and",
+        "# configs/models.yaml. Do not edit; it is rebuilt when they change.",
+        f"CFG_SNAPSHOT_SOURCES={_bash_source_key(snapshot['sources'])}",
+    ]
+    for key, value in system.items():
+        if isinstance(value, dict):
+            # One level of sections, e.g. quota_ledger.enabled -> CFG_QUOTA_LEDGER_ENABLED
+            for sub_key, sub_value in value.items():
+                if not isinstance(sub_value, (dict, list)):
+                    lines.append(f"CFG_{key.upper()}_{sub_key.upper()}={_bash_value(sub_value)}")
+            continue
+        if isinstance(value, list):
+            continue
+        lines.append(f"CFG_{key.upper()}={_bash_value(value)}")
+    lines.append(_bash_map('CFG_API_MODELS', models.get('api_models') or {}))
+    lines.append(_bash_map('CFG_CLI_MODELS', models.get('cli_models') or {}))
+    lines.append(_bash_map('CFG_PROVIDER_DEFAULTS', models.get('defaults') or {}))
+    expensive = ' '.join(shlex.quote(str(m)) for m in models.get('expensive') or [])
+    lines.append(f"CFG_EXPENSIVE_MODELS=({expensive})")
+    return '\n'.join(lines) + '\n'
+
+
+def _write_atomic(path: Path, content: str):
+    import tempfile
+
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def build_snapshot(write: bool = True) -> dict:
+    """
+    Compile config.yaml and models.yaml into a snapshot.
+
+    The snapshot is written as snapshot.json and snapshot.env in the
+    snapshot directory unless a file failed to parse (so the warning is
+    repeated until it is fixed) or the directory is not writable.
+
+    Args:
+        write: Whether to write the snapshot files.
+
+    Returns:
+        dict: Snapshot with 'sources' (mtime keys), 'system' and 'models'.
+    """
+    sources = _source_keys()
+    system, system_ok = _read_yaml(get_config_path(), "config.yaml")
+    models, models_ok = _read_yaml(get_models_config_path(), "models.yaml")
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'sources': sources,
+        'system': system,
+        'models': models,
+    }
+
+    if write and system_ok and models_ok:
+        snapshot_dir = get_snapshot_dir()
+        try:
+            snapshot_dir.mkdir(parents=True, exist_ok=True)
+            # Each file carries its own copy of the source keys: bash checks
+            # CFG_SNAPSHOT_SOURCES in the env file, Python the JSON file
+            _write_atomic(snapshot_dir / "snapshot.env", format_snapshot_env(snapshot))
+            _write_atomic(snapshot_dir / "snapshot.json", json.dumps(snapshot, default=str))
+        except OSError:
+            pass  # Read-only checkout: use the in-memory snapshot
+
+    return snapshot
+
+
+def load_snapshot() -> dict:
+    """
+    Load the resolved config snapshot, rebuilding it if either source changed.
+
+    The snapshot is cached per process and revalidated against the source
+    mtimes on each call, which costs two stat() calls.
+
+    Returns:
+        dict: Snapshot with 'sources', 'system' and 'models'.
+    """
+    global _snapshot
+    sources = _source_keys()
+    if _snapshot is not None and _snapshot['sources'] == sources:
+        return _snapshot
+
+    try:
+        with open(get_snapshot_dir() / "snapshot.json", 'r') as f:
+            snapshot = json.load(f)
+        if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('sources') != sources:
+            snapshot = None
+    except (OSError, ValueError):
+        snapshot = None
+
+    _snapshot = snapshot or build_snapshot()
+    return _snapshot
+
+
+def load_system_config():
+    """
+    Load system-wide configuration from config.yaml.
+
+    Returns:
+        dict: Configuration dictionary with system defaults.
+              Returns empty dict if config file doesn't exist.
+    """
+    return copy.deepcopy(load_snapshot()['system'])
 
 
 def get_default_provider():
@@ -60,8 +247,7 @@ def get_default_provider():
     Returns:
         str or None: The default provider, or None if not configured.
     """
-    config = load_system_config()
-    return config.get("default_provider")
+    return load_snapshot()['system'].get("default_provider")
 
 
 def get_default_model():
@@ -71,8 +257,7 @@ def get_default_model():
     Returns:
         str or None: The default model, or None if not configured.
     """
-    config = load_system_config()
-    return config.get("default_model")
+    return load_snapshot()['system'].get("default_model")
 
 
 def get_max_parallel():
@@ -119,18 +304,7 @@ def load_models_config():
         dict: Configuration dictionary with models and defaults.
               Returns empty dict if config file doesn't exist.
     """
-    config_file = get_models_config_path()
-
-    if not config_file.exists():
-        return {}
-
-    try:
-        with open(config_file, 'r') as f:
-            config = yaml.safe_load(f)
-            return config if config else {}
-    except Exception as e:
-        print(f"Warning: Failed to load models.yaml: {e}", file=sys.stderr)
-        return {}
+    return copy.deepcopy(load_snapshot()['models'])
 
 
 def get_available_models(section: str = None):
@@ -226,7 +400,7 @@ def resolve_provider_from_model(model_name: str, section: str = None) -> str | N
     Returns:
         str or None: The provider name, or None if model not found in models.yaml.
     """
-    config = load_models_config()
+    config = load_snapshot()['models']
 
     # Determine which sections to check
     if section:
@@ -236,7 +410,7 @@ def resolve_provider_from_model(model_name: str, section: str = None) -> str | N
         sections = ['api_models', 'cli_models']
 
     for sec in sections:
-        models = config.get(sec, {})
+        models = config.get(sec) or {}
         if model_name in models:
             return models[model_name]
 
@@ -251,8 +425,7 @@ def get_expensive_models() -> list:
     Returns:
         list: List of model names that are marked as expensive.
     """
-    config = load_models_config()
-    return config.get('expensive', [])
+    return list(load_snapshot()['models'].get('expensive') or [])
 
 
 def is_expensive_model(model_name: str) -> bool:
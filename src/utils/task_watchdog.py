@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Timeouts and no-output watchdog for agent tasks and LLM calls.
+
+A hung CLI (waiting on a login prompt, or on a stalled stream) would
+otherwise hold its concurrency slot for the rest of the run. Commands run
+here get their own process group. The whole group is killed when the
+stage's timeout expires, or when the command has printed nothing for the
+idle timeout. That covers the agent, llm_caller.sh, the CLI and anything
+the CLI started.
+
+Limits come from the timeouts section of configs/config.yaml. Each kill is
+appended to the stats JSONL as an event entry (event: watchdog_kill).
+
+parallel_runner.sh wraps each task with this:
+    task_watchdog.py --stage marker --timeout 1200 --idle-timeout 600 \\
+        [--retries N] [--requeue-file F --task-id N] [--stats-file F] -- CMD [ARGS...]
+
+    With --requeue-file, a killed task that has retries left is appended to
+    the file for the runner to re-queue at the end of the stage. Without it,
+    the task is retried in place.
+
+    Exits with the command's status, or 124 if the command was killed.
+
+task_watchdog.py --limits STAGE
+    Print "<timeout> <idle> <retries>" for a stage (0 = no limit).
+"""
+
+import argparse
+import os
+import selectors
+import signal
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from system_config import load_snapshot
+
+# Exit status of a killed command (as with coreutils timeout)
+TIMEOUT_EXIT = 124
+
+# Seconds between SIGTERM and SIGKILL
+KILL_GRACE = 5
+
+DEFAULT_TIMEOUTS = {
+    'stages': {'default': 0},
+    'idle': 0,
+    'retries': 0,
+}
+
+
+@dataclass
+class GuardedResult:
+    """Outcome of run_guarded (stdout/stderr are None when not captured)."""
+    returncode: int
+    stdout: str | None
+    stderr: str | None
+    killed: str | None  # 'timeout' or 'idle' if the watchdog killed the command
+    elapsed_s: float
+
+
+def get_timeouts(stage: str) -> dict:
+    """
+    Get the limits for a stage from the timeouts section of config.yaml.
+
+    Args:
+        stage: Pipeline stage (marker, normalizer, unifier, ...)
+
+    Returns:
+        dict: timeout (s), idle (s) and retries; 0 means no limit
+    """
+    config = load_snapshot()['system'].get('timeouts') or {}
+    stages = config.get('stages') or DEFAULT_TIMEOUTS['stages']
+    timeout = stages.get(stage, stages.get('default', 0))
+    return {
+        'timeout': int(timeout or 0),
+        'idle': int(config.get('idle') or 0),
+        'retries': int(config.get('retries') or 0),
+    }
+
+
+def _kill_group(proc: subprocess.Popen):
+    """Terminate a command's process group, escalating to SIGKILL."""
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(proc.pid, sig)
+        except ProcessLookupError:
+            return
+        try:
+            proc.wait(timeout=KILL_GRACE)
+            return
+        except subprocess.TimeoutExpired:
+            continue
+
+
+def run_guarded(cmd: list, timeout: float = 0, idle_timeout: float = 0,
+                capture: bool = True, env: dict = None) -> GuardedResult:
+    """
+    Run a command in its own process group under a timeout and watchdog.
+
+    Output counts as activity for the idle timeout. When capture is False,
+    output is passed through to this process's stdout/stderr as it arrives.
+    If this process is interrupted or terminated, the group is killed too.
+
+    Args:
+        cmd: Command and arguments
+        timeout: Wall-clock limit in seconds (0 = none)
+        idle_timeout: Limit on time without output in seconds (0 = none)
+        capture: Capture stdout/stderr (as text) instead of passing them through
+        env: Environment for the command (default: inherited)
+
+    Returns:
+        GuardedResult
+    """
+    start = time.monotonic()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            env=env, start_new_session=True)
+
+    # The command is outside our process group, so Ctrl-C and SIGTERM sent to
+    # the run no longer reach it: forward them by killing the group.
+    def forward(signum, frame):
+        _kill_group(proc)
+        raise SystemExit(128 + signum)
+
+    previous = {}
+    for sig in (signal.SIGTERM, signal.SIGHUP):
+        try:
+            previous[sig] = signal.signal(sig, forward)
+        except ValueError:
+            pass  # Not the main thread
+
+    chunks = {proc.stdout: [], proc.stderr: []}
+    passthrough = {proc.stdout: sys.stdout.buffer, proc.stderr: sys.stderr.buffer}
+    selector = selectors.DefaultSelector()
+    for stream in chunks:
+        selector.register(stream, selectors.EVENT_READ)
+
+    killed = None
+    last_output = start
+    try:
+        while True:
+            now = time.monotonic()
+            deadlines = []
+            if timeout:
+                deadlines.append(('timeout', start + timeout))
+            if idle_timeout:
+                deadlines.append(('idle', last_output + idle_timeout))
+            reason, deadline = min(deadlines, key=lambda d: d[1]) if deadlines else (None, None)
+            if deadline is not None and now >= deadline:
+                killed = reason
+                break
+            wait = deadline - now if deadline is not None else None
+
+            if not selector.get_map():
+                # Output closed; wait for the process itself
+                try:
+                    proc.wait(timeout=wait)
+                    break
+                except subprocess.TimeoutExpired:
+                    continue
+
+            for key, _ in selector.select(wait):
+                data = os.read(key.fd, 65536)
+                if not data:
+                    selector.unregister(key.fileobj)
+                    continue
+                last_output = time.monotonic()
+                if capture:
+                    chunks[key.fileobj].append(data)
+                else:
+                    passthrough[key.fileobj].write(data)
+                    passthrough[key.fileobj].flush()
+    except KeyboardInterrupt:
+        _kill_group(proc)
+        raise
+    finally:
+        if killed:
+            _kill_group(proc)
+        selector.close()
+        for stream in chunks:
+            stream.close()
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+    returncode = TIMEOUT_EXIT if killed else proc.wait()
+
+    def text(stream):
+        return b''.join(chunks[stream]).decode('utf-8', errors='replace') if capture else None
+
+    return GuardedResult(returncode, text(proc.stdout), text(proc.stderr), killed,
+                         round(time.monotonic() - start, 3))
+
+
+def kill_message(result: GuardedResult, limits: dict) -> str:
+    """Describe a watchdog kill for logs and error messages."""
+    if result.killed == 'idle':
+        return f"No output for {limits['idle']:g}s; killed after {result.elapsed_s:.0f}s"
+    return f"Timed out after {limits['timeout']:g}s"
+
+
+def record_kill(stats_file: str | None, stage: str, context: str, scope: str,
+                result: GuardedResult, limits: dict, action: str, attempt: int = None):
+    """
+    Append a watchdog kill to the stats JSONL.
+
+    Args:
+        stats_file: Stats JSONL path (nothing is recorded if None)
+        stage: Pipeline stage
+        context: Task or call context (e.g., student/activity)
+        scope: 'task' (parallel_runner.sh task) or 'call' (an agent's LLM call)
+        result: The killed command's GuardedResult
+        limits: Output of get_timeouts() (or the limits in effect)
+        action: 'requeued', 'retried' or 'failed'
+        attempt: Retry count of the killed run (default: from LLM_ATTEMPT)
+    """
+    if not stats_file:
+        return
+
+    # Imported here: llm_telemetry is only needed when something was killed
+    from llm_telemetry import append_stats_entry, env_attempt
+
+    append_stats_entry(stats_file, {
+        'timestamp': datetime.now().isoformat(),
+        'event': 'watchdog_kill',
+        'stage': stage,
+        'context': context,
+        'scope': scope,
+        'reason': result.killed,
+        'limit_s': limits['idle'] if result.killed == 'idle' else limits['timeout'],
+        'elapsed_s': result.elapsed_s,
+        'attempt': env_attempt() if attempt is None else attempt,
+        'action': action,
+    })
+
+
+def run_llm_call(cmd: list, stage: str, stats_file: str | None = None,
+                 context: str = '') -> GuardedResult:
+    """
+    Run an agent's llm_caller.sh command under the stage's timeout.
+
+    Used in place of subprocess.run(cmd, capture_output=True, text=True). A
+    killed call is recorded in the stats file and returns status 124 with
+    the reason appended to stderr.
+
+    Args:
+        cmd: llm_caller.sh command
+        stage: Pipeline stage, for the timeout and the stats entry
+        stats_file: Stats JSONL path (optional)
+        context: Stats context (e.g., student/activity)
+
+    Returns:
+        GuardedResult
+    """
+    limits = get_timeouts(stage)
+    result = run_guarded(cmd, timeout=limits['timeout'])
+    if result.killed:
+        record_kill(stats_file, stage, context, 'call', result, limits, 'failed')
+        result.stderr += f"\n{kill_message(result, limits)} (timeouts.stages.{stage} in config.yaml)\n"
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a task under a timeout and no-output watchdog")
+    parser.add_argument('--limits', metavar='STAGE',
+                        help='Print "<timeout> <idle> <retries>" for STAGE and exit')
+    parser.add_argument('--stage', default='unknown', help='Pipeline stage (for stats)')
+    parser.add_argument('--timeout', type=float, default=0, help='Wall-clock limit in seconds')
+    parser.add_argument('--idle-timeout', type=float, default=0, help='No-output limit in seconds')
+    parser.add_argument('--retries', type=int, default=0, help='Retry budget for killed tasks')
+    parser.add_argument('--requeue-file', help='Append the task ID here instead of retrying in place')
+    parser.add_argument('--task-id', default='', help='Task ID (line number in the tasks file)')
+    parser.add_argument('--stats-file', help='Stats JSONL for watchdog events')
+    parser.add_argument('command', nargs=argparse.REMAINDER, help='-- CMD [ARGS...]')
+    args = parser.parse_args()
+
+    if args.limits:
+        limits = get_timeouts(args.limits)
+        print(limits['timeout'], limits['idle'], limits['retries'])
+        return
+
+    command = args.command[1:] if args.command[:1] == ['--'] else args.command
+    if not command:
+        parser.error("no command given")
+
+    limits = {'timeout': args.timeout, 'idle': args.idle_timeout}
+    context = f"task {args.task_id}" if args.task_id else ''
+    env = dict(os.environ)
+
+    while True:
+        result = run_guarded(command, timeout=args.timeout, idle_timeout=args.idle_timeout,
+                             capture=False, env=env)
+        if not result.killed:
+            sys.exit(result.returncode)
+
+        attempt = int(env.get('LLM_ATTEMPT') or 0)
+        retry = attempt < args.retries
+        action = ('requeued' if args.requeue_file else 'retried') if retry else 'failed'
+        record_kill(args.stats_file, args.stage, context, 'task', result, limits, action, attempt)
+        print(f"⚠ Watchdog: {kill_message(result, limits)} ({action})", file=sys.stderr)
+
+        if not retry:
+            sys.exit(TIMEOUT_EXIT)
+        if args.requeue_file:
+            with open(args.requeue_file, 'a') as f:
+                f.write(f"{args.task_id}\n")
+            sys.exit(TIMEOUT_EXIT)
+        env['LLM_ATTEMPT'] = str(attempt + 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Run-wide tracing in Chrome trace-event format.
+
+When AGENTIC_TRACE_DIR is set (by tracing.sh's trace_init, i.e. --trace on
+the orchestrators), every process appends complete ("X") events to its own
+file, <dir>/<pid>.jsonl, so tracing needs no locking between workers. The
+files are merged into one trace at the end of the run, which can be opened
+in Perfetto (https://ui.perfetto.dev) or chrome://tracing.
+
+Events are grouped by AGENTIC_TRACE_PID (one per orchestrator run) and
+AGENTIC_TRACE_TID (one per task), both inherited from the environment, so a
+task's agent, prompt building and LLM call nest on the task's own track.
+
+Usage as a library:
+    from tracing import span
+    with span("build_prompt", "agent", student=name):
+        ...
+
+Usage from the command line:
+    tracing.py merge <trace_dir> <output.json>
+"""
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+TRACE_DIR_ENV = 'AGENTIC_TRACE_DIR'
+
+
+def trace_dir() -> Path | None:
+    """Get the trace directory, or None when tracing is disabled."""
+    value = os.environ.get(TRACE_DIR_ENV)
+    return Path(value) if value else None
+
+
+def now_us() -> int:
+    """Current time in microseconds since the epoch (the trace clock)."""
+    return time.time_ns() // 1000
+
+
+def emit(event: dict) -> None:
+    """
+    Append one trace event to this process's span file.
+
+    pid/tid default to the run and task inherited from the environment.
+    Does nothing when tracing is disabled.
+    """
+    directory = trace_dir()
+    if directory is None:
+        return
+    event.setdefault('pid', int(os.environ.get('AGENTIC_TRACE_PID') or os.getpid()))
+    event.setdefault('tid', int(os.environ.get('AGENTIC_TRACE_TID') or os.getpid()))
+    try:
+        with open(directory / f"{os.getpid()}.jsonl", 'a', encoding='utf-8') as f:
+            f.write(json.dumps(event) + '\n')
+    except OSError:
+        pass  # Tracing must never break a run
+
+
+def complete(name: str, cat: str, start_us: int, end_us: int, **args) -> None:
+    """Record a span that has already finished."""
+    event = {'name': name, 'cat': cat, 'ph': 'X', 'ts': start_us,
+             'dur': max(end_us - start_us, 0)}
+    if args:
+        event['args'] = args
+    emit(event)
+
+
+@contextmanager
+def span(name: str, cat: str = 'python', **args):
+    """Record the enclosed block as a span (no-op when tracing is disabled)."""
+    if trace_dir() is None:
+        yield
+        return
+    start = now_us()
+    try:
+        yield
+    finally:
+        complete(name, cat, start, now_us(), **args)
+
+
+def merge(directory: Path, output: Path) -> int:
+    """
+    Merge the per-process span files into one Chrome trace JSON file.
+
+    Lines truncated by a killed process are skipped.
+
+    Args:
+        directory: Trace directory containing *.jsonl span files
+        output: Trace file to write
+
+    Returns:
+        Number of events written
+    """
+    events = []
+    for span_file in sorted(directory.glob('*.jsonl')):
+        with open(span_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+
+    # Metadata first, then spans in time order
+    events.sort(key=lambda e: (e.get('ph') != 'M', e.get('ts', 0)))
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    return len(events)
+
+
+def main():
+    if len(sys.argv) != 4 or sys.argv[1] != 'merge':
+        print("Usage: tracing.py merge <trace_dir> <output.json>", file=sys.stderr)
+        sys.exit(1)
+
+    directory = Path(sys.argv[2])
+    if not directory.is_dir():
+        print(f"Error: Trace directory not found: {directory}", file=sys.stderr)
+        sys.exit(1)
+
+    count = merge(directory, Path(sys.argv[3]))
+    print(f"✓ Trace written: {sys.argv[3]} ({count} events)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env bash
+#
+# Run-wide tracing helpers for the bash scripts (source this file)
+#
+# Spans are appended as Chrome trace events to per-process files in
+# $AGENTIC_TRACE_DIR and merged into one trace file when the run that
+# created the directory exits. See tracing.py for the format.
+#
+#   trace_init FILE NAME          Enable tracing (FILE may be empty to join an
+#                                 enclosing traced run, e.g. under batch_mark.sh)
+#   trace_stage NAME              End the current stage span and begin a new one
+#   trace_begin NAME [CAT]        Begin a nested span on this process's track
+#   trace_end                     End the most recent span
+#   trace_now                     Set TRACE_NOW_US to the current time (µs)
+#   trace_complete NAME CAT START_US [ARGS_JSON]
+#                                 Record a finished span
+#
+# All functions are no-ops when tracing is disabled.
+#
+
+_TRACE_LIB_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+_TRACE_NAMES=()
+_TRACE_CATS=()
+_TRACE_STARTS=()
+_TRACE_STAGE_NAME=""
+_TRACE_STAGE_START=""
+_TRACE_OWNER=false
+_TRACE_OUTPUT=""
+
+trace_now() {
+    local t="${EPOCHREALTIME:-}"
+    if [[ -n "$t" ]]; then
+        t="${t/,/.}"
+        TRACE_NOW_US="${t/./}"
+    else
+        TRACE_NOW_US="$(date +%s)000000"
+    fi
+}
+
+# Escape a string for use inside a JSON string literal
+_trace_escape() {
+    local s="${1//\\/\\\\}"
+    s="${s//\"/\\\"}"
+    s="${s//$'\n'/ }"
+    printf '%s' "${s//$'\t'/ }"
+}
+
+_trace_write() {
+    printf '%s\n' "$1" >> "$AGENTIC_TRACE_DIR/${BASHPID:-$$}.jsonl" 2>/dev/null || true
+}
+
+trace_complete() {
+    [[ -n "${AGENTIC_TRACE_DIR:-}" ]] || return 0
+    local name cat="$2" start="$3" args="${4:-}"
+    name=$(_trace_escape "$1")
+    trace_now
+    _trace_write "{\"name\":\"$name\",\"cat\":\"$cat\",\"ph\":\"X\",\"ts\":$start,\"dur\":$((TRACE_NOW_US - start)),\"pid\":${AGENTIC_TRACE_PID:-$$},\"tid\":${AGENTIC_TRACE_TID:-$$}${args:+,\"args\":$args}}"
+}
+
+_trace_metadata() {
+    local kind="$1" name
+    name=$(_trace_escape "$2")
+    _trace_write "{\"name\":\"$kind\",\"ph\":\"M\",\"pid\":${AGENTIC_TRACE_PID:-$$},\"tid\":${AGENTIC_TRACE_TID:-$$},\"args\":{\"name\":\"$name\"}}"
+}
+
+trace_begin() {
+    [[ -n "${AGENTIC_TRACE_DIR:-}" ]] || return 0
+    trace_now
+    _TRACE_NAMES+=("$1")
+    _TRACE_CATS+=("${2:-bash}")
+    _TRACE_STARTS+=("$TRACE_NOW_US")
+}
+
+trace_end() {
+    [[ -n "${AGENTIC_TRACE_DIR:-}" ]] || return 0
+    local depth=${#_TRACE_NAMES[@]}
+    [[ $depth -gt 0 ]] || return 0
+    local top=$((depth - 1))
+    trace_complete "${_TRACE_NAMES[$top]}" "${_TRACE_CATS[$top]}" "${_TRACE_STARTS[$top]}"
+    unset "_TRACE_NAMES[$top]" "_TRACE_CATS[$top]" "_TRACE_STARTS[$top]"
+}
+
+trace_stage() {
+    [[ -n "${AGENTIC_TRACE_DIR:-}" ]] || return 0
+    # Close spans left open by the previous stage
+    while [[ ${#_TRACE_NAMES[@]} -gt 0 ]]; do
+        trace_end
+    done
+    if [[ -n "$_TRACE_STAGE_NAME" ]]; then
+        trace_complete "$_TRACE_STAGE_NAME" stage "$_TRACE_STAGE_START"
+    fi
+    _TRACE_STAGE_NAME="$1"
+    trace_now
+    _TRACE_STAGE_START="$TRACE_NOW_US"
+}
+
+# EXIT trap: close open spans and, in the run that owns the trace, merge
+trace_finish() {
+    [[ -n "${AGENTIC_TRACE_DIR:-}" ]] || return 0
+    trace_stage ""
+    if [[ "$_TRACE_OWNER" == true ]]; then
+        if python3 "$_TRACE_LIB_DIR/tracing.py" merge "$AGENTIC_TRACE_DIR" "$_TRACE_OUTPUT"; then
+            rm -rf "$AGENTIC_TRACE_DIR"
+        else
+            echo "Warning: Failed to merge trace; span files kept in $AGENTIC_TRACE_DIR" >&2
+        fi
+    fi
+}
+
+trace_init() {
+    local output="$1"
+    local process_name="$2"
+
+    if [[ -z "${AGENTIC_TRACE_DIR:-}" ]]; then
+        [[ -n "$output" ]] || return 0
+        case "$output" in
+            /*) ;;
+            *) output="$PWD/$output" ;;
+        esac
+        AGENTIC_TRACE_DIR=$(mktemp -d "${TMPDIR:-/tmp}/agentic_trace.XXXXXX")
+        export AGENTIC_TRACE_DIR
+        _TRACE_OWNER=true
+        _TRACE_OUTPUT="$output"
+    fi
+
+    # One trace process per run, with the orchestrator on its own track
+    export AGENTIC_TRACE_PID=$$
+    export AGENTIC_TRACE_TID=$$
+    _trace_metadata process_name "$process_name"
+    _trace_metadata thread_name "orchestrator"
+    trap trace_finish EXIT
+}
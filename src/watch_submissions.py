@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Submission Watcher - Incremental Marking for Late Submissions
+
+Polls the submissions directory of an assignment that has already been marked
+and processes only notebooks that are not yet in the submissions manifest.
+Each new submission is marked (one marker per activity for structured
+assignments), unified against the existing approved scheme, and merged into
+grades.csv and the filled gradebooks. The rest of the class is never
+re-normalized or re-marked.
+
+Usage:
+    python3 watch_submissions.py --assignment-dir assignments/lab1 --type structured \\
+        --provider claude
+    python3 watch_submissions.py --assignment-dir assignments/lab1 --type structured \\
+        --provider claude --once
+"""
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+from aggregate_grades import upsert_grade_row
+from apply_translation import (
+    apply_gradebook_updates,
+    detect_encoding,
+    get_student_name_from_row,
+    load_grades_csv,
+    normalize_name,
+)
+from clean_artifacts import clean_file, load_artifacts
+from find_submissions import SubmissionFinder
+
+
+SRC_DIR = Path(__file__).parent
+ARTIFACTS_FILE = SRC_DIR.parent / "configs" / "processing_artifacts.jsonl"
+
+
+def load_json(path: Path, default=None):
+    """Load a JSON file, returning default if it does not exist."""
+    if not path.exists():
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_json(path: Path, data) -> None:
+    """Write JSON atomically so a concurrent orchestrator never sees a partial file."""
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class SubmissionWatcher:
+    """Detect new submissions and run the per-student part of the pipeline for them."""
+
+    def __init__(self, assignment_dir: str, assignment_type: str, provider: str,
+                 base_file: Optional[str] = None,
+                 marker_model: Optional[str] = None, unifier_model: Optional[str] = None,
+                 api_model: Optional[str] = None, parallel: int = 4,
+                 settle_seconds: int = 30, problem_context: Optional[str] = None,
+                 clean_artifacts: bool = True):
+        """
+        Initialize the watcher.
+
+        Args:
+            assignment_dir: Path to assignment directory (must already be marked)
+            assignment_type: 'structured' or 'freeform'
+            provider: LLM provider for marker and unifier agents
+            base_file: Base notebook filename to ignore inside submissions/
+            marker_model: Optional model for marker agents
+            unifier_model: Optional model for unifier agents
+            api_model: Optional model for direct API calls
+            parallel: Maximum concurrent marker tasks for one submission
+            settle_seconds: Minimum age of a notebook before it is processed,
+                so files still being copied in are not picked up half-written
+            problem_context: Optional problem_contexts.json (free-form only)
+            clean_artifacts: Remove known LLM artifacts from grades.csv
+        """
+        self.assignment_dir = Path(os.path.abspath(assignment_dir))
+        self.assignment_type = assignment_type
+        self.provider = provider
+        self.base_file = base_file
+        self.marker_model = marker_model
+        self.unifier_model = unifier_model
+        self.api_model = api_model
+        self.parallel = max(1, parallel)
+        self.settle_seconds = settle_seconds
+        self.problem_context = problem_context
+        self.clean_artifacts = clean_artifacts
+
+        self.submissions_dir = self.assignment_dir / "submissions"
+        self.processed_dir = self.assignment_dir / "processed"
+        self.manifest_path = self.processed_dir / "submissions_manifest.json"
+        self.name_mapping_path = self.processed_dir / "name_mapping.json"
+        self.scheme_path = self.processed_dir / "approved_scheme.json"
+        self.markings_dir = self.processed_dir / "markings"
+        self.final_dir = self.processed_dir / "final"
+        self.grades_csv = self.final_dir / "grades.csv"
+        self.stats_file = self.processed_dir / "stats" / "token_usage.jsonl"
+        self.translation_dir = self.processed_dir / "translation"
+        self.translation_mapping_path = self.translation_dir / "translation_mapping.json"
+
+        self.num_activities = len(list((self.processed_dir / "activities").glob("A*.json")))
+        self.failures: Dict[str, int] = {}
+
+    def check_ready(self) -> List[str]:
+        """Return a list of problems that prevent watching this assignment."""
+        problems = []
+        if not self.manifest_path.exists():
+            problems.append(f"Submissions manifest not found: {self.manifest_path}")
+        if not self.scheme_path.exists():
+            problems.append(f"Approved scheme not found: {self.scheme_path}")
+        if self.assignment_type == 'structured' and self.num_activities == 0:
+            problems.append("No extracted activities found in processed/activities")
+        return problems
+
+    def find_new_submissions(self) -> List[Dict[str, str]]:
+        """Scan submissions/ and return settled notebooks not yet in the manifest."""
+        manifest = load_json(self.manifest_path, {'submissions': []})
+        known = {s['path'] for s in manifest.get('submissions', [])}
+
+        finder = SubmissionFinder(str(self.submissions_dir), self.base_file)
+        now = time.time()
+        new_submissions = []
+        for submission in finder.find_all_submissions():
+            if submission['path'] in known:
+                continue
+            age = now - Path(submission['path']).stat().st_mtime
+            if age < self.settle_seconds:
+                continue
+            new_submissions.append(submission)
+        return new_submissions
+
+    def canonical_name(self, submission: Dict[str, str]) -> str:
+        """Resolve the canonical name for a new submission.
+
+        Uses an existing name mapping entry if present, otherwise matches the
+        extracted name against gradebook names, falling back to the name
+        extracted by SubmissionFinder.
+        """
+        mapping = load_json(self.name_mapping_path, {}).get('name_mapping', {})
+        for key in (submission['relative_path'], submission['path']):
+            if key in mapping:
+                return mapping[key]
+
+        extracted = submission['student_name']
+        target = normalize_name(extracted)
+        for gradebook_name in self._gradebook_names():
+            if normalize_name(gradebook_name) == target:
+                return gradebook_name
+        return extracted
+
+    def _gradebook_names(self) -> List[str]:
+        """Collect student names from the original (unfilled) gradebooks."""
+        gradebooks_dir = self.assignment_dir / "gradebooks"
+        names = []
+        if not gradebooks_dir.exists():
+            return names
+        for gradebook in sorted(gradebooks_dir.glob("*.csv")):
+            if '_filled' in gradebook.name or '_summarized' in gradebook.name:
+                continue
+            encoding = detect_encoding(str(gradebook))
+            with open(gradebook, 'r', encoding=encoding) as f:
+                reader = csv.DictReader(f)
+                fieldnames = list(reader.fieldnames or [])
+                for row in reader:
+                    name = get_student_name_from_row(row, 'Student Name', fieldnames)
+                    if name:
+                        names.append(name)
+        return names
+
+    def _agent_options(self, model: Optional[str]) -> List[str]:
+        """Common provider/model/stats options for an agent command."""
+        options = ["--provider", self.provider]
+        if model:
+            options.extend(["--model", model])
+        if self.api_model:
+            options.extend(["--api-model", self.api_model])
+        options.extend(["--stats-file", str(self.stats_file)])
+        return options
+
+    def marker_commands(self, name: str, submission_path: str) -> List[List[str]]:
+        """Build marker commands for outputs that do not exist yet."""
+        marker = str(SRC_DIR / "agents" / "marker.py")
+        commands = []
+        if self.assignment_type == 'structured':
+            for n in range(1, self.num_activities + 1):
+                output_file = self.markings_dir / f"{name}_A{n}.md"
+                if output_file.exists():
+                    continue
+                commands.append([
+                    sys.executable, marker,
+                    "--activity", f"A{n}",
+                    "--student", name,
+                    "--submission", submission_path,
+                    "--output", str(output_file),
+                ] + self._agent_options(self.marker_model))
+        else:
+            output_file = self.markings_dir / f"{name}.md"
+            if not output_file.exists():
+                cmd = [
+                    sys.executable, marker,
+                    "--student", name,
+                    "--submission", submission_path,
+                    "--criteria", str(self.processed_dir / "marking_criteria.md"),
+                    "--output", str(output_file),
+                    "--type", "freeform",
+                ] + self._agent_options(self.marker_model)
+                if self.problem_context:
+                    cmd.extend(["--problem-context", self.problem_context])
+                commands.append(cmd)
+        return commands
+
+    def unifier_command(self, name: str, submission_path: str) -> List[str]:
+        """Build the unifier command for one student."""
+        return [
+            sys.executable, str(SRC_DIR / "agents" / "unifier.py"),
+            "--student", name,
+            "--submission", submission_path,
+            "--scheme", str(self.scheme_path),
+            "--markings-dir", str(self.markings_dir),
+            "--output", str(self.final_dir / f"{name}_feedback.md"),
+            "--type", self.assignment_type,
+        ] + self._agent_options(self.unifier_model)
+
+    def _run(self, cmd: List[str]) -> bool:
+        """Run one agent command, echoing its error output on failure."""
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"  ✗ {Path(cmd[1]).stem} failed: {result.stderr.strip()}", file=sys.stderr)
+            return False
+        return True
+
+    def process(self, submission: Dict[str, str]) -> bool:
+        """Mark, unify and record a single new submission."""
+        name = self.canonical_name(submission)
+        print(f"\n[{datetime.now().strftime('%H:%M:%S')}] New submission: {name}")
+        print(f"  Path: {submission['relative_path']}")
+
+        self.markings_dir.mkdir(parents=True, exist_ok=True)
+        self.final_dir.mkdir(parents=True, exist_ok=True)
+
+        commands = self.marker_commands(name, submission['path'])
+        if commands:
+            print(f"  Running {len(commands)} marker task(s)...")
+            with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+                results = list(executor.map(self._run, commands))
+            if not all(results):
+                return False
+
+        feedback_file = self.final_dir / f"{name}_feedback.md"
+        if not feedback_file.exists():
+            print("  Running unifier against approved scheme...")
+            if not self._run(self.unifier_command(name, submission['path'])):
+                return False
+
+        grades_name = upsert_grade_row(self.grades_csv, feedback_file,
+                                       self.assignment_type, self.num_activities)
+        if self.clean_artifacts:
+            artifacts = load_artifacts(ARTIFACTS_FILE, quiet=True)
+            if artifacts:
+                clean_file(self.grades_csv, artifacts, in_place=True, quiet=True)
+        print("  ✓ grades.csv updated")
+
+        self.update_gradebooks(grades_name)
+        self.register(submission, name)
+        print(f"  ✓ {name} marked")
+        return True
+
+    def update_gradebooks(self, grades_name: str) -> None:
+        """Add the student to the translation mapping and refill the gradebooks."""
+        mapping = load_json(self.translation_mapping_path)
+        if not mapping:
+            return
+
+        target = normalize_name(grades_name)
+        matched = False
+        for gradebook_config in mapping.get('gradebooks', []):
+            mappings = gradebook_config.setdefault('student_mappings', [])
+            if any(m['grades_name'] == grades_name for m in mappings):
+                matched = True
+                continue
+
+            gradebook_path = gradebook_config['path']
+            if not Path(gradebook_path).exists():
+                continue
+            encoding = gradebook_config.get('encoding', 'utf-8')
+            if encoding == 'auto':
+                encoding = detect_encoding(gradebook_path)
+            with open(gradebook_path, 'r', encoding=encoding) as f:
+                reader = csv.DictReader(f)
+                fieldnames = list(reader.fieldnames or [])
+                for row in reader:
+                    gradebook_name = get_student_name_from_row(
+                        row, gradebook_config['student_column'], fieldnames)
+                    if gradebook_name and normalize_name(gradebook_name) == target:
+                        mappings.append({
+                            'grades_name': grades_name,
+                            'gradebook_name': gradebook_name,
+                            'confidence': 100,
+                            'match_method': 'exact',
+                            'requires_review': False,
+                        })
+                        matched = True
+                        break
+
+        if not matched:
+            print(f"  ⚠ {grades_name} not found in any gradebook; "
+                  f"add it to {self.translation_mapping_path} and re-run apply_translation.py")
+            return
+
+        save_json(self.translation_mapping_path, mapping)
+        grades = load_grades_csv(str(self.grades_csv))
+        for gradebook_config in mapping['gradebooks']:
+            apply_gradebook_updates(gradebook_config, grades, self.translation_dir)
+        print("  ✓ Filled gradebooks updated")
+
+    def register(self, submission: Dict[str, str], name: str) -> None:
+        """Record the submission in the manifest and name mapping."""
+        manifest = load_json(self.manifest_path, {'submissions': [], 'errors': []})
+        submissions = manifest.setdefault('submissions', [])
+        submissions.append(submission)
+        submissions.sort(key=lambda s: (s['section'], s['student_name']))
+        manifest['total_submissions'] = len(submissions)
+        sections = sorted(set(s['section'] for s in submissions))
+        manifest['summary'] = {
+            'total_submissions': len(submissions),
+            'total_sections': len(sections),
+            'sections': {
+                section: sum(1 for s in submissions if s['section'] == section)
+                for section in sections
+            },
+            'errors': len(manifest.get('errors', [])),
+        }
+        save_json(self.manifest_path, manifest)
+
+        if self.name_mapping_path.exists():
+            name_mapping = load_json(self.name_mapping_path, {})
+            name_mapping.setdefault('name_mapping', {})[submission['relative_path']] = name
+            save_json(self.name_mapping_path, name_mapping)
+
+    def poll(self, max_attempts: int) -> int:
+        """Run one scan. Returns the number of submissions processed successfully."""
+        processed = 0
+        for submission in self.find_new_submissions():
+            path = submission['path']
+            if self.failures.get(path, 0) >= max_attempts:
+                continue
+            if self.process(submission):
+                processed += 1
+                self.failures.pop(path, None)
+            else:
+                self.failures[path] = self.failures.get(path, 0) + 1
+                if self.failures[path] < max_attempts:
+                    print(f"  ✗ Attempt {self.failures[path]}/{max_attempts} failed; "
+                          f"will retry on the next scan")
+                else:
+                    print(f"  ✗ Giving up on {submission['relative_path']} "
+                          f"after {max_attempts} attempts")
+        return processed
+
+    def watch(self, interval: int, once: bool = False, max_attempts: int = 3) -> None:
+        """Poll the submissions directory until interrupted."""
+        if once:
+            print(f"Scanning {self.submissions_dir} once")
+        else:
+            print(f"Watching {self.submissions_dir} (every {interval}s, Ctrl+C to stop)")
+        try:
+            while True:
+                processed = self.poll(max_attempts)
+                if processed:
+                    print(f"\n✓ Processed {processed} new submission(s)")
+                if once:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\nWatch stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Watch for late submissions and mark only the new work"
+    )
+    parser.add_argument("--assignment-dir", required=True, help="Assignment directory")
+    parser.add_argument("--type", choices=["structured", "freeform"], required=True,
+                        help="Assignment type")
+    parser.add_argument("--provider", required=True, help="LLM provider")
+    parser.add_argument("--base-file", help="Base notebook filename to ignore")
+    parser.add_argument("--marker-model", help="Model for marker agents")
+    parser.add_argument("--unifier-model", help="Model for unifier agents")
+    parser.add_argument("--api-model", help="Model for direct API calls")
+    parser.add_argument("--parallel", type=int, default=4,
+                        help="Concurrent marker tasks per submission (default: 4)")
+    parser.add_argument("--interval", type=int, default=60,
+                        help="Seconds between scans (default: 60)")
+    parser.add_argument("--settle", type=int, default=30,
+                        help="Ignore notebooks modified within this many seconds (default: 30)")
+    parser.add_argument("--max-attempts", type=int, default=3,
+                        help="Attempts per submission before giving up (default: 3)")
+    parser.add_argument("--problem-context", help="problem_contexts.json (free-form only)")
+    parser.add_argument("--no-clean-artifacts", action="store_true",
+                        help="Do not clean artifacts from grades.csv")
+    parser.add_argument("--once", action="store_true",
+                        help="Scan once and exit (for cron)")
+
+    args = parser.parse_args()
+
+    watcher = SubmissionWatcher(
+        args.assignment_dir,
+        args.type,
+        args.provider,
+        base_file=args.base_file,
+        marker_model=args.marker_model,
+        unifier_model=args.unifier_model,
+        api_model=args.api_model,
+        parallel=args.parallel,
+        settle_seconds=args.settle,
+        problem_context=args.problem_context,
+        clean_artifacts=not args.no_clean_artifacts,
+    )
+
+    problems = watcher.check_ready()
+    if problems:
+        for problem in problems:
+            print(f"Error: {problem}", file=sys.stderr)
+        print("Run the full marking pipeline once before using watch mode.", file=sys.stderr)
+        sys.exit(1)
+
+    watcher.watch(args.interval, once=args.once, max_attempts=args.max_attempts)
+
+
+if __name__ == "__main__":
+    main()
@@ -207,6 +207,14 @@ Options:
   --start-round N     Start from round N (1-5, default: 1)
   --auto-approve      Skip interactive stages (pattern design, dashboard approval)
   --force-complete    Generate zero-mark feedback for failed students and continue
+  --trace FILE        Write a Chrome/Perfetto trace of all rounds to FILE
+  --cli-pool          Keep persistent CLI worker processes for headless calls
+  --provider-pool     Spread marker/unifier calls over the providers in provider_pool
+  --cascade           Mark with the cascade's cheap model first, escalating uncertain markings
+  --deadline TIME     Finish all assignments by TIME (e.g. "2026-10-20 09:00"); each
+                      marking run gets an equal share of the time left
+  --plan              Estimate calls, tokens, cost and time of every assignment and
+                      their total, without marking (see src/dry_run.py)
   --help              Show this help message
 
 Automatic Workflow (5 rounds - runs continuously):
@@ -270,6 +278,12 @@ API_MODEL=""
 START_ROUND=1
 AUTO_APPROVE=false
 FORCE_COMPLETE=false
+TRACE_FILE=""
+CLI_POOL=false
+PROVIDER_POOL=false
+CASCADE=false
+DEADLINE=""
+PLAN=false
 
 while [[ $# -gt 0 ]]; do
     case "$1" in
@@ -305,6 +319,30 @@ while [[ $# -gt 0 ]]; do
             FORCE_COMPLETE=true
             shift
             ;;
+        --trace)
+            TRACE_FILE="$2"
+            shift 2
+            ;;
+        --provider-pool)
+            PROVIDER_POOL=true
+            shift
+            ;;
+        --cascade)
+            CASCADE=true
+            shift
+            ;;
+        --deadline)
+            DEADLINE="$2"
+            shift 2
+            ;;
+        --cli-pool)
+            CLI_POOL=true
+            shift
+            ;;
+        --plan)
+            PLAN=true
+            shift
+            ;;
         --help)
             usage
             ;;
@@ -397,6 +435,12 @@ if [[ "$START_ROUND" -lt 1 || "$START_ROUND" -gt 5 ]]; then
     exit 1
 fi
 
+# Validate deadline (the marking runs split the time left, see src/task_planner.py)
+TASK_PLANNER="$PROJECT_ROOT/src/task_planner.py"
+if [[ -n "$DEADLINE" ]] && ! python3 "$TASK_PLANNER" share --deadline "$DEADLINE" --parts 1 > /dev/null; then
+    exit 1
+fi
+
 # Validate assignments file
 if [[ ! -f "$ASSIGNMENTS_FILE" ]]; then
     log_error "Assignments file not found: $ASSIGNMENTS_FILE"
@@ -418,6 +462,11 @@ if [[ ${#ASSIGNMENTS[@]} -eq 0 ]]; then
     exit 1
 fi
 
+# Run-wide tracing (--trace); each marking run adds its own process to the trace
+source "$PROJECT_ROOT/src/utils/tracing.sh"
+trace_init "$TRACE_FILE" "batch_mark: $(basename "$ASSIGNMENTS_FILE")"
+trace_stage "Setup"
+
 echo "=================================================================="
 echo "              BATCH MARKING - STAGED WORKFLOW"
 echo "=================================================================="
@@ -448,6 +497,57 @@ if [[ "$FORCE_COMPLETE" == true ]]; then
 fi
 echo
 
+# ============================================================================
+# DRY RUN (--plan): plan each assignment with its marking script, then add up
+# ============================================================================
+
+if [[ "$PLAN" == true ]]; then
+    PLAN_DIR=$(mktemp -d)
+    for i in "${!ASSIGNMENTS[@]}"; do
+        assignment="${ASSIGNMENTS[$i]}"
+        if [[ "$assignment" = /* ]]; then
+            assignment_dir="$assignment"
+        else
+            assignment_dir="$PROJECT_ROOT/$assignment"
+        fi
+        overview_file="$assignment_dir/overview.md"
+        if [[ ! -f "$overview_file" ]]; then
+            log_warning "Skipping $assignment (no overview.md)"
+            continue
+        fi
+
+        mark_script="$PROJECT_ROOT/mark_structured.sh"
+        if grep -q "assignment_type:\s*freeform" "$overview_file" 2>/dev/null; then
+            mark_script="$PROJECT_ROOT/mark_freeform.sh"
+        fi
+        cmd=("$mark_script" "$assignment_dir" --plan-json "$(printf "%s/%03d.json" "$PLAN_DIR" "$i")")
+        [[ -n "$PROVIDER" ]] && cmd+=("--provider" "$PROVIDER")
+        [[ -n "$MODEL" ]] && cmd+=("--model" "$MODEL")
+        [[ -n "$API_MODEL" ]] && cmd+=("--api-model" "$API_MODEL")
+        [[ -n "$PARALLEL_OVERRIDE" ]] && cmd+=("--parallel" "$PARALLEL_OVERRIDE")
+
+        echo "------------------------------------------------------------------"
+        if ! "${cmd[@]}"; then
+            log_warning "Could not plan $assignment"
+        fi
+        echo
+    done
+
+    echo "=================================================================="
+    log_info "Batch plan (assignments are marked one after another)"
+    echo "=================================================================="
+    shopt -s nullglob
+    plans=("$PLAN_DIR"/*.json)
+    status=1
+    if [[ ${#plans[@]} -gt 0 ]]; then
+        python3 "$PROJECT_ROOT/src/dry_run.py" total "${plans[@]}" && status=0
+    else
+        log_error "No assignment could be planned"
+    fi
+    rm -rf "$PLAN_DIR"
+    exit $status
+fi
+
 # ============================================================================
 # CHECK FOR MISSING OVERVIEW FILES
 # ============================================================================
@@ -520,6 +620,35 @@ else
     echo
 fi
 
+# ============================================================================
+# HELPER FUNCTION: Check the shared quota ledger before starting an assignment
+# Returns 1 if the per-day budget of the provider is exhausted
+# ============================================================================
+
+QUOTA_LEDGER="$PROJECT_ROOT/src/utils/quota_ledger.py"
+
+check_quota_budget() {
+    if [[ -z "$PROVIDER" ]]; then
+        return 0
+    fi
+    local interface="cli"
+    if [[ -n "$API_MODEL" ]]; then
+        interface="api"
+    fi
+
+    local budget status=0
+    budget=$(python3 "$QUOTA_LEDGER" check --interface "$interface" --provider "$PROVIDER") || status=$?
+    if [[ $status -eq 3 ]]; then
+        log_warning "Quota ledger: $budget"
+        log_warning "Skipping (re-run batch_mark.sh when the budget has recovered)"
+        return 1
+    fi
+    if [[ -n "$budget" ]]; then
+        log_info "Quota ledger remaining: $budget"
+    fi
+    return 0
+}
+
 # ============================================================================
 # HELPER FUNCTION: Run a stage for all assignments
 # ============================================================================
@@ -611,6 +740,26 @@ run_stage_for_all() {
             cmd+=("--force-complete")
         fi
 
+        if [[ "$CLI_POOL" == true ]]; then
+            cmd+=("--cli-pool")
+        fi
+        if [[ "$PROVIDER_POOL" == true ]]; then
+            cmd+=("--provider-pool")
+        fi
+        if [[ "$CASCADE" == true ]]; then
+            cmd+=("--cascade")
+        fi
+        if [[ -n "$DEADLINE" ]]; then
+            cmd+=("--deadline" "$(python3 "$TASK_PLANNER" share --deadline "$DEADLINE" --parts $((total - i)))")
+        fi
+
+        # Don't start an assignment once the shared quota ledger's per-day
+        # budget is used up (other runs on the account count too)
+        if ! check_quota_budget; then
+            failed+=("$assignment (daily quota budget exhausted)")
+            continue
+        fi
+
         # Execute marking script
         if "${cmd[@]}"; then
             log_success "Completed: $assignment"
@@ -645,6 +794,7 @@ run_stage_for_all() {
 # ============================================================================
 
 if [[ "$START_ROUND" -le 1 ]]; then
+    trace_stage "Round 1: Preparation"
     echo
     echo "=================================================================="
     log_round "ROUND 1: PREPARATION (Stages 1-2 for ALL assignments)"
@@ -667,6 +817,7 @@ fi
 # ============================================================================
 
 if [[ "$START_ROUND" -le 2 ]]; then
+    trace_stage "Round 2: Pattern Design"
     echo
     echo "=================================================================="
     log_round "ROUND 2: PATTERN DESIGN (Stage 3 - INTERACTIVE for ALL)"
@@ -690,6 +841,7 @@ fi
 # ============================================================================
 
 if [[ "$START_ROUND" -le 3 ]]; then
+    trace_stage "Round 3: Marking + Normalization"
     echo
     echo "=================================================================="
     log_round "ROUND 3: MARKING + NORMALIZATION (Stages 4-5 for ALL)"
@@ -713,6 +865,7 @@ fi
 # ============================================================================
 
 if [[ "$START_ROUND" -le 4 ]]; then
+    trace_stage "Round 4: Dashboard Review"
     echo
     echo "=================================================================="
     log_round "ROUND 4: DASHBOARD REVIEW (Stage 6 - INTERACTIVE for ALL)"
@@ -735,6 +888,7 @@ fi
 # ============================================================================
 
 if [[ "$START_ROUND" -le 5 ]]; then
+    trace_stage "Round 5: Completion"
     echo
     echo "=================================================================="
     log_round "ROUND 5: COMPLETION (Stages 7-9 for ALL assignments)"
@@ -820,6 +974,19 @@ if [[ "$START_ROUND" -le 5 ]]; then
             cmd+=("--force-complete")
         fi
 
+        if [[ "$CLI_POOL" == true ]]; then
+            cmd+=("--cli-pool")
+        fi
+        if [[ "$PROVIDER_POOL" == true ]]; then
+            cmd+=("--provider-pool")
+        fi
+        if [[ "$CASCADE" == true ]]; then
+            cmd+=("--cascade")
+        fi
+        if [[ -n "$DEADLINE" ]]; then
+            cmd+=("--deadline" "$(python3 "$TASK_PLANNER" share --deadline "$DEADLINE" --parts $((total - i)))")
+        fi
+
         # Always resume in round 5
         # (don't pass --no-resume even if it was set initially)
 
@@ -839,6 +1006,8 @@ fi
 # FINAL SUMMARY
 # ============================================================================
 
+trace_stage "Final summary"
+
 echo
 echo "=================================================================="
 echo "              BATCH MARKING COMPLETE"
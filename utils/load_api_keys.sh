@@ -9,6 +9,10 @@
 # NOTE: This file must be SOURCED, not executed, for the exports to persist.
 # Sourcing runs it in your current shell so exports are available afterward.
 #
+# A key file may hold several keys, one per line, to use as a pool in API
+# mode (see src/api/key_pool.py). The first key is exported as usual and all
+# of them, comma separated, as <NAME>S (e.g. CLAUDE_API_KEYS).
+#
 
 # Find project root by looking for .secrets/ directory
 # First try current directory, then parent of script location
@@ -28,6 +32,20 @@ fi
 
 SECRETS_DIR="$PROJECT_ROOT/.secrets"
 
+# Print the keys in a secrets file, comma separated (blank and # lines skipped)
+_read_keys() {
+    grep -v '^[[:space:]]*\(#\|$\)' "$1" | tr -d ' \t\r' | paste -sd, -
+}
+
+# Export <NAME>S=<all keys> when a file holds more than one key
+_export_key_pool() {
+    local name="$1" keys="$2"
+    if [[ "$keys" == *,* ]]; then
+        export "${name}S=$keys"
+        echo "  $name: $(echo "$keys" | tr ',' '\n' | wc -l | tr -d ' ') keys (pooled as ${name}S)"
+    fi
+}
+
 if [[ ! -d "$SECRETS_DIR" ]]; then
     echo "Warning: .secrets/ directory not found at $SECRETS_DIR"
     return 1 2>/dev/null || exit 1
@@ -35,31 +53,44 @@ fi
 
 # Load Claude API key (Anthropic)
 if [[ -f "$SECRETS_DIR/CLAUDE_API_KEY" ]]; then
-    export CLAUDE_API_KEY="$(cat "$SECRETS_DIR/CLAUDE_API_KEY" | tr -d '\n')"
+    _keys="$(_read_keys "$SECRETS_DIR/CLAUDE_API_KEY")"
+    export CLAUDE_API_KEY="${_keys%%,*}"
     export ANTHROPIC_API_KEY="$CLAUDE_API_KEY"  # Alias for SDK compatibility
     echo "Loaded CLAUDE_API_KEY (also set as ANTHROPIC_API_KEY)"
+    _export_key_pool CLAUDE_API_KEY "$_keys"
 elif [[ -f "$SECRETS_DIR/ANTHROPIC_API_KEY" ]]; then
     # Backward compatibility
-    export ANTHROPIC_API_KEY="$(cat "$SECRETS_DIR/ANTHROPIC_API_KEY" | tr -d '\n')"
+    _keys="$(_read_keys "$SECRETS_DIR/ANTHROPIC_API_KEY")"
+    export ANTHROPIC_API_KEY="${_keys%%,*}"
     export CLAUDE_API_KEY="$ANTHROPIC_API_KEY"
     echo "Loaded ANTHROPIC_API_KEY (also set as CLAUDE_API_KEY)"
+    _export_key_pool CLAUDE_API_KEY "$_keys"
 fi
 
 # Load Google/Gemini API key
 if [[ -f "$SECRETS_DIR/GEMINI_API_KEY" ]]; then
-    export GEMINI_API_KEY="$(cat "$SECRETS_DIR/GEMINI_API_KEY" | tr -d '\n')"
+    _keys="$(_read_keys "$SECRETS_DIR/GEMINI_API_KEY")"
+    export GEMINI_API_KEY="${_keys%%,*}"
     export GOOGLE_API_KEY="$GEMINI_API_KEY"  # Alias for compatibility
     echo "Loaded GEMINI_API_KEY (also set as GOOGLE_API_KEY)"
+    _export_key_pool GEMINI_API_KEY "$_keys"
 elif [[ -f "$SECRETS_DIR/GOOGLE_API_KEY" ]]; then
-    export GOOGLE_API_KEY="$(cat "$SECRETS_DIR/GOOGLE_API_KEY" | tr -d '\n')"
+    _keys="$(_read_keys "$SECRETS_DIR/GOOGLE_API_KEY")"
+    export GOOGLE_API_KEY="${_keys%%,*}"
     export GEMINI_API_KEY="$GOOGLE_API_KEY"  # Alias for compatibility
     echo "Loaded GOOGLE_API_KEY (also set as GEMINI_API_KEY)"
+    _export_key_pool GEMINI_API_KEY "$_keys"
 fi
 
 # Load OpenAI API key
 if [[ -f "$SECRETS_DIR/OPENAI_API_KEY" ]]; then
-    export OPENAI_API_KEY="$(cat "$SECRETS_DIR/OPENAI_API_KEY" | tr -d '\n')"
+    _keys="$(_read_keys "$SECRETS_DIR/OPENAI_API_KEY")"
+    export OPENAI_API_KEY="${_keys%%,*}"
     echo "Loaded OPENAI_API_KEY"
+    _export_key_pool OPENAI_API_KEY "$_keys"
 fi
 
+unset _keys
+unset -f _read_keys _export_key_pool
+
 echo "API keys loaded from $SECRETS_DIR"
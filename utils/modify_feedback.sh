@@ -46,6 +46,8 @@ Options:
   --model <model>         Specific model to use (optional)
   --feedback-col <name>   Name of feedback column (auto-detected if not specified)
   --in-place              Modify file in-place (creates .bak backup)
+  --api-model <model>     Use direct API calls instead of the CLI
+  --parallel <n>          Concurrent LLM calls (default: max_parallel, or api_max_parallel with --api-model)
   --dry-run               Preview without calling LLM
   --help                  Show this help message
 
@@ -90,7 +92,7 @@ while [[ $# -gt 0 ]]; do
             INSTRUCTION="$2"
             shift 2
             ;;
-        --output|--provider|--model|--feedback-col)
+        --output|--provider|--model|--feedback-col|--api-model|--parallel)
             EXTRA_ARGS+=("$1" "$2")
             shift 2
             ;;
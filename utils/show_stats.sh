@@ -2,7 +2,8 @@
 #
 # Show Token Usage Statistics
 #
-# Displays aggregated token usage for an assignment from the stats file.
+# Displays aggregated token usage for an assignment from the stats file,
+# plus latency percentiles, throughput and a time breakdown per stage/model.
 #
 # Usage:
 #   ./utils/show_stats.sh <assignment_dir>
@@ -27,7 +28,7 @@ usage() {
     cat << EOF
 Usage: $(basename "$0") <assignment_dir> [OPTIONS]
 
-Display token usage statistics for an assignment.
+Display token usage, latency and throughput statistics for an assignment.
 
 Arguments:
   assignment_dir    Path to assignment directory
@@ -116,7 +117,14 @@ except Exception as e:
     print(f"Error reading stats file: {e}", file=sys.stderr)
     sys.exit(1)
 
-if not stats:
+# Watchdog kills (timeouts, no-output tasks) and stage makespans are event
+# entries, not calls
+events = [s for s in stats if s.get('event') == 'watchdog_kill']
+makespans = [s for s in stats if s.get('event') == 'makespan']
+invalid = [s for s in stats if s.get('event') == 'validation_failure']
+stats = [s for s in stats if not s.get('event')]
+
+if not stats and not events:
     print(f"No token usage stats found for: {assignment_name}")
     sys.exit(0)
 
@@ -127,6 +135,21 @@ total_cache_creation = sum(s.get('cache_creation_tokens', 0) for s in stats)
 total_cache_read = sum(s.get('cache_read_tokens', 0) for s in stats)
 total_cost = sum(s.get('cost_usd', 0) for s in stats)
 
+STAGE_ORDER = ['name_resolver', 'pattern_designer', 'marker', 'normalizer', 'unifier',
+               'aggregator', 'translator', 'summarizer', 'unknown']
+
+def stage_sort_key(stage):
+    return (STAGE_ORDER.index(stage) if stage in STAGE_ORDER else len(STAGE_ORDER), stage)
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+def mean(values):
+    return sum(values) / len(values) if values else None
+
 # By stage
 by_stage = defaultdict(lambda: {'input': 0, 'output': 0, 'count': 0})
 for s in stats:
@@ -152,6 +175,9 @@ print()
 
 print(f"\033[1mOverall Totals:\033[0m")
 print(f"  Total LLM Calls:     {len(stats):,}")
+failed_calls = sum(1 for s in stats if s.get('exit_status', 0) != 0)
+if failed_calls > 0:
+    print(f"  Failed Calls:        {failed_calls:,}")
 print(f"  Input Tokens:        {total_input:,}")
 print(f"  Output Tokens:       {total_output:,}")
 if total_cache_creation > 0:
@@ -163,10 +189,9 @@ if total_cost > 0:
 print()
 
 print(f"\033[1mBy Stage:\033[0m")
-for stage in ['marker', 'normalizer', 'unifier', 'pattern_designer', 'aggregator', 'unknown']:
-    if stage in by_stage:
-        s = by_stage[stage]
-        print(f"  {stage:20s}  {s['count']:4d} calls  |  {s['input']:>10,} in  |  {s['output']:>8,} out")
+for stage in sorted(by_stage, key=stage_sort_key):
+    s = by_stage[stage]
+    print(f"  {stage:20s}  {s['count']:4d} calls  |  {s['input']:>10,} in  |  {s['output']:>8,} out")
 print()
 
 print(f"\033[1mBy Provider:\033[0m")
@@ -174,6 +199,155 @@ for provider, p in sorted(by_provider.items()):
     print(f"  {provider:10s}  {p['count']:4d} calls  |  {p['input']:>10,} in  |  {p['output']:>8,} out")
 print()
 
+# By API key (API mode; keys are identified by fingerprint only)
+by_key = defaultdict(lambda: {'input': 0, 'output': 0, 'count': 0, 'failed': 0})
+for s in stats:
+    if s.get('key_fingerprint'):
+        k = by_key[(s.get('provider', 'unknown'), s['key_fingerprint'])]
+        k['input'] += s.get('input_tokens', 0)
+        k['output'] += s.get('output_tokens', 0)
+        k['count'] += 1
+        k['failed'] += 1 if s.get('exit_status', 0) != 0 else 0
+if by_key:
+    print(f"\033[1mBy API Key:\033[0m")
+    for (provider, key), k in sorted(by_key.items()):
+        failed = f"  ({k['failed']} failed)" if k['failed'] else ''
+        print(f"  {provider:8s} {key:20s}  {k['count']:4d} calls  |  {k['input']:>10,} in  |  {k['output']:>8,} out{failed}")
+    print()
+
+# Hedged API requests: the extra cost is that of the requests that did not
+# win (abandoned ones are priced on their estimated input tokens)
+by_hedge = defaultdict(lambda: {'hedged': 0, 'hedge_won': 0, 'extra': 0, 'extra_cost': 0.0})
+for s in stats:
+    if s.get('hedge'):
+        h = by_hedge[s.get('stage', 'unknown')]
+        h['hedged'] += 1 if s['hedge'] == 'hedge' else 0
+        h['hedge_won'] += 1 if s['hedge'] == 'hedge' and s.get('hedge_outcome') == 'won' else 0
+        if s.get('hedge_outcome') in ('lost', 'abandoned', 'failed'):
+            h['extra'] += 1
+            h['extra_cost'] += s.get('cost_usd', 0) or 0
+if by_hedge:
+    print(f"\033[1mHedged Requests:\033[0m")
+    for stage in sorted(by_hedge, key=stage_sort_key):
+        h = by_hedge[stage]
+        print(f"  {stage:20s}  {h['hedged']:4d} hedged  |  {h['hedge_won']:4d} won by the hedge  |  "
+              f"{h['extra']:4d} extra requests, \${h['extra_cost']:.4f}")
+    print()
+
+# Streamed API responses cancelled by the stream guard (tokens are estimated)
+by_abort = defaultdict(lambda: {'count': 0, 'output': 0, 'cost': 0.0})
+for s in stats:
+    if s.get('stream_abort'):
+        a = by_abort[(s.get('stage', 'unknown'), s['stream_abort'])]
+        a['count'] += 1
+        a['output'] += s.get('output_tokens', 0)
+        a['cost'] += s.get('cost_usd', 0) or 0
+if by_abort:
+    print(f"\033[1mStream Aborts:\033[0m")
+    for (stage, reason), a in sorted(by_abort.items(), key=lambda kv: (stage_sort_key(kv[0][0]), kv[0][1])):
+        print(f"  {stage:20s}  {reason:16s}  {a['count']:4d} cancelled  |  {a['output']:>8,} out  |  \${a['cost']:.4f}")
+    print()
+
+# Latency and throughput (entries written before timing was recorded are skipped)
+timed = [s for s in stats if s.get('latency_s') is not None]
+if timed:
+    groups = defaultdict(list)
+    for s in timed:
+        groups[(s.get('stage', 'unknown'), s.get('model') or '(default)')].append(s)
+
+    print(f"\033[1mLatency and Throughput by Stage/Model:\033[0m")
+    print(f"  {'stage':16s} {'model':22s} {'calls':>5s} {'fail':>4s} {'retry':>5s}"
+          f"  {'p50':>6s} {'p95':>6s} {'p99':>6s}  {'calls/min':>9s} {'out tok/s':>9s}")
+    breakdown = {}
+    for (stage, model), entries in sorted(groups.items(), key=lambda kv: (stage_sort_key(kv[0][0]), kv[0][1])):
+        latencies = [e['latency_s'] for e in entries]
+        failed = sum(1 for e in entries if e.get('exit_status', 0) != 0)
+        retried = sum(1 for e in entries if e.get('attempt', 0) > 0)
+
+        # Throughput over the window in which this group was running
+        starts = [e['start_ts'] for e in entries if e.get('start_ts')]
+        ends = [e['end_ts'] for e in entries if e.get('end_ts')]
+        window = (max(ends) - min(starts)) if starts and ends else 0
+        output_tokens = sum(e.get('output_tokens', 0) for e in entries)
+        calls_per_min = f"{len(entries) * 60 / window:9.1f}" if window > 0 else f"{'-':>9s}"
+        tokens_per_s = f"{output_tokens / window:9.1f}" if window > 0 else f"{'-':>9s}"
+
+        print(f"  {stage[:16]:16s} {model[:22]:22s} {len(entries):5d} {failed:4d} {retried:5d}"
+              f"  {percentile(latencies, 50):5.1f}s {percentile(latencies, 95):5.1f}s {percentile(latencies, 99):5.1f}s"
+              f"  {calls_per_min} {tokens_per_s}")
+
+        # Mean time per call in each part of the chain
+        provider = [e['provider_s'] for e in entries if e.get('provider_s') is not None]
+        local = [e['latency_s'] - e['provider_s'] for e in entries if e.get('provider_s') is not None]
+        ttft = [e['ttft_s'] for e in entries if e.get('ttft_s') is not None]
+        breakdown[(stage, model)] = {
+            'queue': mean([e['queue_s'] for e in entries if e.get('queue_s') is not None]),
+            'startup': mean([e['startup_s'] for e in entries if e.get('startup_s') is not None]),
+            'provider': mean(provider),
+            'local': mean(local),
+            'ttft': mean(ttft),
+            'latency': mean(latencies),
+        }
+    print()
+
+    def fmt(value):
+        return f"{value:7.2f}s" if value is not None else f"{'-':>8s}"
+
+    print(f"\033[1mMean Time per Call (where it goes):\033[0m")
+    print(f"  {'stage':16s} {'model':22s} {'queue':>8s} {'startup':>8s} {'provider':>8s}"
+          f" {'local':>8s} {'ttft':>8s}  bound by")
+    for (stage, model), b in breakdown.items():
+        # provider = provider-reported (or SDK request) time, network included;
+        # local = CLI/SDK process time outside the provider request
+        parts = {
+            'queue (concurrency)': b['queue'] or 0,
+            'process (startup)': b['startup'] or 0,
+            'provider/network': b['provider'] if b['provider'] is not None else b['latency'],
+            'process (local)': b['local'] or 0,
+        }
+        bound = max(parts, key=parts.get)
+        print(f"  {stage[:16]:16s} {model[:22]:22s} {fmt(b['queue'])} {fmt(b['startup'])} {fmt(b['provider'])}"
+              f" {fmt(b['local'])} {fmt(b['ttft'])}  {bound}")
+    print(f"  (provider: time reported by the provider or the SDK request; local: rest of the")
+    print(f"   CLI/SDK call; '-' where the interface does not report it)")
+    print()
+
+if events:
+    print(f"\033[1mWatchdog Kills:\033[0m")
+    kills = defaultdict(lambda: defaultdict(int))
+    for e in events:
+        kills[(e.get('stage', 'unknown'), e.get('scope', 'task'), e.get('reason', 'timeout'))][e.get('action', 'failed')] += 1
+    for (stage, scope, reason), actions in sorted(kills.items(), key=lambda kv: (stage_sort_key(kv[0][0]), kv[0][1:])):
+        summary = ', '.join(f"{count} {action}" for action, count in sorted(actions.items()))
+        print(f"  {stage:20s}  {scope:4s}  {reason:7s}  {sum(actions.values()):4d} killed  ({summary})")
+    print(f"  (timeout: stage time limit; idle: no output; limits in the timeouts section of config.yaml)")
+    print()
+
+if invalid:
+    print(f"\033[1mOutput Validation:\033[0m")
+    checks = defaultdict(int)
+    last_action = {}
+    for e in invalid:
+        checks[e.get('stage', 'unknown')] += 1
+        last_action[(e.get('stage', 'unknown'), e.get('context'))] = e.get('action')
+    for stage in sorted(checks, key=stage_sort_key):
+        actions = [a for (s, _), a in last_action.items() if s == stage]
+        kept = sum(1 for a in actions if a == 'kept')
+        print(f"  {stage:20s}  {checks[stage]:4d} failed checks  |  {len(actions):4d} outputs  |  "
+              f"{len(actions) - kept:4d} repaired  |  {kept:4d} kept invalid")
+    print(f"  (see src/utils/output_validator.py; problems are in the stats file's validation_failure events)")
+    print()
+
+if makespans:
+    print(f"\033[1mStage Makespan:\033[0m")
+    print(f"  {'Stage':16s} {'Tasks':>5s} {'Par':>4s} {'Order':>5s} {'Predicted':>10s} {'File order':>11s} {'Actual':>8s}")
+    for m in makespans:
+        print(f"  {m.get('stage', 'unknown')[:16]:16s} {m.get('tasks', 0):5d} {m.get('concurrency', 0):4d} "
+              f"{m.get('order', '-'):>5s} {m.get('predicted_s', 0):9.0f}s {m.get('file_order_s', 0):10.0f}s "
+              f"{m.get('actual_s', 0):7.0f}s")
+    print(f"  (predicted: list schedule of the per-task estimates in the order run; see src/task_planner.py)")
+    print()
+
 # Time range
 timestamps = [s.get('timestamp') for s in stats if s.get('timestamp')]
 if timestamps:
@@ -46,6 +46,8 @@ Options:
   --total-marks <n>       Total possible marks (default: 100)
   --feedback-col <name>   Name of feedback column (auto-detected if not specified)
   --summary-col <name>    Name of summary column to add (default: "Feedback Summary")
+  --api-model <model>     Use direct API calls instead of the CLI
+  --parallel <n>          Concurrent LLM calls (default: max_parallel, or api_max_parallel with --api-model)
   --dry-run               Preview without calling LLM
   --help                  Show this help message
 
@@ -82,7 +84,7 @@ while [[ $# -gt 0 ]]; do
         --help)
             usage
             ;;
-        --output|--provider|--model|--feedback-col|--summary-col|--total-marks)
+        --output|--provider|--model|--feedback-col|--summary-col|--total-marks|--api-model|--parallel)
             EXTRA_ARGS+=("$1" "$2")
             shift 2
             ;;